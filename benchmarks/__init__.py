@@ -0,0 +1,8 @@
+"""
+性能基准.
+
+每个模块可以单独运行, 如: python -m benchmarks.plugin_cache
+
+纯计算热点路径的基准套件见 hot_paths, 支持 json 输出和与基线比较:
+python -m benchmarks.hot_paths --save-baseline, 修改后运行 python -m benchmarks.hot_paths --compare.
+"""
@@ -0,0 +1,190 @@
+"""
+基准的注册, 运行, json 结果和基线比较.
+
+基准以 case 装饰器注册, 被装饰的函数接收放大倍数 scale, 完成数据准备后返回要计时的无参函数.
+"""
+from __future__ import annotations
+
+import datetime
+import fnmatch
+import json
+import platform
+import statistics
+import sys
+import timeit
+from pathlib import Path
+from typing import Callable, Optional
+
+__all__ = [
+    "RESULT_VERSION", "DEFAULT_THRESHOLD",
+    "Case", "case", "registered_cases", "run", "dump", "load", "compare", "format_results",
+]
+
+RESULT_VERSION = 1
+DEFAULT_THRESHOLD = 0.2  # 比基线慢超过此比例时视为退化.
+
+
+class Case:
+    """一个已注册的基准."""
+
+    def __init__(self, name: str, setup: Callable[[int], Callable[[], object]], description: str):
+        self.name = name
+        self.setup = setup
+        self.description = description
+
+
+_cases: dict[str, Case] = {}
+
+
+def case(name: str):
+    """
+    注册基准.
+
+    Examples:
+
+    >>> @case("example.sum")
+    ... def bench_sum(scale: int):
+    ...     \"\"\"对 1000 * scale 个整数求和.\"\"\"
+    ...     data = list(range(1000 * scale))
+    ...     return lambda: sum(data)
+    """
+
+    def decorator(setup: Callable[[int], Callable[[], object]]):
+        if name in _cases:
+            raise ValueError(f"benchmark {name} is already registered.")
+        _cases[name] = Case(name, setup, (setup.__doc__ or "").strip().split("\n")[0])
+        return setup
+
+    return decorator
+
+
+def registered_cases(patterns: list[str] = None) -> list[Case]:
+    """
+    已注册的基准, 按照名称排序.
+
+    Parameters:
+        patterns: 名称的 fnmatch 模式或者子串, 只返回匹配其中之一的基准, 默认返回全部.
+    """
+    cases = sorted(_cases.values(), key=lambda c: c.name)
+    if not patterns:
+        return cases
+    return [c for c in cases
+            if any(p in c.name or fnmatch.fnmatchcase(c.name, p) for p in patterns)]
+
+
+def run(cases: list[Case], scale: int = 1, repeat: int = 5, number: int = None,
+        progress: Callable[[str], None] = None) -> dict:
+    """
+    运行基准.
+
+    Parameters:
+        cases: 要运行的基准.
+        scale: 示例数据的放大倍数.
+        repeat: 重复计时的次数, 结果取最短和中位时间.
+        number: 每次计时执行的次数, 默认自动选择使每次计时至少 0.2s.
+        progress: 每个基准运行前以其名称调用.
+
+    Returns:
+        可以被 json 序列化的结果, 时间单位为 s, 为单次执行的时间.
+    """
+    results = {}
+    for c in cases:
+        if progress is not None:
+            progress(c.name)
+        timer = timeit.Timer(c.setup(scale))
+        n = number or timer.autorange()[0]
+        times = [t / n for t in timer.repeat(repeat=repeat, number=n)]
+        results[c.name] = {
+            "min": min(times),
+            "median": statistics.median(times),
+            "number": n,
+            "repeat": repeat,
+        }
+    return {
+        "version": RESULT_VERSION,
+        "meta": {
+            "created": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "scale": scale,
+        },
+        "results": results,
+    }
+
+
+def dump(result: dict, path: str | Path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+        f.write("\n")
+
+
+def load(path: str | Path) -> dict:
+    """
+    读取 dump 写出的结果.
+
+    Raises:
+        ValueError: 文件不是此版本的基准结果.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        result = json.load(f)
+    if not isinstance(result, dict) or result.get("version") != RESULT_VERSION:
+        raise ValueError(f"{path} is not a benchmark result of version {RESULT_VERSION}.")
+    return result
+
+
+def compare(current: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD) -> dict[str, dict]:
+    """
+    比较两次结果中相同基准的最短时间.
+
+    Parameters:
+        current: 本次结果.
+        baseline: 基线结果.
+        threshold: 退化阈值, 见 DEFAULT_THRESHOLD.
+
+    Returns:
+        基准名称 -> {"baseline": s 或 None, "current": s, "ratio": current / baseline 或 None,
+        "status": "regressed" / "improved" / "ok" / "new"}.
+    """
+    comparison = {}
+    for name, res in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            comparison[name] = {"baseline": None, "current": res["min"], "ratio": None, "status": "new"}
+            continue
+        ratio = res["min"] / base["min"] if base["min"] > 0 else float("inf")
+        if ratio > 1 + threshold:
+            status = "regressed"
+        elif ratio < 1 / (1 + threshold):
+            status = "improved"
+        else:
+            status = "ok"
+        comparison[name] = {"baseline": base["min"], "current": res["min"], "ratio": ratio, "status": status}
+    return comparison
+
+
+def _fmt_time(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return "-"
+    for unit, factor in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= factor:
+            return f"{seconds / factor:.3f}{unit}"
+    return f"{seconds / 1e-9:.1f}ns"
+
+
+def format_results(result: dict, comparison: dict[str, dict] = None) -> str:
+    """结果的文本表格, 有比较结果时附加基线时间和比例."""
+    width = max((len(name) for name in result["results"]), default=4)
+    header = f"{'name':<{width}} {'min':>12} {'median':>12}"
+    if comparison is not None:
+        header += f" {'baseline':>12} {'ratio':>8}  status"
+    lines = [header]
+    for name, res in result["results"].items():
+        line = f"{name:<{width}} {_fmt_time(res['min']):>12} {_fmt_time(res['median']):>12}"
+        if comparison is not None:
+            cmp = comparison[name]
+            ratio = "-" if cmp["ratio"] is None else f"{cmp['ratio']:.2f}x"
+            line += f" {_fmt_time(cmp['baseline']):>12} {ratio:>8}  {cmp['status']}"
+        lines.append(line)
+    return "\n".join(lines)
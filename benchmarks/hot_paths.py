@@ -0,0 +1,367 @@
+"""
+纯计算热点路径的基准套件.
+
+使用 assets/development-references 中的示例数据, 按照 --scale 放大后测量各个解析和计算函数,
+结果可以写出为 json, 并与保存的基线比较, 用于衡量优化效果和发现性能退化.
+
+运行:
+    python -m benchmarks.hot_paths                      # 运行全部基准并输出表格.
+    python -m benchmarks.hot_paths -k seat -k encrypt   # 只运行名称包含 seat 或 encrypt 的基准.
+    python -m benchmarks.hot_paths --json result.json   # 同时写出 json 结果.
+    python -m benchmarks.hot_paths --save-baseline      # 把结果保存为基线.
+    python -m benchmarks.hot_paths --compare            # 与基线比较, 有基准退化时退出码为 1.
+"""
+from __future__ import annotations
+
+import argparse
+import copy
+import datetime
+import json
+import sys
+from pathlib import Path
+
+from src.plugin.context import PluginCache
+from tests.fake_ecnu import FIXTURE_DIR, import_plugin_module
+from .harness import DEFAULT_THRESHOLD, case, registered_cases, run, dump, load, compare, format_results
+from .plugin_cache import make_history
+
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+
+
+def load_fixture(name: str):
+    with open(FIXTURE_DIR / name, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def tiled_seats(scale: int) -> list[dict]:
+    """把示例区域的座位布局横向复制 scale 份, 组成一个更大的区域."""
+    template = load_fixture("query_seats_example.json")
+    seats = []
+    for k in range(scale):
+        for seat in copy.deepcopy(template):
+            seat["id"] = str(int(seat["id"]) + k * 100000)
+            seat["point_x"] = str(float(seat["point_x"]) + k * 100)
+            seats.append(seat)
+    return seats
+
+
+def synthetic_days(count: int) -> list[dict]:
+    """date 请求返回的 count 天可预约时间, 每天 24 个时间段."""
+    start = datetime.date.today()
+    return [{"day": (start + datetime.timedelta(days=i)).isoformat(),
+             "times": [{"id": str(1480000 + i * 100 + j), "status": 1,
+                        "start": f"{8 + j // 2:02d}:{j % 2 * 30:02d}", "end": "22:00"} for j in range(24)]}
+            for i in range(count)]
+
+
+def scaled_quick_select(scale: int) -> dict:
+    """在示例 quickSelect 数据中把区域复制 scale 份, 复制的区域使用新的 id."""
+    data = load_fixture("quick_select_example.json")
+    areas = data["area"]
+    for k in range(1, scale):
+        for area in load_fixture("quick_select_example.json")["area"]:
+            area["id"] = str(int(area["id"]) + k * 1000)
+            areas.append(area)
+    return data
+
+
+@case("library.seat_finder.find_most_isolated")
+def bench_find_most_isolated(scale: int):
+    """在 76 * 4 * scale 个座位中寻找最孤立的空闲座位."""
+    seat = import_plugin_module("library.seat")
+    finder = seat.SeatFinder(seat.Seat.from_response(tiled_seats(4 * scale)))
+    return finder.find_most_isolated
+
+
+@case("library.seat_scorer.construct")
+def bench_seat_scorer_construct(scale: int):
+    """把 76 * 4 * scale 个座位打包为 SeatScorer 的数组."""
+    seat = import_plugin_module("library.seat")
+    scoring = import_plugin_module("library.scoring")
+    seats = seat.Seat.from_response(tiled_seats(4 * scale))
+    return lambda: scoring.SeatScorer(seats)
+
+
+@case("library.seat_scorer.objectives")
+def bench_seat_scorer_objectives(scale: int):
+    """在 76 * 4 * scale 个座位中按照每个评分目标各寻找一次最佳座位."""
+    seat = import_plugin_module("library.seat")
+    scoring = import_plugin_module("library.scoring")
+    scorer = scoring.SeatScorer(seat.Seat.from_response(tiled_seats(4 * scale)))
+
+    def best_of_all():
+        for objective in scoring.OBJECTIVES:
+            scorer.best(objective, entrance=(0, 50))
+
+    return best_of_all
+
+
+@case("library.seat.from_response")
+def bench_seat_from_response(scale: int):
+    """解析 76 * 4 * scale 个座位."""
+    seat = import_plugin_module("library.seat")
+    data = tiled_seats(4 * scale)
+    return lambda: seat.Seat.from_response(data)
+
+
+@case("library.seat_table.construct")
+def bench_seat_table_construct(scale: int):
+    """把 76 * 4 * scale 个座位解析为 SeatTable, 与 library.seat.from_response 对比."""
+    seat = import_plugin_module("library.seat")
+    data = tiled_seats(4 * scale)
+    return lambda: seat.SeatTable(data)
+
+
+@case("library.seat_scorer.construct_table")
+def bench_seat_scorer_construct_table(scale: int):
+    """从 76 * 4 * scale 个座位的 SeatTable 构建 SeatScorer, 即每次轮询时从查询结果到评分的开销."""
+    seat = import_plugin_module("library.seat")
+    scoring = import_plugin_module("library.scoring")
+    data = tiled_seats(4 * scale)
+    return lambda: scoring.SeatScorer(seat.SeatTable(data))
+
+
+@case("library.seat_index.find_group")
+def bench_seat_index_find_group(scale: int):
+    """在 76 * 4 * scale 个座位中寻找 3 个相邻的空闲座位."""
+    seat = import_plugin_module("library.seat")
+    spatial = import_plugin_module("library.spatial")
+    index = spatial.SeatIndex(seat.Seat.from_response(tiled_seats(4 * scale)))
+    return lambda: index.find_group(3, 8)
+
+
+@case("library.seat_index.within")
+def bench_seat_index_within(scale: int):
+    """查询 76 * 4 * scale 个座位中每个座位周围的空闲座位."""
+    seat = import_plugin_module("library.seat")
+    spatial = import_plugin_module("library.spatial")
+    seats = seat.Seat.from_response(tiled_seats(4 * scale))
+    index = spatial.SeatIndex(seats)
+
+    def within_all():
+        for s in seats:
+            index.within(s, 8)
+
+    return within_all
+
+
+@case("library.quick_select.construct")
+def bench_quick_select(scale: int):
+    """构建区域数量为示例 4 * scale 倍的 QuickSelect."""
+    query = import_plugin_module("library.query")
+    data = scaled_quick_select(4 * scale)
+    return lambda: query.QuickSelect(data)  # 构建时只会把 id 转换为 int, 可以重复使用同一份数据.
+
+
+@case("library.quick_select.get_premises_of")
+def bench_get_premises_of(scale: int):
+    """查询区域数量为示例 4 * scale 倍的 QuickSelect 中每个区域所属的校区."""
+    query = import_plugin_module("library.query")
+    qs = query.QuickSelect(scaled_quick_select(4 * scale))
+
+    def premises_of_all():
+        for area_id in qs.areas:
+            qs.get_premises_of(area_id)
+
+    return premises_of_all
+
+
+@case("library.date.from_response")
+def bench_day_from_response(scale: int):
+    """解析 7 * scale 天, 每天 24 个时间段的可预约时间."""
+    date = import_plugin_module("library.date")
+    data = synthetic_days(7 * scale)
+    return lambda: date.Day.from_response(data)
+
+
+ENCRYPT_KEY = "2024112882114202"
+ENCRYPT_PAYLOAD = {"seat_id": "3361", "segment": "1508173"}
+
+
+@case("library.encryptor.encrypt")
+def bench_encrypt(scale: int):
+    """加密 scale 个预约请求."""
+    encryptor = import_plugin_module("library.encrypt").Encryptor
+
+    def encrypt():
+        for _ in range(scale):
+            encryptor.encrypt(ENCRYPT_PAYLOAD, ENCRYPT_KEY)
+
+    return encrypt
+
+
+@case("library.encryptor.decrypt")
+def bench_decrypt(scale: int):
+    """解密 scale 个预约请求."""
+    encryptor = import_plugin_module("library.encrypt").Encryptor
+    token = encryptor.encrypt(ENCRYPT_PAYLOAD, ENCRYPT_KEY)
+
+    def decrypt():
+        for _ in range(scale):
+            encryptor.decrypt(token, ENCRYPT_KEY)
+
+    return decrypt
+
+
+def confirm_pairs(count: int) -> list[tuple[int, int]]:
+    return [(3300 + i, 1508173 + i % 3) for i in range(count)]
+
+
+@case("library.encryptor.confirm_payloads")
+def bench_encrypt_confirm_payloads(scale: int):
+    """使用 Encryptor.encrypt 逐个加密 100 * scale 个预约请求, 与 confirm_encryptor.encrypt_many 对比."""
+    encryptor = import_plugin_module("library.encrypt").Encryptor
+    pairs = confirm_pairs(100 * scale)
+
+    def encrypt_each():
+        for seat_id, segment in pairs:
+            encryptor.encrypt({"seat_id": seat_id, "segment": f"{segment}"})
+
+    return encrypt_each
+
+
+@case("library.confirm_encryptor.encrypt_many")
+def bench_confirm_encrypt_many(scale: int):
+    """使用 ConfirmEncryptor.encrypt_many 批量加密 100 * scale 个预约请求."""
+    encryptor = import_plugin_module("library.encrypt").ConfirmEncryptor()
+    pairs = confirm_pairs(100 * scale)
+    return lambda: encryptor.encrypt_many(pairs)
+
+
+def synthetic_rooms(count: int, day: datetime.date) -> list[dict]:
+    """roomAvailable 接口返回的研修间, 每个研修间当天有 4 个预约."""
+    rooms = []
+    for i in range(count):
+        resv = []
+        for begin, end in (("08:30", "09:45"), ("10:20", "13:00"), ("15:00", "16:10"), ("18:00", "22:00")):
+            b = datetime.datetime.combine(day, datetime.time.fromisoformat(begin))
+            e = datetime.datetime.combine(day, datetime.time.fromisoformat(end))
+            resv.append({"devId": 3676574 + i, "startTime": int(b.timestamp() * 1000),
+                         "endTime": int(e.timestamp() * 1000), "title": "自习", "uuid": f"{i}-{begin}"})
+        rooms.append({"devId": 3676574 + i, "devName": f"单人间{i}", "kindId": 3675133, "labName": "图书馆四楼",
+                      "roomId": 3676573 + i, "roomName": f"单人间{i}", "openStart": "08:00",
+                      "openTimes": [{"openStartTime": "08:00", "openEndTime": "22:00", "openLimit": 1}],
+                      "resvInfo": resv})
+    return rooms
+
+
+@case("studyroom.process_reservation_data")
+def bench_process_reservation_data(scale: int):
+    """整理 30 * scale 个研修间的预约数据并计算可预约时间段."""
+    available = import_plugin_module("studyroom.available")
+    rooms = synthetic_rooms(30 * scale, datetime.date.today() + datetime.timedelta(days=1))
+    return lambda: available.process_reservation_data_in_roomAvailable(rooms, "tomorrow", True)
+
+
+def degree_file(rows: int) -> str:
+    """电量记录文件, 每 10 分钟一条, 电量逐渐下降, 每 5000 条充值一次, 包含重复读数."""
+    lines = []
+    degree = 100.0
+    for i in range(rows):
+        if i % 5000 == 4999:
+            degree = 100.0
+        elif i % 3:
+            degree -= 0.02
+        lines.append(f"{1700000000 + i * 600},{degree:.2f}")
+    return "\n".join(lines)
+
+
+@case("electric_bill.load_data")
+def bench_load_data(scale: int):
+    """解析 10000 * scale 条电量记录."""
+    visualize = import_plugin_module("electric_bill.visualize_degree")
+    content = degree_file(10000 * scale)
+    return lambda: visualize.load_data(content)
+
+
+@case("electric_bill.smooth")
+def bench_smooth(scale: int):
+    """平滑 10000 * scale 条电量记录."""
+    visualize = import_plugin_module("electric_bill.visualize_degree")
+    timestamp, degree = visualize.load_data(degree_file(10000 * scale))
+    return lambda: visualize.smooth(timestamp, degree)
+
+
+@case("electric_bill.consuming_speed")
+def bench_consuming_speed(scale: int):
+    """计算 10000 * scale 条电量记录的消耗速度."""
+    visualize = import_plugin_module("electric_bill.visualize_degree")
+    timestamp, degree = visualize.load_data(degree_file(10000 * scale))
+    return lambda: visualize.consuming_speed(timestamp, degree)
+
+
+@case("plugin.plugin_cache.get")
+def bench_plugin_cache_get(scale: int):
+    """读取长度为 1000 * scale 的历史记录列表."""
+    cache = PluginCache("bench")
+    cache.set("history", make_history(1000 * scale))
+    return lambda: cache.get("history")
+
+
+@case("plugin.plugin_cache.serialize")
+def bench_plugin_cache_serialize(scale: int):
+    """获取保存长度为 1000 * scale 的历史记录列表的 PluginCache 的可序列化对象."""
+    cache = PluginCache("bench")
+    cache.set("history", make_history(1000 * scale))
+    return cache._serialize
+
+
+@case("plugin.plugin_config.clone")
+def bench_plugin_config_clone(scale: int):
+    """复制所有内置插件的配置 scale 次."""
+    configs = [import_plugin_module(f"{name}.manifest").manifest.configuration
+               for name in ("library", "studyroom", "calendar_notice", "electric_bill")]
+
+    def clone_all():
+        for _ in range(scale):
+            for config in configs:
+                config.clone()
+
+    return clone_all
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-k", dest="patterns", action="append", default=[],
+                        help="只运行名称包含此子串或者匹配此 fnmatch 模式的基准, 可以指定多次")
+    parser.add_argument("--scale", type=int, default=1, help="示例数据的放大倍数")
+    parser.add_argument("--repeat", type=int, default=5, help="重复计时的次数")
+    parser.add_argument("--number", type=int, default=None, help="每次计时执行的次数, 默认自动选择")
+    parser.add_argument("--json", type=Path, default=None, help="把结果写入此 json 文件")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH, help="基线文件路径")
+    parser.add_argument("--save-baseline", action="store_true", help="把结果保存为基线")
+    parser.add_argument("--compare", action="store_true", help="与基线比较")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="比基线慢超过此比例时视为退化")
+    parser.add_argument("--list", action="store_true", help="列出基准而不运行")
+    args = parser.parse_args(argv)
+
+    cases = registered_cases(args.patterns)
+    if args.list:
+        for c in cases:
+            print(f"{c.name:<45} {c.description}")
+        return 0
+    if not cases:
+        print("no benchmark matches.", file=sys.stderr)
+        return 2
+    result = run(cases, args.scale, args.repeat, args.number,
+                 progress=lambda name: print(f"running {name}...", file=sys.stderr))
+    comparison = None
+    if args.compare:
+        baseline = load(args.baseline)
+        if baseline["meta"].get("scale") != args.scale:
+            print(f"warning: baseline was recorded with scale {baseline['meta'].get('scale')}.", file=sys.stderr)
+        comparison = compare(result, baseline, args.threshold)
+    print(format_results(result, comparison))
+    if args.json is not None:
+        dump(result, args.json)
+    if args.save_baseline:
+        dump(result, args.baseline)
+        print(f"baseline saved to {args.baseline}.", file=sys.stderr)
+    if comparison is not None and any(c["status"] == "regressed" for c in comparison.values()):
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
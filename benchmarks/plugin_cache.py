@@ -0,0 +1,85 @@
+"""
+PluginCache 读写开销基准.
+
+对比旧实现 (每次读取和序列化都 deepcopy, 写入时递归检查) 和当前的不可修改结构实现,
+模拟插件在 routine 中读取历史记录列表, 追加一条记录后写回, 并由 PluginCacheStore 序列化保存.
+
+运行: python -m benchmarks.plugin_cache [--size N] [--repeat N]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import timeit
+from copy import deepcopy
+
+from src.plugin.context import PluginCache, is_json_serializable
+
+
+class DeepcopyPluginCache:
+    """旧的 PluginCache 实现, 仅用于对比."""
+
+    def __init__(self, name: str):
+        self.__dic = {}
+        self.__name = name
+        self._last_routine = 0
+
+    def _serialize(self):
+        return deepcopy({
+            'name': self.__name,
+            'last_routine': self._last_routine,
+            'cache': self.__dic
+        })
+
+    def get(self, item):
+        return deepcopy(self.__dic[item])
+
+    def set(self, key, value):
+        if not is_json_serializable(value):
+            raise ValueError("Cache object can only accept json serializable object.")
+        self.__dic[key] = value
+
+
+def make_history(size: int) -> list[dict]:
+    return [{"timestamp": 1700000000.0 + i * 60, "degree": 100 - i * 0.01, "room": "A101"}
+            for i in range(size)]
+
+
+def bench(cache_cls, size: int, repeat: int) -> dict[str, float]:
+    """返回各项操作单次执行的平均时间 (s)."""
+    cache = cache_cls("bench")
+    cache.set("history", make_history(size))
+    entry = {"timestamp": 0.0, "degree": 0.0, "room": "A101"}
+
+    def get():
+        cache.get("history")
+
+    def append():
+        history = list(cache.get("history"))
+        history.append(entry)
+        cache.set("history", history)
+
+    def serialize():
+        json.dumps(cache._serialize())
+
+    return {name: min(timeit.repeat(func, number=1, repeat=repeat))
+            for name, func in (("get", get), ("append", append), ("serialize", serialize))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", type=int, nargs="+", default=[100, 1000, 10000],
+                        help="历史记录列表长度")
+    parser.add_argument("--repeat", type=int, default=20, help="每项操作的重复次数, 取最短时间")
+    args = parser.parse_args()
+    print(f"{'size':>8} {'op':>10} {'deepcopy (ms)':>14} {'frozen (ms)':>12} {'speedup':>8}")
+    for size in args.size:
+        old = bench(DeepcopyPluginCache, size, args.repeat)
+        new = bench(PluginCache, size, args.repeat)
+        for op in old:
+            print(f"{size:>8} {op:>10} {old[op] * 1000:>14.3f} {new[op] * 1000:>12.3f} "
+                  f"{old[op] / new[op]:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+图书馆座位和可预约时间解析的开销基准.
+
+对比旧实现 (每个座位和时间段都是带 __dict__ 的对象, 每次都重新解析字符串) 和当前的
+SeatTable 列存储以及带 __slots__ 和解析缓存的 Day / TimePeriod,
+模拟一次轮询中的解析部分: 把一个区域的座位解析为 SeatScorer, 以及解析一个区域的可预约时间.
+评分本身两者相同, 不计入.
+
+运行: python -m benchmarks.seat_models [--scale N ...] [--repeat N]
+"""
+from __future__ import annotations
+
+import argparse
+import timeit
+import tracemalloc
+from datetime import time, datetime
+
+from tests.fake_ecnu import import_plugin_module
+from .hot_paths import tiled_seats, synthetic_days
+
+seat_module = import_plugin_module("library.seat")
+date_module = import_plugin_module("library.date")
+scoring = import_plugin_module("library.scoring")
+
+
+class DictSeat:
+    """旧的 Seat 实现, 仅用于对比."""
+
+    def __init__(self, json_data: dict):
+        self.raw = json_data
+        self.id = int(self.raw['id'])
+        self.area_id = int(self.raw['area'])
+        self.no = self.raw['no']
+        self.status = int(self.raw['status'])
+        self.x = float(self.raw['point_x'])
+        self.y = float(self.raw['point_y'])
+        self.width = float(self.raw['width'])
+        self.height = float(self.raw['height'])
+
+    def is_available(self) -> bool:
+        return self.status == 1
+
+
+class DictDay:
+    """旧的 Day 实现, 仅用于对比."""
+
+    def __init__(self, json_data: dict):
+        self.raw = json_data
+        self.day = datetime.strptime(self.raw["day"], "%Y-%m-%d").date()
+        self.times = [DictTimePeriod(p, self) for p in self.raw["times"]]
+
+
+class DictTimePeriod:
+    """旧的 TimePeriod 实现, 仅用于对比."""
+
+    def __init__(self, json_data: dict, day: DictDay):
+        self.raw = json_data
+        self.id = int(self.raw['id'])
+        self.day = day
+        self.start = time(*[int(i) for i in self.raw['start'].split(':', maxsplit=2)])
+        self.end = time(*[int(i) for i in self.raw['end'].split(':', maxsplit=2)])
+
+
+def old_poll(seats: list[dict], days: list[dict]):
+    return scoring.SeatScorer([DictSeat(s) for s in seats]), [DictDay(d) for d in days]
+
+
+def new_poll(seats: list[dict], days: list[dict]):
+    return scoring.SeatScorer(seat_module.SeatTable(seats)), date_module.Day.from_response(days)
+
+
+def measure(poll, seats: list[dict], days: list[dict], repeat: int) -> tuple[float, int, int]:
+    """返回单次轮询的最短时间 (s), 分配的内存峰值和结果保留的内存 (byte)."""
+    elapsed = min(timeit.repeat(lambda: poll(seats, days), number=1, repeat=repeat))
+    tracemalloc.start()
+    result = poll(seats, days)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return elapsed, peak, retained
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", type=int, nargs="+", default=[1, 4, 16],
+                        help="座位为示例区域的 4 * scale 倍, 可预约时间为 7 * scale 天")
+    parser.add_argument("--repeat", type=int, default=20, help="重复次数, 取最短时间")
+    args = parser.parse_args()
+    print(f"{'scale':>6} {'old (ms)':>9} {'new (ms)':>9} {'speedup':>8} "
+          f"{'old peak (KB)':>14} {'new peak (KB)':>14} {'old kept (KB)':>14} {'new kept (KB)':>14}")
+    for scale in args.scale:
+        seats, days = tiled_seats(4 * scale), synthetic_days(7 * scale)
+        new_poll(seats, days)  # 预热解析缓存, 与轮询时的状态相同.
+        old_time, old_peak, old_kept = measure(old_poll, seats, days, args.repeat)
+        new_time, new_peak, new_kept = measure(new_poll, seats, days, args.repeat)
+        print(f"{scale:>6} {old_time * 1000:>9.3f} {new_time * 1000:>9.3f} {old_time / new_time:>7.1f}x "
+              f"{old_peak / 1024:>14.1f} {new_peak / 1024:>14.1f} {old_kept / 1024:>14.1f} {new_kept / 1024:>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,14 @@
-from src.log import init
-from src.gui.mainwind import main
+import sys
+
+from src.profiler import startup_profiler
+
+startup_profiler.enable_from(sys.argv)
+
+with startup_profiler.span("import src.gui.mainwind", "import"):
+    from src.log import init
+    from src.gui.mainwind import main
 
 if __name__ == '__main__':
-    init()
+    with startup_profiler.span("src.log.init", "init"):
+        init()
     main()
@@ -0,0 +1,4 @@
+"""
+课程提醒插件.
+"""
+from .calendar_plugin import *
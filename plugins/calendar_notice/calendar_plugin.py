@@ -1,17 +1,25 @@
+from __future__ import annotations
+
 import datetime
 import textwrap
-from typing import Self
+from typing import Self, TYPE_CHECKING
 
 import requests
 from requests import Response
 from selenium.webdriver.support.wait import WebDriverWait
-from seleniumwire.webdriver import Edge
 import selenium.webdriver.support.expected_conditions as EC
 
 from src import Throttler
-from src.plugin import register_plugin, PluginConfig, Routine, Plugin, PluginContext, \
-    TimeItem
+from src.plugin import register_plugin, PluginConfig, Plugin, PluginContext
+from src.net.cache import scope_of
+from src.net.client import HttpClient, shared_client
+from src.net.resilience import check_available
+from src.uia.cache import PROBE_TIMEOUT
 from src.uia.login import LoginError
+from .manifest import PLUGIN_NAME
+
+if TYPE_CHECKING:
+    from seleniumwire.webdriver import Edge
 
 USER_SCHEDULES = """
 query ($filter: ScheduleFilter, $userId: String) {
@@ -57,6 +65,8 @@ query ($term: Int, $year: Int, $filter: SchoolCalendarFilter) {
 }
 """
 
+SCHOOL_CALENDAR_TTL = (24 * 60 * 60, 7 * 24 * 60 * 60)  # 校历的缓存时间 (ttl, stale), 见 ResponseCache.fetch.
+
 
 class PortalCache:
     def __init__(self, authorization: str):
@@ -75,10 +85,31 @@ class PortalCache:
         req = driver.wait_for_request("calendar-new", 60)
         return cls(req.headers['Authorization'])
 
+    def probe(self) -> bool:
+        """用一次校历查询请求检查登录缓存是否仍然有效, 见 LoginCache.is_valid."""
+        response = shared_client().post(
+            "https://portal2023.ecnu.edu.cn/bus/graphql/calendar-new",
+            cache=self,
+            headers={"Content-Type": "application/json"},
+            json={"query": SCHOOL_CALENDAR, "variables": {}},
+            timeout=PROBE_TIMEOUT,
+        )
+        try:
+            Request.check_login_and_extract_data(response)
+        except LoginError:
+            return False
+        return True
+
 
 class Request:
-    def __init__(self, cache: PortalCache):
+    def __init__(self, cache: PortalCache, http: HttpClient = None):
+        """
+        Parameters:
+            cache: portal 登录缓存.
+            http: 发送请求的 HTTP 客户端, 默认为共享的客户端, 插件中使用 ctx.http.
+        """
         self.cache = cache
+        self.http = http or shared_client()
         if self.cache is None:
             raise ValueError("cache cannot be None.")
 
@@ -91,11 +122,13 @@ class Request:
             response: requests 请求的返回返回对象.
 
         Raises:
+            ServerUnavailableError: 服务器暂时不可用, 不代表登录失效.
             LoginError: 登录失效及请求错误.
 
         Returns:
             如果执行正常, 返回请求回应中的 json 结构 data 字段.
         """
+        check_available(response)
         if response.status_code != 200:
             raise LoginError(f"response status code: {response.status_code}.")
         if "json" not in response.headers["content-type"]:
@@ -118,11 +151,13 @@ class Request:
 
         payload(GraphQL): {"query": query, "variables": variables}
         """
-        headers_ = {"Authorization": self.cache.authorization, "Content-Type": "application/json"}
+        headers_ = {"Content-Type": "application/json"}
         if headers is not None:
             headers_.update(headers)
-        return requests.post(
+        return self.http.post(
             "https://portal2023.ecnu.edu.cn/bus/graphql/calendar-new",
+            cache=self.cache,  # 附加 Authorization 请求头.
+            idempotent=True,  # GraphQL 查询只读取数据.
             headers=headers_,
             json={
                 "query": query,
@@ -163,8 +198,8 @@ class ClassSchedule:
 
 
 class CalendarQuery(Request):
-    def __init__(self, cache: PortalCache):
-        super().__init__(cache)
+    def __init__(self, cache: PortalCache, http: HttpClient = None):
+        super().__init__(cache, http)
 
     def query_user_schedules(self, start_time: int, end_time: int, optimize: bool) \
             -> list[ClassSchedule]:
@@ -196,12 +231,15 @@ class CalendarQuery(Request):
 
     def query_school_calendar(self) -> dict:
         """
-        查询学校日历
+        查询学校日历, 结果会缓存 SCHOOL_CALENDAR_TTL.
         """
-        # 校历无需 filter 参数.
-        rsp = self.query(query=SCHOOL_CALENDAR, variables={})
-        ret = self.check_login_and_extract_data(rsp)
-        return ret
+        ttl, stale = SCHOOL_CALENDAR_TTL
+        return self.http.responses.fetch(
+            "https://portal2023.ecnu.edu.cn/bus/graphql/calendar-new#schoolCalendar",
+            # 校历无需 filter 参数.
+            lambda: self.check_login_and_extract_data(self.query(query=SCHOOL_CALENDAR, variables={})),
+            scope=scope_of(self.cache), ttl=ttl, stale=stale,
+        )
 
     @staticmethod
     def _optimize(class_schedules: list[ClassSchedule]) -> list[ClassSchedule]:
@@ -224,15 +262,7 @@ class CalendarQuery(Request):
         return unique_classes
 
 @register_plugin(
-    name="calendar_notice",
-    description="课程提醒辅助插件, 产生课程消息给其他插件",
-    configuration=PluginConfig().add(
-        TimeItem(
-            name="notice_before_class_start", default_value=datetime.time(0, 10),
-            description="上课提前提醒时间 (提前h小时m分钟)"
-        )
-    ),
-    routine=Routine.MINUTELY,
+    name=PLUGIN_NAME,
     ecnu_cache_grabber=PortalCache.grab_from_driver
 )
 class CalendarNotice(Plugin):
@@ -261,7 +291,7 @@ class CalendarNotice(Plugin):
             ctx.get_logger().error("failed to get cache.")
             ctx.report_cache_invalid()
             return
-        self.calendar_query = CalendarQuery(cache)
+        self.calendar_query = CalendarQuery(cache, ctx.http)
         self.update_schedules(ctx)
 
     def on_routine(self, ctx: PluginContext):
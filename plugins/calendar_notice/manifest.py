@@ -0,0 +1,18 @@
+import datetime
+
+from src.plugin import PluginManifest, PluginConfig, Routine, TimeItem
+
+PLUGIN_NAME = "calendar_notice"
+
+manifest = PluginManifest(
+    name=PLUGIN_NAME,
+    entry="calendar_plugin",
+    description="课程提醒辅助插件, 产生课程消息给其他插件",
+    configuration=PluginConfig().add(
+        TimeItem(
+            name="notice_before_class_start", default_value=datetime.time(0, 10),
+            description="上课提前提醒时间 (提前h小时m分钟)"
+        )
+    ),
+    routine=Routine.MINUTELY,
+)
@@ -1,38 +1,26 @@
-import asyncio
+from __future__ import annotations
+
 import time
 import traceback
-from typing import Awaitable, Callable, Self
+from typing import Awaitable, Callable, Self, TYPE_CHECKING
 
-from PIL.ImageQt import QImage
 from PySide6.QtCore import QThreadPool, Slot
-from PySide6.QtGui import QPixmap
+from PySide6.QtGui import QPixmap, QImage
 from PySide6.QtWidgets import QMessageBox, QWidget, QVBoxLayout, QPushButton, QLabel, QHBoxLayout, \
     QLineEdit
-from matplotlib.backends.backend_agg import FigureCanvasAgg
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.wait import WebDriverWait
-from seleniumwire.webdriver import Edge
 from websockets import connect
 
-from src.plugin import register_plugin, PluginConfig, TextItem, Routine, Plugin, PluginContext, Task
-from src.plugin.config import PasswordItem, NumberItem
-from src.uia.login import get_login_cache
+from src.plugin import register_plugin, PluginConfig, Plugin, PluginContext, Task
+from src.net.client import shared_client
+from src.uia.cache import PROBE_TIMEOUT
 from .client import GuardClient
-from .visualize_degree import get_figure as generate_bill_figure
-from . import visualize_degree
-
-PLUGIN_NAME = "query_electric_bill_client"
-
-
-def byte_len_eq(expected_len: int, accept_empty=False):
-    def j(s: str):
-        try:
-            return (accept_empty and len(s) == 0) or len(s.encode("utf-8")) == expected_len
-        except (UnicodeEncodeError, AttributeError):
-            return False
+from .manifest import PLUGIN_NAME
 
-    return j
+if TYPE_CHECKING:
+    from seleniumwire.webdriver import Edge
 
 
 class EPayCache:
@@ -65,6 +53,20 @@ class EPayCache:
             }
         )
 
+    def probe(self) -> bool:
+        """
+        请求电费查询页面检查登录缓存是否仍然有效, 见 LoginCache.is_valid.
+
+        登录失效时页面会重定向至统一认证登录界面.
+        """
+        response = shared_client().get(
+            "https://epay.ecnu.edu.cn/epaycas/electric/load4electricbill?elcsysid=1",
+            cache=self,
+            allow_redirects=False,
+            timeout=PROBE_TIMEOUT,
+        )
+        return response.status_code == 200
+
 
 class DormInfo:
     def __init__(self, elcbuis: str, elcarea: int, room_no: str):
@@ -110,26 +112,6 @@ class DormInfo:
 
 @register_plugin(
     name=PLUGIN_NAME,
-    description="    宿舍电量自动查询插件, 需要和 GitHub 仓库 https://github.com/azazo1/ecnu-query-electric-bill 配套的服务器共同使用.\n"
-                "    `检查连接`: 可以通过检查服务器连接情况来检查当前与服务器的配置是否正确\n"
-                "    `可视化电量使用情况`: 可以视化宿舍电量随时间的变化\n"
-                "    `获取宿舍配置`: 在弹出的浏览器窗口中选择宿舍信息并获得宿舍配置 1, 2, 3 填写内容",
-    configuration=PluginConfig()
-    .add(TextItem("server_address", "127.0.0.1:30530",
-                  "query degree 服务器套接字地址"))
-    .add(PasswordItem("key", "",
-                      "和 query degree 服务器通信的加密密钥, utf-8 编码后必须 32 个字节",
-                      byte_len_eq(32, True)))
-    .add(PasswordItem("iv", "",
-                      "和 query degree 服务器通信的初始化向量, utf-8 编码后必须 16 个字节",
-                      byte_len_eq(16, True)))
-    .add(NumberItem("alert_degree", 10, "警告电量, 当宿舍电量低于指定电量的时候发出邮件提醒",
-                    lambda a: 0 <= a))
-    .add(TextItem("elcbuis", "", f"宿舍配置 1"))
-    .add(NumberItem("elcarea", -1, "宿舍配置 2"))
-    .add(TextItem("room_no", "", "宿舍配置 3"))
-    ,
-    routine=Routine.MINUTELY,
     ecnu_cache_grabber=EPayCache.grabber
 )
 class QueryBillClientPlugin(Plugin):
@@ -160,25 +142,25 @@ class QueryBillClientPlugin(Plugin):
         self.ctx.get_cache().set("prev_degree", value)
 
     def check_server(self):
-        @Slot(bool)
         def checked_result(rst: bool):
             title = "连接" + ("成功" if rst else "失败")
             text = "与服务器连接" + title
             QMessageBox.information(None, title, text)
 
-        def parallel():
+        async def check():
             try:
-                self.async_client(lambda cli: cli.fetch_degree())
+                await self.async_client(lambda cli: cli.fetch_degree())
                 return True
             except Exception:
                 return False
 
-        task = Task(parallel)
-        task.signals.finished.connect(checked_result)
-        QThreadPool.globalInstance().start(task)
+        self.ctx.run_coroutine(check(), checked_result)
 
     def visualize_degree(self):
-        @Slot(str)
+        # matplotlib 导入较慢, 只在需要显示图表时导入.
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from . import visualize_degree
+
         def file_arrived(file: str):
             if file == "error":
                 QMessageBox.information(None, "发生了错误", "请在日志文件查看详情")
@@ -192,7 +174,7 @@ class QueryBillClientPlugin(Plugin):
                 visualize_degree.iv = self.iv
                 visualize_degree.logger = self.ctx.get_logger()
                 # 生成新的图表
-                fig = generate_bill_figure()
+                fig = visualize_degree.get_figure(file)
                 canvas = FigureCanvasAgg(fig)
                 canvas.draw()
                 buf = canvas.buffer_rgba()
@@ -213,21 +195,21 @@ class QueryBillClientPlugin(Plugin):
                 self._fig_widget.setLayout(layout)
                 self._fig_widget.show()
 
-        def parallel():
+        async def download():
             try:
-                return self.async_client(lambda cli: cli.fetch_degree_file())
+                return await self.async_client(lambda cli: cli.fetch_degree_file())
             except Exception:
                 self.ctx.get_logger().error(traceback.format_exc())
                 return "error"
 
-        task = Task(parallel)
-        task.signals.finished.connect(file_arrived)
-        QThreadPool.globalInstance().start(task)
+        self.ctx.run_coroutine(download(), file_arrived)
 
     def ask_for_room(self):
         """在浏览器中获取用户宿舍配置消息, 不能直接调用, 需要在子线程中调用"""
+        from src.uia.login import get_login_cache
         try:
-            dorm_info = get_login_cache((DormInfo.grabber,)).get_cache(DormInfo)
+            # 需要等待用户在浏览器中选择宿舍.
+            dorm_info = get_login_cache((DormInfo.grabber,), grabber_timeout=60 * 60).get_cache(DormInfo)
             return {
                 "elcbuis": dorm_info.elcbuis,
                 "elcarea": dorm_info.elcarea,
@@ -286,47 +268,42 @@ class QueryBillClientPlugin(Plugin):
         ctx.bind_action("检查连接", self.check_server)
         ctx.bind_action("可视化电量使用情况", self.visualize_degree)
         ctx.bind_action("获取宿舍配置", self.get_dorm_info)
+        self.post_room()
 
-    def async_client(self, job: Callable[[GuardClient], Awaitable]):
-        async def j():
-            async with connect(f"ws://{self.server_address}/") as client:
-                return await job(GuardClient(client, self.key, self.iv, self.ctx.get_logger()))
-
-        return asyncio.run(j())
+    async def async_client(self, job: Callable[[GuardClient], Awaitable]):
+        async with connect(f"ws://{self.server_address}/") as client:
+            return await job(GuardClient(client, self.key, self.iv, self.ctx.get_logger()))
 
     def post_room(self):
+        if not (self.elcbuis and self.elcarea > 0 and self.room_no):
+            return
         dic = dict(roomNo=self.room_no, elcarea=self.elcarea, elcbuis=self.elcbuis)
         self.ctx.get_logger().info("posting room: {}.".format(dic))
 
-        def parallel():
+        async def post():
             try:
-                self.async_client(lambda client: client.post_room(**dic))
+                await self.async_client(lambda client: client.post_room(**dic))
             except Exception as e:
                 self.ctx.get_logger().error((type(e), e))
 
-        QThreadPool.globalInstance().start(Task(parallel))
+        self.ctx.run_coroutine(post())
 
-    def fetch_degree(self) -> None:
-        def parallel():
-            try:
-                rst = self.async_client(lambda client: client.fetch_degree())
-            except Exception:
-                rst = -3
-            return rst
-
-        task = Task(parallel)
-        task.signals.finished.connect(self.on_degree_arrived)
-        QThreadPool.globalInstance().start(task)
+    async def fetch_degree(self) -> float:
+        """从服务器获取宿舍电量, 通信失败时返回 -3."""
+        try:
+            return await self.async_client(lambda client: client.fetch_degree())
+        except Exception:
+            return -3
 
-    def post_token(self):
+    async def post_token(self):
         def pt(client: GuardClient):
             return client.post_token(self.epay_cache.x_csrf_token, self.epay_cache.cookies)
 
-        self.async_client(pt)
+        await self.async_client(pt)
 
-    def on_uia_login(self, ctx: PluginContext):
+    async def on_uia_login(self, ctx: PluginContext):
         self.epay_cache = ctx.get_uia_cache().get_cache(EPayCache)
-        self.post_token()
+        await self.post_token()
 
     def on_config_load(self, ctx: PluginContext, cfg: PluginConfig):
         self.key = cfg.get_item("key").current_value.encode("utf-8")
@@ -337,20 +314,17 @@ class QueryBillClientPlugin(Plugin):
         self.alert_degree = cfg.get_item("alert_degree").current_value
         self.server_address = cfg.get_item("server_address").current_value
 
-        if self.elcbuis and self.elcarea > 0 and self.room_no:
-            self.ctx = ctx
-            self.post_room()
-
     def on_config_save(self, ctx: PluginContext, cfg: PluginConfig):
         self.on_config_load(ctx, cfg)
+        self.ctx = ctx
+        self.post_room()
 
-    def alert(self, title: str, text: str):
-        self.ctx.send_message("email_notifier", ("text", title, text))
+    def alert(self, title: str, text: str, coalesce_key: str = None):
+        self.ctx.send_message("email_notifier", ("text", title, text), coalesce_key)
 
-    def on_routine(self, ctx: PluginContext):
-        self.fetch_degree()
+    async def on_routine(self, ctx: PluginContext):
+        self.on_degree_arrived(await self.fetch_degree())
 
-    @Slot(float)
     def on_degree_arrived(self, degree: float):
         if degree == -1:
             self.ctx.report_cache_invalid()
@@ -361,10 +335,12 @@ class QueryBillClientPlugin(Plugin):
         elif degree >= 0:
             self.ctx.get_logger().info(f"{degree=}.")
             if degree < self.alert_degree:
-                self.alert(
-                    title="电量不足",
-                    text=f"电量剩余: {degree}, 请及时进行电量的充值, 以防止意外断电的情况"
-                )
+                if not self.notified:  # 电量恢复之前只提醒一次.
+                    self.alert(
+                        title="电量不足",
+                        text=f"电量剩余: {degree}, 请及时进行电量的充值, 以防止意外断电的情况",
+                        coalesce_key="电量不足"
+                    )
                 self.notified = True
             else:
                 self.notified = False
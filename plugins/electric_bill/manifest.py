@@ -0,0 +1,39 @@
+from src.plugin import PluginManifest, PluginConfig, Routine, TextItem
+from src.plugin.config import PasswordItem, NumberItem
+
+PLUGIN_NAME = "query_electric_bill_client"
+
+
+def byte_len_eq(expected_len: int, accept_empty=False):
+    def j(s: str):
+        try:
+            return (accept_empty and len(s) == 0) or len(s.encode("utf-8")) == expected_len
+        except (UnicodeEncodeError, AttributeError):
+            return False
+
+    return j
+
+
+manifest = PluginManifest(
+    name=PLUGIN_NAME,
+    entry="bill_plugin",
+    description="    宿舍电量自动查询插件, 需要和 GitHub 仓库 https://github.com/azazo1/ecnu-query-electric-bill 配套的服务器共同使用.\n"
+                "    `检查连接`: 可以通过检查服务器连接情况来检查当前与服务器的配置是否正确\n"
+                "    `可视化电量使用情况`: 可以视化宿舍电量随时间的变化\n"
+                "    `获取宿舍配置`: 在弹出的浏览器窗口中选择宿舍信息并获得宿舍配置 1, 2, 3 填写内容",
+    configuration=PluginConfig()
+    .add(TextItem("server_address", "127.0.0.1:30530",
+                  "query degree 服务器套接字地址"))
+    .add(PasswordItem("key", "",
+                      "和 query degree 服务器通信的加密密钥, utf-8 编码后必须 32 个字节",
+                      byte_len_eq(32, True)))
+    .add(PasswordItem("iv", "",
+                      "和 query degree 服务器通信的初始化向量, utf-8 编码后必须 16 个字节",
+                      byte_len_eq(16, True)))
+    .add(NumberItem("alert_degree", 10, "警告电量, 当宿舍电量低于指定电量的时候发出邮件提醒",
+                    lambda a: 0 <= a))
+    .add(TextItem("elcbuis", "", f"宿舍配置 1"))
+    .add(NumberItem("elcarea", -1, "宿舍配置 2"))
+    .add(TextItem("room_no", "", "宿舍配置 3")),
+    routine=Routine.MINUTELY,
+)
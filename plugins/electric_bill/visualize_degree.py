@@ -85,11 +85,16 @@ def consuming_speed(timestamp, degree):
     return t, s
 
 
-def get_figure():
-    """获得电量变化图表"""
-    timestamp, degree = load_data(
-        asyncio.run(download_data())
-    )
+def get_figure(file_content: str = None):
+    """
+    获得电量变化图表.
+
+    Parameters:
+        file_content: 已经下载的电量记录文件内容, 为 None 时从服务器下载 (会阻塞).
+    """
+    if file_content is None:
+        file_content = asyncio.run(download_data())
+    timestamp, degree = load_data(file_content)
     if not timestamp:
         print("no data")
         return
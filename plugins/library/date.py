@@ -1,9 +1,24 @@
 """
 图书馆特定区域的可预约时间对象, 见 $projectdir/test/test_library/query_date_example.json 文件.
+
+轮询时每个区域都会返回相同的几个日期和时间段字符串, 解析结果按照字符串缓存.
 """
+from functools import lru_cache
 from typing import Self
 
-from datetime import time, datetime
+from datetime import date, time, datetime
+
+_PARSE_CACHE_SIZE = 1024  # 缓存的日期和时间字符串数量.
+
+
+@lru_cache(maxsize=_PARSE_CACHE_SIZE)
+def _parse_day(day: str) -> date:
+    return datetime.strptime(day, "%Y-%m-%d").date()
+
+
+@lru_cache(maxsize=_PARSE_CACHE_SIZE)
+def _parse_time(t: str) -> time:
+    return time(*[int(i) for i in t.split(':', maxsplit=2)])
 
 
 class Day:
@@ -11,14 +26,15 @@ class Day:
     可选日期, 其下有多个可选时间段.
     """
 
+    __slots__ = ("raw", "day", "times")
+
     def __init__(self, json_data: dict):
         """
         Parameters:
             json_data: 包含 day 和 times 字段的对象.
         """
         self.raw = json_data
-        day_ = self.raw["day"]
-        self.day = datetime.strptime(day_, "%Y-%m-%d").date()
+        self.day = _parse_day(self.raw["day"])
         self.times = TimePeriod.from_response_part(self.raw["times"], self)
 
     @classmethod
@@ -41,6 +57,8 @@ class Day:
 class TimePeriod:
     """一天中的可选时间段."""
 
+    __slots__ = ("raw", "id", "day", "start", "end")
+
     def __init__(self, json_data: dict, day: Day):
         """
         Parameters:
@@ -48,11 +66,9 @@ class TimePeriod:
         """
         self.raw = json_data
         self.id = int(self.raw['id'])
-        start = self.raw['start']
-        end = self.raw['end']
         self.day = day
-        self.start = time(*[int(i) for i in start.split(':', maxsplit=2)])
-        self.end = time(*[int(i) for i in end.split(':', maxsplit=2)])
+        self.start = _parse_time(self.raw['start'])
+        self.end = _parse_time(self.raw['end'])
 
     @classmethod
     def from_response_part(cls, part: list, day):
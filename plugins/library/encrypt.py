@@ -3,12 +3,19 @@ ECNU 图书馆网站加密实现, 这里的实现可能会根据网络管理员
 
 加密算法分析见 assets/development-references/confirm_subscribe.js
 """
+from __future__ import annotations
+
 import base64
+import datetime
 import time
 import json
+from typing import Any, Callable, Iterable
+
+import numpy as np
 from Crypto.Cipher import AES
 
 AES_IV = "ZZWBKJ_ZHIHUAWEI"
+BATCH_THRESHOLD = 3  # 明文数量达到此值时才按块对齐批量加密, 数量较少时 numpy 的开销大于逐个加密.
 
 
 def day_str():
@@ -78,3 +85,118 @@ class Encryptor:
                 base64.b64decode(base64_str)
             ))
         )
+
+
+def day_key(day: datetime.date) -> str:
+    """原 js 中 day 日使用的默认密钥."""
+    s = day.strftime("%Y%m%d")
+    return s + s[::-1]
+
+
+def _json_value(value: Any) -> str:
+    if isinstance(value, int) and not isinstance(value, bool):
+        return str(value)
+    if isinstance(value, str) and value.isdigit():
+        return f'"{value}"'
+    return json.dumps(value)
+
+
+class ConfirmEncryptor:
+    """
+    预约请求 aesjson 的批量加密, 结果与 Encryptor.encrypt 相同.
+
+    - 默认密钥按照本地日期缓存, 到达午夜时自动更换.
+    - 预约数据 {"seat_id": ..., "segment": ...} 直接按照模板拼接, 不经过 json.dumps.
+    - 批量加密时, 把长度相同的明文按块对齐, CBC 的每一轮用一次 ECB 调用同时加密所有明文的对应块,
+      而不是为每个明文创建一个 AES 对象.
+
+    Examples:
+
+    >>> encryptor = ConfirmEncryptor()
+    >>> encryptor.encrypt_many([(3361, 1508173), (3362, 1508173)])  # 可以直接作为 aesjson 提交.
+    """
+
+    def __init__(self, key: str = None, clock: Callable[[], float] = time.time):
+        """
+        Parameters:
+            key: 固定的加密密钥, 默认使用按照日期变化的密钥, 同 Encryptor.encrypt.
+            clock: 返回当前 unix 时间戳的函数, 用于确定日期.
+        """
+        self._fixed_key = key
+        self._clock = clock
+        self._iv = np.frombuffer(AES_IV.encode("utf-8"), dtype=np.uint8)
+        self._key: str | None = None
+        self._key_bytes = b""
+        self._ecb = None
+        self._valid_until = float("-inf")  # 当前密钥的失效时间 (下一个午夜的时间戳).
+        if key is not None:
+            self._set_key(key, float("inf"))
+
+    def _set_key(self, key: str, valid_until: float):
+        self._key = key
+        self._key_bytes = key.encode("utf-8")
+        self._ecb = AES.new(self._key_bytes, AES.MODE_ECB)
+        self._valid_until = valid_until
+
+    @property
+    def key(self) -> str:
+        """当前使用的密钥."""
+        now = self._clock()
+        if now >= self._valid_until:
+            today = datetime.date.fromtimestamp(now)
+            midnight = datetime.datetime.combine(today + datetime.timedelta(days=1), datetime.time())
+            self._set_key(day_key(today), midnight.timestamp())
+        return self._key
+
+    @staticmethod
+    def confirm_payload(seat_id: int | str, segment: int | str) -> bytes:
+        """预约请求加密前的 json, 与 json.dumps({"seat_id": seat_id, "segment": f"{segment}"}) 相同."""
+        return f'{{"seat_id":{_json_value(seat_id)},"segment":{_json_value(f"{segment}")}}}'.encode("utf-8")
+
+    def encrypt_payloads(self, payloads: Iterable[bytes]) -> list[str]:
+        """
+        使用 AES-CBC 加密多个明文, 返回 base64 字符串, 与输入一一对应.
+        """
+        self.key  # noqa: 确保密钥没有过期.
+        ecb = self._ecb
+        padded = [pkcs7_pad(p, AES.block_size) for p in payloads]
+        if len(padded) < BATCH_THRESHOLD:
+            iv = AES_IV.encode("utf-8")
+            return [base64.b64encode(AES.new(self._key_bytes, AES.MODE_CBC, iv=iv).encrypt(p)).decode("utf-8")
+                    for p in padded]
+        results: list[str | None] = [None] * len(padded)
+        groups: dict[int, list[int]] = {}  # 块数 -> 明文下标.
+        for i, p in enumerate(padded):
+            groups.setdefault(len(p), []).append(i)
+        for length, indices in groups.items():
+            blocks = np.frombuffer(b"".join(padded[i] for i in indices), dtype=np.uint8)
+            blocks = blocks.reshape(len(indices), length // AES.block_size, AES.block_size)
+            cipher = np.empty_like(blocks)
+            prev = self._iv
+            for j in range(blocks.shape[1]):
+                # 所有明文的第 j 块同时加密: C_j = E(P_j ^ C_{j-1}), ECB 对每个块独立加密.
+                encrypted = ecb.encrypt((blocks[:, j] ^ prev).tobytes())
+                prev = cipher[:, j] = np.frombuffer(encrypted, dtype=np.uint8).reshape(len(indices), AES.block_size)
+            for i, row in zip(indices, cipher.reshape(len(indices), length)):
+                results[i] = base64.b64encode(row.tobytes()).decode("utf-8")
+        return results
+
+    def encrypt(self, json_data: dict) -> str:
+        """加密任意 json 数据, 同 Encryptor.encrypt."""
+        return self.encrypt_payloads([json.dumps(json_data, separators=(",", ":")).encode("utf-8")])[0]
+
+    def encrypt_confirm(self, seat_id: int | str, segment: int | str) -> str:
+        """加密一个预约请求."""
+        return self.encrypt_payloads([self.confirm_payload(seat_id, segment)])[0]
+
+    def encrypt_many(self, pairs: Iterable[tuple[int | str, int | str]]) -> list[str]:
+        """
+        批量加密预约请求.
+
+        Parameters:
+            pairs: (座位 id, 时间段 id) 列表.
+
+        Returns:
+            与 pairs 一一对应的 aesjson 字符串.
+        """
+        return self.encrypt_payloads([self.confirm_payload(seat_id, segment) for seat_id, segment in pairs])
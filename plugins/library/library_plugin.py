@@ -4,30 +4,23 @@ import datetime
 import traceback
 from typing import Any
 
-from src.plugin import TimeItem, PluginContext, PluginConfig, register_plugin, Plugin, Routine, \
-    NumberItem
+from src.net.resilience import ServerUnavailableError
+from src.plugin import PluginContext, PluginConfig, register_plugin, Plugin, ReservationTracker, next_occurrence
 from src.uia.login import LoginError
+from .manifest import PLUGIN_NAME
 from .subscribe import Subscribe
 from .query import LibraryQuery, QuickSelect
 from .req import LibCache
-from .seat import SeatFinder
+from .search import DEFAULT_MAX_AREAS, SeatSearch
+from .occupancy import OccupancyRecorder
+from .sniper import SeatSniper
+from .scheduled import ScheduledSeatReservation
+
+OCCUPANCY_KEEP_DAYS = 8 * 7  # 空闲座位数记录保留的天数.
 
 
 @register_plugin(
-    name="library_seat_subscriber",
-    description="图书馆座位预约插件",
-    configuration=PluginConfig()
-    .add(TimeItem("prefer_study_duration", datetime.time(hour=4),
-                  "偏好的学习时长(h小时m分钟),\n当一次下课时接下来的非上课时间超过此时长,\n则自动预约图书馆座位.\n不建议设置太短, 频繁地预约取消会达到当天预约取消次数上限."))
-    .add(NumberItem("auto_cancel", 1,
-                    "是否自动取消未签到的将过期预约,\n如果为 1(True),\n检查账号下的所有图书馆预约,\n在违约的前 1~2 分钟自动取消该预约,\n为 0 则不会.",
-                    lambda a: 0 <= a <= 1,
-                    ))
-    .add(NumberItem("premise", -1,
-                    "预约座位选择的校区, 0 为普陀, 1 为闵行, -1 为不限.",
-                    lambda a: -1 <= a <= 1,
-                    )),
-    routine=Routine.MINUTELY,
+    name=PLUGIN_NAME,
     ecnu_cache_grabber=LibCache.grab_from_driver
 )
 class LibrarySeatSubscriberPlugin(Plugin):
@@ -37,12 +30,35 @@ class LibrarySeatSubscriberPlugin(Plugin):
         self.premise: int = -1
         self.library_query: LibraryQuery | None = None
         self.subscriber: Subscribe | None = None
+        self.seat_search: SeatSearch | None = None
+        self.search_areas: int = DEFAULT_MAX_AREAS  # 0 表示不限.
+        self.occupancy_interval: int = 0  # 分钟, 0 表示不记录.
+        self.occupancy: OccupancyRecorder | None = None
+        self.snipe_window: int = 0  # 分钟, 0 表示不抢座.
+        self.sniper: SeatSniper | None = None
+        self.scheduled_reserve: bool = False
+        self.booking_open_time: datetime.time | None = None
+        self.scheduled: ScheduledSeatReservation | None = None
+        self.tracker: ReservationTracker | None = None
 
     def on_uia_login(self, ctx: PluginContext):
         try:
             cache = ctx.get_uia_cache().get_cache(LibCache)
-            self.library_query = LibraryQuery(cache)
-            self.subscriber = Subscribe(cache)
+            self.library_query = LibraryQuery(cache, ctx.http)
+            self.subscriber = Subscribe(cache, ctx.http)
+            self.seat_search = SeatSearch(self.library_query, max_areas=self.search_areas or None)
+            # 使用新的登录信息重新安排.
+            if self.scheduled is not None:
+                self.scheduled.cancel(ctx)
+            if self.tracker is not None:
+                self.tracker.stop(ctx)
+            self.tracker = ReservationTracker(
+                fetch=self.subscriber.query_subscribes,
+                key_of=lambda subs: subs["id"],
+                deadline_of=lambda subs: datetime.datetime.strptime(
+                    subs["lastSigninTime"], "%Y-%m-%d %H:%M:%S").timestamp(),
+                on_deadline=lambda subs: self.auto_cancel_subscribe(ctx, subs),
+            )
         except Exception:
             ctx.report_cache_invalid()
             ctx.get_logger().error(traceback.format_exc())
@@ -52,8 +68,22 @@ class LibrarySeatSubscriberPlugin(Plugin):
         self.prefer_study_duration = datetime.timedelta(hours=t.hour, minutes=t.minute)
         t = cfg.get_item("auto_cancel").current_value
         self.auto_cancel = bool(t)
+        if self.tracker is not None and not self.auto_cancel:
+            self.tracker.stop(ctx)
         t = cfg.get_item("premise").current_value
         self.premise = t
+        self.search_areas = int(cfg.get_item("search_areas").current_value)
+        if self.seat_search is not None:
+            self.seat_search.max_areas = self.search_areas or None
+        self.occupancy_interval = int(cfg.get_item("occupancy_interval").current_value)
+        if self.occupancy is not None:
+            self.occupancy.interval = self.occupancy_interval * 60
+        self.snipe_window = int(cfg.get_item("snipe_window").current_value)
+        self.scheduled_reserve = bool(cfg.get_item("scheduled_reserve").current_value)
+        self.booking_open_time = cfg.get_item("booking_open_time").current_value
+        if self.scheduled is not None and (not self.scheduled_reserve
+                                           or self.scheduled.target.time() != self.booking_open_time):
+            self.scheduled.cancel(ctx)
 
     def on_config_save(self, ctx: PluginContext, cfg: PluginConfig):
         self.on_config_load(ctx, cfg)
@@ -79,32 +109,93 @@ class LibrarySeatSubscriberPlugin(Plugin):
             return
         try:
             qs = self.library_query.quick_select()
-            area_id = qs.get_most_free_seats_area(self.premise_filter(qs))
-            days = self.library_query.query_time(area_id)
-            if not days or not days[0].times:
-                ctx.get_logger().info("no available subscribing time")
-            subscribe_time = days[0].times[0]
-            sf = SeatFinder(self.library_query.query_seats(area_id, subscribe_time))
-            target_seat = sf.find_most_isolated()
-            rst = self.subscriber.confirm(target_seat.id, subscribe_time)
-            ctx.get_logger().info(f"subscribe result: {rst}")
-            ctx.send_message("email_notifier", ("text", "图书馆座位预约", f"预约结果: {rst}"))
+            # 并发查询所有符合校区要求的区域, 从全局最好的座位开始依次尝试预约.
+            # 座位可能在查询之后被他人抢先预约, 预约被拒绝不代表登录失效, 继续尝试下一个座位.
+            for candidate in self.seat_search.search(qs, self.premise_filter(qs)):
+                rst = self.subscriber.try_confirm(candidate.seat.id, candidate.time_period)
+                if rst.get("code") == 1:
+                    ctx.get_logger().info(f"subscribed {candidate}: {rst}")
+                    ctx.send_message("email_notifier", ("text", "图书馆座位预约", f"预约结果: {rst}"))
+                    self.subscribes_changed(ctx)
+                    return
+                ctx.get_logger().info(f"{candidate} rejected: {rst.get('msg')}")
+            ctx.get_logger().info("no available seat")
+            self.start_sniping(ctx, obj)
         except LoginError:
             ctx.report_cache_invalid()
 
+    def start_sniping(self, ctx: PluginContext, next_class: datetime.datetime):
+        """
+        在 snipe_window 内抢座, 抢座必须在距离下一次上课还有 prefer_study_duration 之前结束.
+        """
+        if self.sniper is not None and not self.sniper.finished:
+            return
+        window = min(self.snipe_window * 60,
+                     (next_class - datetime.datetime.now() - self.prefer_study_duration).total_seconds())
+        if window <= 0:
+            return
+        self.sniper = SeatSniper(self.library_query, self.subscriber, window, campus=self.premise)
+        ctx.get_logger().info(f"start sniping for {window / 60:.0f} minutes.")
+        self.sniper.start(ctx, lambda sniper: self.on_snipe_finish(ctx, sniper))
+
+    def on_snipe_finish(self, ctx: PluginContext, sniper: SeatSniper):
+        latencies = ", ".join(f"{a.latency:.2f}s" for a in sniper.attempts)
+        ctx.get_logger().info(f"sniping finished: {sniper.finish_reason}, {sniper.requests} requests, "
+                              f"attempt latencies: [{latencies}].")
+        if sniper.booked is not None:
+            ctx.send_message("email_notifier", ("text", "图书馆座位预约", f"抢座结果: {sniper.booked.result}"))
+            self.subscribes_changed(ctx)
+
+    def record_occupancy(self, ctx: PluginContext):
+        """按照配置的间隔记录各区域的空闲座位数."""
+        if self.occupancy_interval <= 0:
+            return
+        if self.occupancy is None:
+            self.occupancy = OccupancyRecorder(ctx.get_data_dir() / "occupancy", self.occupancy_interval * 60)
+            self.occupancy.prune(OCCUPANCY_KEEP_DAYS)
+        # 记录的时间是现在, 不能使用缓存中最多 QUICK_SELECT_TTL 之前的结果.
+        if self.occupancy.due() and self.occupancy.record(self.library_query.quick_select(fresh=True)):
+            ctx.get_logger().debug("occupancy recorded.")
+
+    def arm_scheduled(self, ctx: PluginContext):
+        """安排下一次预约开放时的定时预约."""
+        if not self.scheduled_reserve or (self.scheduled is not None and self.scheduled.armed):
+            return
+        target = next_occurrence(self.booking_open_time)
+        self.scheduled = ScheduledSeatReservation(self.library_query, self.subscriber, target, campus=self.premise)
+        self.scheduled.arm(ctx, lambda r: self.on_scheduled_finish(ctx, r))
+        ctx.get_logger().info(f"scheduled reservation armed at {target}.")
+
+    def on_scheduled_finish(self, ctx: PluginContext, reservation: ScheduledSeatReservation):
+        if reservation.booked is not None:
+            ctx.send_message("email_notifier", ("text", "图书馆座位预约", f"定时预约结果: {reservation.result}"))
+            self.subscribes_changed(ctx)
+        else:
+            ctx.get_logger().info(f"scheduled reservation failed: {reservation.attempts}")
+
     def on_routine(self, ctx: PluginContext):
         if self.subscriber is None:
             ctx.report_cache_invalid()
             return
+        self.arm_scheduled(ctx)
         if self.auto_cancel:
-            for subs in self.subscriber.query_subscribes():
-                last_signin_time = datetime.datetime.strptime(
-                    subs["lastSigninTime"],
-                    "%Y-%m-%d %H:%M:%S"
-                )
-                if last_signin_time - datetime.datetime.now() < datetime.timedelta(minutes=2):
-                    self.subscriber.cancel(subs["id"])
-                    ctx.send_message("email_notifier",
-                                     ("text",
-                                     "图书馆座位预约取消",
-                                      f"已经为你自动取消即将过期的预约: {subs['nameMerge']} {subs['no']} 座位"))
+            # 跟踪器只在预约变化后或者每 DEFAULT_REFRESH_INTERVAL 查询一次预约, 这里只确保它在运行.
+            self.tracker.start(ctx)
+        # 记录空闲座位数是可选功能, 放在最后并且只记录日志, 不影响上面的定时预约和自动取消.
+        try:
+            self.record_occupancy(ctx)
+        except (ServerUnavailableError, OSError) as e:  # 网络错误 (requests 的异常也是 OSError) 或者写入失败.
+            ctx.get_logger().warning(f"failed to record occupancy: {e}")
+
+    def subscribes_changed(self, ctx: PluginContext):
+        """预约之后让跟踪器重新查询."""
+        if self.auto_cancel and self.tracker is not None:
+            self.tracker.touch(ctx)
+
+    def auto_cancel_subscribe(self, ctx: PluginContext, subs: dict):
+        """在签到截止前取消未签到的预约."""
+        self.subscriber.cancel(subs["id"])
+        ctx.send_message("email_notifier",
+                         ("text",
+                          "图书馆座位预约取消",
+                          f"已经为你自动取消即将过期的预约: {subs['nameMerge']} {subs['no']} 座位"))
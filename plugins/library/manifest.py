@@ -0,0 +1,41 @@
+import datetime
+
+from src.plugin import PluginManifest, PluginConfig, Routine, TimeItem, NumberItem
+
+PLUGIN_NAME = "library_seat_subscriber"
+
+manifest = PluginManifest(
+    name=PLUGIN_NAME,
+    entry="library_plugin",
+    description="图书馆座位预约插件",
+    configuration=PluginConfig()
+    .add(TimeItem("prefer_study_duration", datetime.time(hour=4),
+                  "偏好的学习时长(h小时m分钟),\n当一次下课时接下来的非上课时间超过此时长,\n则自动预约图书馆座位.\n不建议设置太短, 频繁地预约取消会达到当天预约取消次数上限."))
+    .add(NumberItem("auto_cancel", 1,
+                    "是否自动取消未签到的将过期预约,\n如果为 1(True),\n检查账号下的所有图书馆预约,\n在违约的前 1~2 分钟自动取消该预约,\n为 0 则不会.",
+                    lambda a: 0 <= a <= 1,
+                    ))
+    .add(NumberItem("premise", -1,
+                    "预约座位选择的校区, 0 为普陀, 1 为闵行, -1 为不限.",
+                    lambda a: -1 <= a <= 1,
+                    ))
+    .add(NumberItem("search_areas", 4,
+                    "下课时同时查询空闲座位最多的前几个区域(每个区域的所有时间段),\n从中选择最好的座位,\n为 0 则查询所有符合校区要求的区域 (区域多时会被限流, 耗时变长).",
+                    lambda a: 0 <= a <= 100,
+                    ))
+    .add(NumberItem("occupancy_interval", 0,
+                    "记录各区域空闲座位数的间隔(分钟),\n记录保存在插件数据目录中, 用于预测各区域的空闲情况,\n为 0 则不记录.",
+                    lambda a: 0 <= a <= 24 * 60,
+                    ))
+    .add(NumberItem("snipe_window", 30,
+                    "下课时没有可预约的座位时,\n在接下来的多少分钟内持续检查是否有座位空出并立即预约(抢座),\n为 0 则不抢座.",
+                    lambda a: 0 <= a <= 24 * 60,
+                    ))
+    .add(NumberItem("scheduled_reserve", 0,
+                    "是否每天在座位预约开放的时刻(booking_open_time)定时预约,\n预约当天最早的时间段, 1 为是, 0 为否.",
+                    lambda a: 0 <= a <= 1,
+                    ))
+    .add(TimeItem("booking_open_time", datetime.time(hour=7),
+                  "图书馆每天开放座位预约的时刻(时:分:秒),\n定时预约会按照服务器时间在此时刻准时提交.")),
+    routine=Routine.MINUTELY,
+)
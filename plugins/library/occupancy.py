@@ -0,0 +1,194 @@
+"""
+图书馆各区域空闲座位数的历史记录.
+
+定时把 QuickSelect 中各区域的空闲座位数追加到按天分区的二进制文件中, 每条记录定长 (见 RECORD_DTYPE),
+文件可以直接用 numpy.memmap 映射, 查询历史时不需要解析, 也不需要把所有记录读入内存.
+根据历史记录可以预测某个时间各区域的空闲座位数, 不需要额外的实时查询.
+"""
+from __future__ import annotations
+
+import datetime
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, Optional
+
+import numpy as np
+
+from .query import QuickSelect
+
+__all__ = ["RECORD_DTYPE", "DEFAULT_INTERVAL", "DEFAULT_HISTORY_DAYS", "OccupancyRecorder"]
+
+# 一条记录: 采样时间 (unix 时间戳, s), 区域 id, 空闲座位数, 共 16 字节, 小端序.
+RECORD_DTYPE = np.dtype([("time", "<i8"), ("area", "<i4"), ("free", "<i4")])
+DEFAULT_INTERVAL = 5 * 60  # 默认采样间隔 (s).
+DEFAULT_HISTORY_DAYS = 28  # 查询历史时默认使用的天数.
+PARTITION_SUFFIX = ".occ"
+
+
+class OccupancyRecorder:
+    """
+    空闲座位数记录器, 可在任意线程中使用.
+
+    每天的记录保存在 directory 下的 YYYY-MM-DD.occ 文件中, 只追加不修改,
+    写入中断导致的不完整记录在读取时被忽略.
+
+    Examples:
+
+    >>> recorder = OccupancyRecorder(ctx.get_data_dir() / "occupancy")
+    >>> recorder.record(library_query.quick_select())  # 距离上次采样超过 interval 时才会写入.
+    >>> recorder.mean_free(area_id)  # 形状为 (7, 24) 的数组, 星期几 (周一为 0) 和小时的平均空闲座位数.
+    >>> recorder.rank_areas(qs.areas, datetime.datetime(2024, 12, 2, 15))  # 按照预测的空闲座位数排序区域.
+    """
+
+    def __init__(self, directory: str | Path, interval: float = DEFAULT_INTERVAL):
+        """
+        Parameters:
+            directory: 保存记录文件的目录, 不存在时创建.
+            interval: 两次采样之间的最短间隔 (s).
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.interval = interval
+        self._last_sample: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def partition_path(self, day: datetime.date) -> Path:
+        return self.directory / f"{day.isoformat()}{PARTITION_SUFFIX}"
+
+    def due(self, now: float = None) -> bool:
+        """是否需要采样, 调用方可以先检查, 避免不必要的 quick_select 请求."""
+        now = time.time() if now is None else now
+        return self._last_sample is None or now - self._last_sample >= self.interval
+
+    def record(self, qs: QuickSelect, now: float = None) -> bool:
+        """
+        采样 qs 中所有区域的空闲座位数.
+
+        Parameters:
+            qs: quick_select 的结果.
+            now: 采样时间 (unix 时间戳), 默认为当前时间.
+
+        Returns:
+            是否写入了记录, 距离上次采样不足 interval 时不写入.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            if not self.due(now):
+                return False
+            self._last_sample = now
+            records = np.empty(len(qs.areas), dtype=RECORD_DTYPE)
+            records["time"] = int(now)
+            records["area"] = qs.areas
+            records["free"] = [qs.get_free_seats_num_of(area_id) for area_id in qs.areas]
+            with open(self.partition_path(datetime.date.fromtimestamp(now)), "ab") as f:
+                f.write(records.tobytes())
+        return True
+
+    def _partition(self, path: Path) -> np.ndarray:
+        """映射一个分区文件, 忽略末尾不完整的记录."""
+        count = path.stat().st_size // RECORD_DTYPE.itemsize
+        if count == 0:
+            return np.empty(0, dtype=RECORD_DTYPE)
+        return np.memmap(path, dtype=RECORD_DTYPE, mode="r", shape=(count,))
+
+    def load(self, start: datetime.date, end: datetime.date) -> np.ndarray:
+        """
+        读取 [start, end] 日期范围内的所有记录.
+
+        Returns:
+            dtype 为 RECORD_DTYPE 的数组, 按照分区日期和写入顺序排列.
+        """
+        parts = []
+        day = start
+        while day <= end:
+            path = self.partition_path(day)
+            if path.exists():
+                parts.append(self._partition(path))
+            day += datetime.timedelta(days=1)
+        if not parts:
+            return np.empty(0, dtype=RECORD_DTYPE)
+        return np.concatenate(parts)
+
+    def recent(self, days: int = DEFAULT_HISTORY_DAYS, today: datetime.date = None) -> np.ndarray:
+        """最近 days 天 (包括今天) 的记录."""
+        today = today or datetime.date.today()
+        return self.load(today - datetime.timedelta(days=days - 1), today)
+
+    @staticmethod
+    def _weekday_hour(timestamps: np.ndarray) -> np.ndarray:
+        """本地时间的 星期几 * 24 + 小时, 取值为 0 到 167."""
+        # 同一次采样的记录时间相同, 只需要转换每个不同的时间.
+        unique, inverse = np.unique(timestamps, return_inverse=True)
+        slots = np.fromiter(((dt := datetime.datetime.fromtimestamp(t)).weekday() * 24 + dt.hour
+                             for t in unique.tolist()), dtype=np.int64, count=len(unique))
+        return slots[inverse]
+
+    def mean_free(self, area_id: int, days: int = DEFAULT_HISTORY_DAYS, today: datetime.date = None) -> np.ndarray:
+        """
+        区域在每个星期几和小时的平均空闲座位数.
+
+        Returns:
+            形状为 (7, 24) 的数组, [星期几 (周一为 0), 小时], 没有记录的时间为 nan.
+        """
+        records = self.recent(days, today)
+        records = records[records["area"] == area_id]
+        slots = self._weekday_hour(records["time"])
+        total = np.bincount(slots, weights=records["free"], minlength=7 * 24)
+        count = np.bincount(slots, minlength=7 * 24)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return (total / count).reshape(7, 24)
+
+    def predict(self, area_ids: Iterable[int], at: datetime.datetime,
+                days: int = DEFAULT_HISTORY_DAYS) -> dict[int, float]:
+        """
+        根据最近 days 天中相同星期几和小时的记录预测区域的空闲座位数.
+
+        Returns:
+            区域 id -> 平均空闲座位数, 没有记录的区域不包括在内.
+        """
+        area_ids = np.fromiter(area_ids, dtype=np.int64)
+        records = self.recent(days, at.date())
+        records = records[np.isin(records["area"], area_ids)]
+        records = records[self._weekday_hour(records["time"]) == at.weekday() * 24 + at.hour]
+        if len(records) == 0:
+            return {}
+        areas, index = np.unique(records["area"], return_inverse=True)
+        total = np.bincount(index, weights=records["free"])
+        count = np.bincount(index)
+        return dict(zip(areas.tolist(), (total / count).tolist()))
+
+    def rank_areas(self, area_ids: Iterable[int], at: datetime.datetime, k: int = None,
+                   days: int = DEFAULT_HISTORY_DAYS) -> list[int]:
+        """
+        按照预测的空闲座位数从多到少排序区域, 没有记录的区域排在最后.
+
+        Parameters:
+            area_ids: 候选区域.
+            at: 预测的时间.
+            k: 只返回前 k 个区域, 默认返回全部.
+            days: 使用的历史天数.
+        """
+        area_ids = list(area_ids)
+        predicted = self.predict(area_ids, at, days)
+        ranked = sorted(area_ids, key=lambda a: -predicted.get(a, -1))
+        return ranked if k is None else ranked[:k]
+
+    def prune(self, keep_days: int, today: datetime.date = None) -> int:
+        """
+        删除 keep_days 天之前的分区文件.
+
+        Returns:
+            删除的文件数.
+        """
+        oldest = (today or datetime.date.today()) - datetime.timedelta(days=keep_days - 1)
+        removed = 0
+        for path in self.directory.glob(f"*{PARTITION_SUFFIX}"):
+            try:
+                day = datetime.date.fromisoformat(path.stem)
+            except ValueError:
+                continue
+            if day < oldest:
+                path.unlink()
+                removed += 1
+        return removed
@@ -1,11 +1,22 @@
 from __future__ import annotations
 
 from typing import Optional, Callable
+
+import numpy as np
 from requests import Response
 
+from src.net.client import HttpClient
 from .req import Request, LibCache
 from .date import Day, TimePeriod
-from .seat import Seat
+from .seat import SeatTable
+
+QUICK_SELECT_URL = "https://seat-lib.ecnu.edu.cn/reserve/index/quickSelect"
+SEAT_DATE_URL = "https://seat-lib.ecnu.edu.cn/api/Seat/date"
+# 缓存时间 (ttl, stale), 见 Request.cached_post.
+# 空闲座位数随时变化, 只短暂缓存; 可预约时间段每天才变化.
+QUICK_SELECT_TTL = (10, 30)
+SEAT_DATE_TTL = (5 * 60, 30 * 60)
+CAMPUS_CODES = {"普陀校区": 0, "闵行校区": 1}  # 校区名称 -> get_premises_of 返回的校区代码.
 
 
 class QuickSelect:
@@ -42,6 +53,40 @@ class QuickSelect:
             area["type"] = 2
             self.storage[id_] = area
             self.areas.append(id_)
+        self._build_index()
+
+    def _build_index(self):
+        """
+        预先计算 区域 -> 楼层 -> 校区 的层级关系和各级的空闲座位数,
+        使校区筛选, 楼层汇总和区域排序不需要每次沿着 parentId 查找.
+        """
+        # 节点 id -> 所属校区的 id, parentId 无效时为 None.
+        # 按照 校区, 楼层, 区域 的顺序处理, 每个节点的父节点都已经处理过.
+        storage = self.storage
+        root_of: dict[int, Optional[int]] = {}
+        for id_ in self.premises:
+            root_of[id_] = id_ if int(storage[id_]["parentId"]) == 0 else None
+        for id_ in self.storeys:
+            root_of[id_] = root_of.get(int(storage[id_]["parentId"]))
+        codes = {id_: CAMPUS_CODES.get(storage[id_]["name"], -1) for id_ in self.premises}
+        free_of: dict[int, int] = {}  # 校区和楼层 id -> 其下区域的空闲座位总数.
+        area_free, area_campus = [], []
+        for id_ in self.areas:
+            area = storage[id_]
+            parent = int(area["parentId"])
+            root = root_of[id_] = root_of.get(parent)
+            free = int(area["free_num"])
+            area_free.append(free)
+            area_campus.append(codes.get(root, -1))
+            free_of[parent] = free_of.get(parent, 0) + free
+            if root is not None and root != parent:
+                free_of[root] = free_of.get(root, 0) + free
+        self._campus_of = {id_: codes.get(root, -1) for id_, root in root_of.items()}
+        self._free_of = free_of
+        # 区域按照 self.areas 的顺序保存为数组.
+        self._area_ids = np.array(self.areas, dtype=np.int64)
+        self._area_free = np.array(area_free, dtype=np.int64)
+        self._area_campus = np.array(area_campus, dtype=np.int64)
 
     def get_premises_of(self, id_: int) -> int:
         """
@@ -52,18 +97,44 @@ class QuickSelect:
             - 1 => 闵行校区.
             - -1 => id 参数无效, 或者在网站未来的变更导致校区名称改变.
         """
+        return self._campus_of.get(id_, -1)
+
+    def get_areas_of_campus(self, campus: int) -> list[int]:
+        """
+        返回属于一个校区的区域 id.
+
+        Parameters:
+            campus: 校区代码, 见 get_premises_of, -1 表示所有校区.
+        """
+        if campus == -1:
+            return list(self.areas)
+        return self._area_ids[self._area_campus == campus].tolist()
+
+    def get_free_seats_num_of(self, id_: int) -> int:
+        """
+        返回一个校区, 楼层或者区域的空闲座位总数, id 无效时返回 0.
+        """
         obj = self.get_by_id(id_)
         if obj is None:
-            return -1
-        while int(obj["parentId"]) != 0:
-            obj = self.get_by_id(int(obj["parentId"]))
-        if obj is None:
-            return -1
-        if obj["name"] == "普陀校区":
             return 0
-        elif obj["name"] == "闵行校区":
-            return 1
-        return -1
+        if obj["type"] == 2:
+            return int(obj["free_num"])
+        return self._free_of.get(id_, 0)
+
+    def top_areas(self, k: int, campus: int = -1) -> list[int]:
+        """
+        返回空闲座位最多的 k 个区域, 空闲座位相同时保持 quickSelect 中的顺序, 不包括没有空闲座位的区域.
+
+        Parameters:
+            k: 区域的数量.
+            campus: 只返回此校区的区域, 见 get_areas_of_campus.
+        """
+        mask = self._area_free > 0
+        if campus != -1:
+            mask &= self._area_campus == campus
+        indices = np.flatnonzero(mask)
+        indices = indices[np.argsort(-self._area_free[indices], kind="stable")][:k]
+        return self._area_ids[indices].tolist()
 
     def get_by_id(self, id_: int) -> Optional[dict]:
         """
@@ -79,10 +150,7 @@ class QuickSelect:
         """
         获取可预约座位的总数.
         """
-        sum_ = 0
-        for area_id in self.areas:
-            sum_ += int(self.get_by_id(area_id)["free_num"])
-        return sum_
+        return int(self._area_free.sum())
 
     def get_area_by(self, func: Callable[[dict], bool]) -> int:
         """
@@ -113,19 +181,16 @@ class QuickSelect:
         """
         max_num = 0
         max_id = -1
-        for area_id in self.areas:
-            if not filter_func(self.get_by_id(area_id)):
-                continue
-            n = self.get_by_id(area_id)["free_num"]
-            if n > max_num:
+        for area_id, n in zip(self.areas, self._area_free.tolist()):
+            if n > max_num and filter_func(self.get_by_id(area_id)):  # 先比较数量, 减少 filter_func 的调用.
                 max_num = n
                 max_id = area_id
         return max_id
 
 
 class LibraryQuery(Request):
-    def __init__(self, cache: LibCache):
-        super().__init__(cache)
+    def __init__(self, cache: LibCache, http: HttpClient = None):
+        super().__init__(cache, http)
 
     @classmethod
     def check_login_and_extract_data(cls, response: Response,
@@ -136,7 +201,7 @@ class LibraryQuery(Request):
             raise KeyError("error in response, no data.")
         return rst
 
-    def quick_select(self) -> QuickSelect:
+    def quick_select(self, fresh: bool = False) -> QuickSelect:
         """
         查询各个区域的座位空闲情况, 相当于 quickSelect 请求.
 
@@ -162,21 +227,26 @@ class LibraryQuery(Request):
           "noiseId": "..." // 座位噪声水平.
         }
 
+        结果会缓存 QUICK_SELECT_TTL, 预约或者取消座位后清除.
+
+        Parameters:
+            fresh: 是否忽略缓存重新查询, 用于需要最新空闲情况的轮询, 查询结果仍然会更新缓存.
+
         Returns:
             - 如果请求成功, 返回 QuickSelect 对象.
             - 如果出现了登录信息失效.
         """
-        response = self.post(
-            "https://seat-lib.ecnu.edu.cn/reserve/index/quickSelect",
-            payload={"id": "1", "members": 0}
-        )
-        return QuickSelect(self.check_login_and_extract_data(response))
+        ttl, stale = QUICK_SELECT_TTL
+        if fresh:
+            self.invalidate(QUICK_SELECT_URL)
+        return QuickSelect(self.cached_post(QUICK_SELECT_URL, {"id": "1", "members": 0},
+                                            ttl=ttl, stale=stale))
 
-    def query_seats(self, area_id: int, time_period: TimePeriod):
+    def query_seats(self, area_id: int, time_period: TimePeriod) -> SeatTable:
         """
         查询一个区域可用的座位具体情况.
 
-        会返回座位的位置分布信息.
+        会返回座位的位置分布信息, 以 SeatTable 表示, 可以像 list[Seat] 一样使用.
 
         Parameters:
             area_id(int): 要查询的区域在 QuickSelect 中的 id 值.
@@ -197,11 +267,12 @@ class LibraryQuery(Request):
                                       "segment": time_period["id"],
                                       "day": time_period.day["day"],
                                       "startTime": time_period["start"],
-                                      "endTime": time_period["end"], })
+                                      "endTime": time_period["end"], },
+                             idempotent=True)
         ret_data = self.check_login_and_extract_data(response, expected_code=1)
-        return Seat.from_response(ret_data)
+        return SeatTable(ret_data)
 
-    def query_time(self, area_id: int) -> list[Day]:
+    def query_time(self, area_id: int, fresh: bool = False) -> list[Day]:
         """
         查询某个区域可用的预约时间.
 
@@ -213,15 +284,18 @@ class LibraryQuery(Request):
         payload(json): {
           "build_id": "[int]",
         }
+
+        结果会缓存 SEAT_DATE_TTL, 预约或者取消座位后清除.
+
+        Parameters:
+            area_id: 要查询的区域在 QuickSelect 中的 id 值.
+            fresh: 是否忽略缓存重新查询, 用于等待新的日期开放预约, 查询结果仍然会更新缓存.
         """
-        response = self.post(
-            "https://seat-lib.ecnu.edu.cn/api/Seat/date",
-            payload={"build_id": f"{area_id}"}
-        )
-        ret_data = self.check_login_and_extract_data(
-            response,
-            expected_code=1
-        )
+        ttl, stale = SEAT_DATE_TTL
+        if fresh:
+            self.invalidate(SEAT_DATE_URL)
+        ret_data = self.cached_post(SEAT_DATE_URL, {"build_id": f"{area_id}"},
+                                    ttl=ttl, stale=stale, expected_code=1)
         return Day.from_response(ret_data)
 
     # detail, map 请求没有适配, 暂时认为需求不大.
@@ -1,12 +1,20 @@
+from __future__ import annotations
+
 import json
 import textwrap
-from typing import Self
+from typing import Self, TYPE_CHECKING
 import requests
 from requests import Response
 from selenium.webdriver.support.wait import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from seleniumwire.webdriver import Edge
 
+if TYPE_CHECKING:
+    from seleniumwire.webdriver import Edge
+
+from src.net.cache import scope_of
+from src.net.client import HttpClient, shared_client
+from src.net.resilience import check_available
+from src.uia.cache import PROBE_TIMEOUT
 from src.uia.login import LoginError, click_element
 
 # 图书馆网页中左侧的全部展开按钮.
@@ -51,6 +59,21 @@ class LibCache:
             c[cookie["name"]] = cookie["value"]
         return cls(req.headers["authorization"], c)
 
+    def probe(self) -> bool:
+        """用一次 quickSelect 请求检查登录缓存是否仍然有效, 见 LoginCache.is_valid."""
+        response = shared_client().post(
+            "https://seat-lib.ecnu.edu.cn/reserve/index/quickSelect",
+            cache=self,
+            headers={"Content-Type": "application/json"},
+            json={"id": "1", "members": 0},
+            timeout=PROBE_TIMEOUT,
+        )
+        try:
+            Request.check_login_and_extract_data(response)
+        except LoginError:
+            return False
+        return True
+
 
 class Request:
     """
@@ -64,44 +87,52 @@ class Request:
         ...     def do_something(self):
         ...         self.post(...)
 
-        >>> r = Request(cache=...)
+        >>> r = Request(cache=..., http=ctx.http)
         ... r.post(...)
 
     """
 
-    def __init__(self, cache: LibCache):
+    def __init__(self, cache: LibCache, http: HttpClient = None):
+        """
+        :param cache: 图书馆登录缓存.
+        :param http: 发送请求的 HTTP 客户端, 默认为共享的客户端, 插件中使用 ctx.http.
+        """
         self.cache = cache
+        self.http = http or shared_client()
         if cache is None:
             raise ValueError("cache cannot be None.")
 
     @classmethod
     def check_login_and_extract_data(
             cls, response: Response,
-            expected_code: int = 0,
+            expected_code: int | None = 0,
     ) -> dict | list:
         """
         进行返回内容的一系列检查, 并对表示错误的返回值以报错或日志的形式呈现.
 
         Parameters:
             response: 请求的返回内容.
-            expected_code: 返回内容 json 结构中的 "code" 字段.
+            expected_code: 返回内容 json 结构中的 "code" 字段, 为 None 时不检查.
 
         Raises:
+            ServerUnavailableError: 服务器暂时不可用, 不代表登录失效.
             LoginError: 登录失效及请求错误.
 
         Returns:
             如果执行正常, 返回请求回应中的 json 结构.
         """
+        check_available(response)
         if response.status_code != 200:
             raise LoginError(f"response status code: {response.status_code}.")
         if "json" not in response.headers["content-type"]:
             raise LoginError("request was redirected, which means you didn't login.")
         ret = json.loads(response.text)
-        if ret["code"] != expected_code:
+        if expected_code is not None and ret["code"] != expected_code:
             raise LoginError(f"result code: {ret['code']}, {ret}.")
         return ret
 
-    def post(self, url: str, headers: dict = None, payload: dict = None) -> requests.Response:
+    def post(self, url: str, headers: dict = None, payload: dict = None,
+             idempotent: bool = False) -> requests.Response:
         """
         提交 POST 请求并自动附加以下内容:
 
@@ -114,16 +145,41 @@ class Request:
         payload(json): {
             "authorization": ...,
         }
+
+        只查询数据的请求应指定 idempotent=True, 以便在服务器暂时出错时重试, 见 HttpClient.request.
         """
-        headers_ = {"Authorization": self.cache.authorization, "Content-Type": "application/json"}
+        headers_ = {"Content-Type": "application/json"}
         if headers is not None:
             headers_.update(headers)
-        data_ = {'authorization': self.cache.authorization}
-        if payload is not None:
-            data_.update(payload)
-        return requests.post(
+        return self.http.post(
             url,
+            cache=self.cache,  # 附加 Authorization 请求头和 cookies.
             headers=headers_,
             json=payload,  # 这里不能选择 data 的形参, 因为 data 形参对应的是 x-www-form-urlencodeed.
-            cookies=self.cache.cookies,
+            idempotent=idempotent,
         )
+
+    def cached_post(self, url: str, payload: dict = None, *, ttl: float, stale: float = 0,
+                    expected_code: int = 0) -> dict | list:
+        """
+        提交只查询数据的 POST 请求, 经过 check_login_and_extract_data 检查后的结果在 http.responses 中缓存.
+
+        Parameters:
+            url: 请求地址, 同时作为缓存的端点.
+            payload: 请求的 json 数据.
+            ttl: 结果保持新鲜的时间 (s).
+            stale: 过期后仍然可以返回旧结果并在后台重新请求的时间 (s).
+            expected_code: 见 check_login_and_extract_data.
+        """
+        return self.http.responses.fetch(
+            url,
+            lambda: self.check_login_and_extract_data(
+                self.post(url, payload=payload, idempotent=True), expected_code),
+            payload=payload, scope=scope_of(self.cache), ttl=ttl, stale=stale,
+        )
+
+    def invalidate(self, *urls: str):
+        """清除当前登录身份下这些 url 的缓存结果, 见 cached_post."""
+        scope = scope_of(self.cache)
+        for url in urls:
+            self.http.responses.invalidate(url, scope)
@@ -0,0 +1,111 @@
+"""
+在座位预约开放的时刻定时预约, 见 src.plugin.timed.
+
+准备阶段查询候选区域的时间段和座位, 选出若干个最好的座位并预先加密所有预约请求,
+到达目标时刻后依次提交, 直到有一个预约成功.
+"""
+from __future__ import annotations
+
+import datetime
+from typing import Optional
+
+import numpy as np
+
+from src.log import project_logger
+from src.plugin import TimedReservation
+from .date import TimePeriod
+from .encrypt import ConfirmEncryptor, day_key
+from .query import LibraryQuery
+from .scoring import SeatScorer
+from .search import DEFAULT_MAX_AREAS, SeatCandidate, isolation_rank
+from .subscribe import Subscribe
+
+__all__ = ["DEFAULT_CANDIDATES", "ScheduledSeatReservation"]
+
+DEFAULT_CANDIDATES = 3  # 预先准备的候选座位数, 前面的座位被抢走时依次尝试后面的座位.
+SYNC_URL = "https://seat-lib.ecnu.edu.cn/"  # 同步时钟和预热连接的地址.
+
+
+class ScheduledSeatReservation(TimedReservation):
+    """
+    定时预约图书馆座位.
+
+    Examples:
+
+    >>> reservation = ScheduledSeatReservation(library_query, subscriber, datetime.datetime(2024, 12, 2, 7))
+    >>> reservation.arm(ctx, lambda r: print(r.booked))
+    """
+
+    def __init__(self, query: LibraryQuery, subscriber: Subscribe, target: datetime.datetime,
+                 campus: int = -1, day: datetime.date = None, candidates: int = DEFAULT_CANDIDATES,
+                 max_areas: int = DEFAULT_MAX_AREAS, **kwargs):
+        """
+        Parameters:
+            query: 图书馆查询.
+            subscriber: 图书馆预约.
+            target: 预约开放的时刻 (服务器时间).
+            campus: 只预约此校区的座位, 见 QuickSelect.get_premises_of, -1 表示不限.
+            day: 预约的日期, 默认为 target 的日期.
+            candidates: 预先准备的候选座位数.
+            max_areas: 查询的区域数, 空闲座位多的区域优先.
+            kwargs: 见 TimedReservation.
+        """
+        super().__init__(target, query.http, SYNC_URL, **kwargs)
+        if candidates <= 0 or max_areas <= 0:
+            raise ValueError("scheduled-seat: candidates and max_areas must be positive.")
+        self.query = query
+        self.subscriber = subscriber
+        self.campus = campus
+        self.day = day or target.date()
+        self.max_candidates = candidates
+        self.max_areas = max_areas
+        self.candidates: list[SeatCandidate] = []
+        self.payloads: list[str] = []
+        self.attempts: list[tuple[SeatCandidate, dict]] = []
+        self.booked: Optional[SeatCandidate] = None
+
+    def _time_period_of(self, area_id: int) -> Optional[TimePeriod]:
+        """区域在预约日期的第一个时间段, 这一天还没有开放预约时返回 None."""
+        # 日期列表在开放预约时变化, 不能使用开放之前缓存的结果.
+        day = next((d for d in self.query.query_time(area_id, fresh=True) if d.day == self.day and d.times), None)
+        return day.times[0] if day is not None else None
+
+    def prepare(self) -> None:
+        qs = self.query.quick_select(fresh=True)
+        # 预约开放之前区域可能都没有空闲座位, 此时按照 quickSelect 中的顺序查询.
+        areas = qs.top_areas(self.max_areas, self.campus) or qs.get_areas_of_campus(self.campus)[:self.max_areas]
+        found: list[SeatCandidate] = []
+        for area_id in areas:
+            time_period = self._time_period_of(area_id)
+            if time_period is None:
+                continue
+            seats = self.query.query_seats(area_id, time_period)
+            if not seats:
+                continue
+            scores = isolation_rank(SeatScorer(seats))
+            for i in np.argsort(-scores, kind="stable")[:self.max_candidates]:
+                if np.isfinite(scores[i]):
+                    found.append(SeatCandidate(seats[i], area_id, time_period, float(scores[i])))
+        found.sort(key=lambda c: -c.score)
+        self.candidates = found[:self.max_candidates]
+        # 密钥按照日期变化, 需要使用发出时的日期加密, 而不是准备时的日期.
+        encryptor = ConfirmEncryptor(day_key(self.target.date()))
+        self.payloads = encryptor.encrypt_many((c.seat.id, c.time_period.id) for c in self.candidates)
+        project_logger.info(f"scheduled-seat: {len(self.candidates)} candidates: {self.candidates}.")
+
+    def fire(self) -> Optional[dict]:
+        """
+        依次提交候选座位, 返回成功的预约结果, 全部失败时返回 None.
+
+        准备时没有候选 (预约日期还没有开放) 时, 先重新查询并构建候选, 比预先准备的候选晚几次查询的时间.
+        """
+        if not self.payloads:
+            project_logger.info("scheduled-seat: no prepared candidates, querying again at the target time.")
+            self.prepare()
+        for candidate, aesjson in zip(self.candidates, self.payloads):
+            result = self.subscriber.try_confirm(candidate.seat.id, candidate.time_period, aesjson)
+            self.attempts.append((candidate, result))
+            if result.get("code") == 1:
+                self.booked = candidate
+                return result
+        return None
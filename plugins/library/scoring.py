@@ -0,0 +1,125 @@
+"""
+基于 numpy 的座位评分.
+
+把一个区域内座位的坐标和状态打包为数组, 用广播一次计算所有空闲座位到所有非空闲座位的距离,
+代替逐个座位调用 Seat.distance_to, 使每次轮询都重新评分的开销可以忽略.
+"""
+from __future__ import annotations
+
+from typing import Optional, TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from .seat import Seat, SeatTable
+
+__all__ = ["OBJECTIVES", "SeatScorer"]
+
+OBJECTIVES = ("sum", "max_min", "crowding", "entrance")
+_MIN_SQUARED_DISTANCE = 1e-6  # 计算拥挤度时距离平方的下限, 避免重叠的座位除以 0.
+
+
+class SeatScorer:
+    """
+    座位评分引擎, 分数越高的空闲座位越符合要求, 非空闲座位的分数为 -inf.
+
+    评分目标:
+        - sum: 到所有非空闲座位的距离之和, 与 SeatFinder.find_most_isolated 原来的算法相同.
+        - max_min: 到最近的非空闲座位的距离, 即离最近的人尽量远.
+        - crowding: 到非空闲座位的距离平方倒数之和的相反数, 近处的人影响远大于远处的人.
+        - entrance: 到入口的距离, 需要指定 entrance, 即离入口尽量远.
+
+    座位坐标只在构造时打包一次, 轮询时用 update 更新座位状态即可重新评分.
+
+    Examples:
+
+    >>> scorer = SeatScorer(seats)
+    >>> scorer.best()  # 与 SeatFinder(seats).find_most_isolated() 相同.
+    >>> scorer.best("max_min")
+    >>> scorer.best("entrance", entrance=(0, 50))
+    """
+
+    def __init__(self, seats: list[Seat] | SeatTable):
+        """
+        Parameters:
+            seats: 图书馆中一个区域内的座位, 为 SeatTable 时直接使用其中的列, 不构造 Seat 对象.
+        """
+        from .seat import SeatTable
+        if isinstance(seats, SeatTable):
+            self.seats = seats
+            self._index: Optional[dict[int, int]] = None
+            self.xs = seats.xs
+            self.ys = seats.ys
+            self.available = seats.available()
+            return
+        self.seats = list(seats)
+        self._index = {seat.id: i for i, seat in enumerate(self.seats)}
+        self.xs = np.fromiter((seat.x for seat in seats), dtype=np.float64, count=len(seats))
+        self.ys = np.fromiter((seat.y for seat in seats), dtype=np.float64, count=len(seats))
+        self.available = np.fromiter((seat.is_available() for seat in seats), dtype=bool, count=len(seats))
+
+    def update(self, seats: list[Seat]):
+        """
+        使用新一次查询的结果更新座位状态, 不在构造时座位中的座位会被忽略.
+
+        Parameters:
+            seats: 同一区域的座位.
+        """
+        if self._index is None:  # SeatTable 只在需要时转换 id 列.
+            self._index = dict(zip(self.seats.ids.tolist(), range(len(self.seats))))
+        for seat in seats:
+            i = self._index.get(seat.id)
+            if i is not None:
+                self.seats[i] = seat
+                self.available[i] = seat.is_available()
+
+    def _free_to_occupied(self) -> tuple[np.ndarray, np.ndarray]:
+        """空闲座位的下标和空闲座位到非空闲座位的距离平方矩阵 (空闲数 * 非空闲数)."""
+        free = np.flatnonzero(self.available)
+        occupied = ~self.available
+        dx = self.xs[free, None] - self.xs[None, occupied]
+        dy = self.ys[free, None] - self.ys[None, occupied]
+        return free, dx * dx + dy * dy
+
+    def scores(self, objective: str = "sum", *, entrance: tuple[float, float] = None) -> np.ndarray:
+        """
+        计算所有座位的分数.
+
+        Parameters:
+            objective: 评分目标, 见 OBJECTIVES.
+            entrance: 入口在座位图上的百分比坐标 (x, y), 仅 entrance 目标使用.
+
+        Returns:
+            与构造时的座位一一对应的分数数组, 非空闲座位为 -inf.
+
+        Raises:
+            ValueError: 未知的评分目标, 或者 entrance 目标没有指定入口.
+        """
+        result = np.full(len(self.seats), -np.inf)
+        if objective == "entrance":
+            if entrance is None:
+                raise ValueError("seat-scorer: entrance objective requires the entrance position.")
+            free = np.flatnonzero(self.available)
+            result[free] = np.hypot(self.xs[free] - entrance[0], self.ys[free] - entrance[1])
+            return result
+        if objective not in OBJECTIVES:
+            raise ValueError(f"seat-scorer: unknown objective {objective!r}.")
+        free, squared = self._free_to_occupied()
+        if objective == "sum":
+            result[free] = np.sqrt(squared).sum(axis=1)
+        elif objective == "max_min":
+            # 没有非空闲座位时所有空闲座位的分数都为 inf.
+            result[free] = np.sqrt(squared.min(axis=1, initial=np.inf))
+        else:
+            result[free] = -(1 / np.maximum(squared, _MIN_SQUARED_DISTANCE)).sum(axis=1)
+        return result
+
+    def best(self, objective: str = "sum", *, entrance: tuple[float, float] = None) -> Optional[Seat]:
+        """
+        分数最高的空闲座位, 分数相同时取靠前的座位, 没有空闲座位时返回 None.
+
+        参数见 scores.
+        """
+        if not self.available.any():
+            return None
+        return self.seats[int(np.argmax(self.scores(objective, entrance=entrance)))]
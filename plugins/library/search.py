@@ -0,0 +1,172 @@
+"""
+跨区域, 跨时间段的并发座位搜索.
+
+并发地查询所有候选区域在目标日期的所有可预约时间段和座位, 用同一个排序函数给所有座位打分, 返回全局最好的座位.
+区域之间的查询相互独立, 每个区域的时间段查询完成后立即提交其座位查询, 因此在并发数足够时,
+总耗时接近单个区域的 query_time + query_seats.
+"""
+from __future__ import annotations
+
+import time
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from typing import Callable, Optional
+
+import numpy as np
+
+from src.log import project_logger
+from src.net.resilience import ServerUnavailableError
+from .date import TimePeriod
+from .query import LibraryQuery, QuickSelect
+from .scoring import SeatScorer
+from .seat import Seat
+
+__all__ = ["DEFAULT_CONCURRENCY", "DEFAULT_MAX_AREAS", "ISOLATION_CAP", "isolation_rank", "SeatCandidate", "SeatSearch"]
+
+DEFAULT_CONCURRENCY = 4  # 同时进行的查询数, 不超过 HttpClient 每个域名的连接数.
+# 默认查询的区域数, 每个区域需要两个请求, 使一次搜索的请求数不超过 HttpClient 每个主机的突发请求数,
+# 否则会被限流, 总耗时反而变长.
+DEFAULT_MAX_AREAS = 4
+ISOLATION_CAP = 30.0  # 到最近的非空闲座位的距离超过此值 (座位图百分比坐标) 时视为同样孤立.
+
+
+def isolation_rank(scorer: SeatScorer) -> np.ndarray:
+    """
+    默认的排序函数: 座位到最近的非空闲座位的距离, 不超过 ISOLATION_CAP.
+
+    与 SeatFinder.find_most_isolated 使用的距离之和不同, 此分数与区域的座位数量无关, 可以在区域之间比较.
+    """
+    return np.minimum(scorer.scores("max_min"), ISOLATION_CAP)
+
+
+class SeatCandidate:
+    """一个区域的一个时间段中最好的座位."""
+
+    def __init__(self, seat: Seat, area_id: int, time_period: TimePeriod, score: float):
+        self.seat = seat
+        self.area_id = area_id
+        self.time_period = time_period
+        self.score = score
+
+    def __repr__(self):
+        return (f"SeatCandidate(area={self.area_id}, seat={self.seat.no}, "
+                f"segment={self.time_period.id}, score={self.score:.3f})")
+
+
+class SeatSearch:
+    """
+    并发座位搜索.
+
+    Examples:
+
+    >>> search = SeatSearch(library_query)
+    >>> qs = library_query.quick_select()
+    >>> best = search.best(qs, lambda area: qs.get_premises_of(area["id"]) == 0)
+    >>> subscriber.confirm(best.seat.id, best.time_period)
+    """
+
+    def __init__(self, query: LibraryQuery, concurrency: int = DEFAULT_CONCURRENCY,
+                 segments_per_area: Optional[int] = None, max_areas: Optional[int] = DEFAULT_MAX_AREAS,
+                 rank: Callable[[SeatScorer], np.ndarray] = isolation_rank, day: int = 0):
+        """
+        Parameters:
+            query: 图书馆查询.
+            concurrency: 同时进行的查询数.
+            segments_per_area: 每个区域只查询目标日期中的前几个时间段, None 表示查询所有时间段.
+            max_areas: 只查询空闲座位最多的前几个区域, None 表示查询所有有空闲座位的区域.
+                       每个区域需要 1 + 时间段数 个请求, 区域过多时会受到 HttpClient 的限流.
+            rank: 排序函数, 接收一个区域一个时间段的座位的 SeatScorer, 返回每个座位的分数,
+                  非空闲座位为 -inf, 分数需要可以在区域之间比较.
+            day: 目标日期在 query_time 返回的可选日期中的下标, 0 为最早的一天 (通常是今天).
+        """
+        if concurrency <= 0 or (segments_per_area is not None and segments_per_area <= 0):
+            raise ValueError("seat-search: concurrency and segments_per_area must be positive.")
+        if day < 0:
+            raise ValueError("seat-search: day must not be negative.")
+        self.query = query
+        self.concurrency = concurrency
+        self.segments_per_area = segments_per_area
+        self.day = day
+        self.max_areas = max_areas
+        self.rank = rank
+
+    def candidate_areas(self, qs: QuickSelect, area_filter: Callable[[dict], bool] = lambda a: True) -> list[int]:
+        """通过筛选并且有空闲座位的区域, 空闲座位多的在前."""
+        areas = [area_id for area_id in qs.top_areas(len(qs.areas)) if area_filter(qs.get_by_id(area_id))]
+        return areas if self.max_areas is None else areas[:self.max_areas]
+
+    def _best_of(self, area_id: int, time_period: TimePeriod) -> Optional[SeatCandidate]:
+        seats = self.query.query_seats(area_id, time_period)
+        if not seats:
+            return None
+        scorer = SeatScorer(seats)
+        scores = self.rank(scorer)
+        i = int(np.argmax(scores))
+        if not scorer.available[i]:
+            return None
+        return SeatCandidate(seats[i], area_id, time_period, float(scores[i]))
+
+    def search(self, qs: QuickSelect, area_filter: Callable[[dict], bool] = lambda a: True) -> list[SeatCandidate]:
+        """
+        查询所有候选区域, 返回每个区域在目标日期的每个时间段中最好的座位.
+
+        Parameters:
+            qs: quick_select 的结果, 用于选择候选区域.
+            area_filter: 区域的筛选函数, 参数为区域的 dict.
+
+        Returns:
+            按照分数从高到低排序的候选座位, 分数相同时时间段较早, 空闲座位较多的区域在前.
+
+        Raises:
+            LoginError: 登录失效, 任意一个查询出现时立即抛出.
+            ServerUnavailableError: 所有查询都因服务器不可用而失败, 部分失败时只记录日志.
+        """
+        areas = self.candidate_areas(qs, area_filter)
+        if not areas:
+            return []
+        begin = time.monotonic()
+        order = {area_id: i for i, area_id in enumerate(areas)}
+        results: list[SeatCandidate] = []
+        unavailable: list[ServerUnavailableError] = []
+        pool = ThreadPoolExecutor(max_workers=min(self.concurrency, len(areas)),
+                                  thread_name_prefix="seat-search")
+        pending: set[Future] = set()
+
+        def on_days(area_id: int, future: Future):
+            days = future.result()
+            if len(days) <= self.day:
+                return
+            for time_period in days[self.day].times[:self.segments_per_area]:
+                pending.add(pool.submit(self._best_of, area_id, time_period))
+
+        try:
+            time_queries = {pool.submit(self.query.query_time, area_id): area_id for area_id in areas}
+            pending.update(time_queries)
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.discard(future)
+                    try:
+                        if future in time_queries:
+                            on_days(time_queries[future], future)
+                        elif (candidate := future.result()) is not None:
+                            results.append(candidate)
+                    except ServerUnavailableError as e:
+                        project_logger.warning(f"seat-search: {e}")
+                        unavailable.append(e)
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+        if not results and unavailable:
+            raise unavailable[0]
+        results.sort(key=lambda c: (-c.score, c.time_period.day.day, c.time_period.start, order[c.area_id]))
+        project_logger.debug(f"seat-search: {len(areas)} areas, {len(results)} candidates "
+                             f"in {time.monotonic() - begin:.2f}s.")
+        return results
+
+    def best(self, qs: QuickSelect, area_filter: Callable[[dict], bool] = lambda a: True) -> Optional[SeatCandidate]:
+        """
+        全局最好的座位, 没有可预约的座位时返回 None.
+
+        参数和异常见 search.
+        """
+        results = self.search(qs, area_filter)
+        return results[0] if results else None
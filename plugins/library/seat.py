@@ -1,10 +1,20 @@
 """
 座位对象表示, 见 query_seats_example.json 文件.
+
+query_seats 每次轮询都会返回一个区域的全部座位, 而通常只有评分最高的几个座位会被使用,
+因此查询结果以 SeatTable 表示: 座位的 id, 状态和坐标按列保存在 numpy 数组中,
+Seat 对象只在按下标访问时才从原始 json 构造.
 """
 from __future__ import annotations
 
 import math
-from typing import Self
+import operator
+from typing import Iterator, Optional, Self, Sequence
+
+import numpy as np
+
+from .scoring import SeatScorer
+from .spatial import SeatIndex
 
 
 class Seat:
@@ -26,6 +36,8 @@ class Seat:
         这四个属性表示的就是座位在座位图上的百分比坐标.
     """
 
+    __slots__ = ("raw", "id", "area_id", "no", "status", "x", "y", "width", "height")
+
     def __init__(self, json_data: dict):
         self.raw = json_data
 
@@ -64,6 +76,101 @@ class Seat:
         return self.status == 1
 
 
+class SeatTable(Sequence[Seat]):
+    """
+    一个区域内的座位, 以列的形式保存, 可以像 list[Seat] 一样使用.
+
+    每一列在第一次使用时才一次性转换为数组 (评分只需要坐标和状态), 不创建 Seat 对象,
+    也不复制原始 json; 按下标访问或者迭代时才构造对应的 Seat 并缓存.
+
+    Examples:
+
+    >>> table = SeatTable(ret_data)
+    >>> table.xs[table.status == 1]  # 空闲座位的横坐标.
+    >>> table[3].no, table[3]["area_name"]
+    ('004', '一楼A区')
+    """
+
+    __slots__ = ("raw", "_columns", "_seats")
+
+    def __init__(self, json_data: list[dict]):
+        """
+        Parameters:
+            json_data: seat 请求的响应中的座位列表.
+        """
+        self.raw = json_data
+        self._columns: dict[str, np.ndarray] = {}
+        self._seats: list[Optional[Seat]] = [None] * len(json_data)
+
+    def _column(self, key: str, dtype) -> np.ndarray:
+        column = self._columns.get(key)
+        if column is None:
+            # numpy 直接转换字符串列表比逐个调用 int / float 快.
+            column = self._columns[key] = np.array([seat[key] for seat in self.raw], dtype=dtype)
+        return column
+
+    @property
+    def ids(self) -> np.ndarray:
+        return self._column("id", np.int64)
+
+    @property
+    def area_ids(self) -> np.ndarray:
+        return self._column("area", np.int64)
+
+    @property
+    def status(self) -> np.ndarray:
+        return self._column("status", np.int64)
+
+    @property
+    def xs(self) -> np.ndarray:
+        return self._column("point_x", np.float64)
+
+    @property
+    def ys(self) -> np.ndarray:
+        return self._column("point_y", np.float64)
+
+    @property
+    def widths(self) -> np.ndarray:
+        return self._column("width", np.float64)
+
+    @property
+    def heights(self) -> np.ndarray:
+        return self._column("height", np.float64)
+
+    @classmethod
+    def from_response(cls, json_data: list[dict]) -> Self:
+        return cls(json_data)
+
+    def __len__(self):
+        return len(self._seats)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [self[i] for i in range(*item.indices(len(self)))]
+        i = operator.index(item)
+        seat = self._seats[i]
+        if seat is None:
+            seat = self._seats[i] = Seat(self.raw[i])
+        return seat
+
+    def __setitem__(self, i: int, seat: Seat):
+        """用新一次查询的结果替换第 i 个座位, 只更新状态列."""
+        i = operator.index(i)
+        self._seats[i] = seat
+        self.status[i] = seat.status
+
+    def __iter__(self) -> Iterator[Seat]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def __repr__(self):
+        return f"SeatTable({len(self)} seats)"
+
+    def available(self) -> np.ndarray:
+        """每个座位是否空闲."""
+        return self.status == 1
+
+
 class SeatFinder:
     """
     用于筛选特定要求下最符合要求的座位.
@@ -76,11 +183,17 @@ class SeatFinder:
         """
         self.seats = seats
         self._check_seats()
+        self.scorer = SeatScorer(seats)
+        self._index: SeatIndex | None = None
 
     def _check_seats(self):
         """
         检查自身的座位是否都是来自图书馆同一区域.
         """
+        if isinstance(self.seats, SeatTable):
+            if np.unique(self.seats.area_ids).size > 1:
+                raise ValueError("seat-finder: seats are not from the same area.")
+            return
         area_id = None
         for seat in self.seats:
             if area_id is None:
@@ -90,21 +203,31 @@ class SeatFinder:
 
     def find_most_isolated(self) -> Seat | None:
         """
-        寻找周围空闲数量最多的座位.
+        寻找周围空闲数量最多的座位, 即到所有非空闲座位的距离之和最大的空闲座位.
 
         但如果没有空座位, 返回 None.
         """
-        # 此算法的性能和正确性还有待考量.
-        max_distance = 0
-        target_seat = None
-        for seat in self.seats:
-            if not seat.is_available():
-                continue
-            # 找距离所有非空闲座位最远的.
-            distance = sum([
-                seat.distance_to(seat1) for seat1 in self.seats if not seat1.is_available()
-            ])
-            if target_seat is None or distance > max_distance:
-                max_distance = distance
-                target_seat = seat
-        return target_seat
+        return self.scorer.best("sum")
+
+    def find_best(self, objective: str = "sum", *, entrance: tuple[float, float] = None) -> Seat | None:
+        """
+        按照指定的评分目标寻找最符合要求的空闲座位, 见 SeatScorer.
+
+        但如果没有空座位, 返回 None.
+        """
+        return self.scorer.best(objective, entrance=entrance)
+
+    @property
+    def index(self) -> SeatIndex:
+        """座位的空间索引, 第一次使用时构建."""
+        if self._index is None:
+            self._index = SeatIndex(self.seats)
+        return self._index
+
+    def find_group(self, k: int, radius: float) -> list[Seat] | None:
+        """
+        寻找 k 个相邻的空闲座位, 两两距离都不超过 radius, 见 SeatIndex.find_group.
+
+        但如果没有满足要求的座位, 返回 None.
+        """
+        return self.index.find_group(k, radius)
@@ -0,0 +1,228 @@
+"""
+下课后没有可预约座位时的抢座模式.
+
+在一个有限的时间窗口内轮询 quickSelect, 一旦符合要求的区域出现空闲座位, 立即查询座位并预约.
+轮询间隔随空闲座位数的变化自适应: 空闲座位数变化时使用最短间隔, 不变时逐渐退避到最长间隔.
+所有请求 (包括命中缓存的查询) 都计入请求预算, 预算用完时停止, 避免给 seat-lib 造成过大压力.
+"""
+from __future__ import annotations
+
+import time
+from typing import Any, Callable, Optional
+
+from src.log import project_logger
+from src.net.resilience import ServerUnavailableError
+from src.plugin import PluginContext
+from src.uia.login import LoginError
+from .date import TimePeriod
+from .query import LibraryQuery, QuickSelect
+from .scoring import SeatScorer
+from .subscribe import Subscribe
+
+__all__ = ["DEFAULT_BUDGET", "MIN_INTERVAL", "MAX_INTERVAL", "BACKOFF", "SnipeAttempt", "SeatSniper"]
+
+DEFAULT_BUDGET = 120  # 一次抢座最多发出的请求数.
+MIN_INTERVAL = 3.0  # 空闲座位数变化时的轮询间隔 (s).
+MAX_INTERVAL = 60.0  # 空闲座位数长时间不变时的最长轮询间隔 (s).
+BACKOFF = 2.0  # 空闲座位数不变时轮询间隔的增长倍数.
+AREA_COST = 3  # 尝试一个区域需要的请求数: query_time, query_seats, confirm.
+
+
+class SnipeAttempt:
+    """一次预约尝试."""
+
+    def __init__(self, area_id: int, seat_id: int, time_period: TimePeriod, latency: float, result: dict):
+        """
+        Parameters:
+            area_id: 区域 id.
+            seat_id: 尝试预约的座位 id.
+            time_period: 尝试预约的时间段.
+            latency: 从 quickSelect 中发现区域有空闲座位到收到预约响应的时间 (s).
+            result: 预约请求的响应.
+        """
+        self.area_id = area_id
+        self.seat_id = seat_id
+        self.time_period = time_period
+        self.latency = latency
+        self.result = result
+
+    @property
+    def success(self) -> bool:
+        return self.result.get("code") == 1
+
+    def __repr__(self):
+        return (f"SnipeAttempt(area={self.area_id}, seat={self.seat_id}, segment={self.time_period.id}, "
+                f"latency={self.latency:.3f}s, success={self.success}, msg={self.result.get('msg')!r})")
+
+
+class SeatSniper:
+    """
+    抢座, 每次 step 进行一次轮询, 返回下一次轮询前需要等待的时间.
+
+    Examples:
+
+    >>> sniper = SeatSniper(library_query, subscriber, window=30 * 60, campus=1)
+    >>> sniper.start(ctx, lambda s: print(s.booked, s.attempts))  # 使用 ctx.call_later 调度轮询.
+
+    或者手动调度:
+
+    >>> while (delay := sniper.step()) is not None:
+    ...     time.sleep(delay)
+    """
+
+    def __init__(self, query: LibraryQuery, subscriber: Subscribe, window: float, campus: int = -1,
+                 budget: int = DEFAULT_BUDGET, min_interval: float = MIN_INTERVAL,
+                 max_interval: float = MAX_INTERVAL, areas_per_poll: int = 2,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Parameters:
+            query: 图书馆查询.
+            subscriber: 图书馆预约.
+            window: 抢座的时间窗口 (s), 从创建时开始计算.
+            campus: 只预约此校区的座位, 见 QuickSelect.get_premises_of, -1 表示不限.
+            budget: 最多发出的请求数.
+            min_interval: 最短轮询间隔 (s).
+            max_interval: 最长轮询间隔 (s).
+            areas_per_poll: 一次轮询中最多尝试的区域数, 空闲座位多的区域优先.
+            clock: 单调时钟, 用于计算时间窗口和延迟.
+        """
+        if budget <= 0 or areas_per_poll <= 0:
+            raise ValueError("seat-sniper: budget and areas_per_poll must be positive.")
+        if not 0 < min_interval <= max_interval:
+            raise ValueError("seat-sniper: intervals must satisfy 0 < min_interval <= max_interval.")
+        self.query = query
+        self.subscriber = subscriber
+        self.campus = campus
+        self.budget = budget
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.areas_per_poll = areas_per_poll
+        self.clock = clock
+        self.deadline = clock() + window
+        self.interval = min_interval
+        self.requests = 0  # 已经发出的请求数.
+        self.polls = 0
+        self.attempts: list[SnipeAttempt] = []
+        self.booked: Optional[SnipeAttempt] = None
+        # "booked", "window", "budget", "login" 或 "stopped", 未结束时为 None.
+        self.finish_reason: Optional[str] = None
+        self._last_free: Optional[dict[int, int]] = None
+        self._handle: Optional[int] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.finish_reason is not None
+
+    @property
+    def remaining(self) -> int:
+        return self.budget - self.requests
+
+    def _finish(self, reason: str) -> None:
+        self.finish_reason = reason
+        project_logger.info(f"seat-sniper: finished ({reason}) after {self.polls} polls, "
+                            f"{self.requests} requests, {len(self.attempts)} attempts.")
+
+    def _free_counts(self, qs: QuickSelect) -> dict[int, int]:
+        return {area_id: qs.get_free_seats_num_of(area_id) for area_id in qs.get_areas_of_campus(self.campus)}
+
+    def _try_area(self, area_id: int, detected_at: float) -> Optional[SnipeAttempt]:
+        """查询区域最早的时间段并预约其中最孤立的空闲座位, 没有可预约的座位时返回 None."""
+        self.requests += 1
+        days = self.query.query_time(area_id)
+        if not days or not days[0].times:
+            return None
+        time_period = days[0].times[0]
+        self.requests += 1
+        seat = SeatScorer(self.query.query_seats(area_id, time_period)).best("max_min")
+        if seat is None:
+            return None
+        self.requests += 1
+        result = self.subscriber.try_confirm(seat.id, time_period)
+        attempt = SnipeAttempt(area_id, seat.id, time_period, self.clock() - detected_at, result)
+        self.attempts.append(attempt)
+        project_logger.info(f"seat-sniper: {attempt}")
+        return attempt
+
+    def _poll(self) -> bool:
+        """
+        进行一次轮询, 返回空闲座位数是否变化.
+
+        还没有可比较的上一次结果 (第一次轮询) 时视为变化, 下课后座位变化最频繁, 不应在第一次轮询后就退避.
+        """
+        self.requests += 1
+        self.polls += 1
+        qs = self.query.quick_select(fresh=True)
+        detected_at = self.clock()
+        free = self._free_counts(qs)
+        changed = self._last_free is None or free != self._last_free
+        self._last_free = free
+        for area_id in qs.top_areas(self.areas_per_poll, self.campus):
+            if self.remaining < AREA_COST:
+                break
+            attempt = self._try_area(area_id, detected_at)
+            if attempt is not None and attempt.success:
+                self.booked = attempt
+                break
+        return changed
+
+    def step(self) -> Optional[float]:
+        """
+        进行一次轮询, 如果有符合要求的空闲座位则立即预约.
+
+        Returns:
+            下一次轮询前需要等待的时间 (s), 抢座结束 (预约成功, 时间窗口结束或者请求预算用完) 时返回 None.
+
+        Raises:
+            LoginError: 登录失效, 抢座结束.
+        """
+        if self.finished:
+            return None
+        if self.clock() >= self.deadline:
+            self._finish("window")
+            return None
+        if self.remaining <= 0:
+            self._finish("budget")
+            return None
+        try:
+            changed = self._poll()
+        except LoginError:
+            self._finish("login")
+            raise
+        except ServerUnavailableError as e:
+            project_logger.warning(f"seat-sniper: {e}")
+            changed = self._last_free is None
+        if self.booked is not None:
+            self._finish("booked")
+            return None
+        self.interval = self.min_interval if changed else min(self.interval * BACKOFF, self.max_interval)
+        if self.remaining <= 0:
+            self._finish("budget")
+            return None
+        # 不在时间窗口结束之后轮询, 但窗口结束时仍然检查一次.
+        return max(0.0, min(self.interval, self.deadline - self.clock()))
+
+    def start(self, ctx: PluginContext, on_finish: Callable[[SeatSniper], Any] = None) -> None:
+        """
+        使用 ctx.call_later 在插件的串行执行器中调度轮询, 直到抢座结束.
+
+        Parameters:
+            ctx: 插件上下文.
+            on_finish: 抢座结束时以此对象为参数调用, 因登录失效而中止时不调用.
+        """
+
+        def run(ctx_: PluginContext):
+            delay = self.step()
+            if delay is not None:
+                self._handle = ctx_.call_later(delay, run)
+            elif on_finish is not None:
+                on_finish(self)
+
+        self._handle = ctx.call_later(0, run)
+
+    def stop(self, ctx: PluginContext) -> None:
+        """取消 start 调度的轮询."""
+        if self._handle is not None:
+            ctx.cancel_call(self._handle)
+            self._handle = None
+        if not self.finished:
+            self._finish("stopped")
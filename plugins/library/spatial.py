@@ -0,0 +1,160 @@
+"""
+座位的空间索引, 用于寻找相邻的多个空闲座位 (例如小组学习).
+
+把区域内的座位按照座位中心所在的网格分桶, 半径查询只需要检查半径覆盖的几个网格,
+座位状态变化时只更新对应网格中的空闲集合, 不需要重建索引.
+"""
+from __future__ import annotations
+
+import math
+from typing import Iterable, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .seat import Seat
+
+__all__ = ["DEFAULT_CELL_SIZE", "SeatIndex"]
+
+DEFAULT_CELL_SIZE = 5.0  # 网格边长 (座位图百分比坐标), 约为相邻两个座位的间距, 应与常用的查询半径相近.
+
+
+class SeatIndex:
+    """
+    座位的网格索引, 座位坐标使用座位中心 (x + width / 2, y + height / 2) 的百分比坐标.
+
+    Examples:
+
+    >>> index = SeatIndex(library_query.query_seats(area_id, time_period))
+    >>> index.within(seat, 8)  # seat 周围 8 以内的空闲座位, 由近到远.
+    >>> index.find_group(3, 8)  # 两两距离都不超过 8 的 3 个空闲座位.
+    >>> index.set_available(seat.id, False)  # 座位被预约.
+    """
+
+    def __init__(self, seats: list[Seat], cell_size: float = DEFAULT_CELL_SIZE):
+        """
+        Parameters:
+            seats: 图书馆中一个区域内的座位.
+            cell_size: 网格边长.
+        """
+        if cell_size <= 0:
+            raise ValueError("seat-index: cell size must be positive.")
+        self.cell_size = cell_size
+        self.seats = {seat.id: seat for seat in seats}
+        self._centers = {seat.id: (seat.x + seat.width / 2, seat.y + seat.height / 2) for seat in seats}
+        self._cells: dict[tuple[int, int], set[int]] = {}  # 网格 -> 其中空闲座位的 id.
+        self._free: set[int] = set()
+        for seat in seats:
+            if seat.is_available():
+                self.set_available(seat.id, True)
+
+    def _cell_of(self, x: float, y: float) -> tuple[int, int]:
+        return math.floor(x / self.cell_size), math.floor(y / self.cell_size)
+
+    def __len__(self):
+        return len(self.seats)
+
+    @property
+    def free_count(self) -> int:
+        return len(self._free)
+
+    def is_available(self, seat_id: int) -> bool:
+        return seat_id in self._free
+
+    def set_available(self, seat_id: int, available: bool):
+        """
+        更新座位的空闲状态.
+
+        Raises:
+            KeyError: 座位不在索引中.
+        """
+        cell = self._cell_of(*self._centers[seat_id])
+        if available:
+            self._free.add(seat_id)
+            self._cells.setdefault(cell, set()).add(seat_id)
+        elif seat_id in self._free:
+            self._free.discard(seat_id)
+            members = self._cells[cell]
+            members.discard(seat_id)
+            if not members:
+                del self._cells[cell]
+
+    def update(self, seats: Iterable[Seat]):
+        """使用新一次查询的结果更新座位状态, 不在索引中的座位会被忽略."""
+        for seat in seats:
+            if seat.id in self.seats:
+                self.seats[seat.id] = seat
+                self.set_available(seat.id, seat.is_available())
+
+    def distance(self, a: int, b: int) -> float:
+        """两个座位中心之间的距离."""
+        (ax, ay), (bx, by) = self._centers[a], self._centers[b]
+        return math.hypot(ax - bx, ay - by)
+
+    def _within(self, x: float, y: float, radius: float) -> list[tuple[float, int]]:
+        """中心到 (x, y) 的距离不超过 radius 的空闲座位, 返回 (距离, id), 由近到远."""
+        (x0, y0), (x1, y1) = self._cell_of(x - radius, y - radius), self._cell_of(x + radius, y + radius)
+        found = []
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                for seat_id in self._cells.get((cx, cy), ()):
+                    sx, sy = self._centers[seat_id]
+                    d = math.hypot(sx - x, sy - y)
+                    if d <= radius:
+                        found.append((d, seat_id))
+        found.sort()
+        return found
+
+    def within(self, seat: Seat | int, radius: float) -> list[Seat]:
+        """
+        座位周围 radius 以内的空闲座位 (不包括其自身), 由近到远.
+
+        Parameters:
+            seat: 索引中的座位或者其 id.
+            radius: 半径 (座位图百分比坐标).
+        """
+        seat_id = seat if isinstance(seat, int) else seat.id
+        x, y = self._centers[seat_id]
+        return [self.seats[i] for _, i in self._within(x, y, radius) if i != seat_id]
+
+    def _anchors(self, k: int, radius: float) -> list[int]:
+        """周围 radius 覆盖的网格中至少有 k 个空闲座位的网格中的空闲座位."""
+        reach = math.ceil(radius / self.cell_size)
+        anchors = []
+        for (cx, cy), members in self._cells.items():
+            count = sum(len(self._cells.get((cx + dx, cy + dy), ()))
+                        for dx in range(-reach, reach + 1) for dy in range(-reach, reach + 1))
+            if count >= k:
+                anchors.extend(members)
+        return anchors
+
+    def find_group(self, k: int, radius: float) -> Optional[list[Seat]]:
+        """
+        寻找 k 个两两距离都不超过 radius 的空闲座位, 在所有满足的组合中选择最紧凑 (最大两两距离最小) 的一组.
+
+        以空闲座位为起点, 从近到远贪心地加入与已选座位都不超过 radius 的邻近座位,
+        因此结果不保证是全局最紧凑的, 但 k 较小 (2 到 4) 时通常相同.
+
+        组中的座位都在起点的 radius 以内, 所以先按网格统计每个网格周围 (radius 覆盖的网格) 的空闲座位数,
+        不足 k 个的网格中的座位不会作为起点, 也不需要查询. 最坏情况 (空闲座位密集) 下仍然需要对每个
+        空闲座位做一次邻域查询, 复杂度为 O(F * m), F 为空闲座位数, m 为一个邻域中的空闲座位数.
+
+        Returns:
+            按照座位 id 排序的 k 个座位, 不存在时返回 None.
+        """
+        if k <= 0:
+            raise ValueError("seat-index: group size must be positive.")
+        best, best_diameter = None, math.inf
+        for anchor in sorted(self._anchors(k, radius)):
+            group = [anchor]
+            diameter = 0.0
+            for d, seat_id in self._within(*self._centers[anchor], radius):
+                if len(group) == k or d > best_diameter:
+                    break
+                if seat_id == anchor:
+                    continue
+                distances = [self.distance(seat_id, other) for other in group]
+                if max(distances) <= radius:
+                    group.append(seat_id)
+                    diameter = max(diameter, *distances)
+            if len(group) == k and (diameter, sorted(group)) < (best_diameter, best or []):
+                best, best_diameter = sorted(group), diameter
+        return None if best is None else [self.seats[i] for i in best]
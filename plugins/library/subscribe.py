@@ -6,16 +6,20 @@ https://seat-lib.ecnu.edu.cn/api/Seat/confirm 执行预约操作, 此操作涉
 """
 from __future__ import annotations
 
+from src.net.client import HttpClient
+from src.uia.login import LoginError
 from .date import TimePeriod
+from .query import QUICK_SELECT_URL, SEAT_DATE_URL
 from .req import Request, LibCache
-from .encrypt import Encryptor
+from .encrypt import ConfirmEncryptor
 
 
 class Subscribe(Request):
-    def __init__(self, cache: LibCache):
-        super().__init__(cache)
+    def __init__(self, cache: LibCache, http: HttpClient = None):
+        super().__init__(cache, http)
+        self.encryptor = ConfirmEncryptor()
 
-    def confirm(self, seat_id: int, time_period: TimePeriod):
+    def confirm(self, seat_id: int, time_period: TimePeriod, aesjson: str = None):
         """
         预约图书馆座位.
 
@@ -27,6 +31,11 @@ class Subscribe(Request):
             "aesjson": "..." # 使用 Encryptor.encrypt 加密的 json 数据.
         }
 
+        Parameters:
+            seat_id: 座位 id.
+            time_period: 时间段.
+            aesjson: 预先使用 self.encryptor.encrypt_many 加密好的数据, 默认在此时加密.
+
         其中被加密的 json 数据原格式为:
 
         {
@@ -43,15 +52,30 @@ class Subscribe(Request):
             "area": "...", // 区域全称字符串.
             "no": "[int]" // 座位字符串.
         }
+
+        Raises:
+            LoginError: 登录失效, 或者预约被拒绝 (例如座位已被他人预约).
+        """
+        ret = self.try_confirm(seat_id, time_period, aesjson)
+        if ret["code"] != 1:
+            raise LoginError(f"result code: {ret['code']}, {ret}.")
+        return ret
+
+    def try_confirm(self, seat_id: int, time_period: TimePeriod, aesjson: str = None) -> dict:
+        """
+        预约图书馆座位, 参数见 confirm.
+
+        与 confirm 不同, 预约被拒绝 (响应的 "code" 字段不为 1, 例如座位已被他人预约) 时不抛出异常,
+        而是返回响应, 由调用方检查 "code" 和 "msg" 字段, 只有登录失效时抛出 LoginError.
         """
-        response = self.post(
-            "https://seat-lib.ecnu.edu.cn/api/Seat/confirm",
-            payload={"aesjson": Encryptor.encrypt({
-                "seat_id": seat_id,
-                "segment": f"{time_period.id}",
-            })}
-        )
-        return self.check_login_and_extract_data(response, 1)
+        try:
+            response = self.post(
+                "https://seat-lib.ecnu.edu.cn/api/Seat/confirm",
+                payload={"aesjson": aesjson or self.encryptor.encrypt_confirm(seat_id, time_period.id)}
+            )
+        finally:  # 请求出错时预约也可能已经完成, 缓存的空闲座位信息总是需要清除.
+            self.invalidate(QUICK_SELECT_URL, SEAT_DATE_URL)
+        return self.check_login_and_extract_data(response, None)
 
     def query_subscribes(self) -> list | None:
         """
@@ -63,7 +87,7 @@ class Subscribe(Request):
 
         response(json): 见 assets/development-references/subscribe.json 的 data 字段.
         """
-        response = self.post("https://seat-lib.ecnu.edu.cn/api/index/subscribe")
+        response = self.post("https://seat-lib.ecnu.edu.cn/api/index/subscribe", idempotent=True)
         return self.check_login_and_extract_data(response, 1).get("data")
 
     def cancel(self, subscribe_id: int) -> None:
@@ -85,8 +109,11 @@ class Subscribe(Request):
 
         不报错即为成功执行.
         """
-        response = self.post(
-            "https://seat-lib.ecnu.edu.cn/api/Space/cancel",
-            payload={"id": subscribe_id}
-        )
+        try:
+            response = self.post(
+                "https://seat-lib.ecnu.edu.cn/api/Space/cancel",
+                payload={"id": subscribe_id}
+            )
+        finally:
+            self.invalidate(QUICK_SELECT_URL, SEAT_DATE_URL)
         self.check_login_and_extract_data(response, 1)
@@ -0,0 +1,41 @@
+import datetime
+
+from src.plugin import PluginManifest, PluginConfig, Routine, TimeItem, NumberItem, TextItem
+
+PLUGIN_NAME = "studyroom_subscriber"
+
+ROOM_KINDID = {
+    "普陀校区木门研究室": 3675133,
+    "普陀校区玻璃门研究室": 3674969,
+    "闵行校区研究室": 11563
+}
+
+manifest = PluginManifest(
+    name=PLUGIN_NAME,
+    entry="studyroom_plugin",
+    description="研修间自动预约和取消预约",
+    configuration=PluginConfig()
+    .add(TimeItem("min_reserve_time", datetime.time(hour=1), "要预约研修间的最短时间, h小时m分钟",
+                  lambda a: datetime.time(hour=1) <= a <= datetime.time(hour=4)))
+    .add(TimeItem("max_reserve_time", datetime.time(hour=4), "要预约研修间的最长时间, h小时m分钟",
+                  lambda a: datetime.time(hour=1) <= a <= datetime.time(hour=4)))
+    .add(NumberItem("auto_cancel", 1,
+                    "是否自动取消未签到的将过期预约,\n如果为 1(True),\n检查账号下的所有研修间预约,\n在违约的前 1~2 分钟自动取消该预约,\n为 0 则不会.",
+                    lambda a: 0 <= a <= 1,
+                    ))
+    .add(TextItem("reserve_place", "普陀校区木门研究室",
+                  "选择预约的研修间位置, 支持:\n"
+                  "- 普陀校区木门研究室\n"
+                  "- 普陀校区玻璃门研究室\n"
+                  "- 闵行校区研究室",
+                  lambda a: a in ROOM_KINDID.keys(),
+                  ))
+    .add(NumberItem("scheduled_day", -1,
+                    "每天在研修间预约开放的时刻(booking_open_time)定时预约哪一天的研修间,\n"
+                    "0 为今天, 1 为明天, 2 为后天, -1 为不定时预约.",
+                    lambda a: -1 <= a <= 2,
+                    ))
+    .add(TimeItem("booking_open_time", datetime.time(hour=21),
+                  "研修间每天开放预约的时刻(时:分:秒),\n定时预约会按照服务器时间在此时刻准时提交.")),
+    routine=Routine.MINUTELY,
+)
@@ -1,8 +1,7 @@
-import requests
-
 from datetime import datetime, timedelta
 from typing import List, Optional, Dict
 
+from src.net.client import HttpClient
 from .req import Request, StudyRoomCache, ROOM_KINDID
 
 
@@ -11,8 +10,8 @@ class StudyRoomQuery(Request):
     查询研修间的房间信息类.
     """
 
-    def __init__(self, cache: StudyRoomCache):
-        super().__init__(cache)
+    def __init__(self, cache: StudyRoomCache, http: HttpClient = None):
+        super().__init__(cache, http)
 
     def query_roomsAvailable(self, day: str = "today", kind_name: str = None) -> Optional[List[dict]]:
         """
@@ -68,7 +67,7 @@ class StudyRoomQuery(Request):
         }
 
         # 发送请求
-        response = requests.get(url, headers=headers, params=params)
+        response = self.get(url, headers=headers, params=params)
 
         # 提取和检查数据
         data = self.check_login_and_extract_data(response, expected_code=0)
@@ -8,21 +8,24 @@ Urls:
 
 """
 
+from __future__ import annotations
+
 import json
-import requests
 from requests import Response
-from typing import Optional, Union
+from datetime import date
+from typing import Optional, Union, TYPE_CHECKING
 from selenium.webdriver.support.wait import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from seleniumwire.webdriver import Edge
+from src.net.client import HttpClient, shared_client
+from src.net.resilience import check_available
+from src.uia.cache import PROBE_TIMEOUT
 from src.uia.login import LoginError
+from .manifest import ROOM_KINDID
 
+if TYPE_CHECKING:
+    from seleniumwire.webdriver import Edge
 
-ROOM_KINDID = {
-    "普陀校区木门研究室": 3675133,
-    "普陀校区玻璃门研究室": 3674969,
-    "闵行校区研究室": 11563
-}
+NOT_LOGGED_IN_CODE = 300  # 未登录时返回内容 json 结构中的 "code" 字段.
 
 
 class StudyRoomCache:
@@ -54,34 +57,56 @@ class StudyRoomCache:
 
         return cls(cookies)
 
+    def probe(self) -> bool:
+        """用一次当天的预约查询请求检查登录缓存是否仍然有效, 见 LoginCache.is_valid."""
+        today = date.today().strftime("%Y-%m-%d")
+        response = shared_client().get(
+            "https://studyroom.ecnu.edu.cn/ic-web/reserve/resvInfo",
+            cache=self,
+            headers={"Cookie": f"ic-cookie={self.cookies.get('ic-cookie')}"},
+            params={"beginDate": today, "endDate": today, "needStatus": 2, "page": 1, "pageNum": 1},
+            timeout=PROBE_TIMEOUT,
+        )
+        try:
+            Request.check_login_and_extract_data(response)
+        except LoginError:
+            return False
+        return True
+
 
 class Request:
 
-    def __init__(self, cache: StudyRoomCache):
+    def __init__(self, cache: StudyRoomCache, http: HttpClient = None):
+        """
+        :param cache: 研修间登录缓存.
+        :param http: 发送请求的 HTTP 客户端, 默认为共享的客户端, 插件中使用 ctx.http.
+        """
         self.cache = cache
+        self.http = http or shared_client()
         if cache is None:
             raise ValueError("cache cannot be None.")
 
     @classmethod
     def check_login_and_extract_data(
             cls, response: Response,
-            expected_code: int = 0,
+            expected_code: Optional[int] = 0,
     ) -> Union[dict, list]:
         """
         进行返回内容的一系列检查，并对表示错误的返回值以报错或日志的形式呈现。
 
         Parameters:
             response: 请求的返回内容.
-            expected_code: 返回内容 json 结构中的 "code" 字段.
+            expected_code: 返回内容 json 结构中的 "code" 字段, 为 None 时只检查是否登录.
 
         Raises:
+            ServerUnavailableError: 服务器暂时不可用, 不代表登录失效.
             LoginError: 登录失效及请求错误.
 
         Returns:
             如果执行正常，返回请求回应中的 json 结构。
 
         """
-
+        check_available(response)
         if response.status_code != 200:
             raise LoginError(f"Response status code: {response.status_code}.")
         if "json" not in response.headers.get("content-type", ""):
@@ -91,7 +116,10 @@ class Request:
         except json.JSONDecodeError:
             raise LoginError("Failed to decode JSON response.")
 
-        if ret.get("code") != expected_code:
+        if expected_code is None:
+            if ret.get("code") == NOT_LOGGED_IN_CODE:
+                raise LoginError(f"Result code: {ret.get('code')}, {ret}.")
+        elif ret.get("code") != expected_code:
             raise LoginError(f"Result code: {ret.get('code')}, {ret}.")
         return ret
 
@@ -121,11 +149,11 @@ class Request:
         if ic_cookie:
             headers_['Cookie'] = f"ic-cookie={ic_cookie}"
 
-        return requests.post(
+        return self.http.post(
             url,
+            cache=self.cache,
             headers=headers_,
             json=json_payload,
-            cookies=self.cache.cookies,
         )
 
     def get(self, url: str, params: Optional[dict] = None, headers: Optional[dict] = None,) -> Response:
@@ -149,9 +177,9 @@ class Request:
         if ic_cookie:
             headers_['Cookie'] = f"ic-cookie={ic_cookie}"
 
-        return requests.get(
+        return self.http.get(
             url,
+            cache=self.cache,
             headers=headers_,
-            cookies=self.cache.cookies,
             params=params
         )
@@ -0,0 +1,83 @@
+"""
+在研修间预约开放的时刻定时预约, 见 src.plugin.timed.
+
+准备阶段查询可预约的房间和时间段, 并预先构建若干个最长时间段的预约请求,
+到达目标时刻后依次提交, 直到有一个预约成功.
+目标日期在预约开放之前可能还没有可预约的时间段, 此时准备阶段没有候选, 在发出时重新查询并构建候选.
+"""
+from __future__ import annotations
+
+import datetime
+from typing import Optional
+
+from src.log import project_logger
+from src.plugin import TimedReservation
+from .subscribe import StudyRoomReserve
+
+__all__ = ["DEFAULT_CANDIDATES", "ScheduledRoomReservation"]
+
+DEFAULT_CANDIDATES = 3  # 预先准备的候选房间和时间段数.
+SYNC_URL = "https://studyroom.ecnu.edu.cn/"  # 同步时钟和预热连接的地址.
+
+
+class ScheduledRoomReservation(TimedReservation):
+    """
+    定时预约研修间.
+
+    Examples:
+
+    >>> reservation = ScheduledRoomReservation(reserve, datetime.datetime(2024, 12, 2, 21), "day_after_tomorrow",
+    ...                                        "普陀校区木门研究室", 60, 240)
+    >>> reservation.arm(ctx, lambda r: print(r.result))
+    """
+
+    def __init__(self, reserve: StudyRoomReserve, target: datetime.datetime, day: str, kind_name: str,
+                 min_duration_minutes: int, max_duration_minutes: int = 240,
+                 candidates: int = DEFAULT_CANDIDATES, **kwargs):
+        """
+        Parameters:
+            reserve: 研修间预约.
+            target: 预约开放的时刻 (服务器时间).
+            day: 预约的日期, 见 StudyRoomReserve.submit_reserve, 相对于准备时的日期.
+            kind_name: 房间类型.
+            min_duration_minutes: 预约的最短时长 (分钟).
+            max_duration_minutes: 预约的最长时长 (分钟).
+            candidates: 预先准备的候选数.
+            kwargs: 见 TimedReservation.
+        """
+        super().__init__(target, reserve.http, SYNC_URL, **kwargs)
+        if candidates <= 0:
+            raise ValueError("scheduled-room: candidates must be positive.")
+        self.reserve = reserve
+        self.day = day
+        self.kind_name = kind_name
+        self.min_duration_minutes = min_duration_minutes
+        self.max_duration_minutes = max_duration_minutes
+        self.max_candidates = candidates
+        self.payloads: list[dict] = []
+        self.attempts: list[tuple[dict, dict]] = []  # (请求, 响应).
+
+    def prepare(self) -> None:
+        slots = self.reserve.rank_slots(self.day, self.kind_name,
+                                        self.min_duration_minutes, self.max_duration_minutes)
+        test_name = f"自动预约 - {self.target.strftime('%Y-%m-%d %H:%M:%S')}"
+        self.payloads = [self.reserve.build_reserve_payload(begin, end, test_name, [room.get("devId")], "定时预约")
+                         for room, (begin, end) in slots[:self.max_candidates]]
+        project_logger.info(f"scheduled-room: {len(self.payloads)} candidates: "
+                            f"{[(p['resvDev'], p['resvBeginTime'], p['resvEndTime']) for p in self.payloads]}.")
+
+    def fire(self) -> Optional[dict]:
+        """
+        依次提交候选, 返回成功的预约结果, 全部失败时返回 None.
+
+        准备时没有候选 (目标日期还没有开放) 时, 先重新查询并构建候选, 比预先准备的候选晚一次查询的时间.
+        """
+        if not self.payloads:
+            project_logger.info("scheduled-room: no prepared candidates, querying again at the target time.")
+            self.prepare()
+        for payload in self.payloads:
+            result = self.reserve.try_reserve(payload)
+            self.attempts.append((payload, result))
+            if result.get("code") == 0:
+                return result
+        return None
@@ -3,33 +3,19 @@ from __future__ import annotations
 import datetime
 import traceback
 
+from .manifest import PLUGIN_NAME
 from .query import StudyRoomQuery
-from .req import StudyRoomCache, ROOM_KINDID
-from src.plugin import TimeItem, PluginContext, PluginConfig, register_plugin, Plugin, Routine, \
-    NumberItem, TextItem
+from .req import StudyRoomCache
+from src.plugin import PluginContext, PluginConfig, register_plugin, Plugin, ReservationTracker, next_occurrence
+from src.uia.login import LoginError
 from .subscribe import StudyRoomReserve
+from .scheduled import ScheduledRoomReservation
+
+SCHEDULED_DAYS = ("today", "tomorrow", "day_after_tomorrow")  # scheduled_day 配置项对应的日期.
 
 
 @register_plugin(
-    name="studyroom_subscriber",
-    description="研修间自动预约和取消预约",
-    configuration=PluginConfig()
-    .add(TimeItem("min_reserve_time", datetime.time(hour=1), "要预约研修间的最短时间, h小时m分钟",
-                  lambda a: datetime.time(hour=1) <= a <= datetime.time(hour=4)))
-    .add(TimeItem("max_reserve_time", datetime.time(hour=4), "要预约研修间的最长时间, h小时m分钟",
-                  lambda a: datetime.time(hour=1) <= a <= datetime.time(hour=4)))
-    .add(NumberItem("auto_cancel", 1,
-                    "是否自动取消未签到的将过期预约,\n如果为 1(True),\n检查账号下的所有研修间预约,\n在违约的前 1~2 分钟自动取消该预约,\n为 0 则不会.",
-                    lambda a: 0 <= a <= 1,
-                    ))
-    .add(TextItem("reserve_place", "普陀校区木门研究室",
-                  "选择预约的研修间位置, 支持:\n"
-                  "- 普陀校区木门研究室\n"
-                  "- 普陀校区玻璃门研究室\n"
-                  "- 闵行校区研究室",
-                  lambda a: a in ROOM_KINDID.keys(),
-                  )),
-    routine=Routine.MINUTELY,
+    name=PLUGIN_NAME,
     ecnu_cache_grabber=StudyRoomCache.grab_from_driver
 )
 class LibrarySeatSubscriberPlugin(Plugin):
@@ -40,12 +26,27 @@ class LibrarySeatSubscriberPlugin(Plugin):
         self.reserve_place: str | None = None
         self.query: StudyRoomQuery | None = None
         self.reserve: StudyRoomReserve | None = None
+        self.scheduled_day: int = -1
+        self.booking_open_time: datetime.time | None = None
+        self.scheduled: ScheduledRoomReservation | None = None
+        self.tracker: ReservationTracker | None = None
 
     def on_uia_login(self, ctx: PluginContext):
         try:
             cache = ctx.get_uia_cache().get_cache(StudyRoomCache)
-            self.query = StudyRoomQuery(cache)
-            self.reserve = StudyRoomReserve(cache)
+            self.query = StudyRoomQuery(cache, ctx.http)
+            self.reserve = StudyRoomReserve(cache, ctx.http)
+            # 使用新的登录信息重新安排.
+            if self.scheduled is not None:
+                self.scheduled.cancel(ctx)
+            if self.tracker is not None:
+                self.tracker.stop(ctx)
+            self.tracker = ReservationTracker(
+                fetch=self.fetch_unused_reservations,
+                key_of=lambda r: r["uuid"],
+                deadline_of=lambda r: r["latestCheckInTime"] / 1000,
+                on_deadline=lambda r: self.auto_cancel_reservation(ctx, r),
+            )
         except Exception:
             ctx.report_cache_invalid()
             ctx.get_logger().error(traceback.format_exc())
@@ -57,30 +58,70 @@ class LibrarySeatSubscriberPlugin(Plugin):
         self.max_reserve_time = datetime.timedelta(hours=t.hour, minutes=t.minute)
         t = cfg.get_item("auto_cancel").current_value
         self.auto_cancel = bool(t)
+        if self.tracker is not None and not self.auto_cancel:
+            self.tracker.stop(ctx)
         self.reserve_place = cfg.get_item("reserve_place").current_value
+        self.scheduled_day = int(cfg.get_item("scheduled_day").current_value)
+        self.booking_open_time = cfg.get_item("booking_open_time").current_value
+        if self.scheduled is not None:  # 配置可能改变, 下一次 on_routine 时重新安排.
+            self.scheduled.cancel(ctx)
 
     def on_config_save(self, ctx: PluginContext, cfg: PluginConfig):
         self.on_config_load(ctx, cfg)
 
+    def arm_scheduled(self, ctx: PluginContext):
+        """安排下一次预约开放时的定时预约."""
+        if self.scheduled_day < 0 or (self.scheduled is not None and self.scheduled.armed):
+            return
+        target = next_occurrence(self.booking_open_time)
+        self.scheduled = ScheduledRoomReservation(
+            self.reserve, target, SCHEDULED_DAYS[self.scheduled_day], self.reserve_place,
+            min_duration_minutes=self.min_reserve_time.seconds // 60,
+            max_duration_minutes=self.max_reserve_time.seconds // 60,
+        )
+        self.scheduled.arm(ctx, lambda r: self.on_scheduled_finish(ctx, r))
+        ctx.get_logger().info(f"scheduled reservation armed at {target}.")
+
+    def on_scheduled_finish(self, ctx: PluginContext, reservation: ScheduledRoomReservation):
+        if reservation.result is None:
+            ctx.get_logger().info(f"scheduled reservation failed: {reservation.attempts}")
+            return
+        payload, _ = reservation.attempts[-1]
+        ctx.send_message("email_notifier",
+                         ("text",
+                          "研修间预约成功",
+                          f"定时预约成功: {payload['resvBeginTime']} 至 {payload['resvEndTime']}, "
+                          f"设备 {payload['resvDev']}"))
+        self.reservations_changed(ctx)
+
     def on_routine(self, ctx: PluginContext):
         if not self.query or not self.reserve:
             ctx.report_cache_invalid()
             return
+        self.arm_scheduled(ctx)
         if self.auto_cancel:
-            resv = self.query.check_resvInfo(2)
-            if not resv:
-                ctx.report_cache_invalid()
-                return
-            for r in resv:
-                if (datetime.datetime.fromtimestamp(r["latestCheckInTime"] / 1000)
-                        - datetime.datetime.now()
-                        < datetime.timedelta(minutes=2)):
-                    self.reserve.cancel_reservation(r["uuid"])
-                    ctx.send_message("", (
-                        'text',
-                        "研修间预约自动取消",
-                        f"取消预约, 详细消息: {r['resvDevInfoList']}"
-                    ))
+            self.tracker.start(ctx)
+
+    def fetch_unused_reservations(self) -> list[dict]:
+        """查询未使用的预约, 登录信息失效时抛出 LoginError."""
+        resv = self.query.check_resvInfo(2)
+        if resv is None:
+            raise LoginError("studyroom: failed to query reservations.")
+        return resv
+
+    def reservations_changed(self, ctx: PluginContext):
+        """预约之后让跟踪器重新查询."""
+        if self.auto_cancel and self.tracker is not None:
+            self.tracker.touch(ctx)
+
+    def auto_cancel_reservation(self, ctx: PluginContext, r: dict):
+        """在签到截止前取消未签到的预约."""
+        self.reserve.cancel_reservation(r["uuid"])
+        ctx.send_message("email_notifier", (
+            'text',
+            "研修间预约自动取消",
+            f"取消预约, 详细消息: {r['resvDevInfoList']}"
+        ))
 
     def on_recv(self, ctx: PluginContext, from_plugin: str,
                 next_class_start_time: datetime.datetime):
@@ -103,3 +144,4 @@ class LibrarySeatSubscriberPlugin(Plugin):
                                  ("text",
                                   "研修间预约成功",
                                   "预约成功:\n{}".format("\n".join(resv_str))))
+                self.reservations_changed(ctx)
@@ -1,17 +1,24 @@
 from typing import Optional
 from datetime import datetime, timedelta
 
+from requests import Response
+
 from .available import process_reservation_data_in_roomAvailable
 from .req import StudyRoomCache
 from .req import Request, LoginError
 from .query import StudyRoomQuery
+from src.net.cache import scope_of
+from src.net.client import HttpClient
+
+USER_INFO_TTL = (60 * 60, 24 * 60 * 60)  # 用户信息的缓存时间 (ttl, stale), 见 ResponseCache.fetch.
+RESERVE_URL = "https://studyroom.ecnu.edu.cn/ic-web/reserve"
 
 class StudyRoomReserve(Request):
     """针对 StudyRoom 的请求类，继承自独立的 Request 类，扩展一些 StudyRoom 相关的功能。"""
 
-    def __init__(self, cache: StudyRoomCache):
-        super().__init__(cache)
-        self.query = StudyRoomQuery(self.cache)
+    def __init__(self, cache: StudyRoomCache, http: HttpClient = None):
+        super().__init__(cache, http)
+        self.query = StudyRoomQuery(self.cache, self.http)
 
     def _fetch_userInfo(self) -> Optional[dict]:
         """
@@ -19,6 +26,8 @@ class StudyRoomReserve(Request):
 
         url: https://studyroom.ecnu.edu.cn/ic-web/auth/userInfo
 
+        请求结果会缓存 USER_INFO_TTL.
+
         Returns:
             dict, 包含用户 ID, 学号, 真实姓名, 学院名字, token, accNo 等信息.
         """
@@ -26,8 +35,12 @@ class StudyRoomReserve(Request):
         headers = {
             "Cookie": f"ic-cookie={self.cache.cookies.get('ic-cookie')}"
         }
-        response = self.get(url, headers=headers)
-        json_output = self.check_login_and_extract_data(response, expected_code=0)
+        ttl, stale = USER_INFO_TTL
+        json_output = self.http.responses.fetch(
+            url,
+            lambda: self.check_login_and_extract_data(self.get(url, headers=headers), expected_code=0),
+            scope=scope_of(self.cache), ttl=ttl, stale=stale,
+        )
 
         # 仅提取可能需要的字段
         if json_output and "data" in json_output:
@@ -48,7 +61,7 @@ class StudyRoomReserve(Request):
 
         Url:
         """
-        self.query = StudyRoomQuery(self.cache)
+        self.query = StudyRoomQuery(self.cache, self.http)
         self.uuid = self.query.check_resvInfo(needStatus=6)[0].get("uuid")
         return self.uuid
 
@@ -75,16 +88,40 @@ class StudyRoomReserve(Request):
         Returns:
             dict, 返回服务器的响应数据。
         """
-        url = "https://studyroom.ecnu.edu.cn/ic-web/reserve"
-        cookies = self.cache.cookies
-        ic_cookie = cookies.get("ic-cookie")
+        payload = self.build_reserve_payload(resvBeginTime, resvEndTime, testName, resvDev, memo)
+        return self.check_login_and_extract_data(self._post_reserve(payload), expected_code=0)
+
+    def try_reserve(self, payload: dict) -> dict:
+        """
+        提交 build_reserve_payload 预先构建的预约请求.
+
+        与 _reserve_room 不同, 预约被拒绝 (例如时间段已被他人预约) 时不抛出异常, 而是返回响应,
+        由调用方检查 "code" 字段 (0 表示成功), 只有登录失效时抛出 LoginError.
+        """
+        return self.check_login_and_extract_data(self._post_reserve(payload), expected_code=None)
+
+    def _post_reserve(self, payload: dict) -> Response:
+        ic_cookie = self.cache.cookies.get("ic-cookie")
         if not ic_cookie:
             raise LoginError("ic-cookie not found in cookies.")
-
         headers = {
             "Cookie": f"ic-cookie={ic_cookie}",
         }
+        return self.post(RESERVE_URL, json_payload=payload, headers=headers)
 
+    def build_reserve_payload(
+            self,
+            resvBeginTime: str,
+            resvEndTime: str,
+            testName: str,
+            resvDev: list,
+            memo: str = ""
+    ) -> dict:
+        """
+        构建预约研修间的请求数据, 参数见 _reserve_room.
+
+        会查询 (或者使用缓存的) 用户信息, 因此可以在需要提交之前预先构建.
+        """
         # appAccNo: int, 用户账号 ID, 从 _fetch_userInfo 获取.
         appAccNo = self._fetch_userInfo().get("accNo")
 
@@ -99,79 +136,70 @@ class StudyRoomReserve(Request):
             "resvDev": resvDev,
             "memo": memo,
         }
+        return payload
 
-        response = self.post(url, json_payload=payload, headers=headers)
-        return self.check_login_and_extract_data(response, expected_code=0)
-
-    def submit_reserve(
+    def rank_slots(
             self,
             day: str,
             kind_name: str,
             min_duration_minutes: int,
             max_duration_minutes: int = 240
-    ) -> dict:
+    ) -> list[tuple[dict, tuple[str, str]]]:
         """
-        根据提供的参数执行预约操作。
-
-        参数:
-            day (str): 要预约的日期（'today'，'tomorrow'，'day_after_tomorrow'）。
-            kind_name (str): 表示要预约的房间类型。
-            min_duration_minutes (int): 预约的最短时长（分钟）。
-            max_duration_minutes (int): 预约的最长时长（分钟），默认 240 分钟。
+        查询可预约的房间和时间段, 参数见 submit_reserve.
 
-        返回:
-            dict: 如果预约成功，返回服务器的响应数据。
+        Returns:
+            时长在 [min_duration_minutes, max_duration_minutes] 之间的 (房间, (开始时间, 结束时间)),
+            按照时长从长到短排序, 时长相同时保持查询结果中的顺序.
         """
-        # 获取可用房间
         available_rooms = self.query.query_roomsAvailable(day=day, kind_name=kind_name)
         processed_data = process_reservation_data_in_roomAvailable(
             data=available_rooms,
             query_date=day,
             filter_available_only=True
         )
-        # project_logger.info(f"{day} 可用房间处理后数据: {processed_data}")
-
-        if not processed_data:
-            raise AssertionError(f"在 {day} 没有找到可用的房间。")
-
-        best_room = None
-        best_slot = None
-        longest_duration = timedelta(minutes=0)
-
         min_duration = timedelta(minutes=min_duration_minutes)
         max_duration = timedelta(minutes=max_duration_minutes)
-
-        for room in processed_data:
+        slots = []
+        for room in processed_data or []:
             for slot in room.get("availableInfos", []):
                 begin_time_str = slot.get("availableBeginTime")
                 end_time_str = slot.get("availableEndTime")
                 if not begin_time_str or not end_time_str:
                     continue
+                duration = (datetime.strptime(end_time_str, "%Y-%m-%d %H:%M:%S")
+                            - datetime.strptime(begin_time_str, "%Y-%m-%d %H:%M:%S"))
+                if min_duration <= duration <= max_duration:
+                    slots.append((duration, room, (begin_time_str, end_time_str)))
+        slots.sort(key=lambda s: -s[0])
+        return [(room, slot) for _, room, slot in slots]
 
-                begin_time = datetime.strptime(begin_time_str, "%Y-%m-%d %H:%M:%S")
-                end_time = datetime.strptime(end_time_str, "%Y-%m-%d %H:%M:%S")
-                duration = end_time - begin_time
-                # project_logger.debug(
-                #     f"房间 '{room['roomName']}' 有可用时段从 {begin_time} 到 {end_time}（时长: {duration}）"
-                # )
-
-                if min_duration <= duration <= max_duration and duration > longest_duration:
-                    best_room = room
-                    best_slot = (begin_time_str, end_time_str)
-                    longest_duration = duration
-                    # project_logger.debug(
-                    #     f"在房间 '{room['roomName']}' 找到新的最佳时段，时长 {duration}"
-                    # )
-
-        if not best_room or not best_slot:
+    def submit_reserve(
+            self,
+            day: str,
+            kind_name: str,
+            min_duration_minutes: int,
+            max_duration_minutes: int = 240
+    ) -> dict:
+        """
+        根据提供的参数执行预约操作。
+
+        参数:
+            day (str): 要预约的日期（'today'，'tomorrow'，'day_after_tomorrow'）。
+            kind_name (str): 表示要预约的房间类型。
+            min_duration_minutes (int): 预约的最短时长（分钟）。
+            max_duration_minutes (int): 预约的最长时长（分钟），默认 240 分钟。
+
+        返回:
+            dict: 如果预约成功，返回服务器的响应数据。
+        """
+        slots = self.rank_slots(day, kind_name, min_duration_minutes, max_duration_minutes)
+        if not slots:
             raise AssertionError(
                 f"在 {day} 没有找到满足最短时长 {min_duration_minutes} 分钟且不超过 {max_duration_minutes} 分钟的可用时段，"
                 f"房间类型 ID: {kind_name}。"
             )
-
-        # project_logger.info(
-        #     f"选择的房间 '{best_room['roomName']}'，时间段 {best_slot}"
-        # )
+        best_room, best_slot = slots[0]
 
         resvBeginTime, resvEndTime = best_slot
         resvDev = [best_room.get("devId")]
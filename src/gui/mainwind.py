@@ -1,10 +1,11 @@
 import datetime
+import math
 import sys
 import traceback
 from typing import Callable
 
 from PySide6.QtCore import QTimer, QStringListModel, Qt, QModelIndex, \
-    QDate, QTime, QDateTime, QThreadPool
+    QDate, QTime, QDateTime, QThreadPool, Signal
 from PySide6.QtGui import QIcon
 from PySide6.QtWidgets import QWidget, QApplication, QSystemTrayIcon, QMessageBox, QPushButton, \
     QLabel, QMenu, QSpacerItem, QSizePolicy, QLayout, \
@@ -19,6 +20,7 @@ from src.gui.ui_config_item_row import Ui_configItemRow
 from src.plugin import PluginLoader, ConfigItem, NumberItem, TextItem, DateItem, TimeItem, \
     DatetimeItem, Task
 from src.plugin.config import PasswordItem
+from src.profiler import startup_profiler
 
 
 def to_qdate(date: datetime.date) -> QDate:
@@ -52,7 +54,12 @@ class UIException(Exception):
     pass
 
 
+MAX_POLL_INTERVAL_MS = 60 * 1000  # 插件轮询的最长等待时间, 防止系统时间变化导致长时间不轮询.
+
+
 class MainWindow(QWidget):
+    poll_requested = Signal()  # 插件加载器请求尽快轮询, 可在任意线程触发.
+
     def __init__(self):
         super().__init__()
         if not QSystemTrayIcon.isSystemTrayAvailable():
@@ -60,12 +67,13 @@ class MainWindow(QWidget):
                                  "没有任务栏托盘将会导致应用无法在后台运行")
             self.close()
             raise UIException()
-        self.ui = Ui_MainWindow()
-        self.ui_home_page = Ui_HomePage()
-        self.ui_plugin_page = Ui_PluginPage()
-        self.ui.setupUi(self)
-        self.ui_home_page.setupUi(self.ui.pageContainer.widget(0))
-        self.ui_plugin_page.setupUi(self.ui.pageContainer.widget(1))
+        with startup_profiler.span("MainWindow.setupUi", "gui"):
+            self.ui = Ui_MainWindow()
+            self.ui_home_page = Ui_HomePage()
+            self.ui_plugin_page = Ui_PluginPage()
+            self.ui.setupUi(self)
+            self.ui_home_page.setupUi(self.ui.pageContainer.widget(0))
+            self.ui_plugin_page.setupUi(self.ui.pageContainer.widget(1))
         # ---
         self.alive = True
         self.plugin_config_modified = False  # 编辑插件配置的时候, 如果修改了配置项但是没有保存.
@@ -74,6 +82,8 @@ class MainWindow(QWidget):
         self.icon = QIcon("assets/icon.png")  # ecnu icon
 
         self.plugin_timer = QTimer()
+        # 默认的 CoarseTimer 有最多 5% 的误差, 等待 60s 时可能晚到 3s, 插件安排的 call_at 需要准时执行.
+        self.plugin_timer.setTimerType(Qt.TimerType.PreciseTimer)
         self.plugin_loader = PluginLoader()
         self.plugin_list_model = QStringListModel()
 
@@ -85,8 +95,10 @@ class MainWindow(QWidget):
 
         self.actions_setup()
 
-        self.init_plugin_loader()
-        self.init_tray_icon()
+        with startup_profiler.span("MainWindow.init_plugin_loader", "gui"):
+            self.init_plugin_loader()
+        with startup_profiler.span("MainWindow.init_tray_icon", "gui"):
+            self.init_tray_icon()
         self.init_status_timer()
         # ---
         self.setWindowIcon(self.icon)
@@ -294,20 +306,56 @@ class MainWindow(QWidget):
         self.build_plugin_config_page(plugin_name)
 
     def init_plugin_loader(self):
-        self.plugin_loader.import_plugins()
-        self.plugin_loader.load_config()
-        self.plugin_loader.load_all()
-        # 配置插件加载器的定时轮询.
-        self.plugin_timer.setInterval(100)
+        with startup_profiler.span("PluginLoader.import_plugins", "import"):
+            self.plugin_loader.import_plugins()
+        with startup_profiler.span("PluginLoader.load_config", "config"):
+            self.plugin_loader.load_config()
+        # 加载插件时才导入插件实现, 推迟到事件循环开始之后, 让窗口和托盘图标先显示出来.
+        QTimer.singleShot(0, self.load_all_plugins)
+        # 配置插件加载器的定时轮询, 定时器只在下一个截止时间到达时触发.
+        self.plugin_timer.setSingleShot(True)
         self.plugin_timer.timeout.connect(self.poll)
-        self.plugin_timer.start()
+        self.poll_requested.connect(self.request_poll)
+        self.plugin_loader.set_wakeup(self.poll_requested.emit)
+        self.schedule_poll()
         # 插件添加到列表组件.
         self.plugin_list_model.setStringList(
             self.plugin_loader.get_imported_plugins()
         )  # 应该不会自动随列表的值变化而自动响应.
 
+    def load_all_plugins(self):
+        with startup_profiler.span("PluginLoader.load_all", "plugin"):
+            self.plugin_loader.load_all()
+        startup_profiler.finish()  # 所有插件加载完毕, 启动结束.
+        self.restore_login()
+
+    def restore_login(self):
+        """
+        在子线程中尝试复用上一次保存的 uia 登录缓存, 不调出浏览器.
+
+        恢复期间不会提醒登录, 恢复失败后再按照未登录的情况提醒.
+        """
+        if self.performing_login:
+            return
+        self.performing_login = True
+
+        def parallel():
+            try:
+                self.plugin_loader.restore_uia_login()
+            except Exception:
+                project_logger.error(traceback.format_exc())
+
+        def end():
+            self.performing_login = False
+
+        task = Task(parallel)
+        task.signals.finished.connect(end)
+        QThreadPool.globalInstance().start(task)
+
     def init_status_timer(self):
         def update():
+            if not self.plugin_loader.cache_valid and not self.performing_login:
+                self.notify_login_throttler.throttle(self.notify_timeout_login)
             self.setWindowTitle(
                 self.raw_title
                 + ("" if self.plugin_loader.cache_valid else " (未登录)")
@@ -524,19 +572,36 @@ class MainWindow(QWidget):
             raise TypeError("Unknown log item type.")
         layout.addWidget(widget)
 
+    def schedule_poll(self):
+        """根据插件加载器的下一个截止时间安排下一次轮询."""
+        if not self.alive:
+            return
+        delay = self.plugin_loader.next_poll_delay()
+        if delay is None:
+            interval = MAX_POLL_INTERVAL_MS
+        else:
+            interval = min(math.ceil(delay * 1000), MAX_POLL_INTERVAL_MS)
+        self.plugin_timer.start(interval)
+
+    def request_poll(self):
+        """尽快进行一次轮询."""
+        if self.alive:
+            self.plugin_timer.start(0)
+
     def poll(self):
         """在非主线程调用可能会产生错误"""
-        if not self.plugin_loader.cache_valid:
-            self.notify_login_throttler.throttle(self.notify_timeout_login)
         self.plugin_loader.poll()
+        self.schedule_poll()
 
 
 @requires_init
 def main():
     app = QApplication(sys.argv)
     try:
-        window = MainWindow()
-        window.show()
+        with startup_profiler.span("MainWindow()", "gui"):
+            window = MainWindow()
+        with startup_profiler.span("MainWindow.show", "gui"):
+            window.show()
     except UIException:
         pass
     rst = app.exec()
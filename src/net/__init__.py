@@ -0,0 +1,10 @@
+"""
+插件共用的网络请求组件.
+"""
+from src.net.cache import ResponseCache, scope_of
+from src.net.client import HttpClient, RequestTiming, shared_client
+from src.net.clock import ServerClock, sleep_until
+from src.net.resilience import ServerUnavailableError, RetryPolicy, check_available
+
+__all__ = ["HttpClient", "RequestTiming", "shared_client", "ServerUnavailableError", "RetryPolicy",
+           "check_available", "ResponseCache", "scope_of", "ServerClock", "sleep_until"]
@@ -0,0 +1,237 @@
+"""
+短时间内很少变化的查询结果的缓存.
+
+图书馆的区域目录和可预约时间段, 校历, 研修间的用户信息等查询的结果在两次调用之间几乎不变,
+缓存它们的结果可以减少抢座等对延迟敏感的流程中的请求往返.
+
+- 缓存项以 (端点, 请求参数, 登录身份) 为键, 每个端点在调用处指定自己的有效期 (ttl).
+- 过期后的 stale 秒内仍然直接返回旧的结果, 同时在后台重新请求 (stale-while-revalidate).
+- 会改变服务器状态的请求 (例如预约座位) 完成后, 调用方使用 invalidate 清除受影响的端点.
+"""
+from __future__ import annotations
+
+import copy
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+from src.log import project_logger
+from src.net.resilience import ServerUnavailableError
+
+__all__ = ["STATS_LOG_INTERVAL", "scope_of", "ResponseCache"]
+
+STATS_LOG_INTERVAL = 10 * 60  # 命中统计写入日志的最短间隔 (s).
+
+T = TypeVar("T")
+
+
+def scope_of(login_cache: Any) -> str:
+    """
+    登录身份的摘要, 作为缓存键的一部分, 使不同用户 (或者重新登录后) 的结果不会相互混用.
+
+    Parameters:
+        login_cache: 带有 cookies 和 / 或 authorization 属性的 Cache 对象, 可以为 None.
+    """
+    if login_cache is None:
+        return ""
+    ident = {
+        "authorization": getattr(login_cache, "authorization", None),
+        "cookies": getattr(login_cache, "cookies", None),
+    }
+    return hashlib.sha1(json.dumps(ident, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class _Entry:
+    __slots__ = ("value", "fresh_until", "stale_until")
+
+    def __init__(self, value: Any, fresh_until: float, stale_until: float):
+        self.value = value
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
+
+
+class ResponseCache:
+    """
+    查询结果缓存, 可在任意线程中使用.
+
+    缓存的是解析后的 json 结构而不是 Response, 读取时返回副本, 调用方可以随意修改.
+    同一个键同时只会有一个请求: 缓存未命中时并发的调用会等待同一个请求的结果.
+
+    Examples:
+
+    >>> responses = ResponseCache()
+    >>> responses.fetch("https://example.com/api", lambda: {"a": 1}, ttl=60)
+    {'a': 1}
+    >>> responses.fetch("https://example.com/api", lambda: {"a": 2}, ttl=60)  # 命中缓存.
+    {'a': 1}
+    >>> responses.stats()["hits"]
+    1
+    """
+
+    def __init__(self, max_refresh_workers: int = 2):
+        """
+        Parameters:
+            max_refresh_workers: 后台重新请求的最大线程数.
+        """
+        self._entries: dict[tuple, _Entry] = {}
+        self._pending: dict[tuple, Future] = {}  # 正在进行的请求, 用于合并并发的未命中.
+        # 每个键被 invalidate 的次数. 请求开始时记录, 完成时已经变化说明结果可能是改变之前的, 不写入缓存.
+        self._generations: dict[tuple, int] = {}
+        self._max_refresh_workers = max_refresh_workers
+        self._refresher: Optional[ThreadPoolExecutor] = None
+        self._hits = self._stale_hits = self._misses = self._errors = 0
+        self._last_log = time.monotonic()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(endpoint: str, payload: Any, scope: str) -> tuple:
+        return endpoint, json.dumps(payload, sort_keys=True, default=str), scope
+
+    def fetch(self, endpoint: str, fetcher: Callable[[], T], *, payload: Any = None,
+              scope: str = "", ttl: float, stale: float = 0) -> T:
+        """
+        获取缓存的结果, 没有缓存或者缓存已经完全过期时调用 fetcher 请求.
+
+        Parameters:
+            endpoint: 端点, 通常为请求的 url.
+            fetcher: 发送请求并返回解析后结果的函数, 其抛出的异常会传递给调用方, 不会被缓存.
+            payload: 请求参数, 需要可以被 json 序列化.
+            scope: 登录身份, 见 scope_of.
+            ttl: 结果保持新鲜的时间 (s).
+            stale: 过期后仍然可以返回旧结果的时间 (s), 期间返回旧结果并在后台重新请求.
+
+        Returns:
+            fetcher 返回值的副本.
+        """
+        key = self._key(endpoint, payload, scope)
+        now = time.monotonic()
+        refresh: Optional[Future] = None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or now >= entry.stale_until:
+                entry = None
+            elif now < entry.fresh_until:
+                self._hits += 1
+            else:
+                self._stale_hits += 1
+                if key not in self._pending:
+                    refresh = self._pending[key] = Future()
+                    generation = self._generations.get(key, 0)
+        if entry is None:
+            return copy.deepcopy(self._fetch_now(key, fetcher, ttl, stale))
+        if refresh is not None:
+            self._submit_refresh(key, refresh, generation, fetcher, ttl, stale)
+        self._maybe_log_stats()
+        return copy.deepcopy(entry.value)
+
+    def _fetch_now(self, key: tuple, fetcher: Callable[[], T], ttl: float, stale: float) -> T:
+        with self._lock:
+            pending = self._pending.get(key)
+            owner = pending is None
+            if owner:
+                pending = self._pending[key] = Future()
+            generation = self._generations.get(key, 0)
+            self._misses += 1
+        if not owner:
+            return pending.result()
+        self._run(key, pending, generation, fetcher, ttl, stale)
+        self._maybe_log_stats()
+        return pending.result()
+
+    def _submit_refresh(self, key: tuple, pending: Future, generation: int, fetcher: Callable,
+                        ttl: float, stale: float):
+        with self._lock:
+            if self._refresher is None:
+                self._refresher = ThreadPoolExecutor(self._max_refresh_workers,
+                                                     thread_name_prefix="response-cache")
+            refresher = self._refresher
+        refresher.submit(self._run, key, pending, generation, fetcher, ttl, stale)
+
+    def _run(self, key: tuple, pending: Future, generation: int, fetcher: Callable, ttl: float, stale: float):
+        """
+        执行请求, 把结果写入缓存和 pending.
+
+        出错时移除旧的缓存项, 以免继续返回可能已经无效的结果 (例如登录失效),
+        只有服务器暂时不可用时保留, 在 stale 期间继续返回旧的结果.
+        请求期间键被 invalidate 时, 结果只交给已经在等待的调用方, 不写入缓存.
+        """
+        try:
+            value = fetcher()
+        except BaseException as e:
+            with self._lock:
+                self._errors += 1
+                if not isinstance(e, ServerUnavailableError):
+                    self._entries.pop(key, None)
+                if self._pending.get(key) is pending:
+                    del self._pending[key]
+            pending.set_exception(e)
+            project_logger.debug(f"response cache: failed to fetch {key[0]}: {e!r}")
+            return
+        now = time.monotonic()
+        with self._lock:
+            if self._generations.get(key, 0) == generation:
+                self._entries[key] = _Entry(value, now + ttl, now + ttl + stale)
+            if self._pending.get(key) is pending:
+                del self._pending[key]
+        pending.set_result(value)
+
+    def invalidate(self, endpoint: str = None, scope: str = None):
+        """
+        清除缓存项, 用于会改变服务器状态的请求完成后.
+
+        正在进行的请求 (可能在改变之前发出) 会与缓存分离: 其结果不会写入缓存,
+        之后的调用也不会再等待它, 而是发出新的请求.
+
+        Parameters:
+            endpoint: 只清除此端点的缓存项, 默认为全部端点.
+            scope: 只清除此登录身份的缓存项, 默认为全部身份.
+        """
+        with self._lock:
+            for key in [k for k in {*self._entries, *self._pending}
+                        if (endpoint is None or k[0] == endpoint) and (scope is None or k[2] == scope)]:
+                self._entries.pop(key, None)
+                self._pending.pop(key, None)
+                self._generations[key] = self._generations.get(key, 0) + 1
+
+    def clear(self):
+        """清除所有缓存项和统计."""
+        self.invalidate()
+        with self._lock:
+            self._hits = self._stale_hits = self._misses = self._errors = 0
+
+    def stats(self) -> dict[str, int]:
+        """命中统计: hits (新鲜命中), stale_hits (返回旧结果), misses (同步请求), errors, entries."""
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "stale_hits": self._stale_hits,
+                "misses": self._misses,
+                "errors": self._errors,
+                "entries": len(self._entries),
+            }
+
+    def log_stats(self):
+        """把命中统计写入日志."""
+        stats = self.stats()
+        lookups = stats["hits"] + stats["stale_hits"] + stats["misses"]
+        ratio = (stats["hits"] + stats["stale_hits"]) / lookups if lookups else 0.0
+        project_logger.info(f"response cache: {lookups} lookups, {ratio:.0%} served from cache, "
+                            + ", ".join(f"{k}={v}" for k, v in stats.items()) + ".")
+
+    def _maybe_log_stats(self):
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_log < STATS_LOG_INTERVAL:
+                return
+            self._last_log = now
+        self.log_stats()
+
+    def close(self):
+        """停止后台重新请求的线程, 不等待正在进行的请求."""
+        with self._lock:
+            refresher, self._refresher = self._refresher, None
+        if refresher is not None:
+            refresher.shutdown(wait=False)
@@ -0,0 +1,285 @@
+"""
+共享的 HTTP 客户端.
+
+每个域名 (scheme + host) 使用一个 requests.Session, 连接在请求之间保持 (keep-alive) 并复用,
+定时执行的插件请求不需要每次都重新进行 TCP 和 TLS 握手.
+
+每个主机还拥有独立的限流器和熔断器, 暂时性的错误会按照 RetryPolicy 重试, 见 src.net.resilience.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from http.cookiejar import DefaultCookiePolicy
+from typing import Any, Callable, Optional, Union
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.cookies import RequestsCookieJar
+
+from src.net.cache import ResponseCache
+from src.net.resilience import (TokenBucket, RetryPolicy, CircuitBreaker, ServerUnavailableError,
+                                IDEMPOTENT_METHODS, UNAVAILABLE_STATUS, retry_after_of)
+
+__all__ = [
+    "DEFAULT_TIMEOUT", "DEFAULT_POOL_SIZE", "DEFAULT_RATE", "DEFAULT_BURST", "BASE_URL_ENV", "ECNU_DOMAIN",
+    "RequestTiming", "HttpClient", "shared_client",
+]
+
+DEFAULT_TIMEOUT = (5, 30)  # 默认的 (连接超时, 读取超时) (s).
+DEFAULT_POOL_SIZE = 8  # 每个域名保持的最大连接数.
+DEFAULT_RATE = 5  # 每个主机默认每秒最多请求数.
+DEFAULT_BURST = 10  # 每个主机默认允许的突发请求数.
+# 设置此环境变量后, 对 ECNU_DOMAIN 下各个网站的请求转发到指定的地址, 例如本地的测试服务器 (见 tests/fake_ecnu):
+# ECNU_BASE_URL=http://127.0.0.1:8080 时, https://seat-lib.ecnu.edu.cn/api/Seat/date
+# 被转发到 http://127.0.0.1:8080/seat-lib.ecnu.edu.cn/api/Seat/date.
+BASE_URL_ENV = "ECNU_BASE_URL"
+ECNU_DOMAIN = "ecnu.edu.cn"
+
+Timeout = Union[float, tuple[float, float], None]
+
+
+class _RejectAll(DefaultCookiePolicy):
+    """不保存服务器返回的任何 cookie, 登录状态完全由调用方提供的 cookie 决定, 不同插件之间不会相互影响."""
+
+    def set_ok(self, cookie, request):
+        return False
+
+
+class RequestTiming:
+    """一次请求的耗时记录, 传递给 HttpClient 的 hook."""
+
+    __slots__ = ("method", "url", "host", "status_code", "elapsed", "error", "attempt")
+
+    def __init__(self, method: str, url: str, host: str, status_code: Optional[int],
+                 elapsed: float, error: Optional[BaseException], attempt: int = 0):
+        self.method = method
+        self.url = url
+        self.host = host
+        self.status_code = status_code  # 请求出错时为 None.
+        self.elapsed = elapsed  # 从发出请求到收到完整响应的时间 (s).
+        self.error = error
+        self.attempt = attempt  # 第几次尝试, 从 0 开始, 每次重试都会单独记录.
+
+    def __repr__(self):
+        return (f"RequestTiming({self.method} {self.url}, status_code={self.status_code}, "
+                f"elapsed={self.elapsed * 1000:.1f}ms, attempt={self.attempt})")
+
+
+class _HostPolicy:
+    """一个主机的限流器和熔断器."""
+
+    def __init__(self, rate: float, burst: int, failure_threshold: int, reset_timeout: float):
+        self.bucket = TokenBucket(rate, burst)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+
+
+class HttpClient:
+    """
+    带有连接池的 HTTP 客户端, 可在任意线程中使用.
+
+    - 每个域名拥有独立的连接池, 连接在空闲时保持, 之后的请求直接复用.
+    - 所有请求都有超时时间, 默认为 DEFAULT_TIMEOUT.
+    - 请求可以指定 cache 参数 (LoginCache 中的 Cache 对象) 自动附加登录信息:
+      cache.cookies 作为 cookie 发送, cache.authorization 作为 Authorization 请求头发送,
+      调用方显式提供的 cookie 和请求头优先.
+    - 服务器返回的 cookie 不会被保存.
+    - 每个主机的请求速率受令牌桶限制, 超出时请求会等待.
+    - 超时, 连接错误和 5xx 等暂时性错误按照 RetryPolicy 重试, 重试用尽后:
+      出错的请求抛出 ServerUnavailableError, 5xx 响应照常返回, 由调用方使用 check_available 检查.
+    - 主机连续失败后熔断, 熔断期间的请求直接抛出 ServerUnavailableError, 不会发出.
+    - 每次尝试结束后 (包括出错时), 在发出请求的线程中以 RequestTiming 调用各个 hook.
+    - responses 为查询结果缓存, 供很少变化的查询使用, 见 ResponseCache.
+    - 指定了 base_url 时, 对 ECNU_DOMAIN 下各个网站的请求被转发到 base_url, 见 BASE_URL_ENV.
+
+    Examples:
+
+    >>> client = HttpClient(timeout=10)
+    >>> client.add_hook(lambda t: print(t.host, t.status_code))
+    >>> client.get("https://example.com/")  # 需要网络连接.
+    example.com 200
+    <Response [200]>
+    >>> client.close()
+    """
+
+    def __init__(self, timeout: Timeout = DEFAULT_TIMEOUT, pool_size: int = DEFAULT_POOL_SIZE,
+                 retry: RetryPolicy = None, rate: float = DEFAULT_RATE, burst: int = DEFAULT_BURST,
+                 failure_threshold: int = 5, reset_timeout: float = 30, base_url: str = None):
+        """
+        Parameters:
+            timeout: 默认超时时间, 可以是一个数值或者 (连接超时, 读取超时), 单位 s.
+            pool_size: 每个域名保持的最大连接数.
+            retry: 重试策略, 默认为 RetryPolicy().
+            rate: 每个主机每秒最多请求数, 见 TokenBucket.
+            burst: 每个主机允许的突发请求数.
+            failure_threshold: 主机连续失败多少次后熔断, 见 CircuitBreaker.
+            reset_timeout: 熔断持续时间 (s).
+            base_url: 转发 ECNU 网站请求的地址, 默认读取环境变量 BASE_URL_ENV, 都没有时不转发.
+        """
+        if base_url is None:
+            base_url = os.environ.get(BASE_URL_ENV, "")
+        self.base_url = base_url.rstrip("/") or None
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.retry = retry or RetryPolicy()
+        self._policy_args = (rate, burst, failure_threshold, reset_timeout)
+        self._policies: dict[str, _HostPolicy] = {}
+        self._sessions: dict[str, requests.Session] = {}
+        self._hooks: list[Callable[[RequestTiming], None]] = []
+        self._lock = threading.Lock()
+        self.responses = ResponseCache()
+
+    def add_hook(self, hook: Callable[[RequestTiming], None]):
+        """添加请求耗时的 hook, hook 中抛出的异常会被忽略."""
+        with self._lock:
+            self._hooks = self._hooks + [hook]
+
+    def remove_hook(self, hook: Callable[[RequestTiming], None]):
+        with self._lock:
+            self._hooks = [h for h in self._hooks if h is not hook]
+
+    def resolve(self, url: str) -> str:
+        """请求实际发送到的地址, 见 base_url."""
+        if self.base_url is None:
+            return url
+        parts = urlsplit(url)
+        host = parts.hostname or ""
+        if host != ECNU_DOMAIN and not host.endswith("." + ECNU_DOMAIN):
+            return url
+        return f"{self.base_url}/{host}{parts.path or '/'}" + (f"?{parts.query}" if parts.query else "")
+
+    def session_for(self, url: str) -> requests.Session:
+        """获取 url 所在域名的 Session, 不存在时创建."""
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        with self._lock:
+            session = self._sessions.get(origin)
+            if session is None:
+                session = requests.Session()
+                session.cookies = RequestsCookieJar(policy=_RejectAll())
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._sessions[origin] = session
+            return session
+
+    def configure_host(self, host: str, rate: float = None, burst: int = None,
+                       failure_threshold: int = None, reset_timeout: float = None):
+        """为某个主机单独设置限流和熔断参数, 未指定的参数使用客户端的默认值."""
+        args = [default if value is None else value for value, default in
+                zip((rate, burst, failure_threshold, reset_timeout), self._policy_args)]
+        with self._lock:
+            self._policies[host] = _HostPolicy(*args)
+
+    def policy_for(self, host: str) -> _HostPolicy:
+        with self._lock:
+            policy = self._policies.get(host)
+            if policy is None:
+                policy = self._policies[host] = _HostPolicy(*self._policy_args)
+            return policy
+
+    def request(self, method: str, url: str, *, cache: Any = None,
+                timeout: Timeout = None, idempotent: bool = None, **kwargs) -> requests.Response:
+        """
+        发送请求, 参数同 requests.request.
+
+        Parameters:
+            method: 请求方法.
+            url: 请求地址.
+            cache: 提供登录信息的 Cache 对象, 见 HttpClient.
+            timeout: 本次请求 (每次尝试) 的超时时间, 默认为客户端的超时时间.
+            idempotent: 请求是否可以安全地重复发送, 决定重试的范围, 见 RetryPolicy,
+                        默认根据请求方法判断, 只读取数据的 POST 请求可以指定为 True.
+
+        Raises:
+            ServerUnavailableError: 主机熔断中, 或者重试用尽后仍然超时或者连接失败.
+        """
+        if cache is not None:
+            cookies = getattr(cache, "cookies", None)
+            if cookies:
+                kwargs["cookies"] = {**cookies, **(kwargs.get("cookies") or {})}
+            authorization = getattr(cache, "authorization", None)
+            if authorization:
+                headers = dict(kwargs.get("headers") or {})
+                if not any(k.lower() == "authorization" for k in headers):
+                    headers["Authorization"] = authorization
+                kwargs["headers"] = headers
+        method = method.upper()
+        url = self.resolve(url)
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        host = urlsplit(url).hostname or ""
+        session = self.session_for(url)
+        policy = self.policy_for(host)
+        timeout = self.timeout if timeout is None else timeout
+        for attempt in range(self.retry.max_attempts):
+            if not policy.breaker.allow():
+                raise ServerUnavailableError(host, "circuit breaker is open.", policy.breaker.retry_after())
+            policy.bucket.acquire()
+            last = attempt + 1 >= self.retry.max_attempts
+            start = time.perf_counter()
+            response = None
+            error = None
+            try:
+                response = session.request(method, url, timeout=timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+                policy.breaker.record_failure()
+                if last or not self.retry.should_retry_error(e, idempotent):
+                    raise ServerUnavailableError(host, repr(e)) from e
+            except BaseException as e:
+                error = e
+                policy.breaker.release()
+                raise
+            finally:
+                self._emit(RequestTiming(method, url, host,
+                                         None if response is None else response.status_code,
+                                         time.perf_counter() - start, error, attempt))
+            if response is not None:
+                if response.status_code not in UNAVAILABLE_STATUS:
+                    policy.breaker.record_success()
+                    return response
+                policy.breaker.record_failure()
+                if last or not self.retry.should_retry_status(response.status_code, idempotent):
+                    return response
+                response.close()
+            time.sleep(self.retry.delay(attempt, None if response is None else retry_after_of(response)))
+        raise AssertionError("unreachable")
+
+    def _emit(self, timing: RequestTiming):
+        for hook in self._hooks:
+            try:
+                hook(timing)
+            except Exception:
+                pass
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def close(self):
+        """关闭所有保持的连接, 之后仍然可以继续使用, 需要时会重新建立连接."""
+        with self._lock:
+            sessions, self._sessions = self._sessions, {}
+        for session in sessions.values():
+            session.close()
+        self.responses.close()
+
+
+_shared: Optional[HttpClient] = None
+_shared_lock = threading.Lock()
+
+
+def shared_client() -> HttpClient:
+    """
+    获取整个程序共用的 HttpClient, 插件中通过 PluginContext.http 获取的就是此客户端.
+    """
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = HttpClient()
+        return _shared
@@ -0,0 +1,152 @@
+"""
+服务器时钟同步和精确等待.
+
+预约开放时热门的座位和研修间在几秒内就会被抢完, 请求需要在服务器时间的某一时刻准时发出,
+而本地时钟可能与服务器相差数秒. 服务器时间只能从 HTTP 响应的 Date 头获得, 精度只有 1 秒,
+ServerClock 把多次请求得到的偏差区间取交集, 并让每次请求在估计的服务器整秒时刻到达,
+使区间每次缩小约一半, 几次请求后即可达到毫秒级精度 (受网络往返时间的抖动限制).
+"""
+from __future__ import annotations
+
+import math
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Callable, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from src.net.client import HttpClient
+
+__all__ = ["DEFAULT_SAMPLES", "DEFAULT_PRECISION", "SPIN_WINDOW", "ServerClock", "sleep_until"]
+
+DEFAULT_SAMPLES = 8  # 一次同步最多发出的请求数.
+DEFAULT_PRECISION = 0.005  # 偏差的不确定度 (s) 小于此值时停止同步.
+SPIN_WINDOW = 0.02  # sleep_until 在最后多少秒内忙等, 需要大于系统 sleep 的精度 (Windows 上约 15.6ms).
+
+
+def sleep_until(deadline: float, clock: Callable[[], float] = time.time):
+    """
+    等待到 clock() >= deadline, 先用 time.sleep 等待到 deadline 前 SPIN_WINDOW 秒, 之后忙等,
+    误差通常小于 1ms.
+    """
+    while True:
+        remaining = deadline - clock()
+        if remaining <= 0:
+            return
+        if remaining > SPIN_WINDOW:
+            time.sleep(remaining - SPIN_WINDOW)
+
+
+class ServerClock:
+    """
+    根据 HTTP 响应的 Date 头估计服务器时钟与本地时钟 (time.time) 的偏差, 可在任意线程中使用.
+
+    一次请求在本地时间 sent 发出, received 收到, Date 头为 d 时, 服务器生成响应的时刻位于 [d, d + 1),
+    而这个时刻对应的本地时间位于 [sent, received], 因此偏差 offset (服务器时间 - 本地时间) 位于
+    [d - received, d + 1 - sent], 多次请求的区间取交集.
+
+    Examples:
+
+    >>> clock = ServerClock()
+    >>> clock.sync(ctx.http, "https://seat-lib.ecnu.edu.cn/")  # 同时建立到服务器的连接.
+    >>> clock.offset, clock.uncertainty
+    (0.4213, 0.0037)
+    >>> sleep_until(clock.to_local(target))  # 等待到服务器时间 target.
+    """
+
+    def __init__(self):
+        self._low = -math.inf
+        self._high = math.inf
+        self._lock = threading.Lock()
+
+    @property
+    def synced(self) -> bool:
+        return math.isfinite(self._low)
+
+    @property
+    def offset(self) -> float:
+        """服务器时间 - 本地时间 (s), 没有同步时为 0."""
+        with self._lock:
+            return (self._low + self._high) / 2 if self.synced else 0.0
+
+    @property
+    def uncertainty(self) -> float:
+        """offset 的最大误差 (s), 没有同步时为 inf."""
+        with self._lock:
+            return (self._high - self._low) / 2
+
+    def now(self) -> float:
+        """估计的服务器时间 (unix 时间戳)."""
+        return time.time() + self.offset
+
+    def to_local(self, server_time: float) -> float:
+        """服务器时间戳对应的本地时间戳."""
+        return server_time - self.offset
+
+    def observe(self, sent: float, received: float, date: str) -> None:
+        """
+        记录一次请求.
+
+        Parameters:
+            sent: 发出请求时的本地时间戳.
+            received: 收到响应时的本地时间戳.
+            date: 响应的 Date 头.
+
+        Raises:
+            ValueError: date 格式错误.
+        """
+        server = parsedate_to_datetime(date).timestamp()
+        low, high = server - received, server + 1 - sent
+        with self._lock:
+            if low > self._high or high < self._low:
+                # 与之前的区间矛盾, 说明服务器或者本地时钟被调整过, 重新开始.
+                self._low, self._high = low, high
+            else:
+                self._low, self._high = max(self._low, low), min(self._high, high)
+
+    def reset(self):
+        with self._lock:
+            self._low, self._high = -math.inf, math.inf
+
+    def sync(self, http: HttpClient, url: str, samples: int = DEFAULT_SAMPLES,
+             precision: float = DEFAULT_PRECISION, clock: Callable[[], float] = time.time,
+             sleep: Callable[[float], None] = time.sleep) -> float:
+        """
+        向 url 所在的服务器发出若干请求来估计偏差, 请求复用 http 的连接, 因此同时起到预热连接的作用.
+
+        第一次请求之后, 每次请求都安排在使其按照当前估计恰好在服务器的整秒时刻到达的时间发出,
+        Date 头是否跨过这一秒可以排除偏差区间的一半.
+
+        Parameters:
+            http: 发送请求的客户端.
+            url: 请求的地址, 响应的状态码不重要, 只使用 Date 头.
+            samples: 最多请求次数.
+            precision: 不确定度小于此值时提前结束.
+            clock: 本地时钟.
+            sleep: 等待函数.
+
+        Returns:
+            同步后的不确定度 (s).
+
+        Raises:
+            ServerUnavailableError: 服务器不可用.
+            ValueError: 响应没有 Date 头.
+        """
+        rtt = 0.0
+        for _ in range(samples):
+            if self.synced:
+                # 使请求在估计的服务器时间的下一个整秒 (至少留出 rtt 的准备时间) 到达.
+                arrival = math.ceil(clock() + self.offset + rtt) - self.offset
+                sleep(max(0.0, arrival - rtt / 2 - clock()))
+            sent = clock()
+            response = http.request("GET", url)
+            received = clock()
+            response.close()
+            date = response.headers.get("Date")
+            if not date:
+                raise ValueError(f"server-clock: no Date header in the response of {url}.")
+            self.observe(sent, received, date)
+            rtt = received - sent
+            if self.uncertainty <= precision:
+                break
+        return self.uncertainty
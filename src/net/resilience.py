@@ -0,0 +1,212 @@
+"""
+网络请求的限流, 重试和熔断.
+
+学校的网站在高峰期 (例如预约开放时) 经常返回 5xx 或者超时, 这些暂时性的错误不代表登录失效,
+不应该触发重新登录, 而是应该稍后重试, 并在服务器持续出错时暂停对它的请求.
+"""
+from __future__ import annotations
+
+import random
+import threading
+import time
+from typing import Optional
+
+import requests
+
+__all__ = [
+    "ServerUnavailableError", "check_available", "retry_after_of",
+    "TokenBucket", "RetryPolicy", "CircuitBreaker",
+    "UNAVAILABLE_STATUS", "IDEMPOTENT_METHODS",
+]
+
+UNAVAILABLE_STATUS = frozenset((429, 500, 502, 503, 504))  # 表示服务器暂时不可用的状态码.
+IDEMPOTENT_METHODS = frozenset(("GET", "HEAD", "OPTIONS", "PUT", "DELETE"))
+
+
+class ServerUnavailableError(Exception):
+    """
+    服务器暂时不可用 (5xx, 429, 超时或者熔断中), 与 LoginError 不同, 不代表登录缓存失效.
+    """
+
+    def __init__(self, host: str, msg: str = "", retry_after: Optional[float] = None):
+        """
+        Parameters:
+            host: 不可用的服务器.
+            msg: 附加信息.
+            retry_after: 建议的重试等待时间 (s), 未知时为 None.
+        """
+        super().__init__(f"{host} is unavailable" + (f": {msg}" if msg else "."))
+        self.host = host
+        self.retry_after = retry_after
+
+
+def check_available(response: requests.Response):
+    """
+    检查响应是否表示服务器暂时不可用, 各个插件检查登录状态之前应该先调用此函数.
+
+    Raises:
+        ServerUnavailableError: 响应的状态码为 UNAVAILABLE_STATUS 之一.
+    """
+    if response.status_code in UNAVAILABLE_STATUS:
+        host = requests.utils.urlparse(response.url).hostname or ""
+        raise ServerUnavailableError(host, f"response status code: {response.status_code}.",
+                                     retry_after_of(response))
+
+
+def retry_after_of(response: requests.Response) -> Optional[float]:
+    """响应 Retry-After 请求头指定的等待时间 (s), 没有或者不是秒数时返回 None."""
+    value = response.headers.get("Retry-After", "")
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+class TokenBucket:
+    """
+    令牌桶限流器, 可在任意线程中使用.
+
+    桶中最多保存 burst 个令牌, 每秒补充 rate 个, 每次请求消耗一个令牌, 没有令牌时等待.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        """
+        Parameters:
+            rate: 每秒补充的令牌数, 即长期的最大请求速率.
+            burst: 桶的容量, 即允许的最大突发请求数.
+        """
+        if rate <= 0 or burst <= 0:
+            raise ValueError("rate and burst must be positive.")
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self) -> float:
+        """
+        尝试取出一个令牌.
+
+        Returns:
+            0 表示成功取出, 否则为需要等待的时间 (s).
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self):
+        """取出一个令牌, 没有令牌时阻塞等待."""
+        while (wait := self.try_acquire()) > 0:
+            time.sleep(wait)
+
+
+class RetryPolicy:
+    """
+    重试策略: 带有随机抖动 (full jitter) 的指数退避.
+
+    - 幂等请求 (GET 等, 或者调用方声明幂等的请求) 在超时, 连接错误和 UNAVAILABLE_STATUS 时重试.
+    - 非幂等请求 (例如提交预约的 POST) 只在确定服务器没有处理请求时重试:
+      连接超时, 429 和 503.
+    """
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.5, max_delay: float = 8):
+        """
+        Parameters:
+            max_attempts: 最多尝试次数, 包括第一次请求.
+            base_delay: 第一次重试的最长等待时间 (s), 之后每次翻倍.
+            max_delay: 单次重试的最长等待时间 (s).
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        第 attempt 次 (从 0 开始) 尝试失败后的等待时间 (s), 服务器指定了 Retry-After 时优先使用.
+        """
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    @staticmethod
+    def should_retry_error(error: BaseException, idempotent: bool) -> bool:
+        if isinstance(error, requests.ConnectTimeout):
+            return True
+        return idempotent and isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+    @staticmethod
+    def should_retry_status(status_code: int, idempotent: bool) -> bool:
+        if idempotent:
+            return status_code in UNAVAILABLE_STATUS
+        return status_code in (429, 503)
+
+
+class CircuitBreaker:
+    """
+    熔断器, 可在任意线程中使用.
+
+    连续失败 failure_threshold 次后打开, 在 reset_timeout 秒内拒绝所有请求;
+    之后进入半开状态, 只放行一个试探请求, 成功则关闭, 失败则再次打开.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None  # 打开时的 time.monotonic() 时间, 关闭时为 None.
+        self._probing = False  # 半开状态下是否已经放行了试探请求.
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def allow(self) -> bool:
+        """是否允许发出请求, 半开状态下只有第一次调用返回 True."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def retry_after(self) -> float:
+        """距离进入半开状态的时间 (s), 没有打开时为 0."""
+        with self._lock:
+            if self._opened_at is None:
+                return 0.0
+            return max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def release(self):
+        """放行的请求没有得到结果 (例如请求本身有误) 时调用, 不计入成功或失败."""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self) -> bool:
+        """
+        记录一次失败.
+
+        Returns:
+            熔断器是否因为这次失败而打开.
+        """
+        with self._lock:
+            self._failures += 1
+            if self._probing or (self._opened_at is None and self._failures >= self.failure_threshold):
+                self._opened_at = time.monotonic()
+                self._probing = False
+                return True
+            return False
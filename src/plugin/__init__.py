@@ -4,36 +4,53 @@
 from __future__ import annotations
 
 import datetime
-import json
+import importlib
+import itertools
 import os
 import sys
+import threading
+import time
 import traceback
+from concurrent.futures import Future, wait as wait_futures
 from enum import Enum, auto
 from pathlib import Path
-from typing import Optional, Callable, Any, Sequence
+from typing import Optional, Callable, Any, Sequence, Coroutine, Hashable, TYPE_CHECKING
 
 import toml
-from PySide6.QtCore import QRunnable, QObject, Signal
-from seleniumwire.webdriver import Edge
+from PySide6.QtCore import QRunnable, QObject, Signal, QThreadPool
 
 from src import SRC_DIR_PATH
 from src.log import requires_init, project_logger
+from src.net.client import RequestTiming, shared_client
+from src.net.resilience import ServerUnavailableError
+from src.plugin.bus import Mailbox, MailboxStats, Message, Overflow, DEFAULT_MAILBOX_CAPACITY
 from src.plugin.config import (PluginConfig, ConfigItem,
                                TextItem, ItemType, DateItem,
                                TimeItem, NumberItem, DatetimeItem)
 from src.plugin.context import PluginContext
+from src.plugin.executor import GuiDispatcher, SerialExecutor, DEFAULT_CALLBACK_TIMEOUT
+from src.plugin.runtime import AsyncRuntime
+from src.plugin.scheduler import DeadlineScheduler
+from src.plugin.store import PluginCacheStore
+from src.plugin.timed import TimedReservation, next_occurrence
+from src.plugin.tracker import ReservationTracker
+from src.profiler import startup_profiler
 
 __all__ = [
     "Routine",
     "ItemType",
     "ConfigItem", "TextItem", "DateItem",
     "TimeItem", "NumberItem", "DatetimeItem",
-    "register_plugin",
+    "register_plugin", "Overflow", "PluginManifest",
     "PluginConfig", "Plugin", "PluginContext", "PluginLoader",
-    "Task"
+    "Task", "TimedReservation", "next_occurrence", "ReservationTracker"
 ]
 
-from src.uia.login import get_login_cache, LoginError
+from src.uia.cache import LoginError, LoginCache, cache_type_of
+from src.uia.session import SessionStore
+
+if TYPE_CHECKING:  # seleniumwire 导入很慢, 只在登录时才需要导入.
+    from seleniumwire.webdriver import Edge
 
 
 class Record:
@@ -44,10 +61,14 @@ class Record:
             description: str,
             plugin_config: Optional[PluginConfig],
             routine: Optional[Routine],
-            cache_grabber: Callable[[Edge], Any]
+            cache_grabber: Callable[[Edge], Any],
+            mailbox: Mailbox,
+            entry: Callable[[], Any] = None
     ):
         self.name = name  # 插件名称.
-        self.plugin_cls = plugin_cls
+        self.plugin_cls = plugin_cls  # 插件由 manifest 声明且实现尚未导入时为 None.
+        self.entry = entry  # 导入插件实现的函数, 只有由 manifest 声明的插件才有.
+        self.config_loaded = False  # 配置是否已经从文件中加载过.
         self.config = plugin_config
         self.routine = routine
         self.instance: Plugin = None  # 类型应为 self.plugin_cls
@@ -55,7 +76,7 @@ class Record:
         self.cache_grabber = cache_grabber
         self.ctx = PluginContext(name)
         self.actions: dict[str, Callable[[], None]] = {}  # 此插件提供的用户交互动作
-        self.messages: list[tuple[str, Any]] = []  # 此插件接收到的其他插件的消息
+        self.mailbox = mailbox  # 此插件接收到的其他插件的消息
 
 
 class Registry:
@@ -64,6 +85,10 @@ class Registry:
     @classmethod
     @requires_init
     def add_record(cls, record: Record):
+        """
+        注册插件, 如果 record 没有插件类 (由 manifest 声明),
+        则等待插件实现被导入时再通过 bind 创建插件实例.
+        """
         if not (record.name and all(c.isalpha() or c == "_" for c in record.name)):
             raise ValueError(
                 f"Invalid plugin name: "
@@ -72,10 +97,35 @@ class Registry:
             )
         if record.name in cls.__registered_plugins.keys():
             raise ValueError(f"plugin: {record.name} already registered.")
-        record.instance = record.plugin_cls()
         cls.__registered_plugins.update({record.name: record})
+        if record.plugin_cls is None:
+            project_logger.info(f"plugin: {record.name} declared.")
+            return
+        record.instance = record.plugin_cls()
         project_logger.info(f"plugin: {record.name} registered.")
-        record.instance.on_register(record.ctx)
+        with startup_profiler.span(f"{record.name}.on_register", "plugin"):
+            record.instance.on_register(record.ctx)
+
+    @classmethod
+    def is_declared(cls, plugin_name: str) -> bool:
+        """插件是否由 manifest 声明, 且实现尚未导入."""
+        record = cls.__registered_plugins.get(plugin_name)
+        return record is not None and record.plugin_cls is None
+
+    @classmethod
+    def bind(cls, plugin_name: str, plugin_cls, cache_grabber: Callable[[Edge], Any] | None):
+        """把导入的插件实现绑定到 manifest 声明的插件上, 创建插件实例."""
+        record = cls.__registered_plugins[plugin_name]
+        record.plugin_cls = plugin_cls
+        record.cache_grabber = cache_grabber
+        record.entry = None
+        record.instance = plugin_cls()
+        project_logger.info(f"plugin: {record.name} registered.")
+        with startup_profiler.span(f"{record.name}.on_register", "plugin"):
+            record.instance.on_register(record.ctx)
+        if record.config is not None and record.config_loaded:
+            with startup_profiler.span(f"{record.name}.on_config_load", "plugin"):
+                record.instance.on_config_load(record.ctx, record.config.clone())
 
     @classmethod
     def plugin_record(cls, plugin_name: str):
@@ -93,6 +143,20 @@ class Routine(Enum):
     DAILY = auto()
     WEEKLY = auto()
 
+    @property
+    def interval(self) -> datetime.timedelta:
+        """此 routine 对应的回调间隔."""
+        return _ROUTINE_INTERVAL[self]
+
+
+_ROUTINE_INTERVAL = {
+    Routine.SECONDLY: datetime.timedelta(seconds=1),
+    Routine.MINUTELY: datetime.timedelta(minutes=1),
+    Routine.HOURLY: datetime.timedelta(hours=1),
+    Routine.DAILY: datetime.timedelta(days=1),
+    Routine.WEEKLY: datetime.timedelta(weeks=1),
+}
+
 
 @requires_init
 def register_plugin(  # 此方法应该在运行之后延迟调用, 也就是说 PluginLoader 先等待项目初始化结束后再加载插件.
@@ -100,7 +164,9 @@ def register_plugin(  # 此方法应该在运行之后延迟调用, 也就是说
         description: str = "",
         configuration: PluginConfig = None,
         routine: Routine = None,
-        ecnu_cache_grabber: Callable[[Edge], Any] | None = None
+        ecnu_cache_grabber: Callable[[Edge], Any] | None = None,
+        mailbox_capacity: int = DEFAULT_MAILBOX_CAPACITY,
+        mailbox_overflow: Overflow = Overflow.DROP_OLDEST
 ):
     """
     注册插件, 只有被注册的插件才会可能被加载, 被装饰的类将会注册到 PluginLoader 中准备加载.
@@ -113,6 +179,11 @@ def register_plugin(  # 此方法应该在运行之后延迟调用, 也就是说
         ecnu_cache_grabber: 回调函数, 用于从 WebDriver 中抓取插件需求的 ECNU 登录缓存数据,
                            在 PluginLoader 执行 uia 登录操作时触发, 触发时为已经登录 uia 的状态,
                            函数定义方法见 get_login_cache 函数.
+        mailbox_capacity: 插件接收消息的邮箱容量, 未投递的消息超过此数量时根据 mailbox_overflow 丢弃消息.
+        mailbox_overflow: 邮箱已满时丢弃最早的消息还是丢弃新到达的消息.
+
+    如果插件已经由 PluginManifest 声明, 则只需要提供 name 和 ecnu_cache_grabber,
+    其他参数在 manifest 中提供, 被装饰的类会绑定到声明的插件上.
 
     Example:
 
@@ -128,13 +199,70 @@ def register_plugin(  # 此方法应该在运行之后延迟调用, 也就是说
     def _decorator(cls):
         if not issubclass(cls, Plugin):
             raise ValueError(f"plugin: {cls.__name__} must be a subclass of Plugin.")
-        Registry.add_record(Record(name, cls, description,
-                                   configuration, routine, ecnu_cache_grabber))
+        if Registry.is_declared(name):
+            if description or configuration is not None or routine is not None:
+                raise ValueError(f"plugin: {name} is declared by a manifest, "
+                                 f"its description, configuration and routine must be provided there.")
+            Registry.bind(name, cls, ecnu_cache_grabber)
+        else:
+            Registry.add_record(Record(name, cls, description,
+                                       configuration, routine, ecnu_cache_grabber,
+                                       Mailbox(name, mailbox_capacity, mailbox_overflow)))
         return lambda cls_: cls_
 
     return _decorator
 
 
+class PluginManifest:
+    """
+    插件声明, 放在插件包的 manifest.py 中, 以模块变量 manifest 提供.
+
+    PluginLoader 启动时只导入 manifest.py, 根据声明注册插件, 显示插件的描述和配置,
+    插件实现模块 (entry) 在插件第一次被加载时才导入, 以减少启动时间.
+    因此 manifest.py 只应导入 src.plugin 等轻量的模块, 不能导入插件的实现.
+
+    插件实现中仍然使用 register_plugin(name, ecnu_cache_grabber=...) 装饰插件类.
+
+    Example:
+
+    >>> manifest = PluginManifest(
+    ...     name="plugin_b",
+    ...     entry="b_plugin",  # 插件包内的实现模块, 即 plugins/<package>/b_plugin.py.
+    ...     description="插件 B",
+    ...     configuration=PluginConfig().add(TextItem("address", "no.9 l street")),
+    ...     routine=Routine.HOURLY,
+    ... )
+    """
+
+    def __init__(
+            self, name: str,
+            entry: str,
+            description: str = "",
+            configuration: PluginConfig = None,
+            routine: Routine = None,
+            mailbox_capacity: int = DEFAULT_MAILBOX_CAPACITY,
+            mailbox_overflow: Overflow = Overflow.DROP_OLDEST
+    ):
+        """
+        Parameters:
+            entry: 插件实现模块相对于插件包的名称.
+            其他参数见 register_plugin.
+        """
+        self.name = name
+        self.entry = entry
+        self.description = description
+        self.configuration = configuration
+        self.routine = routine
+        self.mailbox_capacity = mailbox_capacity
+        self.mailbox_overflow = mailbox_overflow
+
+    def to_record(self, entry: Callable[[], Any]) -> Record:
+        return Record(self.name, None, self.description,
+                      self.configuration, self.routine, None,
+                      Mailbox(self.name, self.mailbox_capacity, self.mailbox_overflow),
+                      entry)
+
+
 class TaskSignals(QObject):
     finished = Signal(object)
 
@@ -165,7 +293,18 @@ class Plugin:
 
     为了保证项目的整洁和规范性, 插件创建文件和记录日志等操作请使用生命周期函数和事件函数中提供的 PluginContext 进行.
 
-    插件回调方法不能是阻塞的, 如果需要执行长时间任务, 请使用 QThread 或者 QThreadPool, 如:
+    事件函数 on_routine, on_recv 和 on_uia_login 在插件专属的串行执行器中执行 (不在主线程):
+    - 同一插件的这些事件函数不会同时执行, 按照触发顺序依次执行,
+      通过 PluginContext.call_at / call_later 安排的回调也在同一个执行器中执行.
+    - 不同插件的事件函数可能同时执行.
+    - 可以在其中进行网络请求等阻塞操作, 但是执行时间超过 DEFAULT_CALLBACK_TIMEOUT 会被记录为超时,
+      并且在其返回前, 此插件的后续事件只能等待.
+    - 不能在其中直接操作 Qt 界面组件.
+    - 这三个事件函数也可以定义为 async def, 此时它们在 PluginLoader 持有的事件循环中执行,
+      不占用线程, 超时会被取消. 在其中不能调用阻塞函数, 否则会拖慢所有插件的异步事件.
+      在生命周期函数或者 action 中, 可以通过 PluginContext.run_coroutine 执行其他协程.
+
+    生命周期函数和其他事件函数在主线程中执行, 不能是阻塞的, 如果需要执行长时间任务, 请使用 QThread 或者 QThreadPool, 如:
     >>> from PySide6.QtCore import QThreadPool, QThread
     >>> def takes_long_time(v):
     ...     QThread.sleep(10)
@@ -227,7 +366,7 @@ class Plugin:
         事件函数, 插件注册时指定的 routine 对应的时间间隔到达时触发.
 
         - 调用的频率不会随着应用频繁关闭启动而更改, 间隔时间将保存到硬盘中.
-        - 请不要在此处长时间阻塞, 否则其他插件将无法得到回调.
+        - 如果上一次 routine 还没有执行完毕, 本次 routine 会被跳过.
         - 此回调方法不是在整点进行回调, 而是间隔时间大于指定时间后的一个时刻进行回调, 不能以此进行计时.
 
         Note:
@@ -247,12 +386,25 @@ class Plugin:
         """
         当插件接收到其他插件发送来的消息时触发, 只有被加载的插件才能接收其他插件的消息.
 
+        消息按照发送顺序逐条触发此事件.
+
         Parameters:
             ctx: 插件上下文.
             from_plugin: 发送消息的插件.
             obj: 附加的信息对象.
         """
 
+    def on_recv_batch(self, ctx: PluginContext, messages: list[tuple[str, Any]]):
+        """
+        批量接收消息, 如果插件重写了此方法, 每次轮询时积压的消息会一次性通过此方法投递, 而不再触发 on_recv.
+
+        Parameters:
+            ctx: 插件上下文.
+            messages: 按照发送顺序排列的 (发送消息的插件, 附加的信息对象) 列表.
+        """
+        for from_plugin, obj in messages:
+            self.on_recv(ctx, from_plugin, obj)
+
 
 class SingleInstanceError(Exception):
     def __init__(self, msg: str = None):
@@ -280,7 +432,22 @@ def _import_module(module_name: str, file_path: str | Path):
     return module
 
 
+def _import_manifest(package_name: str, init_path: str | Path):
+    """
+    导入插件包中的 manifest 模块, 不执行插件包的 __init__.py.
+
+    插件包以未执行的模块对象放入 sys.modules, 以便 manifest 和之后导入的插件实现可以使用相对导入.
+    """
+    from importlib.util import spec_from_file_location, module_from_spec
+    spec = spec_from_file_location(package_name, init_path)
+    sys.modules[package_name] = module_from_spec(spec)
+    return importlib.import_module(f"{package_name}.manifest")
+
+
 class PluginLoader:
+    PLUGIN_THREADS = 8  # 执行插件事件函数的最大线程数.
+    UNLOAD_WAIT = 5  # 卸载插件时等待其正在执行的事件函数结束的最长时间 (s).
+    SLOW_REQUEST = 5  # 插件的网络请求超过此时间 (s) 时记录警告.
     __IMPORT_PATH = [
         # SRC_DIR_PATH.parent / "src" / "plugin" / "intrinsic",
         SRC_DIR_PATH.parent / "plugins",
@@ -289,6 +456,7 @@ class PluginLoader:
     __CONFIG_FILE_PATH = SRC_DIR_PATH.parent / "plugin_config.toml"
     CONFIG_HEAD_LINE = "# comments will be removed, don't write comments here."
     __PLUGIN_CACHE_PATH = SRC_DIR_PATH.parent / "plugin_cache.json"  # 给插件提供持续化保存内容的文件, cache 持续化内容不保证不会用户删除, 不应保存重要数据.
+    __SESSION_PATH = SRC_DIR_PATH.parent / "uia_session.bin"  # 加密保存的 uia 登录缓存, 重启后复用.
     __instantiated = False
 
     def __new__(cls, *args, **kwargs):
@@ -302,12 +470,150 @@ class PluginLoader:
     def __init__(self):
         self.cache_valid = False
         self.loaded_plugins: set[str] = set()
+        self._scheduler: DeadlineScheduler[str] = DeadlineScheduler()  # 已加载插件的下一次 routine 时间.
+        self._calls: DeadlineScheduler[tuple[str, int]] = DeadlineScheduler()  # 插件通过 call_at 安排的回调.
+        self._call_callbacks: dict[tuple[str, int], Callable[[PluginContext], Any]] = {}
+        self._call_counter = itertools.count()
+        self._calls_lock = threading.Lock()  # call_at 可能在插件的执行线程中被调用.
+        self._pending_messages: set[str] = set()  # 有待处理消息的插件.
+        self._pending_lock = threading.Lock()
+        self._wakeup: Callable[[], None] = lambda: None
+        self._pool = QThreadPool()
+        self._pool.setMaxThreadCount(self.PLUGIN_THREADS)
+        self._dispatcher = GuiDispatcher()  # 把事件函数的执行结果转交回主线程.
+        self._runtime = AsyncRuntime()  # 执行 async 事件函数和协程的事件循环.
+        self._executors: dict[str, SerialExecutor] = {}  # 已加载插件的串行执行器.
+        self._cache_store = PluginCacheStore(self.__PLUGIN_CACHE_PATH,
+                                             on_scheduled=lambda: self._wakeup())
+        self._session_store = SessionStore(self.__SESSION_PATH)
+        self._http = shared_client()  # 插件通过 PluginContext.http 使用的 HTTP 客户端.
+        self._http.add_hook(self._on_http_request)
+        self._stats_logged = False  # close 会被重复调用 (__del__), 只在加载插件后的第一次记录统计.
+
+    def set_wakeup(self, callback: Callable[[], None]):
+        """
+        设置唤醒回调, 当有新的消息需要投递, 或者调度发生变化需要提前轮询时触发.
+
+        回调可能在非主线程被调用, 调用方需要自行把轮询安排回主线程.
+        """
+        self._wakeup = callback
+
+    def next_poll_delay(self) -> Optional[float]:
+        """
+        距离下一次需要调用 poll 的秒数, 不会小于 0.
+
+        如果没有任何需要等待的事件, 返回 None.
+        """
+        if self._pending_messages:
+            return 0.0
+        delays = []
+        deadline = self._scheduler.next_deadline()
+        if deadline is not None:
+            delays.append(deadline - time.time())
+        with self._calls_lock:
+            deadline = self._calls.next_deadline()
+        if deadline is not None:
+            delays.append(deadline - time.time())
+        now = time.monotonic()
+        deadline = self._cache_store.flush_deadline()
+        if deadline is not None:
+            delays.append(deadline - now)
+        for executor in self._executors.values():
+            deadline = executor.timeout_deadline()
+            if deadline is not None:
+                delays.append(deadline - now)
+        if not delays:
+            return None
+        return max(min(delays), 0.0)
+
+    def _dispatch(self, record: Record, callback_name: str, *args,
+                  key: Any = None) -> Optional[Future]:
+        """
+        把插件的事件函数提交到插件的串行执行器中执行, 执行结果会在主线程中处理.
+
+        Returns:
+            事件函数返回值的 Future, 如果插件未加载或者提交被合并, 返回 None.
+        """
+        return self._dispatch_callable(record, callback_name, getattr(record.instance, callback_name),
+                                       *args, key=key)
+
+    def _dispatch_callable(self, record: Record, callback_name: str, callback: Callable, *args,
+                           key: Any = None) -> Optional[Future]:
+        """把以插件上下文为第一个参数的函数提交到插件的串行执行器中执行, 见 _dispatch."""
+        executor = self._executors.get(record.name)
+        if executor is None:
+            return None
+        future = executor.submit(callback_name, callback, record.ctx, *args, key=key)
+        if future is not None:
+            future.add_done_callback(lambda f: self._dispatcher.post(
+                lambda: self._on_callback_done(record.name, callback_name, f)
+            ))
+        return future
+
+    def call_at(self, plugin_name: str, timestamp: float,
+                callback: Callable[[PluginContext], Any]) -> Optional[int]:
+        """安排插件的回调, 见 PluginContext.call_at."""
+        if plugin_name not in self.loaded_plugins:
+            return None
+        with self._calls_lock:
+            handle = next(self._call_counter)
+            self._call_callbacks[(plugin_name, handle)] = callback
+            self._calls.schedule((plugin_name, handle), timestamp)
+        self._wakeup()
+        return handle
+
+    def cancel_call(self, plugin_name: str, handle: int) -> bool:
+        """取消插件安排的回调, 见 PluginContext.cancel_call."""
+        with self._calls_lock:
+            self._call_callbacks.pop((plugin_name, handle), None)
+            return self._calls.cancel((plugin_name, handle))
+
+    def _cancel_calls_of(self, plugin_name: str):
+        with self._calls_lock:
+            for key in [k for k in self._call_callbacks if k[0] == plugin_name]:
+                del self._call_callbacks[key]
+                self._calls.cancel(key)
+
+    def run_coroutine(self, plugin_name: str, coro: Coroutine,
+                      callback: Callable[[Any], None] = None) -> Optional[Future]:
+        """在事件循环中执行插件提交的协程, 见 PluginContext.run_coroutine."""
+        if plugin_name not in self.loaded_plugins:
+            coro.close()
+            return None
+        future = self._runtime.submit(coro)
+
+        def done(f: Future):
+            self._on_callback_done(plugin_name, "coroutine", f)
+            if callback is not None and not f.cancelled() and f.exception() is None:
+                callback(f.result())
+
+        future.add_done_callback(lambda f: self._dispatcher.post(lambda: done(f)))
+        return future
+
+    def _on_callback_done(self, plugin_name: str, callback_name: str, future: Future):
+        if future.cancelled():
+            return
+        e = future.exception()
+        if e is None:
+            return
+        if isinstance(e, LoginError):
+            project_logger.error(f"LoginError ({plugin_name}): {e}")
+            self.invalidate_cache(plugin_name)
+        elif isinstance(e, ServerUnavailableError):
+            # 服务器暂时不可用不代表登录失效, 不需要重新登录, 插件下一次 routine 时再尝试.
+            project_logger.warning(f"{plugin_name} {callback_name}: {e}")
+        else:
+            project_logger.error(f"Error when calling {plugin_name} {callback_name}:\n"
+                                 f"{''.join(traceback.format_exception(e))}")
 
     @requires_init
     def import_plugins(self):
         """
         导入并注册插件, 只会导入选定路径下的首层模块, 模块内调用 register_plugin 来注册模块.
 
+        如果插件包中有 manifest.py, 则只导入 manifest 并根据其中的 PluginManifest 声明插件,
+        插件实现在插件第一次被加载时才导入, 见 PluginManifest.
+
         _import_module 不支持模块结构, 如果被导入模块内部如果要导入子模块, 必须使用相对于选定路径的方式来导入.
 
         被导入的插件不能延迟导入其他模块, 必须在其被导入的时候导入其他所需的模块, 否则可能出现找不到指定模块的错误.
@@ -329,7 +635,17 @@ class PluginLoader:
                     continue
                 if n not in self.__IMPORTED_MODULE.keys():
                     # 不导入重复的模块.
-                    with TempSysPath(path):  # 为了插件能导入子模块.
+                    if s.is_dir() and s.joinpath("manifest.py").exists():
+                        with startup_profiler.span(f"import {n}.manifest", "import"):
+                            module = _import_manifest(n, p)
+                        manifest: PluginManifest = module.manifest
+                        Registry.add_record(manifest.to_record(
+                            lambda path_=path, n_=n, entry=manifest.entry: self._import_entry(path_, n_, entry)
+                        ))
+                        self.__IMPORTED_MODULE[n] = module
+                        project_logger.info(f"module: {n} manifest imported.")
+                        continue
+                    with TempSysPath(path), startup_profiler.span(f"import {n}", "import"):  # 为了插件能导入子模块.
                         self.__IMPORTED_MODULE[n] = _import_module(n, p)
                     project_logger.info(f"module: {n} imported.")
                 else:
@@ -337,26 +653,21 @@ class PluginLoader:
                                         f"{n} not imported for "
                                         f"its name duplicates with previous one.")
 
-    @classmethod
-    def _check_time_reached(cls, now: datetime.datetime,
-                            last_routine: datetime.datetime,
-                            routine: Routine):
-        if routine == Routine.SECONDLY:
-            if now - last_routine > datetime.timedelta(seconds=1):
-                return True
-        elif routine == Routine.MINUTELY:
-            if now - last_routine > datetime.timedelta(minutes=1):
-                return True
-        elif routine == Routine.HOURLY:
-            if now - last_routine > datetime.timedelta(hours=1):
-                return True
-        elif routine == Routine.DAILY:
-            if now - last_routine > datetime.timedelta(days=1):
-                return True
-        elif routine == Routine.WEEKLY:
-            if now - last_routine > datetime.timedelta(weeks=1):
-                return True
-        return False
+    @staticmethod
+    def _import_entry(path: str | Path, package_name: str, entry: str):
+        """导入由 manifest 声明的插件的实现模块, 模块中的 register_plugin 会把插件类绑定到声明上."""
+        with TempSysPath(path), startup_profiler.span(f"import {package_name}.{entry}", "import"):
+            importlib.import_module(f"{package_name}.{entry}")
+        project_logger.info(f"module: {package_name}.{entry} imported.")
+
+    def _schedule_routine(self, record: Record):
+        """根据插件上一次 routine 的时间安排下一次 routine."""
+        if record.routine is None:
+            return
+        self._scheduler.schedule(
+            record.name,
+            record.ctx._plugin_cache._last_routine + record.routine.interval.total_seconds()
+        )
 
     def load_config(self):
         project_logger.info("plugin_loader: loading config.")
@@ -372,7 +683,10 @@ class PluginLoader:
             serializable_part = serializable.get(record.name)  # 通过插件名称获取对应的配置部分.
             if serializable_part is not None:
                 record.config.from_serializable(serializable_part)
-            record.instance.on_config_load(record.ctx, record.config.clone())
+            record.config_loaded = True
+            if record.instance is not None:  # 插件实现尚未导入时, on_config_load 在导入后触发.
+                with startup_profiler.span(f"{record.name}.on_config_load", "plugin"):
+                    record.instance.on_config_load(record.ctx, record.config.clone())
 
     def save_config(self):
         """
@@ -392,28 +706,44 @@ class PluginLoader:
 
     def poll(self):
         """
-        轮询调用各个插件.
+        轮询调用各个插件, 只处理有待处理消息的插件和 routine 已经到期的插件,
+        事件函数被提交到各个插件的串行执行器中执行, 此方法不会等待它们执行完毕.
+
+        调用方应该在 next_poll_delay 指示的时刻再次调用此方法.
         """
-        now = datetime.datetime.now()
-        for plugin_name in self.loaded_plugins:
+        with self._pending_lock:
+            pending, self._pending_messages = self._pending_messages, set()
+        for plugin_name in pending:
+            if plugin_name not in self.loaded_plugins:
+                continue
             record = Registry.plugin_record(plugin_name)
-            while record.messages:
-                msg = record.messages.pop()
-                try:
-                    record.instance.on_recv(record.ctx, msg[0], msg[1])
-                except Exception:
-                    project_logger.error(f"Error when calling {plugin_name} recv:\n"
-                                         f"{traceback.format_exc()}")
-            if self._check_time_reached(now, record.ctx.last_routine(), record.routine):
-                record.ctx._plugin_cache._last_routine = now.timestamp()
-                try:
-                    record.instance.on_routine(record.ctx)
-                except LoginError as e:
-                    project_logger.error(f"LoginError ({plugin_name}): {e}")
-                    self.invalidate_cache(record.name)
-                except Exception:
-                    project_logger.error(f"Error when calling {plugin_name} routine:\n"
-                                         f"{traceback.format_exc()}")
+            messages = record.mailbox.drain()
+            if not messages:
+                continue
+            if type(record.instance).on_recv_batch is not Plugin.on_recv_batch:
+                self._dispatch(record, "on_recv_batch",
+                               [(msg.from_plugin, msg.obj) for msg in messages])
+            else:
+                for msg in messages:
+                    self._dispatch(record, "on_recv", msg.from_plugin, msg.obj)
+        now = time.time()
+        for plugin_name in self._scheduler.pop_due(now):
+            record = Registry.plugin_record(plugin_name)
+            record.ctx._plugin_cache._last_routine = now
+            self._schedule_routine(record)
+            if self._dispatch(record, "on_routine", key="on_routine") is None:
+                project_logger.warning(f"{plugin_name} routine skipped, previous routine is still running.")
+        with self._calls_lock:
+            due = [(key, self._call_callbacks.pop(key)) for key in self._calls.pop_due(now)]
+        for (plugin_name, _), callback in due:
+            self._dispatch_callable(Registry.plugin_record(plugin_name), "call", callback)
+        now = time.monotonic()
+        for executor in self._executors.values():
+            job = executor.check_timeout(now)
+            if job is not None:
+                project_logger.error(f"{executor.name} {job.name} timed out, "
+                                     f"it has been running for more than {job.timeout}s.")
+        self._cache_store.flush_due(now)
 
     def load_all(self, exclude: Sequence[str] = None):
         """
@@ -426,31 +756,45 @@ class PluginLoader:
             if not (exclude and record.name in exclude):
                 self.load_plugin(record.name)
 
-    @classmethod
-    def _touch_plugin_cache(cls):
-        if not os.path.exists(cls.__PLUGIN_CACHE_PATH):
-            with open(cls.__PLUGIN_CACHE_PATH, "w", encoding="utf-8") as w:
-                w.write("{}")
-
     def load_plugin(self, plugin_name: str):
-        """已经注册的插件需要被加载才能执行 on_routine 等内容, 跳过已经加载的插件"""
+        """
+        已经注册的插件需要被加载才能执行 on_routine 等内容, 跳过已经加载的插件.
+
+        由 manifest 声明的插件在第一次被加载时导入其实现, 导入失败时插件不会被加载.
+        """
         if plugin_name in self.loaded_plugins:
             return
         project_logger.info(f"plugin_loader: loading plugin {plugin_name}.")
         record = Registry.plugin_record(plugin_name)
+        if record.instance is None:
+            try:
+                record.entry()
+            except Exception:
+                project_logger.error(f"plugin_loader: failed to import plugin {plugin_name}:\n"
+                                     f"{traceback.format_exc()}")
+                return
+            if record.instance is None:
+                project_logger.error(f"plugin_loader: {plugin_name} is not registered by its entry module.")
+                return
         self.loaded_plugins.add(plugin_name)
+        self._stats_logged = False
         record.ctx._bind_action = self.bind_action
         record.ctx._report_cache_invalid = self.invalidate_cache
         record.ctx._is_plugin_loaded = self.is_plugin_loaded
         record.ctx._queue_message = self.queue_message
+        record.ctx._run_coroutine = self.run_coroutine
+        record.ctx._call_at = self.call_at
+        record.ctx._cancel_call = self.cancel_call
+        self._executors[plugin_name] = SerialExecutor(plugin_name, self._pool,
+                                                      on_started=lambda: self._wakeup(),
+                                                      runtime=self._runtime)
         # 加载 plugin 的 cache, 不是 uia cache.
-        self._touch_plugin_cache()
-        with open(self.__PLUGIN_CACHE_PATH, "r", encoding="utf-8") as cache_file:
-            record.ctx._plugin_cache._load_from(
-                json.load(cache_file).get(plugin_name)  # 这里读取了整个插件 cache 文件,
-            )
+        self._cache_store.attach(plugin_name, record.ctx._plugin_cache)
 
-        record.instance.on_load(record.ctx)
+        with startup_profiler.span(f"{plugin_name}.on_load", "plugin"):
+            record.instance.on_load(record.ctx)
+        self._schedule_routine(record)
+        self._wakeup()
 
     def unload_plugin(self, plugin_name: str):
         """停止插件运行, 可能源自用户意愿和插件加载器停止运行, 如果插件没被加载, 不做任何事"""
@@ -458,23 +802,26 @@ class PluginLoader:
             return
         project_logger.info(f"plugin_loader: unloading plugin {plugin_name}.")
         record = Registry.plugin_record(plugin_name)
+        executor = self._executors.pop(plugin_name)
+        if not executor.shutdown(self.UNLOAD_WAIT):
+            project_logger.warning(f"plugin_loader: {plugin_name} is still running when unloading.")
         record.instance.on_unload(record.ctx)
         self.loaded_plugins.remove(plugin_name)
+        self._scheduler.cancel(plugin_name)
+        self._cancel_calls_of(plugin_name)
+        with self._pending_lock:
+            self._pending_messages.discard(plugin_name)
 
         record.ctx._report_cache_invalid = lambda: None
         record.ctx._bind_action = lambda n, a, b: None
-        record.ctx._queue_message = lambda a, b, c: None
+        record.ctx._queue_message = lambda a, b, c, d: None
         record.ctx._is_plugin_loaded = lambda a: False
-        record.messages.clear()
+        record.ctx._run_coroutine = lambda n, c, cb: c.close()
+        record.ctx._call_at = lambda n, t, cb: None
+        record.ctx._cancel_call = lambda n, h: False
+        record.mailbox.clear()
         record.actions.clear()
-
-        # 保存 plugin_cache.
-        self._touch_plugin_cache()
-        with open(self.__PLUGIN_CACHE_PATH, "r", encoding="utf-8") as cache_file:
-            obj = json.load(cache_file)
-        with open(self.__PLUGIN_CACHE_PATH, "w", encoding="utf-8") as cache_file:
-            obj[plugin_name] = record.ctx._plugin_cache._serialize()
-            json.dump(obj, cache_file)
+        self._cache_store.detach(plugin_name)  # plugin_cache 在下一次写入时保存.
 
     def __del__(self):
         self.__instantiated = False
@@ -484,8 +831,25 @@ class PluginLoader:
         self.close()
 
     def close(self):
-        for plugin_name in self.loaded_plugins.copy():
-            self.unload_plugin(plugin_name)
+        self._cache_store.flush()  # 保存已经卸载的插件的 plugin_cache.
+        if self.loaded_plugins:
+            for plugin_name in self.loaded_plugins.copy():
+                self.unload_plugin(plugin_name)
+            self._cache_store.flush()
+        # 即使没有已加载的插件, 已卸载插件遗留的任务和连接也需要关闭.
+        self._pool.waitForDone(self.UNLOAD_WAIT * 1000)
+        self._runtime.close(self.UNLOAD_WAIT)
+        if not self._stats_logged:
+            self._http.responses.log_stats()
+            self._stats_logged = True
+        self._http.close()
+
+    def _on_http_request(self, timing: RequestTiming):
+        if timing.error is not None:
+            project_logger.warning(f"http: {timing.method} {timing.url} failed "
+                                   f"after {timing.elapsed:.1f}s: {timing.error!r}")
+        elif timing.elapsed > self.SLOW_REQUEST:
+            project_logger.warning(f"http: {timing.method} {timing.url} took {timing.elapsed:.1f}s.")
 
     def send_qrcode_email(self, img_path: str, content: str, is_retry: bool):
         title = "CampusPlugins: ECNU 登录二维码" if not is_retry else "CampusPlugins: 登陆二维码已刷新"
@@ -508,35 +872,81 @@ class PluginLoader:
             [(img_path, cid)]
         ))
 
+    def _restore_login_cache(self) -> tuple[LoginCache, list[Callable[[Edge], Any]]]:
+        """
+        恢复保存的登录缓存, 并使用 probe 请求检查已加载插件需要的 Cache 是否仍然有效.
+
+        Returns:
+            (仍然有效的登录缓存, 需要重新在浏览器中运行的 cache grabber).
+        """
+        login_cache = self._session_store.load() or LoginCache()
+        stale = []
+        for plugin_name in list(self.loaded_plugins):
+            grabber = Registry.plugin_record(plugin_name).cache_grabber
+            if grabber is None:
+                continue
+            cache_cls = cache_type_of(grabber)
+            if cache_cls is None or not login_cache.is_valid(cache_cls):
+                if cache_cls is not None:
+                    login_cache.remove_cache(cache_cls)
+                stale.append(grabber)
+        return login_cache, stale
+
+    def restore_uia_login(self) -> bool:
+        """
+        不启动浏览器, 尝试使用上一次保存的登录缓存登录,
+        只有已加载插件需要的 Cache 都仍然有效时才会成功并触发 on_uia_login.
+
+        此方法会发送网络请求, 不应在主线程调用.
+
+        Returns:
+            是否成功登录.
+        """
+        login_cache, stale = self._restore_login_cache()
+        if stale or not len(login_cache):
+            return False
+        project_logger.info("plugin_loader: uia session restored.")
+        self._deliver_login_cache(login_cache)
+        return True
+
     def ecnu_uia_login(self):
         """
         登录到 UIA, 调用此方法会调出 WebDriver 界面, 引导用户登录 ECNU UIA,
         成功登录后, 各个插件能够获取登录缓存.
 
-        Parameters:
-            qrcode_callback: 见 get_login_cache
+        上一次保存的登录缓存中仍然有效的 Cache 会被复用, 只有失效的 Cache 才在浏览器中重新获取,
+        如果全部有效, 则不会启动浏览器.
         """
-        grabbers = []
-        for plugin_name in self.loaded_plugins:
-            record = Registry.plugin_record(plugin_name)
-            grabbers.append(record.cache_grabber)
-        login_cache = get_login_cache(cache_grabbers=grabbers,
-                                      qrcode_callback=self.send_qrcode_email)
+        login_cache, stale = self._restore_login_cache()
+        if stale:
+            from src.uia.login import get_login_cache  # 导入 selenium 较慢, 只在登录时导入.
+            fresh = get_login_cache(cache_grabbers=stale,
+                                    qrcode_callback=self.send_qrcode_email)
+            if fresh is None:
+                login_cache = None
+            else:
+                login_cache.update(fresh)
+                self._session_store.save(login_cache)
+        else:
+            project_logger.info("plugin_loader: uia session restored, browser login skipped.")
+        self._deliver_login_cache(login_cache)
+
+    def _deliver_login_cache(self, login_cache: Optional[LoginCache]):
+        """把登录缓存分发给已加载的插件, 并等待它们的 on_uia_login 执行完毕."""
         self.cache_valid = True  # 放在前面可以让插件在 on_uia_login 的时候报告失效(登录失败).
-        for plugin_name in self.loaded_plugins:
+        futures = []
+        for plugin_name in list(self.loaded_plugins):
             record = Registry.plugin_record(plugin_name)
             record.ctx._uia_cache = login_cache
-            try:
-                record.instance.on_uia_login(record.ctx)
-            except LoginError:
-                project_logger.error(
-                    f"Error when calling {plugin_name} UIA login:\n{traceback.format_exc()}\n"
-                )
-                self.invalidate_cache(record.name)
-            except Exception:
-                project_logger.error(
-                    f"Error when calling {plugin_name} UIA login:\n{traceback.format_exc()}\n"
-                )
+            future = self._dispatch(record, "on_uia_login")
+            if future is not None:
+                futures.append(future)
+        # 等待各个插件处理登录缓存, 以便调用方在此方法返回后得到正确的 cache_valid.
+        wait_futures(futures, DEFAULT_CALLBACK_TIMEOUT)
+        # 回调抛出的 LoginError 由 _on_callback_done 在主线程中处理 (记录日志, 丢弃失效的 Cache),
+        # 那时此方法可能已经返回, 所以先在这里同步地标记失效.
+        if any(f.done() and not f.cancelled() and isinstance(f.exception(), LoginError) for f in futures):
+            self.cache_valid = False
 
     def invalidate_cache(self, source_plugin: str):
         """
@@ -547,6 +957,9 @@ class PluginLoader:
         """
         self.cache_valid = False
         project_logger.info(f"{source_plugin} reported invalid cache")
+        cache_cls = cache_type_of(Registry.plugin_record(source_plugin).cache_grabber)
+        if cache_cls is not None:
+            self._session_store.discard(cache_cls)  # 下次登录时不再复用失效的 Cache.
 
     def get_plugin_description(self, plugin_name: str) -> str:
         """
@@ -597,8 +1010,23 @@ class PluginLoader:
         """
         return Registry.plugin_record(plugin_name).actions.copy()
 
-    def queue_message(self, to_plugin: str, from_plugin: str, obj: Any):
-        Registry.plugin_record(to_plugin).messages.append((from_plugin, obj))
+    def queue_message(self, to_plugin: str, from_plugin: str, obj: Any,
+                      coalesce_key: Hashable = None):
+        """向插件投递消息, 可在任意线程调用, 参数含义见 PluginContext.send_message."""
+        if not Registry.plugin_record(to_plugin).mailbox.put(Message(from_plugin, obj, coalesce_key)):
+            return  # 消息被合并或者被丢弃, 邮箱中已有待处理的消息.
+        with self._pending_lock:
+            self._pending_messages.add(to_plugin)
+        self._wakeup()
+
+    def get_mailbox_stats(self, plugin_name: str) -> MailboxStats:
+        """
+        获取插件邮箱的计数器快照, 包括排队深度, 丢弃和合并的消息数以及投递延迟.
+
+        Note:
+            此方法面向持有 PluginLoader 的对象.
+        """
+        return Registry.plugin_record(plugin_name).mailbox.stats()
 
     def bind_action(self, plugin_name: str, action_text: str, callback: Callable[[], None]):
         Registry.plugin_record(plugin_name).actions[action_text] = callback
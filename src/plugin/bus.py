@@ -0,0 +1,189 @@
+"""
+插件消息总线.
+
+每个插件拥有一个有界的 FIFO 邮箱, 其他插件发送的消息先进入邮箱, 再由 PluginLoader 在轮询时按照发送顺序取出投递.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from enum import Enum, auto
+from typing import Any, Hashable, Optional
+
+from src.log import project_logger
+
+__all__ = [
+    "DEFAULT_MAILBOX_CAPACITY",
+    "Overflow", "Message", "MailboxStats", "Mailbox",
+]
+
+DEFAULT_MAILBOX_CAPACITY = 256  # 插件邮箱的默认容量.
+
+
+class Overflow(Enum):
+    """邮箱已满时的处理策略."""
+    DROP_OLDEST = auto()  # 丢弃最早的消息, 保留新消息.
+    DROP_NEWEST = auto()  # 丢弃新到达的消息.
+
+
+class Message:
+    """邮箱中的一条消息."""
+
+    __slots__ = ("from_plugin", "obj", "coalesce_key", "enqueued_at")
+
+    def __init__(self, from_plugin: str, obj: Any, coalesce_key: Optional[Hashable] = None):
+        self.from_plugin = from_plugin
+        self.obj = obj
+        self.coalesce_key = coalesce_key
+        self.enqueued_at = time.monotonic()
+
+    def __repr__(self):
+        return f"Message(from_plugin={self.from_plugin!r}, coalesce_key={self.coalesce_key!r})"
+
+
+class MailboxStats:
+    """邮箱计数器的快照."""
+
+    def __init__(self):
+        self.depth = 0  # 当前排队的消息数.
+        self.max_depth = 0  # 出现过的最大排队消息数.
+        self.received = 0  # 被接收进邮箱的消息数, 不包括被合并和被丢弃的新消息.
+        self.delivered = 0  # 被取出投递的消息数.
+        self.dropped = 0  # 因邮箱已满被丢弃的消息数.
+        self.coalesced = 0  # 被合并到已排队消息中的消息数.
+        self.total_latency = 0.0  # 消息从进入邮箱到被取出的总时间 (s).
+        self.max_latency = 0.0  # 消息从进入邮箱到被取出的最长时间 (s).
+
+    @property
+    def mean_latency(self) -> float:
+        """消息从进入邮箱到被取出的平均时间 (s)."""
+        return self.total_latency / self.delivered if self.delivered else 0.0
+
+    def copy(self) -> MailboxStats:
+        stats = MailboxStats()
+        stats.__dict__.update(self.__dict__)
+        return stats
+
+    def __repr__(self):
+        return (f"MailboxStats(depth={self.depth}, max_depth={self.max_depth}, "
+                f"received={self.received}, delivered={self.delivered}, "
+                f"dropped={self.dropped}, coalesced={self.coalesced}, "
+                f"mean_latency={self.mean_latency:.3f}s, max_latency={self.max_latency:.3f}s)")
+
+
+class Mailbox:
+    """
+    有界的 FIFO 邮箱, 可在任意线程中投递和取出消息.
+
+    - 带有 coalesce_key 的消息, 如果同一发送方相同 key 的消息还在排队, 会替换排队消息的内容,
+      而不是再次排队, 排队位置和进入邮箱的时间保持不变.
+    - 邮箱已满时, 根据 Overflow 策略丢弃最早的消息或者新到达的消息.
+
+    Examples:
+
+    >>> box = Mailbox("x", capacity=2)
+    >>> box.put(Message("a", 1))
+    True
+    >>> box.put(Message("a", 2, coalesce_key="k"))
+    True
+    >>> box.put(Message("a", 3, coalesce_key="k"))  # 合并到上一条消息.
+    False
+    >>> box.put(Message("b", 4))  # 邮箱已满, 丢弃最早的消息.
+    True
+    >>> [(m.from_plugin, m.obj) for m in box.drain()]
+    [('a', 3), ('b', 4)]
+    >>> box.stats().dropped, box.stats().coalesced
+    (1, 1)
+    """
+
+    def __init__(self, name: str, capacity: int = DEFAULT_MAILBOX_CAPACITY,
+                 overflow: Overflow = Overflow.DROP_OLDEST):
+        """
+        Parameters:
+            name: 邮箱名称, 一般为接收消息的插件名称, 用于日志.
+            capacity: 邮箱容量, 必须为正数.
+            overflow: 邮箱已满时的处理策略.
+        """
+        if capacity <= 0:
+            raise ValueError("mailbox capacity must be positive.")
+        self.name = name
+        self.capacity = capacity
+        self.overflow = overflow
+        self._queue: deque[Message] = deque()
+        self._keyed: dict[tuple[str, Hashable], Message] = {}  # 排队中带有 coalesce_key 的消息.
+        self._stats = MailboxStats()
+        self._lock = threading.Lock()
+
+    def put(self, message: Message) -> bool:
+        """
+        投递消息.
+
+        Returns:
+            消息是否作为新消息进入邮箱, 消息被合并或者被丢弃时返回 False.
+        """
+        with self._lock:
+            key = None
+            if message.coalesce_key is not None:
+                key = (message.from_plugin, message.coalesce_key)
+                queued = self._keyed.get(key)
+                if queued is not None:
+                    queued.obj = message.obj
+                    self._stats.coalesced += 1
+                    return False
+            if len(self._queue) >= self.capacity:
+                self._stats.dropped += 1
+                if self.overflow is Overflow.DROP_NEWEST:
+                    dropped = message
+                else:
+                    dropped = self._queue.popleft()
+                    self._forget(dropped)
+                project_logger.warning(f"mailbox of {self.name} is full, "
+                                       f"dropped a message from {dropped.from_plugin}.")
+                if dropped is message:
+                    return False
+            self._queue.append(message)
+            if key is not None:
+                self._keyed[key] = message
+            self._stats.received += 1
+            self._stats.max_depth = max(self._stats.max_depth, len(self._queue))
+            return True
+
+    def drain(self, limit: int = None) -> list[Message]:
+        """
+        按照进入邮箱的顺序取出消息.
+
+        Parameters:
+            limit: 最多取出的消息数, 默认取出全部.
+        """
+        now = time.monotonic()
+        with self._lock:
+            n = len(self._queue) if limit is None else min(limit, len(self._queue))
+            messages = [self._queue.popleft() for _ in range(n)]
+            for message in messages:
+                self._forget(message)
+                latency = now - message.enqueued_at
+                self._stats.total_latency += latency
+                self._stats.max_latency = max(self._stats.max_latency, latency)
+            self._stats.delivered += n
+            return messages
+
+    def _forget(self, message: Message):
+        if message.coalesce_key is not None:
+            self._keyed.pop((message.from_plugin, message.coalesce_key), None)
+
+    def clear(self):
+        """丢弃所有排队的消息, 不计入丢弃数."""
+        with self._lock:
+            self._queue.clear()
+            self._keyed.clear()
+
+    def stats(self) -> MailboxStats:
+        """获取计数器快照."""
+        with self._lock:
+            stats = self._stats.copy()
+            stats.depth = len(self._queue)
+            return stats
+
+    def __len__(self):
+        return len(self._queue)
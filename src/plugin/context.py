@@ -2,13 +2,17 @@ from __future__ import annotations
 
 import datetime
 import logging
+import threading
+import time
 from copy import deepcopy
+from concurrent.futures import Future
 from pathlib import Path
-from typing import Callable, Any
+from typing import Callable, Any, Coroutine, Optional, Hashable
 
 from src import SRC_DIR_PATH
 from src.log import project_logger
-from src.uia.login import LoginCache
+from src.net.client import HttpClient, shared_client
+from src.uia.cache import LoginCache
 
 
 def is_json_serializable(obj):
@@ -22,58 +26,161 @@ def is_json_serializable(obj):
     return False
 
 
+def _immutable(self, *args, **kwargs):
+    raise TypeError(f"{type(self).__name__} is immutable, "
+                    f"use copy.deepcopy to get a mutable copy.")
+
+
+class FrozenList(list):
+    """
+    不可修改的 list, 由 PluginCache 返回, 可以像 list 一样读取和进行 json 序列化.
+
+    使用 copy.copy 或者 copy.deepcopy 可以得到可修改的普通 list.
+    """
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _immutable
+    append = extend = insert = pop = remove = clear = sort = reverse = _immutable
+
+    def __copy__(self):
+        return list(self)
+
+    def __deepcopy__(self, memo):
+        return [deepcopy(item, memo) for item in self]
+
+    def __reduce__(self):
+        return FrozenList, (list(self),)
+
+
+class FrozenDict(dict):
+    """
+    不可修改的 dict, 由 PluginCache 返回, 可以像 dict 一样读取和进行 json 序列化.
+
+    使用 copy.copy 或者 copy.deepcopy 可以得到可修改的普通 dict.
+    """
+    __setitem__ = __delitem__ = __ior__ = _immutable
+    update = setdefault = pop = popitem = clear = _immutable
+
+    def __copy__(self):
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        return {key: deepcopy(value, memo) for key, value in self.items()}
+
+    def __reduce__(self):
+        return FrozenDict, (dict(self),)
+
+
+def freeze(obj):
+    """
+    检查 obj 是否可以被 json 序列化, 并转换为不可修改的结构, 只遍历 obj 一次.
+
+    - list 和 tuple 转换为 FrozenList, dict 转换为 FrozenDict, 其他可序列化的值原样返回.
+    - 已经是 FrozenList 或者 FrozenDict 的部分不再遍历, 直接共享.
+
+    Raises:
+        ValueError: obj 不能被 json 序列化.
+
+    Examples:
+
+    >>> frozen = freeze({"history": [1, 2.5, "3"], "ok": True})
+    >>> frozen
+    {'history': [1, 2.5, '3'], 'ok': True}
+    >>> frozen["history"].append(4)
+    Traceback (most recent call last):
+    ...
+    TypeError: FrozenList is immutable, use copy.deepcopy to get a mutable copy.
+    >>> freeze(frozen) is frozen
+    True
+    """
+    if isinstance(obj, (FrozenList, FrozenDict, str, int, float, bool, type(None))):
+        return obj
+    if isinstance(obj, (list, tuple)):
+        return FrozenList([freeze(item) for item in obj])
+    if isinstance(obj, dict):
+        if not all(isinstance(key, str) for key in obj):
+            raise ValueError("Cache object can only accept json serializable object.")
+        return FrozenDict({key: freeze(value) for key, value in obj.items()})
+    raise ValueError("Cache object can only accept json serializable object.")
+
+
 class PluginCache:
     """
     插件持久化保存数据存储对象, 只能存放 json 可序列化对象,
     可以把 PluginCache 看成一个`映射`数据结构,
     但是只允许特定的写入方法对数据进行修改.
+
+    写入的 list / tuple 和 dict 会被转换为不可修改的 FrozenList 和 FrozenDict 保存,
+    读取时直接返回保存的对象而不复制, 需要修改时请先复制, 修改后再写入.
+
+    写入的内容会在一段时间后自动持久化保存, 见 PluginCacheStore.
     """
-    __OBJ = object()
 
     def __init__(self, name: str):
         self.__dic = {}
         self.__name = name
-        self._last_routine = 0  # 上一次 routine 执行的时间, (s).
+        self.__last_routine = 0  # 上一次 routine 执行的时间, (s).
+        self.__lock = threading.Lock()
+        self._on_change: Callable[[], None] = lambda: None  # 内容被修改后调用, 由 PluginCacheStore 设置.
 
-    def _check_serializable(self, obj=__OBJ):
-        if obj == self.__OBJ:
-            obj = self.__dic
-        if not is_json_serializable(obj):
-            raise ValueError("Cache object can only accept json serializable object.")
+    @property
+    def _last_routine(self) -> float:
+        return self.__last_routine
+
+    @_last_routine.setter
+    def _last_routine(self, value: float):
+        self.__last_routine = value
+        self._on_change()
 
     def _load_from(self, json_obj):
         """从可序列化对象中恢复, 可以为 None, 此时使用默认的 Cache, 即原 Cache 被删除或者第一次创建 Cache"""
         if json_obj is None:
             return
-        self._check_serializable(json_obj)
         if json_obj['name'] != self.__name:
             raise ValueError("Incorrect plugin name.")
-        self._last_routine = json_obj['last_routine']
-        self.__dic.update(json_obj['cache'])
+        cache = freeze(json_obj['cache'])
+        with self.__lock:
+            self.__last_routine = json_obj['last_routine']
+            self.__dic.update(cache)
 
     def _serialize(self):
-        return deepcopy({
-            'name': self.__name,
-            'last_routine': self._last_routine,
-            'cache': self.__dic
-        })
+        """
+        获取可序列化的对象, 由于保存的值都不可修改, 只复制最外层的 dict,
+        返回值可以在不持有锁的情况下进行 json 序列化.
+        """
+        with self.__lock:
+            return {
+                'name': self.__name,
+                'last_routine': self.__last_routine,
+                'cache': dict(self.__dic)
+            }
 
     def get(self, item):
-        """获取 cache 内容的一个副本, 在返回值中进行数据修改不会反应到持久化保存内容中"""
-        return deepcopy(self.__dic[item])
+        """
+        获取 cache 中保存的值, list 和 dict 以 FrozenList 和 FrozenDict 的形式返回, 不能直接修改,
+        需要修改时使用 copy.deepcopy 获取可修改的副本.
+        """
+        return self.__dic[item]
 
     def set(self, key, value):
-        """在此处写入需要持久化的内容, value 仅支持可 json 化的对象, key 只支持字符串"""
+        """
+        在此处写入需要持久化的内容, value 仅支持可 json 化的对象, key 只支持字符串.
+
+        写入的是 value 的不可修改副本, 之后修改 value 不会影响 cache 的内容,
+        value 中从 get 获取的部分不会被再次复制.
+        """
         if not isinstance(key, str):
             raise TypeError("key must be a string.")
-        self._check_serializable(key)
-        self._check_serializable(value)
-        self.__dic[key] = value
+        value = freeze(value)
+        with self.__lock:
+            self.__dic[key] = value
+        self._on_change()
 
     def remove(self, key):
         """从 cache 中移除 key 的数据, 如果 key 不在 cache 中, 不会发生任何事"""
-        if key in self.__dic:
+        with self.__lock:
+            if key not in self.__dic:
+                return
             del self.__dic[key]
+        self._on_change()
 
     def __getitem__(self, item):
         return self.get(item)
@@ -94,18 +201,26 @@ class ForwardLoggerHandler(logging.Handler):
         self.target.handle(record)
 
 
+PLUGIN_DATA_DIR = SRC_DIR_PATH.parent / "plugin_data"  # 插件保存数据文件的目录, 每个插件一个子目录.
+
+
 class PluginContext:
 
     def __init__(self, name: str):
         self.__name = name  # 插件名称.
+        self._data_dir = PLUGIN_DATA_DIR / name
         self.__logger = logging.Logger(f"plugin-{self.__name}")
         self.__logger.addHandler(ForwardLoggerHandler(project_logger))
         self._uia_cache: LoginCache | None = None
         self._plugin_cache = PluginCache(self.__name)  # 插件持久化保存数据的位置, 同时也是存放 routine 状态的位置.
         self._report_cache_invalid: Callable[[str], None] = lambda s: None
-        self._queue_message: Callable[[str, str, Any], None] = lambda a, b, c: None
+        self._queue_message: Callable[[str, str, Any, Optional[Hashable]], None] = lambda a, b, c, d: None
         self._is_plugin_loaded: Callable[[str], bool] = lambda a: False
         self._bind_action: Callable[[str, str, Callable[[], None]], None] = lambda n, bt, cb: None
+        self._run_coroutine: Callable[[str, Coroutine, Optional[Callable[[Any], None]]],
+                                      Optional[Future]] = lambda n, c, cb: c.close()
+        self._call_at: Callable[[str, float, Callable[[PluginContext], Any]], Optional[int]] = lambda n, t, cb: None
+        self._cancel_call: Callable[[str, int], bool] = lambda n, h: False
 
     def bind_action(self, action_text: str, action_callback: Callable[[], None]):
         """
@@ -118,6 +233,58 @@ class PluginContext:
         """
         self._bind_action(self.__name, action_text, action_callback)
 
+    def run_coroutine(self, coro: Coroutine,
+                      callback: Callable[[Any], None] = None) -> Optional[Future]:
+        """
+        在 PluginLoader 的事件循环中执行协程, 不阻塞调用方.
+
+        只有被加载的插件才能执行协程, 否则协程会被直接关闭.
+
+        Parameters:
+            coro: 要执行的协程.
+            callback: 协程正常结束后在主线程中以协程返回值调用, 协程抛出的异常会被记录到日志中.
+
+        Returns:
+            协程返回值的 Future, 如果插件未被加载, 返回 None.
+        """
+        return self._run_coroutine(self.__name, coro, callback)
+
+    def call_at(self, timestamp: float, callback: Callable[[PluginContext], Any]) -> Optional[int]:
+        """
+        在指定时间调用回调, 回调和 on_routine 等事件函数一样在插件的串行执行器中执行.
+
+        只有被加载的插件才能安排回调, 插件被卸载时未执行的回调被取消.
+
+        Parameters:
+            timestamp: 调用时间 (time.time() 时间戳), 早于当前时间时尽快调用.
+            callback: 以插件上下文为参数的回调, 抛出的异常和事件函数一样被处理 (例如 LoginError).
+
+        Returns:
+            用于 cancel_call 的句柄, 如果插件未被加载, 返回 None.
+        """
+        return self._call_at(self.__name, timestamp, callback)
+
+    def call_later(self, delay: float, callback: Callable[[PluginContext], Any]) -> Optional[int]:
+        """在 delay 秒后调用回调, 见 call_at."""
+        return self.call_at(time.time() + delay, callback)
+
+    def cancel_call(self, handle: int) -> bool:
+        """
+        取消 call_at / call_later 安排的回调.
+
+        Returns:
+            回调是否在执行之前被取消.
+        """
+        return self._cancel_call(self.__name, handle)
+
+    @property
+    def http(self) -> HttpClient:
+        """
+        共享的 HTTP 客户端, 按照域名保持连接, 请求默认带有超时时间,
+        可以通过 cache 参数自动附加 LoginCache 中 Cache 对象的登录信息, 见 HttpClient.
+        """
+        return shared_client()
+
     def last_routine(self):
         return datetime.datetime.fromtimestamp(self._plugin_cache._last_routine)
 
@@ -133,7 +300,7 @@ class PluginContext:
 
     def get_cache(self) -> PluginCache:
         """
-        获取插件自身的 cache, 插件 cache 会在插件被加载时被加载, 在插件被 unload 的时候持久化保存.
+        获取插件自身的 cache, 插件 cache 会在插件被加载时被加载, 被修改后会在几秒内持久化保存.
 
         插件可以在 on_load 触发及其之后获取有效的 cache.
 
@@ -141,6 +308,16 @@ class PluginContext:
         """
         return self._plugin_cache
 
+    def get_data_dir(self) -> Path:
+        """
+        获取插件专属的数据目录, 目录不存在时创建.
+
+        与 plugin cache 不同, 此目录用于保存较大的或者二进制的数据文件 (例如历史记录),
+        由插件自己管理文件的格式和清理.
+        """
+        self._data_dir.mkdir(parents=True, exist_ok=True)
+        return self._data_dir
+
     def get_logger(self):
         """获取插件专属的 logger"""
         return self.__logger
@@ -156,9 +333,17 @@ class PluginContext:
     def is_plugin_loaded(self, plugin_name: str) -> bool:
         return self._is_plugin_loaded(plugin_name)
 
-    def send_message(self, plugin_name: str, obj: Any) -> None:
+    def send_message(self, plugin_name: str, obj: Any, coalesce_key: Hashable = None) -> None:
         """
         向其他插件发送消息, 如果对应插件没有被加载, 则不会发生任何事情.
+
+        消息按照发送顺序投递, 接收方的邮箱已满时, 根据接收方注册时指定的策略丢弃消息.
+
+        Parameters:
+            plugin_name: 接收消息的插件.
+            obj: 附加的信息对象.
+            coalesce_key: 合并键, 如果本插件之前发送的相同合并键的消息还没有被投递,
+                          那条消息的内容会被替换为 obj, 而不会再投递一条新消息.
         """
         if self.is_plugin_loaded(plugin_name):
-            self._queue_message(plugin_name, self.__name, obj)
+            self._queue_message(plugin_name, self.__name, obj, coalesce_key)
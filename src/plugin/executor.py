@@ -0,0 +1,233 @@
+"""
+插件回调执行器.
+
+每个插件拥有一个串行执行器, 同一插件的回调按照提交顺序依次执行, 不同插件的回调在线程池中并行执行,
+回调的结果通过 GuiDispatcher 转交回主线程处理.
+
+async def 定义的回调不占用线程池, 而是在 AsyncRuntime 的事件循环中执行, 但同样遵循串行顺序.
+"""
+from __future__ import annotations
+
+import inspect
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, CancelledError
+from typing import Callable, Optional, Hashable
+
+from PySide6.QtCore import QObject, Signal, Slot, QRunnable, QThreadPool
+
+from src.plugin.runtime import AsyncRuntime
+
+__all__ = [
+    "DEFAULT_CALLBACK_TIMEOUT",
+    "GuiDispatcher", "SerialExecutor", "Job",
+]
+
+DEFAULT_CALLBACK_TIMEOUT = 60  # 单个插件回调的默认超时时间 (s).
+
+
+class GuiDispatcher(QObject):
+    """
+    把函数转交到此对象所在的线程 (主线程) 执行.
+
+    需要在主线程中创建, 且主线程需要运行 Qt 事件循环.
+    """
+    _call = Signal(object)
+
+    def __init__(self):
+        super().__init__()
+        self._call.connect(self._run)
+
+    @Slot(object)
+    def _run(self, func: Callable[[], None]):
+        func()
+
+    def post(self, func: Callable[[], None]):
+        """在主线程中执行 func, 在任意线程中调用此方法都是安全的."""
+        self._call.emit(func)
+
+
+class Job:
+    """提交给 SerialExecutor 的一次回调."""
+
+    def __init__(self, name: str, target: Callable, args: tuple,
+                 key: Optional[Hashable], timeout: float):
+        self.name = name  # 回调名称, 用于日志.
+        self.target = target
+        self.args = args
+        self.key = key
+        self.timeout = timeout
+        self.future: Future = Future()
+        self.started_at: Optional[float] = None  # time.monotonic() 时间.
+        self.timed_out = False
+        self.is_async = inspect.iscoroutinefunction(target)
+
+    def deadline(self) -> Optional[float]:
+        """
+        超时的 time.monotonic() 时刻, 如果还没开始执行, 返回 None.
+
+        async 回调超时会被事件循环取消, 不需要检查, 也返回 None.
+        """
+        if self.started_at is None or self.is_async:
+            return None
+        return self.started_at + self.timeout
+
+
+class _JobRunnable(QRunnable):
+    def __init__(self, executor: SerialExecutor, job: Job):
+        super().__init__()
+        self.executor = executor
+        self.job = job
+
+    def run(self):
+        self.executor._run(self.job)
+
+
+class SerialExecutor:
+    """
+    串行执行器, 保证提交的回调一个接一个地在线程池中执行.
+
+    Python 无法强行终止线程, 因此超时的同步回调不会被打断, 只会被 check_timeout 报告出来,
+    在它返回之前, 同一执行器中的后续回调仍然需要等待.
+    async 回调超时则会被取消, 其 Future 得到 TimeoutError.
+    """
+
+    def __init__(self, name: str, pool: QThreadPool,
+                 timeout: float = DEFAULT_CALLBACK_TIMEOUT,
+                 on_started: Callable[[], None] = lambda: None,
+                 runtime: AsyncRuntime = None):
+        """
+        Parameters:
+            name: 执行器名称, 一般为插件名称.
+            pool: 执行同步回调的线程池.
+            timeout: 单个回调的默认超时时间 (s).
+            on_started: 每当一个同步回调开始执行时, 在工作线程中调用.
+            runtime: 执行 async 回调的事件循环, 为 None 时不能提交 async 回调.
+        """
+        self.name = name
+        self._pool = pool
+        self._runtime = runtime
+        self._timeout = timeout
+        self._on_started = on_started
+        self._lock = threading.RLock()
+        self._idle = threading.Condition(self._lock)
+        self._queue: deque[Job] = deque()
+        self._running: Optional[Job] = None
+        self._keys: set[Hashable] = set()  # 排队或正在执行的回调的 key.
+        self._closed = False
+
+    def submit(self, name: str, target: Callable, *args,
+               key: Hashable = None, timeout: float = None) -> Optional[Future]:
+        """
+        提交一个回调.
+
+        Parameters:
+            name: 回调名称.
+            target: 回调函数.
+            args: 回调参数.
+            key: 如果不为 None, 当相同 key 的回调还在排队或执行时, 本次提交被合并 (丢弃).
+            timeout: 超时时间, 默认为执行器的超时时间.
+
+        Returns:
+            回调结果的 Future, 如果提交被合并或者执行器已经关闭, 返回 None.
+        """
+        job = Job(name, target, args, key, self._timeout if timeout is None else timeout)
+        if job.is_async and self._runtime is None:
+            raise ValueError(f"{self.name}: async callback {name} requires an AsyncRuntime.")
+        with self._lock:
+            if self._closed or (key is not None and key in self._keys):
+                return None
+            if key is not None:
+                self._keys.add(key)
+            self._queue.append(job)
+            if self._running is None:
+                self._start_next()
+        return job.future
+
+    def _start_next(self):
+        """需要持有锁调用."""
+        while self._queue:
+            job = self._queue.popleft()
+            if job.future.set_running_or_notify_cancel():
+                self._running = job
+                if job.is_async:
+                    job.started_at = time.monotonic()
+                    self._runtime.submit(job.target(*job.args), job.timeout) \
+                        .add_done_callback(lambda f, j=job: self._finish_async(j, f))
+                else:
+                    self._pool.start(_JobRunnable(self, job))
+                return
+            self._keys.discard(job.key)
+        self._running = None
+        self._idle.notify_all()
+
+    def _run(self, job: Job):
+        job.started_at = time.monotonic()
+        self._on_started()
+        try:
+            result = job.target(*job.args)
+        except BaseException as e:
+            job.future.set_exception(e)
+        else:
+            job.future.set_result(result)
+        finally:
+            self._finish(job)
+
+    def _finish_async(self, job: Job, future: Future):
+        if future.cancelled():
+            job.future.set_exception(CancelledError())
+        elif future.exception() is not None:
+            job.future.set_exception(future.exception())
+        else:
+            job.future.set_result(future.result())
+        self._finish(job)
+
+    def _finish(self, job: Job):
+        with self._lock:
+            self._keys.discard(job.key)
+            self._start_next()
+
+    def check_timeout(self, now: float) -> Optional[Job]:
+        """
+        检查正在执行的回调是否超时, 每个超时的回调只会被报告一次.
+
+        Parameters:
+            now: time.monotonic() 时间.
+
+        Returns:
+            新发现超时的回调, 没有则返回 None.
+        """
+        job = self._running
+        if job is None or job.timed_out:
+            return None
+        deadline = job.deadline()
+        if deadline is not None and now >= deadline:
+            job.timed_out = True
+            return job
+        return None
+
+    def timeout_deadline(self) -> Optional[float]:
+        """正在执行的回调的超时时刻 (time.monotonic() 时间), 如果没有需要检查的回调, 返回 None."""
+        job = self._running
+        if job is None or job.timed_out:
+            return None
+        return job.deadline()
+
+    def shutdown(self, wait: float = 0) -> bool:
+        """
+        关闭执行器, 取消所有排队的回调, 并等待正在执行的回调结束.
+
+        Parameters:
+            wait: 最长等待时间 (s).
+
+        Returns:
+            执行器是否已经空闲.
+        """
+        with self._lock:
+            self._closed = True
+            while self._queue:
+                job = self._queue.popleft()
+                job.future.cancel()
+                self._keys.discard(job.key)
+            return self._idle.wait_for(lambda: self._running is None, wait)
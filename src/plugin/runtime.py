@@ -0,0 +1,90 @@
+"""
+插件异步运行时.
+
+PluginLoader 持有一个长期运行的 asyncio 事件循环, 所有插件的 async 事件函数和协程都在此循环中执行,
+这样不同插件的网络等待可以在同一个线程中交错进行, 而不需要每次调用都创建新的事件循环.
+"""
+from __future__ import annotations
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Coroutine, Optional
+
+__all__ = ["AsyncRuntime"]
+
+
+class AsyncRuntime:
+    """
+    在独立线程中运行的 asyncio 事件循环, 第一次提交协程时启动.
+
+    协程的结果通过 concurrent.futures.Future 返回, 可以在任意线程中等待或者添加回调,
+    PluginLoader 再通过 GuiDispatcher 把结果转交回 Qt 主线程.
+
+    Examples:
+
+    >>> runtime = AsyncRuntime()
+    >>> async def add(a, b):
+    ...     await asyncio.sleep(0)
+    ...     return a + b
+    >>> runtime.submit(add(1, 2)).result(5)
+    3
+    >>> runtime.close()
+    """
+
+    def __init__(self, name: str = "plugin-asyncio"):
+        self._name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._run, args=(self._loop,),
+                                                name=self._name, daemon=True)
+                self._thread.start()
+            return self._loop
+
+    @staticmethod
+    def _run(loop: asyncio.AbstractEventLoop):
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_forever()
+        finally:
+            loop.close()
+
+    @property
+    def running(self) -> bool:
+        return self._loop is not None
+
+    def submit(self, coro: Coroutine, timeout: float = None) -> Future:
+        """
+        在事件循环中执行协程, 可在任意线程调用.
+
+        Parameters:
+            coro: 要执行的协程.
+            timeout: 超时时间 (s), 超时后协程被取消, Future 得到 TimeoutError.
+        """
+        if timeout is not None:
+            coro = asyncio.wait_for(coro, timeout)
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_started())
+
+    def close(self, timeout: float = 5):
+        """取消所有未完成的协程并停止事件循环, 最多等待 timeout 秒."""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+
+        async def shutdown():
+            tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            loop.stop()
+
+        asyncio.run_coroutine_threadsafe(shutdown(), loop)
+        thread.join(timeout)
@@ -0,0 +1,92 @@
+"""
+插件回调调度.
+
+以截止时间为键的最小堆, PluginLoader 用它来决定下一次需要唤醒的时刻,
+每次轮询只处理已经到期的条目, 而不是遍历所有插件.
+"""
+from __future__ import annotations
+
+import heapq
+import itertools
+from typing import Generic, TypeVar, Hashable, Optional
+
+__all__ = ["DeadlineScheduler"]
+
+K = TypeVar("K", bound=Hashable)
+
+_REMOVED = object()  # 标记被取消的堆条目, 条目在弹出时被跳过.
+
+
+class DeadlineScheduler(Generic[K]):
+    """
+    截止时间调度器, 每个键最多只有一个有效的截止时间.
+
+    - schedule / cancel / pop_due 的开销均为 O(log n).
+    - 被取消或者被重新安排的旧条目不会立即从堆中删除, 而是在弹出时被丢弃.
+
+    Examples:
+
+    >>> s = DeadlineScheduler()
+    >>> s.schedule("a", 10.0)
+    >>> s.schedule("b", 5.0)
+    >>> s.next_deadline()
+    5.0
+    >>> s.pop_due(7.0)
+    ['b']
+    >>> s.schedule("a", 3.0)  # 重新安排会覆盖之前的截止时间.
+    >>> s.pop_due(7.0)
+    ['a']
+    >>> s.next_deadline() is None
+    True
+    """
+
+    def __init__(self):
+        self._heap: list[list] = []  # 元素: [deadline, seq, key]
+        self._entries: dict[K, list] = {}
+        self._counter = itertools.count()  # 保证相同截止时间的条目按照安排顺序弹出.
+
+    def schedule(self, key: K, deadline: float):
+        """安排 key 在 deadline (时间戳, 秒) 到期, 如果 key 已经被安排, 则覆盖原来的截止时间."""
+        self.cancel(key)
+        entry = [deadline, next(self._counter), key]
+        self._entries[key] = entry
+        heapq.heappush(self._heap, entry)
+
+    def cancel(self, key: K) -> bool:
+        """取消 key 的安排, 返回 key 之前是否被安排."""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        entry[2] = _REMOVED
+        return True
+
+    def deadline_of(self, key: K) -> Optional[float]:
+        """获取 key 的截止时间, 如果 key 没有被安排, 返回 None."""
+        entry = self._entries.get(key)
+        return None if entry is None else entry[0]
+
+    def next_deadline(self) -> Optional[float]:
+        """获取最近的截止时间, 如果没有任何安排, 返回 None."""
+        self._discard_removed()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: float) -> list[K]:
+        """弹出所有截止时间不晚于 now 的 key, 按照截止时间先后排列."""
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            _, _, key = heapq.heappop(self._heap)
+            if key is _REMOVED:
+                continue
+            del self._entries[key]
+            due.append(key)
+        return due
+
+    def _discard_removed(self):
+        while self._heap and self._heap[0][2] is _REMOVED:
+            heapq.heappop(self._heap)
+
+    def __contains__(self, key: K) -> bool:
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,134 @@
+"""
+插件 cache 持久化.
+
+整个 plugin_cache.json 只在第一次使用时读取一次, 之后所有插件的 cache 都保存在内存中,
+被修改的插件 cache 在一段防抖时间后统一写回文件.
+"""
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+from src.log import project_logger
+from src.plugin.context import PluginCache
+
+__all__ = ["PluginCacheStore", "DEFAULT_FLUSH_DELAY"]
+
+DEFAULT_FLUSH_DELAY = 5  # 插件 cache 被修改后, 延迟写入文件的时间 (s).
+
+
+class PluginCacheStore:
+    """
+    插件 cache 存储.
+
+    - 被附加 (attach) 的 PluginCache 发生修改时, 对应插件被标记为脏, 并在 flush_delay 秒后写入文件,
+      防抖时间内的多次修改只会触发一次写入.
+    - 写入时只重新序列化脏的插件 cache, 其他插件 (包括未加载的插件) 的内容保持上一次读取或者写入时的状态.
+    - 写入先写到同目录的临时文件, 再替换原文件, 写入过程中崩溃不会损坏原有的文件.
+
+    Note:
+        除了 mark_dirty, 其他方法只应在主线程中调用.
+    """
+
+    def __init__(self, path: str | Path, flush_delay: float = DEFAULT_FLUSH_DELAY,
+                 on_scheduled: Callable[[], None] = lambda: None):
+        """
+        Parameters:
+            path: cache 文件路径.
+            flush_delay: 防抖时间 (s).
+            on_scheduled: 安排了新的写入时刻时调用, 可能在非主线程中调用.
+        """
+        self.path = Path(path)
+        self.flush_delay = flush_delay
+        self._on_scheduled = on_scheduled
+        self._data: Optional[dict] = None  # 文件内容, 第一次使用时读取.
+        self._caches: dict[str, PluginCache] = {}  # 已附加的插件 cache.
+        self._dirty: set[str] = set()
+        self._deadline: Optional[float] = None  # 下一次写入的 time.monotonic() 时刻.
+        self._lock = threading.RLock()
+
+    def _ensure_loaded(self) -> dict:
+        if self._data is None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._data = json.load(f)
+            except FileNotFoundError:
+                self._data = {}
+            except (json.JSONDecodeError, UnicodeDecodeError) as e:
+                project_logger.error(f"plugin cache file is corrupted, starting with an empty cache: {e}")
+                self._data = {}
+        return self._data
+
+    def attach(self, name: str, cache: PluginCache):
+        """从文件内容中恢复插件 cache, 并开始跟踪其修改."""
+        with self._lock:
+            cache._load_from(self._ensure_loaded().get(name))
+            cache._on_change = lambda: self.mark_dirty(name)
+            self._caches[name] = cache
+
+    def detach(self, name: str):
+        """停止跟踪插件 cache 的修改, 其最终内容会在下一次写入时保存."""
+        with self._lock:
+            cache = self._caches.pop(name, None)
+            if cache is None:
+                return
+            cache._on_change = lambda: None
+            self._data[name] = cache._serialize()
+            self.mark_dirty(name)
+
+    def mark_dirty(self, name: str):
+        """标记插件 cache 被修改, 可在任意线程中调用."""
+        with self._lock:
+            self._dirty.add(name)
+            if self._deadline is not None:
+                return
+            self._deadline = time.monotonic() + self.flush_delay
+        self._on_scheduled()
+
+    def flush_deadline(self) -> Optional[float]:
+        """下一次写入的 time.monotonic() 时刻, 如果没有需要写入的内容, 返回 None."""
+        return self._deadline
+
+    def flush_due(self, now: float):
+        """如果已经到达写入时刻, 则写入文件."""
+        if self._deadline is not None and now >= self._deadline:
+            self.flush()
+
+    def flush(self):
+        """立即把所有脏的插件 cache 写入文件, 没有被修改的内容时不做任何事."""
+        with self._lock:
+            if not self._dirty:
+                self._deadline = None
+                return
+            data = self._ensure_loaded()
+            for name in self._dirty:
+                cache = self._caches.get(name)
+                if cache is not None:
+                    data[name] = cache._serialize()
+            dirty, self._dirty, self._deadline = self._dirty, set(), None
+            try:
+                self._write(data)
+            except OSError as e:
+                project_logger.error(f"failed to save plugin cache: {e}")
+                self._dirty |= dirty
+                self._deadline = time.monotonic() + self.flush_delay
+
+    def _write(self, data: dict):
+        fd, tmp = tempfile.mkstemp(prefix=self.path.name, suffix=".tmp", dir=self.path.parent)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
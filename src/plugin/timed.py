@@ -0,0 +1,201 @@
+"""
+在服务器时间的某一时刻精确发出的预约.
+
+Routine.MINUTELY 的触发时刻有一分钟以内的抖动, 不适合在预约开放的瞬间抢预约.
+TimedReservation 把一次预约分为两个阶段:
+
+1. 准备: 在目标时刻前 prepare_lead 秒, 通过 PluginContext.call_at 在插件的串行执行器中查询候选,
+   预先构建 (加密) 所有请求, 然后用 ServerClock 同步服务器时钟, 同时预热到服务器的连接.
+2. 发出: 准备完成后立即启动一个专用线程, 在其中精确等待到按照服务器时钟修正后的目标时刻, 依次提交候选.
+   发出不经过 GUI 的轮询定时器和插件的串行执行器, 因此不会被定时器的误差或者正在执行的其他回调推迟.
+   发出之后再通过 call_at 在执行器中报告结果.
+"""
+from __future__ import annotations
+
+import datetime
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Optional
+
+from src.log import project_logger
+from src.net.client import HttpClient
+from src.net.clock import DEFAULT_SAMPLES, SPIN_WINDOW, ServerClock, sleep_until
+from src.net.resilience import ServerUnavailableError
+from src.plugin.context import PluginContext
+
+__all__ = ["PREPARE_LEAD", "FIRE_LEAD", "next_occurrence", "TimedReservation"]
+
+PREPARE_LEAD = 60.0  # 在目标时刻前多少秒开始准备, 需要足够完成查询和时钟同步.
+# 准备完成, 发出线程开始等待时距离目标时刻至少应有的时间 (s). 准备步骤可能被执行器中正在执行的回调推迟
+# (单个请求的读取超时为 30s), 加上查询和同步的时间, 需要为其留出的余量为 prepare_lead - fire_lead.
+FIRE_LEAD = 10.0
+
+
+def next_occurrence(at: datetime.time, lead: float = PREPARE_LEAD,
+                    now: datetime.datetime = None) -> datetime.datetime:
+    """
+    每天 at 时刻中, 距离现在还有至少 lead 秒 (来得及准备) 的最近一次.
+
+    >>> next_occurrence(datetime.time(7), now=datetime.datetime(2024, 12, 2, 6, 59, 30))
+    datetime.datetime(2024, 12, 3, 7, 0)
+    """
+    now = now or datetime.datetime.now()
+    target = datetime.datetime.combine(now.date(), at)
+    if (target - now).total_seconds() < lead:
+        target += datetime.timedelta(days=1)
+    return target
+
+
+class TimedReservation(ABC):
+    """
+    定时预约, 子类实现 prepare 和 fire.
+
+    Examples:
+
+    >>> class MyReservation(TimedReservation):
+    ...     def prepare(self):
+    ...         self.payload = build_payload()
+    ...     def fire(self):
+    ...         return submit(self.payload)
+    >>> reservation = MyReservation(datetime.datetime(2024, 12, 2, 7), ctx.http, "https://example.ecnu.edu.cn/")
+    >>> reservation.arm(ctx, lambda r: print(r.result, r.fire_error))
+    """
+
+    def __init__(self, target: datetime.datetime, http: HttpClient, sync_url: str,
+                 prepare_lead: float = PREPARE_LEAD, fire_lead: float = FIRE_LEAD):
+        """
+        Parameters:
+            target: 发出预约的服务器时间 (本地时区).
+            http: 发送请求的客户端, 时钟同步和预约需要使用同一个客户端才能复用预热的连接.
+            sync_url: 用于同步时钟和预热连接的地址, 应该与预约请求在同一个域名下.
+            prepare_lead: 在目标时刻前多少秒准备.
+            fire_lead: 准备完成时距离目标时刻至少应有的时间, 不足时记录警告, 见 FIRE_LEAD.
+        """
+        if not 0 < fire_lead < prepare_lead:
+            raise ValueError("timed-reservation: leads must satisfy 0 < fire_lead < prepare_lead.")
+        self.target = target
+        self.http = http
+        self.sync_url = sync_url
+        self.prepare_lead = prepare_lead
+        self.fire_lead = fire_lead
+        self.clock = ServerClock()
+        self.sync_samples = DEFAULT_SAMPLES  # 同步时钟的最多请求次数.
+        self.prepared = False
+        self.result: Any = None  # fire 的返回值.
+        self.fired_at: Optional[float] = None  # 发出时的估计服务器时间戳.
+        self.fire_error: Optional[float] = None  # 发出时刻与目标时刻之差 (s), 按照服务器时钟计算.
+        self.elapsed: Optional[float] = None  # fire 的耗时 (s).
+        self._handle: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self._cancelled = threading.Event()
+
+    @property
+    def target_timestamp(self) -> float:
+        return self.target.timestamp()
+
+    @abstractmethod
+    def prepare(self) -> None:
+        """查询候选并预先构建请求, 在目标时刻前 prepare_lead 秒在插件的执行器中调用."""
+
+    @abstractmethod
+    def fire(self) -> Any:
+        """提交预先构建的请求, 在目标时刻在发出线程中调用, 返回值保存在 result 中."""
+
+    def run_prepare(self):
+        """准备并同步服务器时钟, 同步失败时使用本地时钟."""
+        self.prepare()
+        self.prepared = True
+        try:
+            uncertainty = self.clock.sync(self.http, self.sync_url, self.sync_samples)
+        except (ServerUnavailableError, ValueError) as e:
+            project_logger.warning(f"timed-reservation: failed to sync server clock, using local clock: {e}")
+            return
+        project_logger.info(f"timed-reservation: prepared for {self.target}, "
+                            f"server clock offset {self.clock.offset * 1000:+.1f}ms ± {uncertainty * 1000:.1f}ms.")
+
+    def run_fire(self) -> Any:
+        """精确等待到目标时刻并发出."""
+        sleep_until(self.clock.to_local(self.target_timestamp))
+        begin = time.perf_counter()
+        self.fired_at = self.clock.now()
+        self.fire_error = self.fired_at - self.target_timestamp
+        try:
+            self.result = self.fire()
+        finally:
+            self.elapsed = time.perf_counter() - begin
+        project_logger.info(f"timed-reservation: fired {self.fire_error * 1000:+.1f}ms from {self.target}, "
+                            f"took {self.elapsed * 1000:.1f}ms, result: {self.result}.")
+        return self.result
+
+    def arm(self, ctx: PluginContext, on_finish: Callable[[TimedReservation], Any] = None) -> None:
+        """
+        安排准备和发出, 目标时刻已经过去时立即执行.
+
+        Parameters:
+            ctx: 插件上下文.
+            on_finish: 发出之后以此对象为参数在插件的执行器中调用, 准备或者发出抛出异常时不调用,
+                       发出时的异常会在执行器中重新抛出, 由插件加载器处理 (例如 LoginError).
+        """
+
+        def prepare(ctx_: PluginContext):
+            self._handle = None
+            self.run_prepare()
+            remaining = self.clock.to_local(self.target_timestamp) - time.time()
+            if remaining < self.fire_lead:
+                project_logger.warning(f"timed-reservation: prepared only {remaining:.2f}s before {self.target}, "
+                                       f"the preparation was delayed.")
+            self._cancelled = threading.Event()  # 每个发出线程使用自己的事件, 重新安排时不影响旧的线程.
+            self._thread = threading.Thread(target=self._fire_in_thread, args=(ctx_, on_finish, self._cancelled),
+                                            name="timed-reservation-fire", daemon=True)
+            self._thread.start()
+
+        self._handle = ctx.call_at(self.target_timestamp - self.prepare_lead, prepare)
+
+    def _fire_in_thread(self, ctx: PluginContext, on_finish: Optional[Callable[[TimedReservation], Any]],
+                        cancelled: threading.Event):
+        # 在最后 SPIN_WINDOW 秒之前的等待可以被 cancel 打断, 之后由 run_fire 中的 sleep_until 精确等待.
+        deadline = self.clock.to_local(self.target_timestamp) - SPIN_WINDOW
+        if cancelled.wait(max(0.0, deadline - time.time())):
+            return
+        thread = threading.current_thread()
+        error: Optional[Exception] = None
+        try:
+            self.run_fire()
+        except Exception as e:
+            error = e
+
+        def finish(ctx_: PluginContext):
+            if self._thread is thread:
+                self._thread = None
+            if error is not None:
+                raise error
+            if on_finish is not None:
+                on_finish(self)
+
+        ctx.call_at(time.time(), finish)
+
+    @property
+    def armed(self) -> bool:
+        return self._handle is not None or self._thread is not None
+
+    def join(self, timeout: float = None) -> bool:
+        """
+        等待发出线程结束, 返回线程是否已经结束 (没有发出线程时为 True).
+
+        发出之后的结果仍然需要执行器执行 arm 安排的回调才会报告.
+        """
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+            return not thread.is_alive()
+        return True
+
+    def cancel(self, ctx: PluginContext) -> None:
+        """取消还没有执行的准备或者发出, 已经开始提交的请求不会被中断."""
+        if self._handle is not None:
+            ctx.cancel_call(self._handle)
+            self._handle = None
+        if self._thread is not None:
+            self._cancelled.set()
+            self._thread = None
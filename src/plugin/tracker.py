@@ -0,0 +1,133 @@
+"""
+预约的截止时间跟踪.
+
+自动取消即将违约的预约时, 不再每分钟查询一次所有预约并重新解析签到截止时间,
+而是查询一次后按照截止时间保存在 DeadlineScheduler 中, 只为最近的截止时间安排一次 call_at,
+到期时精确地执行回调. 预约只在发生变化 (预约, 取消) 之后, 或者以很低的频率在后台重新查询,
+以发现在其他地方 (例如网页上) 进行的预约.
+"""
+from __future__ import annotations
+
+import time
+from typing import Any, Callable, Hashable, Optional
+
+from src.plugin.context import PluginContext
+from src.plugin.scheduler import DeadlineScheduler
+
+__all__ = ["DEFAULT_CANCEL_LEAD", "DEFAULT_REFRESH_INTERVAL", "ReservationTracker"]
+
+DEFAULT_CANCEL_LEAD = 90.0  # 在截止时间前多少秒执行回调, 原来每分钟检查时在截止前 1~2 分钟取消, 取中间值.
+DEFAULT_REFRESH_INTERVAL = 30 * 60.0  # 没有变化时后台重新查询预约的间隔 (s).
+
+
+class ReservationTracker:
+    """
+    预约跟踪器, 在每个预约的截止时间前 lead 秒调用一次 on_deadline.
+
+    Examples:
+
+    >>> tracker = ReservationTracker(
+    ...     fetch=subscriber.query_subscribes,
+    ...     key_of=lambda s: s["id"],
+    ...     deadline_of=lambda s: datetime.datetime.strptime(s["lastSigninTime"], "%Y-%m-%d %H:%M:%S").timestamp(),
+    ...     on_deadline=lambda s: subscriber.cancel(s["id"]),
+    ... )
+    >>> tracker.start(ctx)  # 使用 ctx.call_at 调度, 直到 stop.
+    >>> tracker.touch(ctx)  # 预约之后尽快重新查询.
+    """
+
+    def __init__(self, fetch: Callable[[], list[dict]], key_of: Callable[[dict], Hashable],
+                 deadline_of: Callable[[dict], float], on_deadline: Callable[[dict], Any],
+                 lead: float = DEFAULT_CANCEL_LEAD, refresh_interval: float = DEFAULT_REFRESH_INTERVAL,
+                 clock: Callable[[], float] = time.time):
+        """
+        Parameters:
+            fetch: 查询所有预约.
+            key_of: 预约的唯一标识.
+            deadline_of: 预约的截止时间 (unix 时间戳), 每次查询后只计算一次.
+            on_deadline: 到达截止时间前 lead 秒时以预约为参数调用, 调用之后视为预约发生了变化.
+            lead: 提前的时间 (s).
+            refresh_interval: 后台重新查询的间隔 (s).
+            clock: 返回当前 unix 时间戳的函数.
+        """
+        self.fetch = fetch
+        self.key_of = key_of
+        self.deadline_of = deadline_of
+        self.on_deadline = on_deadline
+        self.lead = lead
+        self.refresh_interval = refresh_interval
+        self.clock = clock
+        self.fetches = 0  # 查询次数.
+        self._items: dict[Hashable, dict] = {}
+        self._deadlines: DeadlineScheduler[Hashable] = DeadlineScheduler()
+        self._stale = True
+        self._next_refresh = float("-inf")
+        self._handle: Optional[int] = None
+
+    def __len__(self):
+        return len(self._items)
+
+    @property
+    def items(self) -> list[dict]:
+        """跟踪中的预约, 按照截止时间先后排列."""
+        return sorted(self._items.values(), key=lambda item: self._deadlines.deadline_of(self.key_of(item)))
+
+    @property
+    def armed(self) -> bool:
+        return self._handle is not None
+
+    def invalidate(self):
+        """标记预约已经变化, 下一次 poll 时重新查询."""
+        self._stale = True
+
+    def refresh(self):
+        """重新查询所有预约."""
+        items = self.fetch() or []
+        self.fetches += 1
+        self._items = {}
+        self._deadlines = DeadlineScheduler()
+        for item in items:
+            key = self.key_of(item)
+            self._items[key] = item
+            self._deadlines.schedule(key, self.deadline_of(item) - self.lead)
+        self._stale = False
+        self._next_refresh = self.clock() + self.refresh_interval
+
+    def poll(self) -> float:
+        """
+        需要时重新查询, 并为所有已经到期的预约调用 on_deadline.
+
+        Returns:
+            下一次需要调用 poll 的时间 (unix 时间戳).
+        """
+        if self._stale or self.clock() >= self._next_refresh:
+            self.refresh()
+        for key in self._deadlines.pop_due(self.clock()):
+            item = self._items.pop(key)
+            self._stale = True
+            self.on_deadline(item)
+        if self._stale:
+            return self.clock()
+        deadline = self._deadlines.next_deadline()
+        return self._next_refresh if deadline is None else min(deadline, self._next_refresh)
+
+    def _run(self, ctx: PluginContext):
+        self._handle = None
+        wakeup = self.poll()  # 抛出异常时不再安排, 由 start 重新开始.
+        self._handle = ctx.call_at(wakeup, self._run)
+
+    def start(self, ctx: PluginContext):
+        """开始跟踪, 已经开始时什么也不做, 因此可以在 on_routine 中反复调用, 在出错停止之后重新开始."""
+        if self._handle is None:
+            self._handle = ctx.call_at(self.clock(), self._run)
+
+    def stop(self, ctx: PluginContext):
+        if self._handle is not None:
+            ctx.cancel_call(self._handle)
+            self._handle = None
+
+    def touch(self, ctx: PluginContext):
+        """预约发生了变化, 尽快重新查询."""
+        self.invalidate()
+        self.stop(ctx)
+        self.start(ctx)
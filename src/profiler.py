@@ -0,0 +1,183 @@
+"""
+启动性能分析.
+
+设置环境变量 ECNU_PROFILE_STARTUP=1 或者使用 `python main.py --profile-startup` 启动时,
+记录日志初始化, 插件模块导入, 配置加载, 插件事件函数和主窗口构建等启动阶段的耗时,
+所有插件加载完成后在日志中输出按耗时排序的报告, 并写出可以在 chrome://tracing 或者 Perfetto 中查看的 trace 文件.
+
+未启用时, span 不记录任何内容, 开销可以忽略.
+"""
+from __future__ import annotations
+
+import contextlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+__all__ = [
+    "PROFILE_ENV", "PROFILE_FLAG", "REPORT_FILE", "TRACE_FILE",
+    "Span", "StartupProfiler", "startup_profiler",
+]
+
+PROFILE_ENV = "ECNU_PROFILE_STARTUP"
+PROFILE_FLAG = "--profile-startup"
+REPORT_FILE = "startup-profile.txt"
+TRACE_FILE = "startup-trace.json"
+
+
+class Span:
+    """一段被记录的启动阶段."""
+
+    __slots__ = ("name", "category", "start", "duration", "thread_id")
+
+    def __init__(self, name: str, category: str, start: float, duration: float, thread_id: int):
+        self.name = name
+        self.category = category
+        self.start = start  # 相对于分析开始时刻的时间 (s).
+        self.duration = duration  # (s).
+        self.thread_id = thread_id
+
+    def __repr__(self):
+        return f"Span({self.name!r}, {self.category!r}, duration={self.duration * 1000:.1f}ms)"
+
+
+class StartupProfiler:
+    """
+    启动阶段耗时记录器.
+
+    Examples:
+
+    >>> profiler = StartupProfiler()
+    >>> profiler.enable()
+    >>> with profiler.span("import foo", "import"):
+    ...     pass
+    >>> [span.name for span in profiler.spans()]
+    ['import foo']
+    >>> profiler.chrome_trace()["traceEvents"][0]["ph"]
+    'X'
+    """
+
+    def __init__(self):
+        self._enabled = False
+        self._origin = time.perf_counter()
+        self._spans: list[Span] = []
+        self._finished = False
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled
+
+    def enable(self):
+        """开始记录, 之前的记录被清除, 时间从此刻开始计算."""
+        with self._lock:
+            self._enabled = True
+            self._finished = False
+            self._origin = time.perf_counter()
+            self._spans = []
+
+    def enable_from(self, argv: list[str]):
+        """
+        如果设置了环境变量 PROFILE_ENV 或者命令行参数中有 PROFILE_FLAG, 则开始记录.
+
+        PROFILE_FLAG 会从 argv 中移除, 以免传递给 QApplication.
+        """
+        enabled = os.environ.get(PROFILE_ENV, "") not in ("", "0")
+        if PROFILE_FLAG in argv:
+            argv.remove(PROFILE_FLAG)
+            enabled = True
+        if enabled:
+            self.enable()
+
+    def span(self, name: str, category: str = "startup"):
+        """
+        记录 with 语句块的耗时, 未启用或者已经结束记录时不做任何事.
+
+        Parameters:
+            name: 阶段名称, 例如 "import library".
+            category: 阶段分类, 对应 trace 中的 cat 字段.
+        """
+        if not self._enabled or self._finished:
+            return contextlib.nullcontext()
+        return self._record(name, category)
+
+    @contextlib.contextmanager
+    def _record(self, name: str, category: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            with self._lock:
+                self._spans.append(Span(name, category, start - self._origin, end - start,
+                                        threading.get_ident()))
+
+    def spans(self) -> list[Span]:
+        """已经记录的阶段, 按照结束顺序排列."""
+        with self._lock:
+            return list(self._spans)
+
+    def report(self, limit: int = None) -> str:
+        """
+        按照耗时从长到短排列的报告, 嵌套的阶段各自计算完整耗时.
+
+        Parameters:
+            limit: 最多列出的阶段数, 默认全部列出.
+        """
+        spans = sorted(self.spans(), key=lambda s: s.duration, reverse=True)[:limit]
+        total = max((s.start + s.duration for s in self.spans()), default=0.0)
+        lines = [f"startup profile: {total * 1000:.1f}ms in total."]
+        lines.extend(f"{s.duration * 1000:10.1f}ms  {s.category:<10}  {s.name}" for s in spans)
+        return "\n".join(lines)
+
+    def chrome_trace(self) -> dict:
+        """Chrome trace event 格式的记录, 时间单位为微秒."""
+        pid = os.getpid()
+        return {
+            "traceEvents": [{
+                "name": s.name,
+                "cat": s.category,
+                "ph": "X",
+                "ts": round(s.start * 1e6, 3),
+                "dur": round(s.duration * 1e6, 3),
+                "pid": pid,
+                "tid": s.thread_id,
+            } for s in self.spans()],
+            "displayTimeUnit": "ms",
+        }
+
+    def finish(self, output_dir: str | Path = ".") -> Optional[Path]:
+        """
+        结束记录, 把报告写入日志和 REPORT_FILE, 把 trace 写入 TRACE_FILE, 只有第一次调用有效.
+
+        Parameters:
+            output_dir: 报告和 trace 文件所在的目录.
+
+        Returns:
+            trace 文件路径, 未启用或者已经结束记录时返回 None.
+        """
+        from src.log import project_logger
+
+        with self._lock:
+            if not self._enabled or self._finished:
+                return None
+            self._finished = True
+        output_dir = Path(output_dir)
+        report = self.report()
+        trace_path = output_dir / TRACE_FILE
+        try:
+            with open(output_dir / REPORT_FILE, "w", encoding="utf-8") as f:
+                f.write(report + "\n")
+            with open(trace_path, "w", encoding="utf-8") as f:
+                json.dump(self.chrome_trace(), f)
+        except OSError as e:
+            project_logger.error(f"failed to write startup profile: {e}")
+            return None
+        project_logger.info(f"{report}\ntrace written to {trace_path.absolute()}.")
+        return trace_path
+
+
+startup_profiler = StartupProfiler()  # 整个程序共用的启动性能分析器.
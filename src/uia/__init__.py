@@ -1,8 +1,12 @@
 """
 ECNU 统一认证.
 """
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support import expected_conditions as EC
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:  # selenium 导入较慢, 此包被导入时不一定需要浏览器.
+    from selenium.webdriver.support import expected_conditions as EC
 
 def attribute_changes(css_selector: str, attribute_name: str):
     """
@@ -13,6 +17,7 @@ def attribute_changes(css_selector: str, attribute_name: str):
     :param css_selector: 对应元素的 css selector, 如果其包含多个元素, 那么只会取第一个元素.
     :param attribute_name: 要监视的元素属性, 如 <img> 元素的 src 属性.
     """
+    from selenium.webdriver.common.by import By
     prev = None
 
     def _predicate(driver: EC.WebDriverOrWebElement):
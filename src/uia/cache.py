@@ -0,0 +1,135 @@
+"""
+ECNU 统一认证的登录缓存.
+
+此模块不依赖 selenium, 可以在不启动浏览器的情况下导入.
+"""
+from __future__ import annotations
+
+import json
+from typing import Type, TypeVar, Callable, Any, Optional
+
+from src.log import project_logger
+
+__all__ = ["LoginError", "LoginCache", "PROBE_TIMEOUT", "cache_type_of"]
+
+PROBE_TIMEOUT = 10  # Cache 对象 probe 请求的超时时间 (s).
+
+
+class LoginError(Exception):
+    """登录缓存失效时触发."""
+
+    def __init__(self, msg: str = ""):
+        super().__init__(msg)
+
+
+T = TypeVar("T")
+
+
+def _type_key(cache_cls: type) -> str:
+    return f"{cache_cls.__module__}.{cache_cls.__qualname__}"
+
+
+def cache_type_of(cache_grabber: Optional[Callable]) -> Optional[type]:
+    """
+    获取 cache grabber 产生的 Cache 对象的类型, 要求 grabber 是 Cache 类型的 classmethod,
+    例如 LibCache.grab_from_driver, 否则返回 None.
+    """
+    owner = getattr(cache_grabber, "__self__", None)
+    return owner if isinstance(owner, type) else None
+
+
+class LoginCache:
+    """
+    各个网站的登录缓存的集合, 每种类型的 Cache 对象只保存一个.
+
+    LoginCache 可以转换为 json 结构持久化保存, 要求 Cache 对象的属性 (vars) 可以被 json 序列化,
+    恢复时不需要导入 Cache 类型所在的模块, Cache 对象在第一次通过 get_cache 获取时才被重建.
+
+    Cache 类型可以定义 probe(self) -> bool 方法, 用一次轻量的请求检查登录缓存是否仍然有效, 见 is_valid.
+    """
+
+    def __init__(self):
+        self.cache = {}
+        self._stored: dict[str, dict] = {}  # 从 json 结构恢复但尚未重建的 Cache 对象的属性, 以类型全名为键.
+
+    def add_cache(self, cache: T):
+        """将某个类型的 Cache 添加进集合, 同一类型的 Cache 会相互挤占"""
+        self.cache[type(cache)] = cache
+        self._stored.pop(_type_key(type(cache)), None)
+
+    def get_cache(self, cache_cls: Type[T]) -> T | None:
+        """
+        通过类型来获取对应的 Cache.
+
+        Parameters:
+            cache_cls: Cache 对象的类型.
+
+        Examples:
+
+        >>> from src.portal import PortalCache
+        >>> login_cache: LoginCache # 需要配合 grabber 获取 PortalCache, 存放在 login_cache 中才能获取.
+        >>> login_cache.get_cache(PortalCache) # 需要配合
+        None
+        """
+        cache = self.cache.get(cache_cls)
+        if cache is None:
+            state = self._stored.pop(_type_key(cache_cls), None)
+            if state is not None:
+                cache = cache_cls.__new__(cache_cls)
+                vars(cache).update(state)
+                self.cache[cache_cls] = cache
+        return cache
+
+    def remove_cache(self, cache_cls: type):
+        """移除某个类型的 Cache, 如果不存在, 不会发生任何事."""
+        self.cache.pop(cache_cls, None)
+        self._stored.pop(_type_key(cache_cls), None)
+
+    def update(self, other: LoginCache):
+        """把 other 中的所有 Cache 添加进集合, 覆盖相同类型的 Cache."""
+        for cache in other.cache.values():
+            self.add_cache(cache)
+        self._stored.update(other._stored)
+
+    def is_valid(self, cache_cls: type) -> bool:
+        """
+        检查某个类型的 Cache 是否存在且仍然有效.
+
+        使用 Cache 类型的 probe 方法进行检查, 没有 probe 方法的 Cache 无法检查, 被认为无效,
+        probe 抛出异常 (例如网络错误) 时也被认为无效.
+        """
+        cache = self.get_cache(cache_cls)
+        probe = getattr(cache, "probe", None)
+        if probe is None:
+            return False
+        try:
+            return bool(probe())
+        except Exception as e:
+            project_logger.warning(f"failed to probe {cache_cls.__qualname__}: {e!r}")
+            return False
+
+    def to_json(self) -> dict[str, Any]:
+        """转换为可以 json 序列化的结构, 属性不能被 json 序列化的 Cache 对象会被忽略."""
+        obj = dict(self._stored)
+        for cache_cls, cache in self.cache.items():
+            state = vars(cache)
+            try:
+                json.dumps(state)
+            except (TypeError, ValueError):
+                project_logger.warning(f"{cache_cls.__qualname__} is not json serializable, not saved.")
+            else:
+                obj[_type_key(cache_cls)] = state
+        return obj
+
+    @classmethod
+    def from_json(cls, obj: dict[str, Any]) -> LoginCache:
+        """从 to_json 的结果恢复."""
+        login_cache = cls()
+        login_cache._stored.update(obj)
+        return login_cache
+
+    def __len__(self):
+        return len(self.cache) + len(self._stored)
+
+    def __repr__(self):
+        return f"LoginCache{list(self.cache.values()) + list(self._stored.keys())}"
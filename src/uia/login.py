@@ -6,22 +6,26 @@ from __future__ import annotations
 import base64
 import io
 import tempfile
+import threading
+import time
 import traceback
-from typing import Optional, Callable, Sequence, Any, Type, TypeVar
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Optional, Callable, Sequence, Any, TYPE_CHECKING
 
 import toml
-from pyzbar import pyzbar
-from PIL import Image
 from selenium.common import TimeoutException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.wait import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from seleniumwire.webdriver import Edge
 
 from src.log import project_logger, requires_init
 from src.uia import attribute_changes
+from src.uia.cache import LoginError, LoginCache
 from src.uia.submit import submit_login
 
+if TYPE_CHECKING:  # seleniumwire 导入很慢, 只在启动浏览器时导入.
+    from seleniumwire.webdriver import Edge
+
 # ECNU 统一登陆界面的使用二维码登录按钮.
 QRCODE_BUTTON = '#login-content-right > div.codeBrushing.qr'
 QRCODE_IMG = '#login-content-right > app-login-auth-panel > div > div.content-top > app-login-by-corp-wechat-qr > div > div > div.qrcodeImgStyle > rg-page-qr-box > div > img'
@@ -60,43 +64,10 @@ QRCODE_HTML = """<!DOCTYPE html>
 UPDATED_QRCODE_TITLE = "ECNU Login QRCode Updated"
 FIRST_QRCODE_TITLE = "Login to ECNU"
 
-
-class LoginError(Exception):
-    """登录缓存失效时触发."""
-
-    def __init__(self, msg: str = ""):
-        super().__init__(msg)
-
-
-T = TypeVar("T")
-
-
-class LoginCache:
-    def __init__(self):
-        self.cache = {}
-
-    def add_cache(self, cache: T):
-        """将某个类型的 Cache 添加进集合, 同一类型的 Cache 会相互挤占"""
-        self.cache[type(cache)] = cache
-
-    def get_cache(self, cache_cls: Type[T]) -> T | None:
-        """
-        通过类型来获取对应的 Cache.
-
-        Parameters:
-            cache_cls: Cache 对象的类型.
-
-        Examples:
-
-        >>> from src.portal import PortalCache
-        >>> login_cache: LoginCache # 需要配合 grabber 获取 PortalCache, 存放在 login_cache 中才能获取.
-        >>> login_cache.get_cache(PortalCache) # 需要配合
-        None
-        """
-        return self.cache.get(cache_cls)
-
-    def __repr__(self):
-        return f"LoginCache{list(self.cache.values())}"
+DEFAULT_GRABBER_TIMEOUT = 5 * 60  # 单个 cache grabber 的默认超时时间 (s).
+MAX_PARALLEL_GRABBERS = 4  # 同时运行的 cache grabber 数量, 每个 grabber 占用一个浏览器.
+# CDP Network.setCookies 接受的 cookie 字段, Network.getAllCookies 返回的其他字段 (size, session 等) 需要去掉.
+_COOKIE_PARAM_KEYS = ("name", "value", "domain", "path", "secure", "httpOnly", "sameSite", "expires")
 
 
 def click_element(driver: Edge, selector: str, timeout: float = 10):
@@ -141,6 +112,8 @@ def _get_qrcode(driver: Edge, timeout: float) -> tuple[str, str]:
         EC.presence_of_element_located((By.CSS_SELECTOR, QRCODE_IMG))
     )
     img_base64_data = driver.execute_script(EXTRACT_QRCODE_JS)
+    from pyzbar import pyzbar  # 需要 zbar 动态库, 只在扫描二维码时导入.
+    from PIL import Image
     img_base64 = base64.b64decode(img_base64_data.split(",")[1])
     img = Image.open(io.BytesIO(img_base64))
     decoded = pyzbar.decode(img)
@@ -164,6 +137,140 @@ def _get_temp_qrcode_file(img_base64_data: str) -> str:
     return f.name
 
 
+def _export_session(driver: Edge) -> list[dict]:
+    """通过 CDP 导出浏览器中所有域名的 cookie, 包括 HttpOnly cookie, 用于在其他浏览器中复用登录状态."""
+    cookies = []
+    for cookie in driver.execute_cdp_cmd("Network.getAllCookies", {})["cookies"]:
+        param = {k: cookie[k] for k in _COOKIE_PARAM_KEYS if k in cookie}
+        if cookie.get("session", False):
+            param.pop("expires", None)
+        cookies.append(param)
+    return cookies
+
+
+def _new_session_driver(cookies: list[dict]) -> Edge:
+    """启动新的浏览器并导入 _export_session 导出的 cookie, 新浏览器处于相同的登录状态."""
+    from seleniumwire.webdriver import Edge
+    driver = Edge()
+    try:
+        driver.execute_cdp_cmd("Network.setCookies", {"cookies": cookies})
+    except BaseException:
+        driver.quit()
+        raise
+    return driver
+
+
+def _grabber_name(grabber: Callable) -> str:
+    return getattr(grabber, "__qualname__", repr(grabber))
+
+
+class _GrabberJob:
+    """一个 cache grabber 的运行状态."""
+
+    def __init__(self, grabber: Callable[[Edge], Any], driver: Edge = None):
+        self.grabber = grabber
+        self.name = _grabber_name(grabber)
+        self.driver = driver  # 为 None 时在运行前启动新的浏览器.
+        self.owns_driver = driver is None
+        self.started_at: Optional[float] = None  # time.monotonic() 时间, 包括启动浏览器的时间.
+        self.abandoned = False  # 超时后被放弃, 其浏览器已被关闭.
+        self.lock = threading.Lock()
+
+    def run(self, cookies: list[dict]):
+        self.started_at = time.monotonic()
+        if self.driver is None:
+            driver = _new_session_driver(cookies)
+            with self.lock:
+                if self.abandoned:
+                    driver.quit()
+                    return None
+                self.driver = driver
+        try:
+            return self.grabber(self.driver)
+        finally:
+            project_logger.info(f"cache grabber {self.name} finished "
+                                f"in {time.monotonic() - self.started_at:.1f}s.")
+            if self.owns_driver:
+                self.quit()
+
+    def quit(self):
+        with self.lock:
+            driver, self.driver = self.driver, None
+        if driver is not None:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+
+    def abandon(self):
+        """
+        放弃超时的 grabber, 关闭其浏览器, 使 grabber 中的 WebDriver 调用尽快出错返回.
+
+        主浏览器由 get_login_cache 负责关闭, 这里只关闭 grabber 自己启动的浏览器.
+        """
+        with self.lock:
+            self.abandoned = True
+        if self.owns_driver:
+            self.quit()
+
+
+def grab_caches(driver: Edge, cache_grabbers: Sequence[Callable[[Edge], Any]],
+                timeout: float = DEFAULT_GRABBER_TIMEOUT,
+                max_parallel: int = MAX_PARALLEL_GRABBERS) -> LoginCache:
+    """
+    并行运行 cache grabber, 收集登录缓存.
+
+    第一个 grabber 使用已经登录的 driver, 其余的 grabber 各自启动一个导入了 driver 中 cookie 的新浏览器,
+    因此总耗时接近最慢的单个 grabber, 而不是所有 grabber 耗时之和.
+
+    Parameters:
+        driver: 已经登录 ECNU 统一认证的浏览器.
+        cache_grabbers: 见 get_login_cache, 其中的 None 会被忽略.
+        timeout: 单个 grabber 的超时时间 (s), 从 grabber 开始运行 (包括启动浏览器) 时计算,
+                 超时的 grabber 被放弃, 不会得到其 Cache.
+        max_parallel: 同时运行的 grabber 数量.
+
+    Returns:
+        所有正常返回的 grabber 获取的 Cache, 报错或超时的 grabber 只记录日志.
+    """
+    login_cache = LoginCache()
+    grabbers = [g for g in cache_grabbers if g is not None]
+    if not grabbers:
+        return login_cache
+    begin = time.monotonic()
+    cookies = _export_session(driver) if len(grabbers) > 1 else []
+    jobs = [_GrabberJob(grabbers[0], driver)] + [_GrabberJob(g) for g in grabbers[1:]]
+    pool = ThreadPoolExecutor(max_workers=max(1, min(max_parallel, len(jobs))),
+                              thread_name_prefix="cache-grabber")
+    pending = {pool.submit(job.run, cookies): job for job in jobs}
+    try:
+        while pending:
+            deadlines = [j.started_at + timeout for j in pending.values() if j.started_at is not None]
+            wait_time = max(0.0, min(deadlines) - time.monotonic()) if deadlines else 1
+            done, _ = wait(pending, wait_time, return_when=FIRST_COMPLETED)
+            for future in done:
+                job = pending.pop(future)
+                try:
+                    cache = future.result()
+                    if cache is not None:
+                        login_cache.add_cache(cache)
+                except Exception as e:
+                    project_logger.error(f"Exception during cache grabbing ({job.name}): {e}\n"
+                                         f"{''.join(traceback.format_exception(e))}")
+            now = time.monotonic()
+            for future, job in list(pending.items()):
+                if job.started_at is not None and now >= job.started_at + timeout:
+                    project_logger.error(f"cache grabber {job.name} timed out after {timeout}s, abandoned.")
+                    job.abandon()
+                    del pending[future]
+    finally:
+        for job in pending.values():
+            job.abandon()
+        pool.shutdown(wait=False, cancel_futures=True)
+    project_logger.info(f"{len(jobs)} cache grabbers finished in {time.monotonic() - begin:.1f}s.")
+    return login_cache
+
+
 def load_password():
     try:
         with open("login_info.toml") as f:
@@ -179,6 +286,7 @@ def get_login_cache(
         cache_grabbers: Sequence[Callable[[Edge], Any]] = tuple(),
         timeout: float = 24 * 60,
         qrcode_callback: Callable[[str, str, bool], None] = lambda s1, s2, b1: None,
+        grabber_timeout: float = DEFAULT_GRABBER_TIMEOUT,
 ) -> Optional[LoginCache]:
     """
     使用浏览器的进行 UIA 的登录操作,
@@ -205,15 +313,18 @@ def get_login_cache(
             - 在 LoginCache 中获取此 Cache 对象的方法为 LoginCache#get_cache(T) 方法,
               提供 Cache 对象的类型即可获取, 当 cache_grabber 报错时, 没有返回值,
               自然 LoginCache 不会保存其值, 更无从谈起获取.
+            - 各个 grabber 在各自的浏览器中并行运行, 见 grab_caches, 因此 grabber 之间不能依赖执行顺序.
         timeout: 在某个操作等待时间超过 timeout 时, 停止等待, 终止登录逻辑.
         qrcode_callback: 一个函数, 用于回调提醒用户登录二维码, 如果使用验证码登录则不会触发.
             - 参数 1 为 ECNU uia 登录二维码的临时文件路径, 该文件保存在 %TEMP% 目录下, 脚本不对其进行清理操作.
             - 参数 2 为二维码解析结果, 如果脚本解析二维码失败则此参数是二维码网址.
             - 参数 3 为是否是因为二维码超时而刷新产生的回调.
+        grabber_timeout: 单个 cache grabber 的超时时间, 需要用户在浏览器中操作的 grabber 应该适当延长.
 
     Returns:
         如果登陆成功, 返回 cache_grabbers 获取的所有登录缓存; 如果登录失败或超时, 返回 None.
     """
+    from seleniumwire.webdriver import Edge
     driver = Edge()
     try:
         driver.maximize_window()
@@ -252,15 +363,7 @@ def get_login_cache(
                 qrcode_callback(file, url, True)
 
         # 提取 cache.
-        login_cache = LoginCache()
-        for cache_grabber in cache_grabbers:
-            try:
-                if cache_grabber is not None:
-                    cache = cache_grabber(driver)
-                    login_cache.add_cache(cache)
-            except Exception as e:
-                project_logger.error(
-                    f"Exception during cache grabbing: {e}\n{traceback.format_exc()}")
+        login_cache = grab_caches(driver, cache_grabbers, grabber_timeout)
         project_logger.debug(f"login cache: {login_cache}")
         return login_cache
     except TimeoutException:
@@ -0,0 +1,159 @@
+"""
+登录缓存的加密持久化保存.
+
+程序重启后, 先从文件恢复上一次的登录缓存, 只有失效的部分才需要重新启动浏览器登录.
+
+- Windows 上使用 DPAPI 加密, 只有当前系统用户能够解密.
+- 其他平台 (或者没有安装 pywin32 时) 使用 AES-GCM 加密, 密钥保存在同目录的 .key 文件中, 只有文件所有者可读.
+"""
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Optional
+
+from Crypto.Cipher import AES
+from Crypto.Random import get_random_bytes
+
+from src.log import project_logger
+from src.uia.cache import LoginCache
+
+__all__ = ["SessionStore"]
+
+_DPAPI_MAGIC = b"DPA1"
+_AES_MAGIC = b"AGC1"
+_KEY_SIZE = 32
+_NONCE_SIZE = 12
+_TAG_SIZE = 16
+
+
+def _dpapi():
+    """返回 win32crypt 模块, 不可用时返回 None."""
+    if os.name != "nt":
+        return None
+    try:
+        import win32crypt
+    except ImportError:
+        return None
+    return win32crypt
+
+
+class SessionStore:
+    """
+    登录缓存的加密文件存储, 可在任意线程中使用.
+
+    文件损坏, 被篡改或者无法解密 (例如更换了系统用户, 删除了密钥) 时, load 返回 None, 相当于没有保存的登录缓存.
+    """
+
+    def __init__(self, path: str | Path):
+        """
+        Parameters:
+            path: 保存登录缓存的文件路径, AES-GCM 密钥保存在 path 加上 .key 后缀的文件中.
+        """
+        self.path = Path(path)
+        self.key_path = self.path.with_name(self.path.name + ".key")
+        self._lock = threading.Lock()
+
+    def load(self) -> Optional[LoginCache]:
+        """读取保存的登录缓存, 没有保存或者无法读取时返回 None."""
+        with self._lock:
+            try:
+                with open(self.path, "rb") as f:
+                    blob = f.read()
+            except FileNotFoundError:
+                return None
+            except OSError as e:
+                project_logger.warning(f"failed to read uia session: {e}")
+                return None
+            try:
+                return LoginCache.from_json(json.loads(self._decrypt(blob)))
+            except Exception as e:
+                project_logger.warning(f"saved uia session is unreadable, ignored: {e}")
+                return None
+
+    def save(self, login_cache: LoginCache):
+        """加密保存登录缓存, 覆盖之前保存的内容."""
+        data = json.dumps(login_cache.to_json()).encode("utf-8")
+        with self._lock:
+            try:
+                self._write(self.path, self._encrypt(data))
+            except OSError as e:
+                project_logger.error(f"failed to save uia session: {e}")
+
+    def discard(self, cache_cls: type):
+        """从保存的登录缓存中移除某个类型的 Cache, 用于其失效时."""
+        login_cache = self.load()
+        if login_cache is None or login_cache.get_cache(cache_cls) is None:
+            return
+        login_cache.remove_cache(cache_cls)
+        self.save(login_cache)
+
+    def clear(self):
+        """删除保存的登录缓存."""
+        with self._lock:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+    def _encrypt(self, data: bytes) -> bytes:
+        win32crypt = _dpapi()
+        if win32crypt is not None:
+            return _DPAPI_MAGIC + win32crypt.CryptProtectData(data, None, None, None, None, 0)
+        cipher = AES.new(self._key(), AES.MODE_GCM, nonce=get_random_bytes(_NONCE_SIZE))
+        ciphertext, tag = cipher.encrypt_and_digest(data)
+        return _AES_MAGIC + cipher.nonce + tag + ciphertext
+
+    def _decrypt(self, blob: bytes) -> bytes:
+        magic, body = blob[:4], blob[4:]
+        if magic == _DPAPI_MAGIC:
+            win32crypt = _dpapi()
+            if win32crypt is None:
+                raise ValueError("DPAPI is not available on this platform.")
+            return win32crypt.CryptUnprotectData(body, None, None, None, 0)[1]
+        if magic == _AES_MAGIC:
+            nonce, tag, ciphertext = (body[:_NONCE_SIZE], body[_NONCE_SIZE:_NONCE_SIZE + _TAG_SIZE],
+                                      body[_NONCE_SIZE + _TAG_SIZE:])
+            cipher = AES.new(self._key(create=False), AES.MODE_GCM, nonce=nonce)
+            return cipher.decrypt_and_verify(ciphertext, tag)
+        raise ValueError("unknown uia session format.")
+
+    def _key(self, create: bool = True) -> bytes:
+        """读取 AES 密钥, 不存在时创建只有文件所有者可读写的密钥文件."""
+        try:
+            with open(self.key_path, "rb") as f:
+                key = f.read()
+            if len(key) == _KEY_SIZE:
+                return key
+            if not create:
+                raise ValueError("uia session key is corrupted.")
+        except FileNotFoundError:
+            if not create:
+                raise
+        key = get_random_bytes(_KEY_SIZE)
+        self._write(self.key_path, key)
+        return key
+
+    @staticmethod
+    def _write(path: Path, data: bytes):
+        """
+        先写入临时文件再替换, 写入过程中崩溃不会损坏原有的文件.
+
+        mkstemp 创建的文件只有所有者可读写, 替换后保持此权限.
+        """
+        fd, tmp = tempfile.mkstemp(prefix=path.name, suffix=".tmp", dir=path.parent)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
@@ -1,24 +1,36 @@
 """
 提交加密登录请求.
 """
+from __future__ import annotations
+
 import base64
 import io
 import sys
+from typing import TYPE_CHECKING
 
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.wait import WebDriverWait
-from seleniumwire.webdriver import Edge
 
 from src.log import project_logger
 
-stdout = sys.stdout
-sys.stdout = io.StringIO()  # 禁用标准输出
-import ddddocr
+if TYPE_CHECKING:
+    from seleniumwire.webdriver import Edge
+
+_ocr = None  # 验证码识别模型, 加载较慢, 第一次识别验证码时才加载.
+
 
-ocr = ddddocr.DdddOcr()
-sys.stdout = stdout  # 恢复标准输出
-del stdout
+def get_ocr():
+    global _ocr
+    if _ocr is None:
+        stdout = sys.stdout
+        sys.stdout = io.StringIO()  # 禁用标准输出
+        try:
+            import ddddocr
+            _ocr = ddddocr.DdddOcr()
+        finally:
+            sys.stdout = stdout  # 恢复标准输出
+    return _ocr
 
 CAPTCHA_IMG_SELECTOR = "#login-normal > div > form > app-verification > nz-input-group > span.ant-input-suffix.ng-star-inserted > div > img"
 UPDATE_CAPTCHA_SELECTOR = "#login-normal > div > form > app-verification > nz-input-group > span.ant-input-suffix.ng-star-inserted > div > a"
@@ -71,7 +83,7 @@ def submit_login(driver: Edge, stu_number: str, password: str, timeout=24 * 60):
     wait_for(driver, STUDENT_NUMBER_SELECTOR, timeout)
     wait_for(driver, SUBMIT_BUTTON_SELECTOR, timeout)
 
-    captcha = ocr.classification(
+    captcha = get_ocr().classification(
         get_captcha_img_stream(get_captcha_img(driver)).read()
     )
     project_logger.debug(f"parse captcha result: \"{captcha}\".")
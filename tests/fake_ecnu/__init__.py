@@ -0,0 +1,40 @@
+"""
+本地的 ECNU 替身服务器, 用于离线的集成测试和性能基准.
+
+插件通过 HttpClient 的 base_url (或者环境变量 ECNU_BASE_URL) 连接替身服务器, 登录缓存使用:
+
+- LibCache(TOKEN, {}) 和 PortalCache(TOKEN).
+- StudyRoomCache({"ic-cookie": IC_COOKIE}).
+
+插件模块使用 import_plugin_module 导入.
+
+单独运行: python -m tests.fake_ecnu [--port N] [--ws-port N] [--latency S]
+"""
+import importlib
+import sys
+from importlib.util import spec_from_file_location, module_from_spec
+from types import ModuleType
+
+from src import SRC_DIR_PATH
+from .server import FIXTURE_DIR, TOKEN, IC_COOKIE, ACC_NO, FakeEcnuState, FakeEcnuServer
+from .degree import DEFAULT_KEY, DEFAULT_IV, FakeDegreeServer
+
+__all__ = [
+    "FIXTURE_DIR", "TOKEN", "IC_COOKIE", "ACC_NO", "FakeEcnuState", "FakeEcnuServer",
+    "DEFAULT_KEY", "DEFAULT_IV", "FakeDegreeServer", "PLUGINS_DIR", "import_plugin_module",
+]
+
+PLUGINS_DIR = SRC_DIR_PATH.parent / "plugins"
+
+
+def import_plugin_module(name: str) -> ModuleType:
+    """
+    按照 PluginLoader 的方式导入插件包中的模块, 例如 "library.query".
+
+    插件包以其目录名作为顶层包, 包的 __init__.py 不会被执行, 因此不会注册插件.
+    """
+    package = name.partition(".")[0]
+    if package not in sys.modules:
+        spec = spec_from_file_location(package, PLUGINS_DIR / package / "__init__.py")
+        sys.modules[package] = module_from_spec(spec)
+    return importlib.import_module(name)
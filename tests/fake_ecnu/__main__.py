@@ -0,0 +1,27 @@
+import argparse
+import threading
+
+from src.net.client import BASE_URL_ENV
+from . import FakeEcnuServer, FakeDegreeServer, TOKEN, IC_COOKIE
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地的 ECNU 替身服务器.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080, help="HTTP 服务器端口")
+    parser.add_argument("--ws-port", type=int, default=30530, help="query degree websocket 服务器端口")
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求的额外延迟 (s)")
+    args = parser.parse_args()
+    with FakeEcnuServer(args.host, args.port, args.latency) as server, \
+            FakeDegreeServer(host=args.host, port=args.ws_port) as degree:
+        print(f"{BASE_URL_ENV}={server.base_url}")
+        print(f"server_address={degree.address} key={degree.key.decode()} iv={degree.iv.decode()}")
+        print(f"authorization={TOKEN} ic-cookie={IC_COOKIE}")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""
+本地的 query degree (宿舍电量) 替身 websocket 服务器.
+
+通信格式与 plugins.electric_bill.client.GuardClient 相同:
+每条消息为 AES-CBC 加密的 json, 命令为 {"type": ..., "args": ...}, 返回值为 {"retcode": ..., "content": ...}.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+import time
+from typing import Optional
+
+from Crypto.Cipher import AES
+from Crypto.Util.Padding import pad, unpad
+from websockets.asyncio.server import serve, ServerConnection
+
+__all__ = ["DEFAULT_KEY", "DEFAULT_IV", "FakeDegreeServer"]
+
+DEFAULT_KEY = b"fake-query-degree-key-32-bytes!!"
+DEFAULT_IV = b"fake-degree-iv16"
+
+RET_OK = 0
+RET_ERR_ARGS = 2
+RET_ERR_NO_FILE = 3
+
+
+class FakeDegreeServer:
+    """
+    替身电量服务器, 在后台线程的事件循环中运行.
+
+    address 可以直接作为插件配置项 server_address 的值.
+    """
+
+    def __init__(self, key: bytes = DEFAULT_KEY, iv: bytes = DEFAULT_IV, host: str = "127.0.0.1",
+                 port: int = 0, degree: float = 100.0):
+        self.key = key
+        self.iv = iv
+        self.host = host
+        self.port = port
+        self.degree = degree
+        self.token: Optional[dict] = None  # 最近一次 post_token 的参数.
+        self.room: Optional[dict] = None  # 最近一次 post_room 的参数.
+        self.history: list[tuple[float, float]] = [(time.time(), degree)]  # (时间戳, 电量).
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stop: Optional[asyncio.Future] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> str:
+        return f"{self.host}:{self.port}"
+
+    def set_degree(self, degree: float):
+        """更新宿舍电量, 记录到电量历史中."""
+        self.degree = degree
+        self.history.append((time.time(), degree))
+
+    def _encrypt(self, obj) -> bytes:
+        return AES.new(self.key, AES.MODE_CBC, iv=self.iv).encrypt(
+            pad(json.dumps(obj).encode("utf-8"), AES.block_size))
+
+    def _decrypt(self, data: bytes) -> dict:
+        return json.loads(unpad(AES.new(self.key, AES.MODE_CBC, iv=self.iv).decrypt(data), AES.block_size))
+
+    def _execute(self, command: dict) -> dict:
+        type_, args = command.get("type"), command.get("args")
+        if type_ == "post_token":
+            if not isinstance(args, dict) or "x_csrf_token" not in args:
+                return {"retcode": RET_ERR_ARGS, "content": None}
+            self.token = args
+        elif type_ == "post_room":
+            if not isinstance(args, dict) or not {"roomNo", "elcarea", "elcbuis"} <= args.keys():
+                return {"retcode": RET_ERR_ARGS, "content": None}
+            self.room = args
+        elif type_ == "get_degree":
+            return {"retcode": RET_OK, "content": self.degree}
+        elif type_ == "fetch_degree_file":
+            if not self.history:
+                return {"retcode": RET_ERR_NO_FILE, "content": None}
+            return {"retcode": RET_OK, "content": "\n".join(f"{t},{d}" for t, d in self.history)}
+        else:
+            return {"retcode": RET_ERR_ARGS, "content": None}
+        return {"retcode": RET_OK, "content": None}
+
+    async def _handle(self, connection: ServerConnection):
+        async for message in connection:
+            try:
+                reply = self._execute(self._decrypt(message))
+            except (ValueError, KeyError):
+                reply = {"retcode": RET_ERR_ARGS, "content": None}
+            await connection.send(self._encrypt(reply))
+
+    async def _serve(self, ready: threading.Event):
+        self._stop = asyncio.get_running_loop().create_future()
+        async with serve(self._handle, self.host, self.port) as server:
+            self.port = server.sockets[0].getsockname()[1]
+            ready.set()
+            await self._stop
+
+    def start(self) -> FakeDegreeServer:
+        ready = threading.Event()
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_until_complete, args=(self._serve(ready),),
+                                        name="fake-degree", daemon=True)
+        self._thread.start()
+        ready.wait(10)
+        return self
+
+    def stop(self):
+        if self._loop is None:
+            return
+        self._loop.call_soon_threadsafe(self._stop.set_result, None)
+        self._thread.join(10)
+        self._loop.close()
+        self._loop = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
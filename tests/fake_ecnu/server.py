@@ -0,0 +1,482 @@
+"""
+本地的 ECNU 替身 HTTP 服务器.
+
+按照插件使用的接口约定 (见各个请求函数的文档) 返回数据, 初始数据来自 assets/development-references 中的 json 示例,
+日期被替换为今天和明天. 预约, 取消等操作会修改服务器的状态, 之后的查询能够看到变化.
+
+所有网站共用一个端口, 请求路径的第一段为原网站的域名, 与 HttpClient 的 base_url 转发规则 (见 src.net.client.BASE_URL_ENV) 对应:
+
+- seat-lib.ecnu.edu.cn: 图书馆座位, 需要 Authorization 请求头为 TOKEN, 否则返回登录页面 (html).
+- studyroom.ecnu.edu.cn: 研修间, 需要 ic-cookie 为 IC_COOKIE, 否则返回 code 300.
+- portal2023.ecnu.edu.cn: 课表和校历 GraphQL, 需要 Authorization 请求头为 TOKEN, 否则返回 401.
+"""
+from __future__ import annotations
+
+import ast
+import base64
+import copy
+import datetime
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Optional
+from urllib.parse import parse_qsl, urlsplit
+
+from Crypto.Cipher import AES
+from Crypto.Util.Padding import unpad
+
+from src import SRC_DIR_PATH
+
+__all__ = ["FIXTURE_DIR", "TOKEN", "IC_COOKIE", "ACC_NO", "FakeEcnuState", "FakeEcnuServer"]
+
+FIXTURE_DIR = SRC_DIR_PATH.parent / "assets" / "development-references"
+TOKEN = "fake-authorization"  # 图书馆和 portal 的 Authorization.
+IC_COOKIE = "fake-ic-cookie"  # 研修间的 ic-cookie.
+ACC_NO = 100001  # 研修间的用户账号 id.
+CONFIRM_IV = b"ZZWBKJ_ZHIHUAWEI"  # 见 assets/development-references/confirm_subscribe.js.
+FIXTURE_AREA = 8  # query_seats_example.json 中座位所属的区域.
+
+# 研修间: (kindId, kindName, labId, labName, 房间名称).
+ROOMS = [
+    (3675133, "普陀研究室（木门）", 3674920, "普陀校区图书馆四楼", ["普陀校区单人间C426", "普陀校区单人间C428"]),
+    (3674969, "普陀研究室（玻璃门）", 3674920, "普陀校区图书馆四楼", ["普陀校区单人间C401", "普陀校区单人间C403"]),
+    (11563, "闵行研究室", 11540, "闵行校区图书馆三楼", ["闵行校区单人间301", "闵行校区单人间302"]),
+]
+RESV_UNUSED = 1027  # 已预约但未使用的 resvStatus.
+OTHERS_RESV = [("10:20", "13:00"), ("18:00", "22:00")]  # 每个研修间每天被其他用户预约的时间段.
+
+Reply = tuple[int, Any]  # (状态码, json 对象或者 html 字符串).
+
+
+def load_fixture(name: str) -> Any:
+    path = FIXTURE_DIR / name
+    text = path.read_text(encoding="utf-8")
+    if path.suffix == ".json":
+        return json.loads(text)
+    return ast.literal_eval(text)  # courses_*.txt 为 python 对象的 repr.
+
+
+def decrypt_aesjson(aesjson: str, day: datetime.date = None) -> dict:
+    """解密图书馆预约请求的 aesjson, 密钥为当天日期 %Y%m%d 与其反转的拼接."""
+    day_str = (day or datetime.date.today()).strftime("%Y%m%d")
+    cipher = AES.new((day_str + day_str[::-1]).encode("utf-8"), AES.MODE_CBC, iv=CONFIRM_IV)
+    return json.loads(unpad(cipher.decrypt(base64.b64decode(aesjson)), AES.block_size))
+
+
+def _ms(dt: datetime.datetime) -> int:
+    return int(dt.timestamp() * 1000)
+
+
+class FakeEcnuState:
+    """替身服务器的数据和各个接口的实现, 可在任意线程中使用."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        today = datetime.date.today()
+        self.days = [today, today + datetime.timedelta(days=1)]
+        self.quick_select = load_fixture("quick_select_example.json")
+        self.quick_select["date"] = [d.isoformat() for d in self.days]
+        self._catalog = {int(obj["id"]): obj for kind in ("premises", "storey", "area")
+                         for obj in self.quick_select[kind]}
+        self.area_ids = [int(area["id"]) for area in self.quick_select["area"]]
+        self._seat_template = load_fixture("query_seats_example.json")
+        self._subscribe_template = load_fixture("subcribe.json")["data"][0]
+        self._time_template = load_fixture("query_date_example.json")
+        self._seats: dict[int, list[dict]] = {}  # 区域 id -> 座位.
+        self.segments: dict[int, tuple[int, datetime.date, str, str]] = {}  # 时间段 id -> (区域, 日期, 开始, 结束).
+        for area_id in self.area_ids:
+            for index, day in enumerate(self.days):
+                times = self._time_template[min(index, len(self._time_template) - 1)]["times"][0]
+                self.segments[self.segment_id(area_id, index)] = (area_id, day, times["start"], times["end"])
+        self.bookings: dict[int, dict] = {}  # 图书馆预约 id -> 预约.
+        self._next_booking = 4265071
+        self.reservations: dict[str, dict] = {}  # 研修间预约 uuid -> 预约.
+        # 还没有开放预约的日期: 图书馆可预约日期中没有这一天, roomAvailable 中没有开放时间, 预约被拒绝,
+        # 用于模拟预约开放之前的状态.
+        self.closed_days: set[datetime.date] = set()
+        self.others: list[dict] = [  # 其他用户的研修间预约, 只出现在 roomAvailable 的 resvInfo 中.
+            {"uuid": uuid.uuid4().hex, "devId": room["devId"], "testName": "自习",
+             "resvBeginTime": _ms(datetime.datetime.combine(today + datetime.timedelta(days=offset),
+                                                            datetime.time.fromisoformat(begin))),
+             "resvEndTime": _ms(datetime.datetime.combine(today + datetime.timedelta(days=offset),
+                                                          datetime.time.fromisoformat(end)))}
+            for room in self._rooms() for offset in range(3) for begin, end in OTHERS_RESV]
+        self.calendar_day = load_fixture("school-calendar-day.json")
+        self.schedules = self._shift_schedules(
+            load_fixture("courses_this_week.txt")["userSchedules"]
+            + load_fixture("courses_next_week.txt")["userSchedules"])
+
+    @staticmethod
+    def segment_id(area_id: int, day_index: int) -> int:
+        return 1480000 + area_id * 10 + day_index
+
+    @staticmethod
+    def _shift_schedules(schedules: list[dict]) -> list[dict]:
+        """把课表整周平移, 使示例中的第一周对应本周."""
+        first = min(s["startTime"] for s in schedules)
+        first_day = datetime.datetime.fromtimestamp(first).date()
+        this_monday = datetime.date.today() - datetime.timedelta(days=datetime.date.today().weekday())
+        weeks = (this_monday - (first_day - datetime.timedelta(days=first_day.weekday()))).days // 7
+        offset = weeks * 7 * 24 * 60 * 60
+        shifted = copy.deepcopy(schedules)
+        for s in shifted:
+            s["startTime"] += offset
+            s["endTime"] += offset
+        return shifted
+
+    # 图书馆.
+
+    def seats_of(self, area_id: int) -> list[dict]:
+        """区域的座位, 除了示例区域外, 其他区域使用相同的布局和不同的 id."""
+        with self._lock:
+            if area_id not in self._seats:
+                seats = copy.deepcopy(self._seat_template)
+                for seat in seats:
+                    if area_id != FIXTURE_AREA:
+                        seat["id"] = str(area_id * 100000 + int(seat["no"]))
+                    seat["area"] = str(area_id)
+                self._seats[area_id] = seats
+            return self._seats[area_id]
+
+    def _adjust_free(self, area_id: int, delta: int):
+        obj = self._catalog.get(area_id)
+        while obj is not None:
+            obj["free_num"] = int(obj["free_num"]) + delta
+            obj = self._catalog.get(int(obj["parentId"]))
+
+    def lib_quick_select(self, body: dict, query: dict) -> Reply:
+        with self._lock:
+            return 200, {"code": 0, "msg": "操作成功", "data": copy.deepcopy(self.quick_select)}
+
+    def lib_date(self, body: dict, query: dict) -> Reply:
+        area_id = int(body.get("build_id", -1))
+        if area_id not in self.area_ids:
+            return 200, {"code": 0, "msg": "区域不存在"}
+        data = []
+        for index, day in enumerate(self.days):
+            if day in self.closed_days:
+                continue
+            _, _, start, end = self.segments[self.segment_id(area_id, index)]
+            data.append({"day": day.isoformat(), "times": [
+                {"id": str(self.segment_id(area_id, index)), "status": 1, "start": start, "end": end}]})
+        return 200, {"code": 1, "msg": "操作成功", "data": data}
+
+    def lib_seat(self, body: dict, query: dict) -> Reply:
+        area_id = int(body.get("area", -1))
+        segment = int(body.get("segment", -1))
+        if self.segments.get(segment, (None,))[0] != area_id:
+            return 200, {"code": 0, "msg": "参数错误"}
+        with self._lock:
+            booked = {b["space_id"] for b in self.bookings.values() if b["segment"] == segment}
+            seats = copy.deepcopy(self.seats_of(area_id))
+        for seat in seats:
+            if seat["id"] in booked:
+                seat["status"], seat["status_name"] = "2", "已预约"
+        return 200, {"code": 1, "msg": "操作成功", "data": seats}
+
+    def lib_confirm(self, body: dict, query: dict) -> Reply:
+        try:
+            payload = decrypt_aesjson(body["aesjson"])
+            seat_id, segment = str(payload["seat_id"]), int(payload["segment"])
+        except (KeyError, ValueError, TypeError):
+            return 200, {"code": 0, "msg": "参数错误"}
+        if segment not in self.segments:
+            return 200, {"code": 0, "msg": "预约时间段不存在"}
+        area_id, day, start, end = self.segments[segment]
+        if day in self.closed_days:
+            return 200, {"code": 0, "msg": "该日期尚未开放预约"}
+        with self._lock:
+            seat = next((s for s in self.seats_of(area_id) if s["id"] == seat_id), None)
+            if seat is None:
+                return 200, {"code": 0, "msg": "座位不存在"}
+            for booking in self.bookings.values():
+                if booking["segment"] == segment and booking["space_id"] == seat_id:
+                    return 200, {"code": 0, "msg": "该座位已被预约"}
+                if booking["segment"] == segment:
+                    return 200, {"code": 0, "msg": "该时间段已有预约"}
+            area = self._catalog[area_id]
+            booking_id = self._next_booking
+            self._next_booking += 1
+            booking = copy.deepcopy(self._subscribe_template)
+            booking.update({
+                "id": str(booking_id), "area_id": str(area_id), "space": seat_id, "space_id": seat_id,
+                "no": seat["no"], "spaceName": seat["no"], "enname": area["enname"],
+                "areaName": area["nameMerge"], "nameMerge": area["nameMerge"], "parentId": str(area["parentId"]),
+                "beginTime": f"{day} {start}:00", "endTime": f"{day} {end}:00",
+                "showTime": f"{day} {start}:00 至 {end}:00", "signintime": None, "segment": segment,
+            })
+            self.bookings[booking_id] = booking
+            self._adjust_free(area_id, -1)
+        return 200, {"code": 1, "msg": "预约成功", "time": f"{start}-{end}", "seat": f"{area['nameMerge']}-{seat['no']}",
+                     "new_time": f"{day} {start}-{end}", "area": area["nameMerge"], "no": seat["no"]}
+
+    def lib_subscribe(self, body: dict, query: dict) -> Reply:
+        with self._lock:
+            data = [{k: v for k, v in b.items() if k != "segment"} for b in self.bookings.values()]
+        return 200, {"code": 1, "msg": "操作成功", "data": data}
+
+    def lib_cancel(self, body: dict, query: dict) -> Reply:
+        with self._lock:
+            booking = self.bookings.pop(int(body.get("id", -1)), None)
+            if booking is None:
+                return 200, {"code": 0, "msg": "预约不存在"}
+            self._adjust_free(int(booking["area_id"]), 1)
+        return 200, {"code": 1, "msg": "取消成功"}
+
+    # 研修间.
+
+    def _rooms(self):
+        for kind_id, kind_name, lab_id, lab_name, names in ROOMS:
+            for index, name in enumerate(names):
+                room_id = kind_id + 1000 + index * 2
+                yield {"devId": room_id + 1, "devName": name, "kindId": kind_id, "kindName": kind_name,
+                       "labId": lab_id, "labName": lab_name, "roomId": room_id, "roomName": name,
+                       "openStart": "08:00", "addServices": None,
+                       "openTimes": [{"openStartTime": "08:00", "openEndTime": "22:00", "openLimit": 1}]}
+
+    def room_available(self, body: dict, query: dict) -> Reply:
+        day = datetime.datetime.strptime(query.get("resvDates", ""), "%Y%m%d").date()
+        kind_ids = {int(k) for k in str(query.get("kindIds", "")).split(",") if k}
+        rooms = []
+        with self._lock:
+            for room in self._rooms():
+                if kind_ids and room["kindId"] not in kind_ids:
+                    continue
+                if day in self.closed_days:
+                    room["openTimes"] = []
+                room["resvInfo"] = [
+                    {"devId": r["devId"], "startTime": r["resvBeginTime"], "endTime": r["resvEndTime"],
+                     "title": r["testName"], "trueName": "测*", "logonName": "1*********1", "uuid": r["uuid"]}
+                    for r in [*self.others, *self.reservations.values()]
+                    if r["devId"] == room["devId"]
+                    and datetime.datetime.fromtimestamp(r["resvBeginTime"] / 1000).date() == day]
+                rooms.append(room)
+        return 200, {"code": 0, "message": "查询成功", "data": rooms}
+
+    def user_info(self, body: dict, query: dict) -> Reply:
+        return 200, {"code": 0, "message": "查询成功", "data": {
+            "uuid": "fake-user-uuid", "pid": "10000000000", "trueName": "测试", "className": "测试学院",
+            "token": "fake-token", "accNo": ACC_NO}}
+
+    def reserve(self, body: dict, query: dict) -> Reply:
+        try:
+            begin = datetime.datetime.strptime(body["resvBeginTime"], "%Y-%m-%d %H:%M:%S")
+            end = datetime.datetime.strptime(body["resvEndTime"], "%Y-%m-%d %H:%M:%S")
+            dev_id = int(body["resvDev"][0])
+        except (KeyError, IndexError, ValueError, TypeError):
+            return 200, {"code": 1, "message": "参数错误"}
+        if body.get("appAccNo") != ACC_NO or end <= begin:
+            return 200, {"code": 1, "message": "参数错误"}
+        room = next((r for r in self._rooms() if r["devId"] == dev_id), None)
+        if room is None:
+            return 200, {"code": 1, "message": "设备不存在"}
+        begin_ms, end_ms = _ms(begin), _ms(end)
+        with self._lock:
+            if begin.date() in self.closed_days:
+                return 200, {"code": 1, "message": "该日期尚未开放预约"}
+            for r in [*self.others, *self.reservations.values()]:
+                if r["devId"] == dev_id and r["resvBeginTime"] < end_ms and begin_ms < r["resvEndTime"]:
+                    return 200, {"code": 1, "message": "该时间段已被预约"}
+            resv = {"uuid": uuid.uuid4().hex, "devId": dev_id, "resvBeginTime": begin_ms, "resvEndTime": end_ms,
+                    "resvStatus": RESV_UNUSED, "testName": body.get("testName", ""), "memo": body.get("memo", ""),
+                    "resvDevInfoList": [{"devId": dev_id, "devName": room["devName"], "roomName": room["roomName"]}]}
+            self.reservations[resv["uuid"]] = resv
+        return 200, {"code": 0, "message": "新增成功", "data": copy.deepcopy(resv)}
+
+    def resv_info(self, body: dict, query: dict) -> Reply:
+        try:
+            begin = datetime.date.fromisoformat(query["beginDate"])
+            end = datetime.date.fromisoformat(query["endDate"])
+            need_status = int(query.get("needStatus", 6))
+        except (KeyError, ValueError):
+            return 200, {"code": 1, "message": "参数错误"}
+        with self._lock:
+            data = [copy.deepcopy(r) for r in self.reservations.values()
+                    if need_status & 2
+                    and begin <= datetime.datetime.fromtimestamp(r["resvBeginTime"] / 1000).date() <= end]
+        return 200, {"code": 0, "message": "查询成功", "data": data}
+
+    def delete_reservation(self, body: dict, query: dict) -> Reply:
+        with self._lock:
+            if self.reservations.pop(body.get("uuid", ""), None) is None:
+                return 200, {"code": 1, "message": "预约不存在"}
+        return 200, {"code": 0, "message": "操作成功"}
+
+    # portal.
+
+    def graphql(self, body: dict, query: dict) -> Reply:
+        text = body.get("query", "")
+        variables = body.get("variables") or {}
+        if "schoolCalendarDay" in text:
+            return 200, {"data": copy.deepcopy(self.calendar_day["data"])}
+        if "schoolCalendar" in text:
+            monday = datetime.date.today() - datetime.timedelta(days=datetime.date.today().weekday())
+            start = datetime.datetime.combine(monday - datetime.timedelta(weeks=4), datetime.time())
+            return 200, {"data": {"schoolCalendar": [{
+                "createTime": int(start.timestamp()), "creator": self.calendar_day["data"]["schoolCalendarDay"][0]["creator"],
+                "endTime": int((start + datetime.timedelta(weeks=20)).timestamp()), "id": "fake-term",
+                "memo": "", "startTime": int(start.timestamp()), "term": 1, "termName": "第一学期",
+                "updateTime": int(start.timestamp()), "year": start.year, "__typename": "SchoolCalendar"}]}}
+        if "userSchedules" in text:
+            filter_ = variables.get("filter") or {}
+            begin = filter_.get("startTime", {}).get("eq", 0) / 1000
+            end = filter_.get("endTime", {}).get("eq", float("inf")) / 1000
+            with self._lock:
+                data = [copy.deepcopy(s) for s in self.schedules if s["startTime"] < end and begin < s["endTime"]]
+            return 200, {"data": {"userSchedules": data}}
+        return 200, {"errors": [{"message": "unsupported query."}], "data": None}
+
+
+LOGIN_PAGE = "<html><head><title>统一身份认证</title></head><body>login</body></html>"
+
+
+class FakeEcnuServer:
+    """
+    替身服务器, 在后台线程中运行.
+
+    Examples:
+
+    >>> from src.net import HttpClient
+    >>> from tests.fake_ecnu import import_plugin_module
+    >>> LibraryQuery, LibCache = import_plugin_module("library.query").LibraryQuery, \\
+    ...     import_plugin_module("library.req").LibCache
+    >>> with FakeEcnuServer() as server:
+    ...     client = HttpClient(base_url=server.base_url)
+    ...     query = LibraryQuery(LibCache(TOKEN, {}), client)
+    ...     query.quick_select().get_free_seats_num() > 0
+    True
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0):
+        """
+        Parameters:
+            host: 监听地址.
+            port: 监听端口, 0 表示随机选择空闲端口.
+            latency: 每个请求的额外延迟 (s), 用于模拟网络往返.
+        """
+        self.state = FakeEcnuState()
+        self.latency = latency
+        self.requests: list[tuple[str, str, str]] = []  # 收到的请求: (method, 域名, 路径).
+        self.in_flight = 0  # 正在处理的请求数.
+        self.peak_in_flight = 0  # 同时处理的请求数的最大值, 用于检查客户端的并发.
+        self._faults: dict[str, list[int]] = {}
+        self._lock = threading.Lock()
+        self._routes: dict[tuple[str, str, str], tuple[Callable[[dict, dict], Reply], Optional[str]]] = {}
+        self._add_routes()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    def _add_routes(self):
+        s = self.state
+        for method, host, path, handler, auth in [
+            ("POST", "seat-lib.ecnu.edu.cn", "/reserve/index/quickSelect", s.lib_quick_select, "lib"),
+            ("POST", "seat-lib.ecnu.edu.cn", "/api/Seat/date", s.lib_date, "lib"),
+            ("POST", "seat-lib.ecnu.edu.cn", "/api/Seat/seat", s.lib_seat, "lib"),
+            ("POST", "seat-lib.ecnu.edu.cn", "/api/Seat/confirm", s.lib_confirm, "lib"),
+            ("POST", "seat-lib.ecnu.edu.cn", "/api/index/subscribe", s.lib_subscribe, "lib"),
+            ("POST", "seat-lib.ecnu.edu.cn", "/api/Space/cancel", s.lib_cancel, "lib"),
+            ("GET", "studyroom.ecnu.edu.cn", "/ic-web/reserve", s.room_available, "ic"),
+            ("POST", "studyroom.ecnu.edu.cn", "/ic-web/reserve", s.reserve, "ic"),
+            ("GET", "studyroom.ecnu.edu.cn", "/ic-web/reserve/resvInfo", s.resv_info, "ic"),
+            ("POST", "studyroom.ecnu.edu.cn", "/ic-web/reserve/delete", s.delete_reservation, "ic"),
+            ("GET", "studyroom.ecnu.edu.cn", "/ic-web/auth/userInfo", s.user_info, "ic"),
+            ("POST", "portal2023.ecnu.edu.cn", "/bus/graphql/calendar-new", s.graphql, "portal"),
+        ]:
+            self._routes[(method, host, path)] = (handler, auth)
+
+    @property
+    def port(self) -> int:
+        return self._httpd.server_address[1]
+
+    @property
+    def base_url(self) -> str:
+        """作为 HttpClient 的 base_url 或者环境变量 ECNU_BASE_URL 的值."""
+        return f"http://{self._httpd.server_address[0]}:{self.port}"
+
+    def fail_next(self, path: str, *statuses: int):
+        """
+        让之后对 path (例如 "/api/Seat/confirm") 的请求依次返回 statuses 中的状态码, 用于模拟服务器故障.
+        """
+        with self._lock:
+            self._faults.setdefault(path, []).extend(statuses)
+
+    def start(self) -> FakeEcnuServer:
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-ecnu", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def _dispatch(self, method: str, raw_path: str, headers, raw_body: bytes) -> Reply:
+        parts = urlsplit(raw_path)
+        host, _, path = parts.path.lstrip("/").partition("/")
+        path = "/" + path
+        with self._lock:
+            self.requests.append((method, host, path))
+            faults = self._faults.get(path)
+            fault = faults.pop(0) if faults else None
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            return self._reply_to(method, host, path, parts.query, headers, raw_body, fault)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def _reply_to(self, method: str, host: str, path: str, query: str, headers, raw_body: bytes,
+                  fault: Optional[int]) -> Reply:
+        if self.latency:
+            time.sleep(self.latency)
+        if fault is not None:
+            return fault, "<html><body>fault injected</body></html>"
+        route = self._routes.get((method, host, path))
+        if route is None:
+            return 404, "<html><body>404 Not Found</body></html>"
+        handler, auth = route
+        if auth in ("lib", "portal") and headers.get("Authorization") != TOKEN:
+            return (200, LOGIN_PAGE) if auth == "lib" else (401, {"errors": [{"message": "unauthorized"}]})
+        if auth == "ic" and f"ic-cookie={IC_COOKIE}" not in (headers.get("Cookie") or ""):
+            return 200, {"code": 300, "message": "用户未登录"}
+        try:
+            body = json.loads(raw_body) if raw_body else {}
+        except ValueError:
+            return 400, {"code": 400, "message": "invalid json"}
+        return handler(body if isinstance(body, dict) else {}, dict(parse_qsl(query)))
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _reply(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                status, content = server._dispatch(self.command, self.path, self.headers, self.rfile.read(length))
+                if isinstance(content, str):
+                    data, content_type = content.encode("utf-8"), "text/html; charset=utf-8"
+                else:
+                    data, content_type = json.dumps(content, ensure_ascii=False).encode("utf-8"), \
+                        "application/json; charset=utf-8"
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = _reply
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,57 @@
+import os
+import tempfile
+import unittest
+
+from benchmarks import hot_paths
+from benchmarks.harness import registered_cases, run, dump, load, compare
+
+
+class HotPathsTest(unittest.TestCase):
+    def test_all_cases_run(self):
+        cases = registered_cases()
+        self.assertGreaterEqual(len(cases), 14)
+        result = run(cases, repeat=1, number=1)
+        self.assertEqual({c.name for c in cases}, set(result["results"]))
+        for res in result["results"].values():
+            self.assertGreater(res["min"], 0)
+
+    def test_filter(self):
+        names = [c.name for c in registered_cases(["library.encryptor.*crypt", "electric_bill.s*"])]
+        self.assertEqual(["electric_bill.smooth", "library.encryptor.decrypt", "library.encryptor.encrypt"], names)
+
+    def test_compare_with_baseline(self):
+        baseline = run(registered_cases(["library.encryptor.encrypt"]), repeat=1, number=1)
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "baseline.json")
+            dump(baseline, path)
+            baseline = load(path)
+        current = {"results": {
+            "library.encryptor.encrypt": {"min": baseline["results"]["library.encryptor.encrypt"]["min"] * 2},
+            "new.case": {"min": 1.0},
+        }}
+        comparison = compare(current, baseline, threshold=0.2)
+        self.assertEqual("regressed", comparison["library.encryptor.encrypt"]["status"])
+        self.assertEqual("new", comparison["new.case"]["status"])
+        current["results"]["library.encryptor.encrypt"]["min"] /= 4
+        self.assertEqual("improved", compare(current, baseline)["library.encryptor.encrypt"]["status"])
+
+    def test_load_rejects_other_files(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "other.json")
+            with open(path, "w") as f:
+                f.write("{}")
+            self.assertRaises(ValueError, load, path)
+
+    def test_main_exit_code(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "baseline.json")
+            args = ["-k", "encryptor.encrypt", "--repeat", "1", "--number", "1", "--baseline", path]
+            self.assertEqual(0, hot_paths.main(args + ["--save-baseline"]))
+            baseline = load(path)
+            baseline["results"]["library.encryptor.encrypt"]["min"] = 1e-12
+            dump(baseline, path)
+            self.assertEqual(1, hot_paths.main(args + ["--compare"]))
+
+
+if __name__ == '__main__':
+    unittest.main()
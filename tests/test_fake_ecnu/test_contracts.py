@@ -0,0 +1,102 @@
+import asyncio
+import datetime
+import logging
+import unittest
+
+from websockets.asyncio.client import connect
+
+from src.log import init
+from src.net.client import HttpClient
+from src.uia.login import LoginError
+from tests.fake_ecnu import FakeEcnuServer, FakeDegreeServer, TOKEN, IC_COOKIE, import_plugin_module
+
+calendar_plugin = import_plugin_module("calendar_notice.calendar_plugin")
+CalendarQuery, PortalCache = calendar_plugin.CalendarQuery, calendar_plugin.PortalCache
+GuardClient = import_plugin_module("electric_bill.client").GuardClient
+LibraryQuery = import_plugin_module("library.query").LibraryQuery
+LibCache = import_plugin_module("library.req").LibCache
+Subscribe = import_plugin_module("library.subscribe").Subscribe
+StudyRoomCache = import_plugin_module("studyroom.req").StudyRoomCache
+StudyRoomReserve = import_plugin_module("studyroom.subscribe").StudyRoomReserve
+
+
+class TestFakeEcnu(unittest.TestCase):
+    def setUp(self):
+        init()
+        self.server = FakeEcnuServer().start()
+        self.addCleanup(self.server.stop)
+        self.http = HttpClient(base_url=self.server.base_url)
+        self.addCleanup(self.http.close)
+
+    def test_library(self):
+        query = LibraryQuery(LibCache(TOKEN, {}), self.http)
+        subscribe = Subscribe(LibCache(TOKEN, {}), self.http)
+        qs = query.quick_select()
+        area_id = qs.get_area_by(lambda area: "一楼A区" in area["nameMerge"])
+        free = qs.get_free_seats_num()
+        day = query.query_time(area_id)[-1]
+        self.assertEqual(day.day, datetime.date.today() + datetime.timedelta(days=1))
+        time_period = day.times[0]
+        seat = next(s for s in query.query_seats(area_id, time_period) if s.status == 1)
+        result = subscribe.confirm(seat.id, time_period)  # 服务器解密 aesjson 后预约.
+        self.assertEqual(result["no"], seat.no)
+        self.assertEqual(query.quick_select().get_free_seats_num(), free - 1)
+        booked = next(s for s in query.query_seats(area_id, time_period) if s.id == seat.id)
+        self.assertEqual(booked.status, 2)
+        subscribes = subscribe.query_subscribes()
+        self.assertEqual([int(s["space_id"]) for s in subscribes], [seat.id])
+        subscribe.cancel(int(subscribes[0]["id"]))
+        self.assertEqual(subscribe.query_subscribes(), [])
+        with self.assertRaises(LoginError):
+            LibraryQuery(LibCache("expired", {}), self.http).quick_select()
+
+    def test_studyroom(self):
+        reserve = StudyRoomReserve(StudyRoomCache({"ic-cookie": IC_COOKIE}), self.http)
+        result = reserve.submit_reserve("tomorrow", "普陀校区木门研究室", 60)
+        self.assertEqual(result["code"], 0)
+        uuid = reserve._get_room_uuid()
+        self.assertEqual(uuid, result["data"]["uuid"])
+        rooms = reserve.query.query_roomsAvailable("tomorrow", "普陀校区木门研究室")
+        self.assertTrue(any(room["resvInfo"] for room in rooms))
+        reserve.cancel_reservation(uuid)
+        self.assertEqual(reserve.query.check_resvInfo(needStatus=6), [])
+        with self.assertRaises(LoginError):
+            StudyRoomReserve(StudyRoomCache({}), self.http)._fetch_userInfo()
+
+    def test_portal(self):
+        query = CalendarQuery(PortalCache(TOKEN), self.http)
+        self.assertEqual(query.query_school_calendar()["schoolCalendar"][0]["termName"], "第一学期")
+        now = datetime.datetime.now()
+        monday = datetime.datetime.combine(now.date() - datetime.timedelta(days=now.weekday()), datetime.time())
+        schedules = query.query_user_schedules(int(monday.timestamp() * 1000),
+                                               int((monday + datetime.timedelta(days=7)).timestamp() * 1000),
+                                               False)
+        self.assertTrue(schedules)
+        self.assertTrue(all(monday <= s.startTime < monday + datetime.timedelta(days=7) for s in schedules))
+        with self.assertRaises(LoginError):
+            CalendarQuery(PortalCache("expired"), self.http).query_school_calendar()
+
+    def test_fault_injection(self):
+        self.server.fail_next("/api/index/subscribe", 502)
+        self.assertEqual(Subscribe(LibCache(TOKEN, {}), self.http).query_subscribes(), [])  # 重试后成功.
+
+
+class TestFakeDegree(unittest.TestCase):
+    def test_guard_client(self):
+        with FakeDegreeServer(degree=42.5) as server:
+            async def run():
+                async with connect(f"ws://{server.address}/") as ws:
+                    client = GuardClient(ws, server.key, server.iv, logging.getLogger("test"))
+                    await client.post_room("101", 1, "building")
+                    await client.post_token("csrf", {"a": "b"})
+                    return await client.fetch_degree(), await client.fetch_degree_file()
+
+            degree, history = asyncio.run(run())
+        self.assertEqual(degree, 42.5)
+        self.assertEqual(server.room, {"roomNo": "101", "elcarea": 1, "elcbuis": "building"})
+        self.assertEqual(server.token["x_csrf_token"], "csrf")
+        self.assertTrue(history.endswith(",42.5"))
+
+
+if __name__ == '__main__':
+    unittest.main()
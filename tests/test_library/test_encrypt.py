@@ -0,0 +1,40 @@
+import datetime
+import unittest
+
+from tests.fake_ecnu import import_plugin_module
+
+encrypt = import_plugin_module("library.encrypt")
+Encryptor, ConfirmEncryptor = encrypt.Encryptor, encrypt.ConfirmEncryptor
+
+
+class ConfirmEncryptorTest(unittest.TestCase):
+    def test_matches_encryptor(self):
+        encryptor = ConfirmEncryptor()
+        # 不同位数的 id 使明文长度不同, 覆盖不同块数的分组和逐个加密的路径.
+        pairs = [(9, 1), (3361, 1508173), ("3362", "1508174"), (123456789012, 15081731508173)] * 3
+        expected = [Encryptor.encrypt({"seat_id": s, "segment": f"{g}"}) for s, g in pairs]
+        self.assertEqual(expected, encryptor.encrypt_many(pairs))
+        self.assertEqual(expected[:2], encryptor.encrypt_many(pairs[:2]))
+        self.assertEqual(expected[1], encryptor.encrypt_confirm(3361, 1508173))
+        self.assertEqual([], encryptor.encrypt_many([]))
+        data = {"seat_id": "3361", "segment": "1508173"}
+        self.assertEqual("6l1+11NSwbo9Rje1/+pnuSqexfDXg/pPDTK0KJEG/uOIZyucecgEo7VO8ggVRom9",
+                         ConfirmEncryptor("2024112882114202").encrypt(data))
+        for token in encryptor.encrypt_many(pairs):
+            self.assertIn("seat_id", Encryptor.decrypt(token))
+
+    def test_day_rollover(self):
+        before_midnight = datetime.datetime(2024, 12, 2, 23, 59, 59, 500000)
+        now = [before_midnight.timestamp()]
+        encryptor = ConfirmEncryptor(clock=lambda: now[0])
+        self.assertEqual("2024120220214202", encryptor.key)
+        token = encryptor.encrypt_confirm(3361, 1508173)
+        self.assertEqual({"seat_id": 3361, "segment": "1508173"}, Encryptor.decrypt(token, "2024120220214202"))
+        now[0] += 0.5
+        self.assertEqual("2024120330214202", encryptor.key)
+        token = encryptor.encrypt_many([(3361, 1508173)] * 4)[3]
+        self.assertEqual({"seat_id": 3361, "segment": "1508173"}, Encryptor.decrypt(token, "2024120330214202"))
+
+
+if __name__ == '__main__':
+    unittest.main()
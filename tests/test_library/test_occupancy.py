@@ -0,0 +1,69 @@
+import datetime
+import json
+import tempfile
+import unittest
+
+import numpy as np
+
+from tests.fake_ecnu import FIXTURE_DIR, import_plugin_module
+
+query = import_plugin_module("library.query")
+occupancy = import_plugin_module("library.occupancy")
+
+
+def quick_select(free: dict = None):
+    with open(FIXTURE_DIR / "quick_select_example.json", "r", encoding="utf-8") as f:
+        data = json.load(f)
+    for area in data["area"]:
+        area["free_num"] = (free or {}).get(int(area["id"]), area["free_num"])
+    return query.QuickSelect(data)
+
+
+class OccupancyRecorderTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.recorder = occupancy.OccupancyRecorder(self.dir.name, interval=60)
+        self.monday = datetime.datetime(2024, 12, 2, 15, 10)  # 星期一.
+
+    def ts(self, days=0, hours=0, minutes=0):
+        return (self.monday + datetime.timedelta(days=days, hours=hours, minutes=minutes)).timestamp()
+
+    def test_record_and_load(self):
+        qs = quick_select()
+        self.assertTrue(self.recorder.record(qs, self.ts()))
+        self.assertFalse(self.recorder.due(self.ts(minutes=0.5)))
+        self.assertFalse(self.recorder.record(qs, self.ts(minutes=0.5)))  # 未到采样间隔.
+        self.assertTrue(self.recorder.record(qs, self.ts(minutes=1)))
+        path = self.recorder.partition_path(self.monday.date())
+        self.assertEqual(2 * len(qs.areas) * occupancy.RECORD_DTYPE.itemsize, path.stat().st_size)
+        with open(path, "ab") as f:
+            f.write(b"\x00" * 5)  # 模拟写入中断.
+        records = self.recorder.load(self.monday.date(), self.monday.date())
+        self.assertEqual(2 * len(qs.areas), len(records))
+        self.assertEqual(qs.areas, records["area"][:len(qs.areas)].tolist())
+        self.assertEqual(qs.get_free_seats_num(), int(records["free"][:len(qs.areas)].sum()))
+
+    def test_history_queries(self):
+        area_a, area_b = 8, 40
+        # 连续三周, 每个星期一 15 点 area_a 空闲 10, 20, 30, area_b 空闲 25; 16 点 area_a 空闲 0.
+        for week, free in enumerate((10, 20, 30)):
+            self.recorder.record(quick_select({area_a: free, area_b: 25}), self.ts(days=7 * week))
+            self.recorder.record(quick_select({area_a: 0, area_b: 25}), self.ts(days=7 * week, hours=1))
+        last_monday = self.monday + datetime.timedelta(days=14)
+        profile = self.recorder.mean_free(area_a, today=last_monday.date())
+        self.assertEqual((7, 24), profile.shape)
+        self.assertEqual(20, profile[0, 15])
+        self.assertEqual(0, profile[0, 16])
+        self.assertTrue(np.isnan(profile[1, 15]))
+        self.assertEqual({area_a: 20, area_b: 25}, self.recorder.predict([area_a, area_b], last_monday))
+        self.assertEqual({area_a: 30, area_b: 25},
+                         self.recorder.predict([area_a, area_b], last_monday, days=1))
+        self.assertEqual([area_b, area_a, 99999], self.recorder.rank_areas([99999, area_a, area_b], last_monday))
+        self.assertEqual([area_b], self.recorder.rank_areas([area_a, area_b], last_monday, k=1))
+        self.assertEqual(2, self.recorder.prune(7, today=last_monday.date()))
+        self.assertEqual({area_a: 30, area_b: 25}, self.recorder.predict([area_a, area_b], last_monday))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import json
+import unittest
+
+from tests.fake_ecnu import FIXTURE_DIR, import_plugin_module
+
+query = import_plugin_module("library.query")
+
+
+def load_quick_select():
+    with open(FIXTURE_DIR / "quick_select_example.json", "r", encoding="utf-8") as f:
+        return query.QuickSelect(json.load(f))
+
+
+def legacy_premises_of(qs, id_):
+    """QuickSelect.get_premises_of 原来的实现."""
+    obj = qs.get_by_id(id_)
+    if obj is None:
+        return -1
+    while int(obj["parentId"]) != 0:
+        obj = qs.get_by_id(int(obj["parentId"]))
+    if obj is None:
+        return -1
+    return {"普陀校区": 0, "闵行校区": 1}.get(obj["name"], -1)
+
+
+class QuickSelectIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.qs = load_quick_select()
+
+    def test_premises_of(self):
+        for id_ in list(self.qs.storage) + [-5, 99999]:
+            self.assertEqual(legacy_premises_of(self.qs, id_), self.qs.get_premises_of(id_))
+        self.assertEqual({0, 1}, {self.qs.get_premises_of(a) for a in self.qs.areas})
+
+    def test_aggregates(self):
+        free = {a: self.qs.get_by_id(a)["free_num"] for a in self.qs.areas}
+        self.assertEqual(sum(free.values()), self.qs.get_free_seats_num())
+        for storey in self.qs.storeys:
+            expected = sum(n for a, n in free.items() if int(self.qs.get_by_id(a)["parentId"]) == storey)
+            self.assertEqual(expected, self.qs.get_free_seats_num_of(storey))
+        for campus, premises in zip((0, 1), self.qs.premises):
+            areas = self.qs.get_areas_of_campus(campus)
+            self.assertEqual([a for a in self.qs.areas if self.qs.get_premises_of(a) == campus], areas)
+            self.assertEqual(sum(free[a] for a in areas), self.qs.get_free_seats_num_of(premises))
+        self.assertEqual(0, self.qs.get_free_seats_num_of(-5))
+
+    def test_ranking(self):
+        by_free = sorted(self.qs.areas, key=lambda a: -self.qs.get_by_id(a)["free_num"])
+        self.assertEqual(by_free[:5], self.qs.top_areas(5))
+        minhang = self.qs.top_areas(3, campus=1)
+        self.assertEqual([a for a in by_free if self.qs.get_premises_of(a) == 1][:3], minhang)
+        self.assertEqual(by_free[0], self.qs.get_most_free_seats_area())
+        self.assertEqual(self.qs.top_areas(1, campus=0)[0],
+                         self.qs.get_most_free_seats_area(lambda area: self.qs.get_premises_of(area["id"]) == 0))
+        self.assertEqual(-1, self.qs.get_most_free_seats_area(lambda area: False))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import datetime
+import unittest
+
+from src.log import init
+from src.net.client import HttpClient
+from tests.fake_ecnu import FakeEcnuServer, TOKEN, import_plugin_module
+from tests.fake_ecnu.server import decrypt_aesjson
+
+LibraryQuery = import_plugin_module("library.query").LibraryQuery
+LibCache = import_plugin_module("library.req").LibCache
+Subscribe = import_plugin_module("library.subscribe").Subscribe
+scheduled = import_plugin_module("library.scheduled")
+
+
+class FakeContext:
+    """只实现 call_at 的插件上下文, 回调由测试手动执行."""
+
+    def __init__(self):
+        self.calls = []
+
+    def call_at(self, timestamp, callback):
+        self.calls.append((timestamp, callback))
+        return len(self.calls)
+
+    def run_next(self):
+        timestamp, callback = self.calls.pop(0)
+        callback(self)
+        return timestamp
+
+
+class ScheduledSeatReservationTest(unittest.TestCase):
+    def setUp(self):
+        init()
+        self.server = FakeEcnuServer().start()
+        self.addCleanup(self.server.stop)
+        self.http = HttpClient(base_url=self.server.base_url, rate=1000, burst=1000)
+        self.addCleanup(self.http.close)
+        cache = LibCache(TOKEN, {})
+        self.query = LibraryQuery(cache, self.http)
+        self.subscriber = Subscribe(cache, self.http)
+
+    def new_reservation(self, target: datetime.datetime, **kwargs):
+        reservation = scheduled.ScheduledSeatReservation(self.query, self.subscriber, target, **kwargs)
+        reservation.sync_samples = 1
+        return reservation
+
+    def test_prepare(self):
+        target = datetime.datetime.now() + datetime.timedelta(minutes=1)
+        reservation = self.new_reservation(target, candidates=4)
+        reservation.prepare()
+        self.assertEqual(4, len(reservation.candidates))
+        scores = [c.score for c in reservation.candidates]
+        self.assertEqual(sorted(scores, reverse=True), scores)
+        for candidate, aesjson in zip(reservation.candidates, reservation.payloads):
+            self.assertEqual(1, candidate.seat.status)
+            self.assertEqual({"seat_id": candidate.seat.id, "segment": str(candidate.time_period.id)},
+                             decrypt_aesjson(aesjson, target.date()))
+        self.assertEqual([], reservation.attempts)  # 准备阶段不提交预约.
+        self.assertEqual({}, self.server.state.bookings)
+
+    def test_arm_and_fire(self):
+        # 只同步一次时估计的偏差最多有 0.5s 的误差, 目标时刻需要留出余量.
+        target = datetime.datetime.now() + datetime.timedelta(seconds=1)
+        reservation = self.new_reservation(target)
+        ctx = FakeContext()
+        finished = []
+        reservation.arm(ctx, finished.append)
+        self.assertTrue(reservation.armed)
+        self.assertAlmostEqual(target.timestamp() - reservation.prepare_lead, ctx.run_next())
+        self.assertTrue(reservation.prepared)
+        # 第一个候选座位在准备之后消失, 预约失败, 提交第二个.
+        first, second = reservation.candidates[:2]
+        seats = self.server.state.seats_of(first.area_id)
+        seats.remove(next(s for s in seats if int(s["id"]) == first.seat.id))
+        # 发出在专用线程中进行, 之后再通过 call_at 在执行器中报告结果.
+        self.assertTrue(reservation.armed)
+        self.assertTrue(reservation.join(timeout=5))
+        ctx.run_next()
+        self.assertEqual([reservation], finished)
+        self.assertFalse(reservation.armed)
+        self.assertGreaterEqual(reservation.clock.now(), target.timestamp())
+        self.assertLess(abs(reservation.fire_error), 0.05)
+        self.assertEqual(second, reservation.booked)
+        self.assertEqual([first, second], [c for c, _ in reservation.attempts])
+        self.assertEqual(1, reservation.result["code"])
+        self.assertEqual(1, len(self.server.state.bookings))
+
+    def test_day_opens_at_target(self):
+        tomorrow = datetime.date.today() + datetime.timedelta(days=1)
+        self.server.state.closed_days.add(tomorrow)
+        target = datetime.datetime.now() + datetime.timedelta(minutes=1)
+        reservation = self.new_reservation(target, day=tomorrow)
+        reservation.prepare()
+        # 预约开放之前没有这一天的时间段, 不会改为预约其他日期.
+        self.assertEqual([], reservation.candidates)
+        self.server.state.closed_days.discard(tomorrow)  # 到达目标时刻, 预约开放.
+        result = reservation.fire()
+        self.assertEqual(1, result["code"])
+        self.assertEqual(tomorrow, reservation.booked.time_period.day.day)
+        self.assertEqual(1, len(self.server.state.bookings))
+        self.assertEqual(1, len(reservation.attempts))
+
+
+if __name__ == '__main__':
+    unittest.main()
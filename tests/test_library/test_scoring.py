@@ -0,0 +1,117 @@
+import json
+import math
+import unittest
+
+from tests.fake_ecnu import FIXTURE_DIR, import_plugin_module
+
+seat = import_plugin_module("library.seat")
+scoring = import_plugin_module("library.scoring")
+
+
+def load_fixture() -> list[dict]:
+    with open(FIXTURE_DIR / "query_seats_example.json", "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_seats() -> list:
+    return seat.Seat.from_response(load_fixture())
+
+
+def legacy_most_isolated(seats):
+    """SeatFinder.find_most_isolated 原来的实现."""
+    max_distance = 0
+    target_seat = None
+    for s in seats:
+        if not s.is_available():
+            continue
+        distance = sum([s.distance_to(s1) for s1 in seats if not s1.is_available()])
+        if target_seat is None or distance > max_distance:
+            max_distance = distance
+            target_seat = s
+    return target_seat
+
+
+class SeatScorerTest(unittest.TestCase):
+    def setUp(self):
+        self.seats = load_seats()
+        # 示例中的空闲座位较多, 把一部分标记为已预约, 使结果更有区分度.
+        for s in self.seats[::3]:
+            s.status = 2
+
+    def test_sum_matches_legacy(self):
+        self.assertIs(legacy_most_isolated(self.seats), seat.SeatFinder(self.seats).find_most_isolated())
+        scores = scoring.SeatScorer(self.seats).scores("sum")
+        for s, score in zip(self.seats, scores):
+            if s.is_available():
+                expected = sum(s.distance_to(s1) for s1 in self.seats if not s1.is_available())
+                self.assertAlmostEqual(expected, score, places=6)
+            else:
+                self.assertEqual(-math.inf, score)
+
+    def test_objectives(self):
+        scorer = scoring.SeatScorer(self.seats)
+        occupied = [s for s in self.seats if not s.is_available()]
+        free = [s for s in self.seats if s.is_available()]
+        best = scorer.best("max_min")
+        self.assertAlmostEqual(max(min(s.distance_to(o) for o in occupied) for s in free),
+                               min(best.distance_to(o) for o in occupied))
+        best = scorer.best("crowding")
+        crowding = {s.id: sum(1 / s.distance_to(o) ** 2 for o in occupied) for s in free}
+        self.assertAlmostEqual(min(crowding.values()), crowding[best.id])
+        best = scorer.best("entrance", entrance=(0, 0))
+        self.assertEqual(max(math.hypot(s.x, s.y) for s in free), math.hypot(best.x, best.y))
+        self.assertRaises(ValueError, scorer.scores, "entrance")
+        self.assertRaises(ValueError, scorer.scores, "nearest")
+
+    def test_update_and_empty(self):
+        scorer = scoring.SeatScorer(self.seats)
+        self.assertIsNone(scoring.SeatScorer([]).best())
+        for s in self.seats:
+            s.status = 2
+        scorer.update(self.seats)
+        self.assertIsNone(scorer.best())
+        self.seats[5].status = 1
+        scorer.update(self.seats[5:6])
+        self.assertIs(self.seats[5], scorer.best("max_min"))
+
+
+class SeatTableTest(unittest.TestCase):
+    def setUp(self):
+        self.data = load_fixture()
+        for s in self.data[::3]:
+            s["status"] = "2"
+        self.seats = seat.Seat.from_response(self.data)
+        self.table = seat.SeatTable(self.data)
+
+    def test_columns_and_items(self):
+        self.assertEqual(len(self.seats), len(self.table))
+        self.assertEqual([s.id for s in self.seats], self.table.ids.tolist())
+        self.assertEqual([s.x for s in self.seats], self.table.xs.tolist())
+        self.assertEqual([s.height for s in self.seats], self.table.heights.tolist())
+        self.assertEqual([s.is_available() for s in self.seats], self.table.available().tolist())
+        first = self.table[scoring.np.int64(0)]
+        self.assertIs(first, self.table[0])  # 构造之后缓存.
+        self.assertEqual((self.seats[0].id, self.seats[0].no), (first.id, first.no))
+        self.assertEqual(self.data[0]["area_name"], first["area_name"])
+        self.assertEqual([s.id for s in self.seats[-3:]], [s.id for s in self.table[-3:]])
+        self.assertRaises(AttributeError, setattr, first, "extra", 1)
+
+    def test_scorer_matches_list(self):
+        from_list = scoring.SeatScorer(self.seats)
+        from_table = scoring.SeatScorer(self.table)
+        for objective in ("sum", "max_min", "crowding"):
+            self.assertEqual(from_list.scores(objective).tolist(), from_table.scores(objective).tolist())
+            self.assertEqual(from_list.best(objective).id, from_table.best(objective).id)
+        finder = seat.SeatFinder(self.table)
+        self.assertEqual(seat.SeatFinder(self.seats).find_most_isolated().id, finder.find_most_isolated().id)
+        self.assertEqual([s.id for s in seat.SeatFinder(self.seats).find_group(3, 8)],
+                         [s.id for s in finder.find_group(3, 8)])
+        best = from_table.best("max_min")
+        best.status = 2
+        from_table.update([best])
+        self.assertEqual(2, self.table.status[self.table.ids.tolist().index(best.id)])
+        self.assertNotEqual(best.id, from_table.best("max_min").id)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+
+from src.log import init
+from src.net.client import HttpClient
+from tests.fake_ecnu import FakeEcnuServer, TOKEN, import_plugin_module
+
+LibraryQuery = import_plugin_module("library.query").LibraryQuery
+LibCache = import_plugin_module("library.req").LibCache
+scoring = import_plugin_module("library.scoring")
+search = import_plugin_module("library.search")
+
+
+class SeatSearchTest(unittest.TestCase):
+    def setUp(self):
+        init()
+        self.server = FakeEcnuServer().start()
+        self.addCleanup(self.server.stop)
+        self.http = HttpClient(base_url=self.server.base_url, rate=1000, burst=1000)
+        self.addCleanup(self.http.close)
+        self.query = LibraryQuery(LibCache(TOKEN, {}), self.http)
+
+    def brute_force(self, qs, area_filter=lambda a: True) -> float:
+        best = float("-inf")
+        for area_id in qs.areas:
+            if not area_filter(qs.get_by_id(area_id)):
+                continue
+            time_period = self.query.query_time(area_id)[0].times[0]
+            scorer = scoring.SeatScorer(self.query.query_seats(area_id, time_period))
+            best = max(best, float(search.isolation_rank(scorer).max()))
+        return best
+
+    def test_global_best(self):
+        # 把一个区域的座位全部设为空闲, 使其成为全局最好的区域.
+        empty_area = 17
+        for seat in self.server.state.seats_of(empty_area):
+            seat["status"] = "1"
+        qs = self.query.quick_select()
+        best = search.SeatSearch(self.query, max_areas=None).best(qs)
+        self.assertEqual(empty_area, best.area_id)
+        self.assertEqual(search.ISOLATION_CAP, best.score)
+        self.assertEqual(self.brute_force(qs), best.score)
+        self.assertEqual(1, best.seat.status)
+
+        premise = qs.get_premises_of(empty_area)
+        area_filter = lambda area: qs.get_premises_of(area["id"]) != premise
+        best = search.SeatSearch(self.query, max_areas=None).best(qs, area_filter)
+        self.assertNotEqual(premise, qs.get_premises_of(best.area_id))
+        self.assertEqual(self.brute_force(qs, area_filter), best.score)
+        self.assertIsNone(search.SeatSearch(self.query).best(qs, lambda area: False))
+
+    def test_target_day(self):
+        qs = self.query.quick_select()
+        area_id = qs.top_areas(1)[0]
+        days = self.query.query_time(area_id)
+        for index in (0, 1):
+            results = search.SeatSearch(self.query, max_areas=1, day=index).search(qs)
+            self.assertEqual([t.id for t in days[index].times], [c.time_period.id for c in results])
+        self.assertEqual([], search.SeatSearch(self.query, max_areas=1, day=len(days)).search(qs))
+
+    def test_concurrent_queries(self):
+        # 每个请求都有延迟, 使并发的请求在服务器上重叠.
+        self.server.latency = 0.1
+        qs = self.query.quick_select()
+        areas = search.SeatSearch(self.query, max_areas=8).candidate_areas(qs)
+        self.assertEqual(8, len(areas))
+        self.server.peak_in_flight = 0
+        results = search.SeatSearch(self.query, concurrency=8, max_areas=8).search(qs)
+        self.assertEqual(set(areas), {c.area_id for c in results})
+        self.assertGreater(self.server.peak_in_flight, 1)
+        self.assertLessEqual(self.server.peak_in_flight, 8)
+        self.server.peak_in_flight = 0
+        search.SeatSearch(self.query, concurrency=1, max_areas=8).search(qs)
+        self.assertEqual(1, self.server.peak_in_flight)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import unittest
+
+from src.log import init
+from src.net.client import HttpClient
+from src.uia.login import LoginError
+from tests.fake_ecnu import FakeEcnuServer, TOKEN, import_plugin_module
+
+LibraryQuery = import_plugin_module("library.query").LibraryQuery
+LibCache = import_plugin_module("library.req").LibCache
+Subscribe = import_plugin_module("library.subscribe").Subscribe
+sniper = import_plugin_module("library.sniper")
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class SeatSniperTest(unittest.TestCase):
+    area_id = 17
+
+    def setUp(self):
+        init()
+        self.server = FakeEcnuServer().start()
+        self.addCleanup(self.server.stop)
+        self.http = HttpClient(base_url=self.server.base_url, rate=1000, burst=1000)
+        self.addCleanup(self.http.close)
+        cache = LibCache(TOKEN, {})
+        self.query = LibraryQuery(cache, self.http)
+        self.subscriber = Subscribe(cache, self.http)
+        # 所有区域都没有空闲座位.
+        for area in self.server.state.quick_select["area"]:
+            area["free_num"] = 0
+        for seat in self.server.state.seats_of(self.area_id):
+            seat["status"] = "2"
+
+    def free_seat(self, index: int = 0):
+        """空出 area_id 中的一个座位."""
+        seat = self.server.state.seats_of(self.area_id)[index]
+        seat["status"] = "1"
+        self.server.state._adjust_free(self.area_id, 1)
+        return int(seat["id"])
+
+    def new_sniper(self, **kwargs) -> sniper.SeatSniper:
+        kwargs.setdefault("window", 600)
+        return sniper.SeatSniper(self.query, self.subscriber, **kwargs)
+
+    def test_adaptive_interval_and_budget(self):
+        clock = FakeClock()
+        s = self.new_sniper(budget=8, clock=clock)
+        # 第一次轮询只作为比较的基准, 之后空闲座位数不变才开始退避.
+        self.assertEqual([sniper.MIN_INTERVAL, 6, 12], [s.step(), s.step(), s.step()])
+        # 空闲座位数变化, 但是座位已经被占用, 轮询间隔恢复到最短.
+        self.server.state._adjust_free(self.area_id, 1)
+        self.assertEqual(sniper.MIN_INTERVAL, s.step())
+        self.assertEqual([], s.attempts)
+        self.assertEqual(6, s.requests)  # 4 次轮询, 加上一次 query_time 和 query_seats.
+        self.assertEqual(6, s.step())
+        self.assertEqual(7, s.requests)
+        # 剩余的预算不足以尝试预约, 只轮询.
+        self.free_seat()
+        self.assertIsNone(s.step())
+        self.assertEqual("budget", s.finish_reason)
+        self.assertEqual(8, s.requests)
+        self.assertEqual({}, self.server.state.bookings)
+        self.assertIsNone(s.step())
+
+    def test_book_freed_seat(self):
+        self.server.latency = 0.05
+        s = self.new_sniper()
+        self.assertIsNotNone(s.step())
+        seat_id = self.free_seat()
+        self.assertIsNone(s.step())
+        self.assertEqual("booked", s.finish_reason)
+        self.assertEqual(seat_id, s.booked.seat_id)
+        self.assertEqual([s.booked], s.attempts)
+        # 发现空闲座位之后还需要 query_time, query_seats 和 confirm 三个请求.
+        self.assertGreaterEqual(s.booked.latency, 3 * 0.05)
+        self.assertEqual(1, len(self.server.state.bookings))
+
+    def test_rejected_confirm(self):
+        seat_id = self.free_seat()
+        time_period = self.query.query_time(self.area_id)[0].times[0]
+        self.subscriber.confirm(seat_id, time_period)
+        self.assertRaises(LoginError, self.subscriber.confirm, seat_id, time_period)
+        # 同一时间段已有预约, 空出的座位预约失败, 继续轮询.
+        self.free_seat(1)
+        clock = FakeClock()
+        s = self.new_sniper(window=10, clock=clock)
+        self.assertEqual(sniper.MIN_INTERVAL, s.step())
+        self.assertEqual(1, len(s.attempts))
+        self.assertFalse(s.attempts[0].success)
+        clock.now = 6
+        self.assertEqual(4, s.step())  # 不超过时间窗口.
+        clock.now = 10
+        self.assertIsNone(s.step())
+        self.assertEqual("window", s.finish_reason)
+        self.assertIsNone(s.booked)
+
+
+if __name__ == '__main__':
+    unittest.main()
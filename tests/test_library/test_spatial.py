@@ -0,0 +1,72 @@
+import itertools
+import json
+import math
+import unittest
+
+from tests.fake_ecnu import FIXTURE_DIR, import_plugin_module
+
+seat = import_plugin_module("library.seat")
+spatial = import_plugin_module("library.spatial")
+
+
+def center(s):
+    return s.x + s.width / 2, s.y + s.height / 2
+
+
+def distance(a, b):
+    return math.dist(center(a), center(b))
+
+
+class SeatIndexTest(unittest.TestCase):
+    def setUp(self):
+        with open(FIXTURE_DIR / "query_seats_example.json", "r", encoding="utf-8") as f:
+            self.seats = seat.Seat.from_response(json.load(f))
+        self.index = spatial.SeatIndex(self.seats)
+        self.free = [s for s in self.seats if s.is_available()]
+
+    def test_within_matches_brute_force(self):
+        for radius in (3, 8, 20):
+            for s in self.seats[::7]:
+                expected = {f.id for f in self.free if f is not s and distance(s, f) <= radius}
+                found = self.index.within(s, radius)
+                self.assertEqual(expected, {f.id for f in found})
+                self.assertEqual(sorted(distance(s, f) for f in found), [distance(s, f) for f in found])
+
+    def test_find_group(self):
+        pair = self.index.find_group(2, 8)
+        closest = min(distance(a, b) for a, b in itertools.combinations(self.free, 2))
+        self.assertAlmostEqual(closest, distance(*pair))
+        for k in (3, 4):
+            group = self.index.find_group(k, 8)
+            self.assertEqual(k, len(group))
+            self.assertTrue(all(s.is_available() for s in group))
+            self.assertTrue(all(distance(a, b) <= 8 for a, b in itertools.combinations(group, 2)))
+        self.assertIsNone(self.index.find_group(len(self.free) + 1, 1000))
+        self.assertRaises(ValueError, self.index.find_group, 0, 8)
+
+    def test_sparse_anchors_skipped(self):
+        # 只留下一对相邻的空闲座位和若干孤立的空闲座位, 孤立座位周围不足 k 个空闲座位, 不作为起点.
+        pair = self.index.find_group(2, 8)
+        isolated = [s for s in self.free[::9] if all(distance(s, p) > 30 for p in pair)]
+        keep = {s.id for s in pair} | {s.id for s in isolated}
+        for s in self.free:
+            self.index.set_available(s.id, s.id in keep)
+        self.assertEqual({s.id for s in pair}, set(self.index._anchors(2, 8)))
+        self.assertEqual([s.id for s in pair], [s.id for s in self.index.find_group(2, 8)])
+        self.assertEqual([], self.index._anchors(3, 8))
+        self.assertIsNone(self.index.find_group(3, 8))
+
+    def test_incremental_update(self):
+        group = self.index.find_group(3, 8)
+        self.index.set_available(group[0].id, False)
+        self.assertEqual(len(self.free) - 1, self.index.free_count)
+        self.assertNotIn(group[0].id, {s.id for s in self.index.within(group[1], 8)})
+        self.assertNotIn(group[0].id, {s.id for s in self.index.find_group(3, 8)})
+        group[0].status = 1
+        self.index.update([group[0]])
+        self.assertIn(group[0].id, {s.id for s in self.index.within(group[1], 8)})
+        self.assertEqual([s.id for s in group], [s.id for s in seat.SeatFinder(self.seats).find_group(3, 8)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import threading
+import time
+import unittest
+
+from src.net.cache import ResponseCache, scope_of
+from src.net.resilience import ServerUnavailableError
+
+
+class Counter:
+    def __init__(self, delay: float = 0):
+        self.calls = 0
+        self.delay = delay
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        time.sleep(self.delay)
+        with self.lock:
+            self.calls += 1
+            return {"calls": self.calls}
+
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.responses = ResponseCache()
+        self.addCleanup(self.responses.close)
+
+    def test_ttl_and_copies(self):
+        fetcher = Counter()
+        first = self.responses.fetch("a", fetcher, payload={"x": 1}, ttl=0.1)
+        first["calls"] = 100  # 返回的是副本, 修改不影响缓存.
+        self.assertEqual(self.responses.fetch("a", fetcher, payload={"x": 1}, ttl=0.1), {"calls": 1})
+        self.assertEqual(self.responses.fetch("a", fetcher, payload={"x": 2}, ttl=0.1), {"calls": 2})
+        time.sleep(0.12)
+        self.assertEqual(self.responses.fetch("a", fetcher, payload={"x": 1}, ttl=0.1), {"calls": 3})
+        self.assertEqual(self.responses.stats()["hits"], 1)
+        self.assertEqual(self.responses.stats()["misses"], 3)
+
+    def test_stale_while_revalidate(self):
+        fetcher = Counter()
+        self.responses.fetch("a", fetcher, ttl=0.05, stale=10)
+        time.sleep(0.06)
+        self.assertEqual(self.responses.fetch("a", fetcher, ttl=0.05, stale=10), {"calls": 1})
+        deadline = time.monotonic() + 2
+        while fetcher.calls < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        time.sleep(0.01)
+        self.assertEqual(self.responses.fetch("a", fetcher, ttl=0.05, stale=10), {"calls": 2})
+        self.assertEqual(self.responses.stats()["stale_hits"], 1)
+
+    def test_concurrent_misses_share_one_request(self):
+        fetcher = Counter(delay=0.1)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.responses.fetch("a", fetcher, ttl=10)))
+                   for _ in range(5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(fetcher.calls, 1)
+        self.assertEqual(results, [{"calls": 1}] * 5)
+
+    def test_errors_and_invalidate(self):
+        def fail():
+            raise ServerUnavailableError("host")
+
+        with self.assertRaises(ServerUnavailableError):
+            self.responses.fetch("a", fail, ttl=10)
+        fetcher = Counter()
+        scope = scope_of(type("Cache", (), {"cookies": {"a": "1"}, "authorization": "x"})())
+        self.responses.fetch("a", fetcher, scope=scope, ttl=10)
+        self.responses.fetch("a", fetcher, scope="other", ttl=10)
+        self.responses.invalidate("a", scope)
+        self.assertEqual(self.responses.fetch("a", fetcher, scope=scope, ttl=10), {"calls": 3})
+        self.assertEqual(self.responses.fetch("a", fetcher, scope="other", ttl=10), {"calls": 2})
+
+    def test_invalidate_detaches_in_flight_request(self):
+        started, release = threading.Event(), threading.Event()
+
+        def before_mutation():
+            started.set()
+            release.wait(5)
+            return {"state": "before"}
+
+        results = []
+        thread = threading.Thread(target=lambda: results.append(self.responses.fetch("a", before_mutation, ttl=10)))
+        thread.start()
+        self.assertTrue(started.wait(5))
+        self.responses.invalidate("a")  # 请求发出之后服务器状态发生了变化.
+        # 之后的调用不等待改变之前发出的请求, 而是重新请求.
+        self.assertEqual({"state": "after"}, self.responses.fetch("a", lambda: {"state": "after"}, ttl=10))
+        release.set()
+        thread.join(5)
+        self.assertEqual([{"state": "before"}], results)
+        # 改变之前的结果不会覆盖缓存.
+        self.assertEqual({"state": "after"}, self.responses.fetch("a", Counter(), ttl=10))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from src.net.client import HttpClient
+from src.net.resilience import RetryPolicy, ServerUnavailableError
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # 支持 keep-alive.
+    connections = set()
+
+    def do_GET(self):
+        Handler.connections.add(self.client_address)
+        if self.path == "/slow":
+            time.sleep(1)
+        body = json.dumps({
+            "authorization": self.headers.get("Authorization"),
+            "cookie": self.headers.get("Cookie"),
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Set-Cookie", "server=1")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class Cache:
+    def __init__(self):
+        self.authorization = "token"
+        self.cookies = {"a": "1"}
+
+
+class TestHttpClient(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        cls.url = f"http://127.0.0.1:{cls.server.server_port}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        Handler.connections.clear()
+        self.client = HttpClient(timeout=5)
+        self.addCleanup(self.client.close)
+
+    def test_connection_reused(self):
+        for _ in range(5):
+            self.assertEqual(self.client.get(self.url + "/").status_code, 200)
+        self.assertEqual(len(Handler.connections), 1)
+
+    def test_cache_injection_and_no_cookie_persistence(self):
+        rst = self.client.get(self.url + "/", cache=Cache()).json()
+        self.assertEqual(rst, {"authorization": "token", "cookie": "a=1"})
+        # 显式提供的请求头优先, 服务器返回的 cookie 不会被保存.
+        rst = self.client.get(self.url + "/", cache=Cache(), headers={"authorization": "mine"}).json()
+        self.assertEqual(rst["authorization"], "mine")
+        self.assertEqual(self.client.get(self.url + "/").json(), {"authorization": None, "cookie": None})
+
+    def test_hooks_and_timeout(self):
+        client = HttpClient(timeout=5, retry=RetryPolicy(max_attempts=1))
+        self.addCleanup(client.close)
+        timings = []
+        client.add_hook(timings.append)
+        client.add_hook(lambda t: 1 / 0)  # hook 中的异常被忽略.
+        client.get(self.url + "/")
+        with self.assertRaises(ServerUnavailableError) as cm:
+            client.get(self.url + "/slow", timeout=0.2)
+        self.assertIsInstance(cm.exception.__cause__, requests.Timeout)
+        self.assertEqual([t.status_code for t in timings], [200, None])
+        self.assertEqual(timings[0].host, "127.0.0.1")
+        self.assertIsInstance(timings[1].error, requests.Timeout)
+
+
+if __name__ == '__main__':
+    unittest.main()
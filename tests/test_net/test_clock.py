@@ -0,0 +1,86 @@
+import math
+import time
+import unittest
+from email.utils import formatdate
+
+from src.net.client import HttpClient
+from src.net.clock import ServerClock, sleep_until
+from tests.fake_ecnu import FakeEcnuServer
+
+
+class SimulatedServer:
+    """模拟的本地时钟和服务器, 服务器时钟比本地时钟快 offset 秒, 请求的往返时间为 rtt."""
+
+    class Response:
+        def __init__(self, date: str):
+            self.headers = {"Date": date}
+
+        def close(self):
+            pass
+
+    def __init__(self, offset: float, rtt: float):
+        self.now = 1733094000.25
+        self.offset = offset
+        self.rtt = rtt
+        self.requests = 0
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.now += seconds
+
+    def request(self, method: str, url: str):
+        self.requests += 1
+        self.now += self.rtt / 2
+        date = formatdate(math.floor(self.now + self.offset), usegmt=True)
+        self.now += self.rtt / 2
+        return self.Response(date)
+
+
+class ServerClockTest(unittest.TestCase):
+    def test_converge(self):
+        for offset in (12.3456, -3.9, 0.0, 0.999):
+            for rtt in (0.0, 0.03):
+                server = SimulatedServer(offset, rtt)
+                clock = ServerClock()
+                uncertainty = clock.sync(server, "https://seat-lib.ecnu.edu.cn/",
+                                         clock=server.clock, sleep=server.sleep)
+                self.assertLessEqual(abs(clock.offset - offset), uncertainty + 1e-9)
+                # 二分之后的精度受往返时间限制, 而不是 Date 头的 1 秒.
+                self.assertLess(uncertainty, max(rtt, 0.005) + 1e-9)
+                self.assertLessEqual(server.requests, 8)
+
+    def test_observe(self):
+        clock = ServerClock()
+        self.assertFalse(clock.synced)
+        self.assertEqual(0, clock.offset)
+        date = formatdate(1733094000, usegmt=True)
+        clock.observe(1733093999.9, 1733094000.1, date)
+        self.assertAlmostEqual(0.5, clock.offset, places=5)
+        self.assertAlmostEqual(0.6, clock.uncertainty, places=5)
+        # 与之前的区间矛盾 (时钟被调整), 重新开始.
+        clock.observe(1733093989.9, 1733093990.1, date)
+        self.assertAlmostEqual(10.5, clock.offset, places=5)
+        self.assertAlmostEqual(clock.to_local(1733094000), 1733094000 - clock.offset)
+
+    def test_fake_server(self):
+        with FakeEcnuServer() as server:
+            http = HttpClient(base_url=server.base_url, rate=1000, burst=1000)
+            self.addCleanup(http.close)
+            clock = ServerClock()
+            uncertainty = clock.sync(http, "https://seat-lib.ecnu.edu.cn/", samples=2)
+        # 测试服务器使用本地时钟.
+        self.assertLess(uncertainty, 1)
+        self.assertLessEqual(abs(clock.offset), uncertainty)
+
+    def test_sleep_until(self):
+        for delay in (0.0, 0.01, 0.05):
+            deadline = time.time() + delay
+            sleep_until(deadline)
+            self.assertGreaterEqual(time.time(), deadline)
+            self.assertLess(time.time() - deadline, 0.005)
+
+
+if __name__ == '__main__':
+    unittest.main()
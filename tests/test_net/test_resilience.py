@@ -0,0 +1,111 @@
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from src.net.client import HttpClient
+from src.net.resilience import (TokenBucket, RetryPolicy, CircuitBreaker, ServerUnavailableError,
+                                check_available)
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    statuses: list[int] = []  # 依次返回的状态码, 用完后返回 200.
+    hits = 0
+
+    def _reply(self):
+        Handler.hits += 1
+        status = Handler.statuses.pop(0) if Handler.statuses else 200
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    do_GET = do_POST = _reply
+
+    def log_message(self, *args):
+        pass
+
+
+class TestPrimitives(unittest.TestCase):
+    def test_token_bucket(self):
+        bucket = TokenBucket(rate=20, burst=2)
+        self.assertEqual(bucket.try_acquire(), 0)
+        self.assertEqual(bucket.try_acquire(), 0)
+        self.assertGreater(bucket.try_acquire(), 0)
+        begin = time.monotonic()
+        bucket.acquire()
+        self.assertGreater(time.monotonic() - begin, 0.02)
+
+    def test_retry_policy(self):
+        policy = RetryPolicy(base_delay=1, max_delay=3)
+        self.assertTrue(all(0 <= policy.delay(5) <= 3 for _ in range(20)))
+        self.assertEqual(policy.delay(0, retry_after=10), 3)
+        self.assertTrue(policy.should_retry_status(502, idempotent=True))
+        self.assertFalse(policy.should_retry_status(502, idempotent=False))  # 提交类请求可能已经被处理.
+        self.assertTrue(policy.should_retry_status(503, idempotent=False))
+        self.assertTrue(policy.should_retry_error(requests.ConnectTimeout(), idempotent=False))
+        self.assertFalse(policy.should_retry_error(requests.ReadTimeout(), idempotent=False))
+
+    def test_circuit_breaker(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.1)
+        self.assertFalse(breaker.record_failure())
+        self.assertTrue(breaker.record_failure())
+        self.assertFalse(breaker.allow())
+        time.sleep(0.12)
+        self.assertTrue(breaker.allow())  # 半开, 只放行一个试探请求.
+        self.assertFalse(breaker.allow())
+        self.assertTrue(breaker.record_failure())  # 试探失败, 再次打开.
+        time.sleep(0.12)
+        self.assertTrue(breaker.allow())
+        breaker.record_success()
+        self.assertFalse(breaker.is_open)
+        self.assertTrue(breaker.allow())
+
+
+class TestResilientClient(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        cls.url = f"http://127.0.0.1:{cls.server.server_port}/"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        Handler.statuses = []
+        Handler.hits = 0
+        self.client = HttpClient(retry=RetryPolicy(max_attempts=3, base_delay=0.01),
+                                 failure_threshold=3, reset_timeout=60)
+        self.addCleanup(self.client.close)
+
+    def test_retries_transient_errors(self):
+        Handler.statuses = [502, 503]
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.assertEqual(Handler.hits, 3)
+
+    def test_post_not_retried_unless_idempotent(self):
+        Handler.statuses = [502]
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, 502)
+        with self.assertRaises(ServerUnavailableError):
+            check_available(response)
+        Handler.statuses = [502]
+        self.assertEqual(self.client.post(self.url, idempotent=True).status_code, 200)
+
+    def test_circuit_opens_after_repeated_failures(self):
+        Handler.statuses = [500] * 3
+        self.assertEqual(self.client.get(self.url).status_code, 500)
+        hits = Handler.hits
+        with self.assertRaises(ServerUnavailableError) as cm:
+            self.client.get(self.url)
+        self.assertEqual(Handler.hits, hits)  # 熔断期间请求不会发出.
+        self.assertGreater(cm.exception.retry_after, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
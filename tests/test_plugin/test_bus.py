@@ -0,0 +1,61 @@
+import threading
+import unittest
+
+from src.plugin.bus import Mailbox, Message, Overflow
+
+
+class TestMailbox(unittest.TestCase):
+    def test_fifo_order(self):
+        box = Mailbox("a")
+        for i in range(5):
+            box.put(Message("b", i))
+        self.assertEqual([m.obj for m in box.drain(3)], [0, 1, 2])
+        self.assertEqual([m.obj for m in box.drain()], [3, 4])
+        self.assertEqual(box.drain(), [])
+
+    def test_overflow_policies(self):
+        oldest = Mailbox("a", capacity=2, overflow=Overflow.DROP_OLDEST)
+        newest = Mailbox("a", capacity=2, overflow=Overflow.DROP_NEWEST)
+        for i in range(4):
+            oldest.put(Message("b", i))
+            newest.put(Message("b", i))
+        self.assertEqual([m.obj for m in oldest.drain()], [2, 3])
+        self.assertEqual([m.obj for m in newest.drain()], [0, 1])
+        self.assertEqual(oldest.stats().dropped, 2)
+        self.assertEqual(newest.stats().dropped, 2)
+
+    def test_coalesce_keeps_position_and_takes_latest(self):
+        box = Mailbox("a")
+        box.put(Message("b", "low 9", coalesce_key="low"))
+        box.put(Message("b", "other"))
+        self.assertFalse(box.put(Message("b", "low 8", coalesce_key="low")))
+        self.assertTrue(box.put(Message("c", "low 7", coalesce_key="low")))  # 不同发送方不合并.
+        self.assertEqual([m.obj for m in box.drain()], ["low 8", "other", "low 7"])
+        # 已经被取出的消息不再参与合并.
+        self.assertTrue(box.put(Message("b", "low 6", coalesce_key="low")))
+        stats = box.stats()
+        self.assertEqual(stats.coalesced, 1)
+        self.assertEqual(stats.depth, 1)
+        self.assertEqual(stats.delivered, 3)
+
+    def test_concurrent_put(self):
+        box = Mailbox("a", capacity=10000)
+
+        def put(sender):
+            for i in range(1000):
+                box.put(Message(sender, i))
+
+        threads = [threading.Thread(target=put, args=(str(n),)) for n in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        messages = box.drain()
+        self.assertEqual(len(messages), 4000)
+        for sender in "0123":
+            self.assertEqual([m.obj for m in messages if m.from_plugin == sender], list(range(1000)))
+        self.assertEqual(box.stats().max_depth, 4000)
+
+
+if __name__ == '__main__':
+    unittest.main()
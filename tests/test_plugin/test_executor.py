@@ -0,0 +1,118 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from PySide6.QtCore import QThreadPool
+
+from src.plugin.executor import SerialExecutor
+from src.plugin.runtime import AsyncRuntime
+
+
+class TestSerialExecutor(unittest.TestCase):
+    def setUp(self):
+        self.pool = QThreadPool()
+        self.pool.setMaxThreadCount(4)
+
+    def tearDown(self):
+        self.pool.waitForDone()
+
+    def test_jobs_of_one_executor_are_serialized(self):
+        executor = SerialExecutor("a", self.pool)
+        running = 0
+        max_running = 0
+        order = []
+        lock = threading.Lock()
+
+        def job(i):
+            nonlocal running, max_running
+            with lock:
+                running += 1
+                max_running = max(max_running, running)
+            time.sleep(0.02)
+            order.append(i)
+            with lock:
+                running -= 1
+            return i
+
+        futures = [executor.submit("job", job, i) for i in range(5)]
+        self.assertEqual([f.result(5) for f in futures], list(range(5)))
+        self.assertEqual(order, list(range(5)))
+        self.assertEqual(max_running, 1)
+
+    def test_executors_run_in_parallel(self):
+        barrier = threading.Barrier(2, timeout=5)
+        a = SerialExecutor("a", self.pool)
+        b = SerialExecutor("b", self.pool)
+        fa = a.submit("wait", barrier.wait)
+        fb = b.submit("wait", barrier.wait)
+        fa.result(5)
+        fb.result(5)
+
+    def test_same_key_is_coalesced(self):
+        executor = SerialExecutor("a", self.pool)
+        release = threading.Event()
+        first = executor.submit("routine", release.wait, 5, key="routine")
+        self.assertIsNone(executor.submit("routine", release.wait, 5, key="routine"))
+        release.set()
+        first.result(5)
+        executor.shutdown(5)
+
+    def test_timeout_is_reported_once(self):
+        executor = SerialExecutor("a", self.pool, timeout=0.01)
+        release = threading.Event()
+        future = executor.submit("slow", release.wait, 5)
+        time.sleep(0.05)
+        job = executor.check_timeout(time.monotonic())
+        self.assertIsNotNone(job)
+        self.assertEqual(job.name, "slow")
+        self.assertIsNone(executor.check_timeout(time.monotonic()))
+        release.set()
+        future.result(5)
+
+    def test_shutdown_cancels_queued_jobs(self):
+        executor = SerialExecutor("a", self.pool)
+        release = threading.Event()
+        running = executor.submit("first", release.wait, 5)
+        queued = executor.submit("second", lambda: None)
+        threading.Timer(0.05, release.set).start()
+        self.assertTrue(executor.shutdown(5))
+        self.assertTrue(queued.cancelled())
+        self.assertTrue(running.result(0))
+        self.assertIsNone(executor.submit("third", lambda: None))
+
+    def test_async_jobs_keep_order_with_sync_jobs(self):
+        runtime = AsyncRuntime()
+        executor = SerialExecutor("a", self.pool, runtime=runtime)
+        order = []
+
+        async def async_job(i):
+            await asyncio.sleep(0.02)
+            order.append(i)
+            return i
+
+        futures = [executor.submit("async", async_job, 0),
+                   executor.submit("sync", order.append, 1),
+                   executor.submit("async", async_job, 2)]
+        futures[-1].result(5)
+        self.assertEqual(order, [0, 1, 2])
+        self.assertEqual(futures[0].result(0), 0)
+        runtime.close()
+
+    def test_async_job_timeout_is_cancelled(self):
+        runtime = AsyncRuntime()
+        executor = SerialExecutor("a", self.pool, timeout=0.01, runtime=runtime)
+        future = executor.submit("slow", asyncio.sleep, 5)
+        with self.assertRaises(TimeoutError):
+            future.result(5)
+        self.assertEqual(executor.submit("next", lambda: 1).result(5), 1)
+        runtime.close()
+
+    def test_async_job_requires_runtime(self):
+        executor = SerialExecutor("a", self.pool)
+        with self.assertRaises(ValueError):
+            executor.submit("async", asyncio.sleep, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
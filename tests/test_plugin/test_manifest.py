@@ -0,0 +1,76 @@
+import sys
+import tempfile
+import textwrap
+import unittest
+from pathlib import Path
+
+from src.log import init
+from src.plugin import PluginLoader, _import_manifest, Registry
+
+PACKAGE = "manifest_test_plugin"
+
+FILES = {
+    "__init__.py": "raise ImportError('package __init__ should not be executed.')\n",
+    "manifest.py": textwrap.dedent('''
+        from src.plugin import PluginManifest, PluginConfig, TextItem, Routine
+
+        manifest = PluginManifest(
+            name="manifest_test_plugin",
+            entry="impl",
+            description="lazy",
+            configuration=PluginConfig().add(TextItem("address", "default")),
+            routine=Routine.HOURLY,
+        )
+    '''),
+    "impl.py": textwrap.dedent('''
+        from src.plugin import register_plugin, Plugin
+
+        loaded_config = []
+
+
+        @register_plugin(name="manifest_test_plugin")
+        class Impl(Plugin):
+            def on_config_load(self, ctx, cfg):
+                loaded_config.append(cfg.get_item("address").current_value)
+    '''),
+}
+
+
+class TestManifest(unittest.TestCase):
+    def setUp(self):
+        init()
+        self.dir = tempfile.TemporaryDirectory()
+        package = Path(self.dir.name, PACKAGE)
+        package.mkdir()
+        for name, content in FILES.items():
+            package.joinpath(name).write_text(content, encoding="utf-8")
+        self.package = package
+
+    def tearDown(self):
+        for name in list(sys.modules):
+            if name == PACKAGE or name.startswith(PACKAGE + "."):
+                del sys.modules[name]
+        self.dir.cleanup()
+
+    def test_declared_plugin_is_imported_on_demand(self):
+        module = _import_manifest(PACKAGE, self.package / "__init__.py")
+        Registry.add_record(module.manifest.to_record(
+            lambda: PluginLoader._import_entry(self.dir.name, PACKAGE, module.manifest.entry)
+        ))
+        self.assertNotIn(f"{PACKAGE}.impl", sys.modules)
+        self.assertTrue(Registry.is_declared(PACKAGE))
+        record = Registry.plugin_record(PACKAGE)
+        self.assertEqual(record.description, "lazy")
+        self.assertIsNone(record.instance)
+
+        record.config.get_item("address").set_value("loaded")
+        record.config_loaded = True  # 模拟 PluginLoader.load_config.
+        record.entry()
+        self.assertFalse(Registry.is_declared(PACKAGE))
+        self.assertEqual(type(record.instance).__name__, "Impl")
+        # 实现导入前加载的配置在绑定时投递.
+        self.assertEqual(sys.modules[f"{PACKAGE}.impl"].loaded_config, ["loaded"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import copy
+import json
+import unittest
+
+from src.plugin.context import PluginCache, FrozenList, FrozenDict
+
+
+class TestPluginCache(unittest.TestCase):
+    def test_set_stores_an_immutable_copy(self):
+        cache = PluginCache("a")
+        history = [{"degree": 10.5}]
+        cache.set("history", history)
+        history.append({"degree": 9})
+        history[0]["degree"] = 0
+        self.assertEqual(cache.get("history"), [{"degree": 10.5}])
+        self.assertIsInstance(cache.get("history"), FrozenList)
+        self.assertIsInstance(cache.get("history")[0], FrozenDict)
+        with self.assertRaises(TypeError):
+            cache.get("history").append(1)
+        with self.assertRaises(TypeError):
+            cache.get("history")[0]["degree"] = 1
+
+    def test_get_does_not_copy(self):
+        cache = PluginCache("a")
+        cache.set("history", list(range(100)))
+        self.assertIs(cache.get("history"), cache.get("history"))
+        # 在旧值的基础上追加, 旧值中的元素被共享而不是重新复制.
+        old = cache.get("history")
+        cache.set("nested", [old])
+        self.assertIs(cache.get("nested")[0], old)
+
+    def test_deepcopy_is_mutable(self):
+        cache = PluginCache("a")
+        cache.set("d", {"l": [1]})
+        d = copy.deepcopy(cache.get("d"))
+        d["l"].append(2)
+        self.assertEqual(d, {"l": [1, 2]})
+        self.assertEqual(cache.get("d"), {"l": [1]})
+
+    def test_rejects_unserializable(self):
+        cache = PluginCache("a")
+        with self.assertRaises(ValueError):
+            cache.set("a", {1: "non-str key"})
+        with self.assertRaises(ValueError):
+            cache.set("a", [object()])
+        with self.assertRaises(KeyError):
+            cache.get("a")
+
+    def test_serialize_round_trip(self):
+        cache = PluginCache("a")
+        cache.set("t", (1, [2, {"x": None}]))
+        cache._last_routine = 3
+        text = json.dumps(cache._serialize())
+        restored = PluginCache("a")
+        restored._load_from(json.loads(text))
+        self.assertEqual(restored.get("t"), [1, [2, {"x": None}]])
+        self.assertEqual(restored._last_routine, 3)
+        with self.assertRaises(TypeError):
+            restored.get("t").append(1)
+
+
+if __name__ == '__main__':
+    unittest.main()
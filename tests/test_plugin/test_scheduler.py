@@ -0,0 +1,38 @@
+import unittest
+
+from src.plugin.scheduler import DeadlineScheduler
+
+
+class TestDeadlineScheduler(unittest.TestCase):
+    def test_pop_due_in_deadline_order(self):
+        s = DeadlineScheduler()
+        s.schedule("c", 30)
+        s.schedule("a", 10)
+        s.schedule("b", 20)
+        self.assertEqual(s.pop_due(25), ["a", "b"])
+        self.assertEqual(s.next_deadline(), 30)
+        self.assertEqual(len(s), 1)
+
+    def test_reschedule_and_cancel(self):
+        s = DeadlineScheduler()
+        s.schedule("a", 10)
+        s.schedule("a", 40)  # 覆盖旧的截止时间.
+        s.schedule("b", 20)
+        self.assertTrue(s.cancel("b"))
+        self.assertFalse(s.cancel("b"))
+        self.assertEqual(s.pop_due(30), [])
+        self.assertEqual(s.deadline_of("a"), 40)
+        self.assertEqual(s.next_deadline(), 40)
+        self.assertEqual(s.pop_due(40), ["a"])
+        self.assertIsNone(s.next_deadline())
+        self.assertNotIn("a", s)
+
+    def test_same_deadline_keeps_schedule_order(self):
+        s = DeadlineScheduler()
+        for key in "xyz":
+            s.schedule(key, 5)
+        self.assertEqual(s.pop_due(5), ["x", "y", "z"])
+
+
+if __name__ == '__main__':
+    unittest.main()
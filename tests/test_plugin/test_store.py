@@ -0,0 +1,75 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.plugin.context import PluginCache
+from src.plugin.store import PluginCacheStore
+
+
+class TestPluginCacheStore(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.dir.name, "plugin_cache.json")
+        self.path.write_text(json.dumps({
+            "a": {"name": "a", "last_routine": 1, "cache": {"x": 1}},
+            "other": {"name": "other", "last_routine": 2, "cache": {"y": 2}},
+        }), encoding="utf-8")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def read(self):
+        return json.loads(self.path.read_text(encoding="utf-8"))
+
+    def test_attach_restores_cache(self):
+        store = PluginCacheStore(self.path)
+        cache = PluginCache("a")
+        store.attach("a", cache)
+        self.assertEqual(cache.get("x"), 1)
+        self.assertEqual(cache._last_routine, 1)
+        self.assertIsNone(store.flush_deadline())
+
+    def test_changes_are_debounced(self):
+        scheduled = []
+        store = PluginCacheStore(self.path, flush_delay=10, on_scheduled=lambda: scheduled.append(1))
+        cache = PluginCache("a")
+        store.attach("a", cache)
+        cache.set("x", 3)
+        cache.set("z", 4)
+        cache._last_routine = 5
+        self.assertEqual(len(scheduled), 1)
+        deadline = store.flush_deadline()
+        store.flush_due(deadline - 1)
+        self.assertEqual(self.read()["a"]["cache"], {"x": 1})
+        store.flush_due(deadline)
+        data = self.read()
+        self.assertEqual(data["a"], {"name": "a", "last_routine": 5, "cache": {"x": 3, "z": 4}})
+        self.assertEqual(data["other"]["cache"], {"y": 2})  # 未加载插件的内容保持不变.
+        self.assertIsNone(store.flush_deadline())
+
+    def test_detach_keeps_final_content(self):
+        store = PluginCacheStore(self.path)
+        cache = PluginCache("b")
+        store.attach("b", cache)
+        cache.set("k", [1, 2])
+        store.detach("b")
+        cache.set("k", "after detach")
+        store.flush()
+        self.assertEqual(self.read()["b"]["cache"], {"k": [1, 2]})
+        self.assertEqual(list(Path(self.dir.name).iterdir()), [self.path])  # 没有残留的临时文件.
+
+    def test_missing_or_corrupted_file(self):
+        self.path.write_text("{", encoding="utf-8")
+        store = PluginCacheStore(self.path)
+        cache = PluginCache("a")
+        store.attach("a", cache)
+        with self.assertRaises(KeyError):
+            cache.get("x")
+        cache.set("x", 2)
+        store.flush()
+        self.assertEqual(self.read(), {"a": {"name": "a", "last_routine": 0, "cache": {"x": 2}}})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import datetime
+import unittest
+
+from src.net.client import HttpClient
+from src.plugin.timed import TimedReservation
+from src.uia.login import LoginError
+from tests.fake_ecnu import FakeEcnuServer
+
+
+class FakeContext:
+    """只实现 call_at 和 cancel_call 的插件上下文, 回调由测试手动执行."""
+
+    def __init__(self):
+        self.calls = {}
+        self.next_handle = 0
+
+    def call_at(self, timestamp, callback):
+        self.next_handle += 1
+        self.calls[self.next_handle] = callback
+        return self.next_handle
+
+    def cancel_call(self, handle):
+        self.calls.pop(handle, None)
+
+    def run_next(self):
+        callback = self.calls.pop(min(self.calls))
+        callback(self)
+
+
+class Reservation(TimedReservation):
+    def __init__(self, target, http, error: Exception = None):
+        super().__init__(target, http, "https://seat-lib.ecnu.edu.cn/")
+        self.sync_samples = 1
+        self.error = error
+
+    def prepare(self):
+        pass
+
+    def fire(self):
+        if self.error is not None:
+            raise self.error
+        return "ok"
+
+
+class TimedReservationTest(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeEcnuServer().start()
+        self.addCleanup(self.server.stop)
+        self.http = HttpClient(base_url=self.server.base_url, rate=1000, burst=1000)
+        self.addCleanup(self.http.close)
+        self.ctx = FakeContext()
+
+    def target(self, seconds: float) -> datetime.datetime:
+        return datetime.datetime.now() + datetime.timedelta(seconds=seconds)
+
+    def test_abstract(self):
+        class Incomplete(TimedReservation):
+            def prepare(self):
+                pass
+
+        with self.assertRaises(TypeError):
+            Incomplete(self.target(60), self.http, "https://seat-lib.ecnu.edu.cn/")
+
+    def test_fire_in_thread(self):
+        finished = []
+        reservation = Reservation(self.target(0.5), self.http)
+        reservation.arm(self.ctx, finished.append)
+        self.ctx.run_next()
+        # 发出不需要执行器执行任何回调, 执行器只用于报告结果.
+        self.assertTrue(reservation.join(timeout=5))
+        self.assertEqual("ok", reservation.result)
+        self.assertLess(abs(reservation.fire_error), 0.05)
+        self.assertEqual([], finished)
+        self.ctx.run_next()
+        self.assertEqual([reservation], finished)
+        self.assertFalse(reservation.armed)
+
+    def test_cancel_before_fire(self):
+        reservation = Reservation(self.target(5), self.http)
+        reservation.arm(self.ctx, lambda r: self.fail("cancelled reservation finished"))
+        self.ctx.run_next()
+        thread = reservation._thread
+        reservation.cancel(self.ctx)
+        self.assertFalse(reservation.armed)
+        thread.join(timeout=1)
+        self.assertFalse(thread.is_alive())
+        self.assertIsNone(reservation.fired_at)
+        self.assertEqual({}, self.ctx.calls)
+
+    def test_error_reported_in_executor(self):
+        reservation = Reservation(self.target(0.2), self.http, LoginError("expired"))
+        reservation.arm(self.ctx)
+        self.ctx.run_next()
+        self.assertTrue(reservation.join(timeout=5))
+        with self.assertRaises(LoginError):
+            self.ctx.run_next()
+
+
+if __name__ == '__main__':
+    unittest.main()
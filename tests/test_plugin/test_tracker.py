@@ -0,0 +1,87 @@
+import unittest
+
+from src.plugin.tracker import ReservationTracker
+
+
+class FakeContext:
+    """只实现 call_at 和 cancel_call 的插件上下文, 按时间顺序执行回调并推进时钟."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.calls = {}
+        self.next_handle = 0
+
+    def clock(self):
+        return self.now
+
+    def call_at(self, timestamp, callback):
+        self.next_handle += 1
+        self.calls[self.next_handle] = (timestamp, callback)
+        return self.next_handle
+
+    def cancel_call(self, handle):
+        self.calls.pop(handle, None)
+
+    def run_until(self, end):
+        while self.calls:
+            handle = min(self.calls, key=lambda h: (self.calls[h][0], h))
+            timestamp, callback = self.calls[handle]
+            if timestamp > end:
+                break
+            del self.calls[handle]
+            self.now = max(self.now, timestamp)
+            callback(self)
+        self.now = end
+
+
+class ReservationTrackerTest(unittest.TestCase):
+    def setUp(self):
+        self.ctx = FakeContext()
+        self.reservations = [{"id": 1, "deadline": 1000.0}, {"id": 2, "deadline": 400.0}]
+        self.cancelled = []
+        self.tracker = ReservationTracker(
+            fetch=lambda: list(self.reservations),
+            key_of=lambda r: r["id"],
+            deadline_of=lambda r: r["deadline"],
+            on_deadline=self.cancel,
+            lead=60, refresh_interval=1800, clock=self.ctx.clock,
+        )
+
+    def cancel(self, r):
+        self.cancelled.append((self.ctx.now, r["id"]))
+        self.reservations.remove(r)
+
+    def test_fires_in_deadline_order(self):
+        self.tracker.start(self.ctx)
+        self.tracker.start(self.ctx)  # 已经开始时什么也不做.
+        self.assertEqual(1, len(self.ctx.calls))
+        self.ctx.run_until(1)
+        self.assertEqual(1, self.tracker.fetches)
+        self.assertEqual([2, 1], [r["id"] for r in self.tracker.items])
+        self.ctx.run_until(1200)
+        self.assertEqual([(340, 2), (940, 1)], self.cancelled)
+        # 每次取消之后重新查询一次.
+        self.assertEqual(3, self.tracker.fetches)
+        self.assertEqual(0, len(self.tracker))
+        self.assertTrue(self.tracker.armed)
+
+    def test_refresh_and_touch(self):
+        self.reservations = []
+        self.tracker.start(self.ctx)
+        # 没有预约时只在后台低频率重新查询, 而不是每分钟一次.
+        self.ctx.run_until(3600)
+        self.assertEqual(3, self.tracker.fetches)
+        self.reservations.append({"id": 3, "deadline": 3700.0})
+        self.tracker.touch(self.ctx)
+        self.assertEqual(1, len(self.ctx.calls))
+        self.ctx.run_until(3600)
+        self.assertEqual(4, self.tracker.fetches)
+        self.ctx.run_until(4000)
+        self.assertEqual([(3640, 3)], self.cancelled)
+        self.tracker.stop(self.ctx)
+        self.assertFalse(self.tracker.armed)
+        self.assertEqual({}, self.ctx.calls)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from src.log import init
+from src.profiler import StartupProfiler, PROFILE_ENV, PROFILE_FLAG, REPORT_FILE, TRACE_FILE
+
+
+class TestStartupProfiler(unittest.TestCase):
+    def test_disabled_records_nothing(self):
+        profiler = StartupProfiler()
+        with profiler.span("a"):
+            pass
+        self.assertEqual(profiler.spans(), [])
+        self.assertIsNone(profiler.finish())
+
+    def test_enable_from_flag_and_env(self):
+        argv = ["main.py", PROFILE_FLAG]
+        profiler = StartupProfiler()
+        with mock.patch.dict(os.environ, {PROFILE_ENV: ""}):
+            profiler.enable_from(argv)
+        self.assertTrue(profiler.enabled)
+        self.assertEqual(argv, ["main.py"])  # 参数被移除, 不会传给 QApplication.
+        profiler = StartupProfiler()
+        with mock.patch.dict(os.environ, {PROFILE_ENV: "1"}):
+            profiler.enable_from(argv)
+        self.assertTrue(profiler.enabled)
+
+    def test_report_sorted_and_trace_nested(self):
+        profiler = StartupProfiler()
+        profiler.enable()
+        with profiler.span("outer", "gui"):
+            with profiler.span("inner", "import"):
+                time.sleep(0.01)
+        with profiler.span("short"):
+            pass
+        lines = profiler.report().splitlines()
+        self.assertEqual([line.split()[-1] for line in lines[1:]], ["outer", "inner", "short"])
+        events = {e["name"]: e for e in profiler.chrome_trace()["traceEvents"]}
+        outer, inner = events["outer"], events["inner"]
+        self.assertEqual(outer["ph"], "X")
+        self.assertEqual(inner["cat"], "import")
+        self.assertLessEqual(outer["ts"], inner["ts"])
+        self.assertGreaterEqual(outer["ts"] + outer["dur"], inner["ts"] + inner["dur"])
+
+    def test_finish_writes_files_once(self):
+        init()
+        profiler = StartupProfiler()
+        profiler.enable()
+        with profiler.span("a"):
+            pass
+        with tempfile.TemporaryDirectory() as d:
+            trace = profiler.finish(d)
+            self.assertEqual(trace, Path(d, TRACE_FILE))
+            with open(trace, encoding="utf-8") as f:
+                self.assertEqual(len(json.load(f)["traceEvents"]), 1)
+            self.assertTrue(Path(d, REPORT_FILE).exists())
+            with profiler.span("b"):  # 结束记录后不再记录.
+                pass
+            self.assertIsNone(profiler.finish(d))
+        self.assertEqual(len(profiler.spans()), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
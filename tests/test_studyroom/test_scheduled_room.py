@@ -0,0 +1,66 @@
+import datetime
+import unittest
+
+from src.log import init
+from src.net.client import HttpClient
+from src.uia.login import LoginError
+from tests.fake_ecnu import FakeEcnuServer, IC_COOKIE, import_plugin_module
+
+StudyRoomCache = import_plugin_module("studyroom.req").StudyRoomCache
+StudyRoomReserve = import_plugin_module("studyroom.subscribe").StudyRoomReserve
+scheduled = import_plugin_module("studyroom.scheduled")
+
+
+class ScheduledRoomReservationTest(unittest.TestCase):
+    def setUp(self):
+        init()
+        self.server = FakeEcnuServer().start()
+        self.addCleanup(self.server.stop)
+        self.http = HttpClient(base_url=self.server.base_url, rate=1000, burst=1000)
+        self.addCleanup(self.http.close)
+        self.reserve = StudyRoomReserve(StudyRoomCache({"ic-cookie": IC_COOKIE}), self.http)
+
+    def test_prepare_and_fire(self):
+        target = datetime.datetime.now() + datetime.timedelta(minutes=1)
+        reservation = scheduled.ScheduledRoomReservation(self.reserve, target, "tomorrow", "普陀校区木门研究室",
+                                                         60, 24 * 60)
+        reservation.prepare()
+        slots = self.reserve.rank_slots("tomorrow", "普陀校区木门研究室", 60, 24 * 60)
+        self.assertEqual(min(scheduled.DEFAULT_CANDIDATES, len(slots)), len(reservation.payloads))
+        self.assertGreaterEqual(len(reservation.payloads), 2)
+        durations = [datetime.datetime.strptime(end, "%Y-%m-%d %H:%M:%S")
+                     - datetime.datetime.strptime(begin, "%Y-%m-%d %H:%M:%S") for _, (begin, end) in slots]
+        self.assertEqual(sorted(durations, reverse=True), durations)
+        self.assertEqual([(room["devId"], begin) for room, (begin, _) in slots[:len(reservation.payloads)]],
+                         [(p["resvDev"][0], p["resvBeginTime"]) for p in reservation.payloads])
+        self.assertEqual({}, self.server.state.reservations)
+
+        # 第一个候选在准备之后被预约, 提交时被拒绝, 继续提交第二个.
+        self.assertEqual(0, self.reserve.try_reserve(reservation.payloads[0])["code"])
+        result = reservation.fire()
+        self.assertEqual(0, result["code"])
+        self.assertEqual(2, len(reservation.attempts))
+        self.assertNotEqual(0, reservation.attempts[0][1]["code"])
+        self.assertEqual(2, len(self.server.state.reservations))
+
+        expired = StudyRoomReserve(StudyRoomCache({"ic-cookie": "expired"}), self.http)
+        with self.assertRaises(LoginError):
+            expired.try_reserve(reservation.payloads[0])
+
+    def test_day_opens_at_target(self):
+        tomorrow = datetime.date.today() + datetime.timedelta(days=1)
+        self.server.state.closed_days.add(tomorrow)
+        target = datetime.datetime.now() + datetime.timedelta(minutes=1)
+        reservation = scheduled.ScheduledRoomReservation(self.reserve, target, "tomorrow", "普陀校区木门研究室",
+                                                         60, 24 * 60)
+        reservation.prepare()
+        self.assertEqual([], reservation.payloads)  # 预约开放之前没有可预约的时间段.
+        self.server.state.closed_days.discard(tomorrow)  # 到达目标时刻, 预约开放.
+        result = reservation.fire()
+        self.assertEqual(0, result["code"])
+        self.assertGreaterEqual(len(reservation.payloads), 1)
+        self.assertEqual(1, len(self.server.state.reservations))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import threading
+import time
+import unittest
+from unittest import mock
+
+from src.log import init
+from src.uia import login
+from src.uia.login import grab_caches
+
+
+class FakeDriver:
+    def __init__(self, cookies=()):
+        self.cookies = list(cookies)
+        self.quit_event = threading.Event()
+
+    def execute_cdp_cmd(self, cmd, args):
+        if cmd == "Network.getAllCookies":
+            return {"cookies": [{"name": "SSO", "value": "1", "domain": ".ecnu.edu.cn",
+                                 "size": 4, "session": True, "expires": -1}]}
+        self.cookies.extend(args["cookies"])
+        return {}
+
+    def quit(self):
+        self.quit_event.set()
+
+
+class CacheA:
+    pass
+
+
+class CacheB:
+    pass
+
+
+class TestGrabCaches(unittest.TestCase):
+    def setUp(self):
+        init()
+        self.created = []
+
+        def new_driver(cookies):
+            driver = FakeDriver(cookies)
+            self.created.append(driver)
+            return driver
+
+        patcher = mock.patch.object(login, "_new_session_driver", new_driver)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_grabbers_run_in_parallel_sessions(self):
+        main = FakeDriver()
+        barrier = threading.Barrier(2, timeout=5)  # 两个 grabber 必须同时运行才能通过.
+        seen = []
+
+        def grab_a(driver):
+            seen.append(driver)
+            barrier.wait()
+            return CacheA()
+
+        def grab_b(driver):
+            seen.append(driver)
+            barrier.wait()
+            return CacheB()
+
+        cache = grab_caches(main, [grab_a, None, grab_b])
+        self.assertIsInstance(cache.get_cache(CacheA), CacheA)
+        self.assertIsInstance(cache.get_cache(CacheB), CacheB)
+        self.assertIn(main, seen)
+        self.assertEqual(len(self.created), 1)
+        # 新浏览器导入了主浏览器的 cookie, 不支持的字段和会话 cookie 的过期时间被去掉.
+        self.assertEqual(self.created[0].cookies, [{"name": "SSO", "value": "1", "domain": ".ecnu.edu.cn"}])
+        self.assertTrue(self.created[0].quit_event.is_set())
+        self.assertFalse(main.quit_event.is_set())  # 主浏览器由调用方关闭.
+
+    def test_failed_and_timed_out_grabbers_are_skipped(self):
+        def hang(driver):
+            driver.quit_event.wait(5)  # 浏览器被关闭后返回.
+            return CacheB()
+
+        def fail(driver):
+            raise RuntimeError("boom")
+
+        begin = time.monotonic()
+        cache = grab_caches(FakeDriver(), [lambda d: CacheA(), hang, fail], timeout=0.2)
+        self.assertLess(time.monotonic() - begin, 2)
+        self.assertIsInstance(cache.get_cache(CacheA), CacheA)
+        self.assertIsNone(cache.get_cache(CacheB))
+        for driver in self.created:
+            self.assertTrue(driver.quit_event.wait(1))
+
+
+if __name__ == '__main__':
+    unittest.main()
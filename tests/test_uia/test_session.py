@@ -0,0 +1,93 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.log import init
+from src.uia.cache import LoginCache, cache_type_of
+from src.uia.session import SessionStore
+
+
+class TokenCache:
+    def __init__(self, token: str, valid: bool = True):
+        self.token = token
+        self.valid = valid
+
+    @classmethod
+    def grabber(cls, driver):
+        return cls("grabbed")
+
+    def probe(self) -> bool:
+        return self.valid
+
+
+class NoProbeCache:
+    def __init__(self, cookies: dict):
+        self.cookies = cookies
+
+
+class TestLoginCache(unittest.TestCase):
+    def setUp(self):
+        init()
+
+    def test_json_round_trip_is_lazy(self):
+        cache = LoginCache()
+        cache.add_cache(TokenCache("t"))
+        cache.add_cache(NoProbeCache({"a": "1"}))
+        restored = LoginCache.from_json(cache.to_json())
+        self.assertEqual(len(restored), 2)
+        self.assertEqual(restored.cache, {})  # 第一次获取时才重建.
+        self.assertEqual(restored.get_cache(TokenCache).token, "t")
+        self.assertEqual(restored.get_cache(NoProbeCache).cookies, {"a": "1"})
+        self.assertEqual(restored.to_json(), cache.to_json())
+
+    def test_is_valid_uses_probe(self):
+        cache = LoginCache()
+        cache.add_cache(TokenCache("t", valid=False))
+        cache.add_cache(NoProbeCache({}))
+        self.assertFalse(cache.is_valid(TokenCache))
+        self.assertFalse(cache.is_valid(NoProbeCache))  # 无法检查的 Cache 被认为无效.
+        cache.add_cache(TokenCache("t"))
+        self.assertTrue(cache.is_valid(TokenCache))
+        self.assertIs(cache_type_of(TokenCache.grabber), TokenCache)
+        self.assertIsNone(cache_type_of(lambda d: None))
+
+
+class TestSessionStore(unittest.TestCase):
+    def setUp(self):
+        init()
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.path = Path(self.dir.name, "session.bin")
+
+    def test_save_load_discard(self):
+        store = SessionStore(self.path)
+        self.assertIsNone(store.load())
+        cache = LoginCache()
+        cache.add_cache(TokenCache("secret-token"))
+        cache.add_cache(NoProbeCache({"a": "1"}))
+        store.save(cache)
+        self.assertNotIn(b"secret-token", self.path.read_bytes())  # 文件被加密.
+        self.assertEqual(SessionStore(self.path).load().get_cache(TokenCache).token, "secret-token")
+        store.discard(TokenCache)
+        restored = store.load()
+        self.assertIsNone(restored.get_cache(TokenCache))
+        self.assertIsNotNone(restored.get_cache(NoProbeCache))
+        store.clear()
+        self.assertIsNone(store.load())
+
+    def test_tampered_or_keyless_session_is_ignored(self):
+        store = SessionStore(self.path)
+        cache = LoginCache()
+        cache.add_cache(TokenCache("t"))
+        store.save(cache)
+        blob = bytearray(self.path.read_bytes())
+        blob[-1] ^= 1
+        self.path.write_bytes(bytes(blob))
+        self.assertIsNone(store.load())
+        store.save(cache)
+        store.key_path.unlink()
+        self.assertIsNone(store.load())
+
+
+if __name__ == '__main__':
+    unittest.main()